@@ -0,0 +1,46 @@
+"""Add composite/partial indexes for stats, gallery and cleanup queries."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_01"
+down_revision = "20251105_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_job_history_slot_status_completed",
+        "job_history",
+        ["slot_id", "status", "completed_at"],
+    )
+    op.create_index(
+        "ix_job_history_failure_completed",
+        "job_history",
+        ["failure_reason", "completed_at"],
+        sqlite_where=sa.text("failure_reason IS NOT NULL"),
+        postgresql_where=sa.text("failure_reason IS NOT NULL"),
+    )
+    op.create_index("ix_job_history_started_at", "job_history", ["started_at"])
+    op.create_index("ix_job_history_completed_at", "job_history", ["completed_at"])
+    op.create_index(
+        "ix_media_object_scope_expires",
+        "media_object",
+        ["scope", "expires_at"],
+        sqlite_where=sa.text("cleaned_at IS NULL"),
+        postgresql_where=sa.text("cleaned_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_object_scope_expires", table_name="media_object")
+    op.drop_index("ix_job_history_completed_at", table_name="job_history")
+    op.drop_index("ix_job_history_started_at", table_name="job_history")
+    op.drop_index("ix_job_history_failure_completed", table_name="job_history")
+    op.drop_index(
+        "ix_job_history_slot_status_completed", table_name="job_history"
+    )
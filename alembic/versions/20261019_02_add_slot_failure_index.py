@@ -0,0 +1,26 @@
+"""Add per-slot failure index for set-based slot metrics."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_02"
+down_revision = "20261019_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_job_history_slot_failure_completed",
+        "job_history",
+        ["slot_id", "completed_at", "started_at"],
+        sqlite_where=sa.text("failure_reason IS NOT NULL"),
+        postgresql_where=sa.text("failure_reason IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_job_history_slot_failure_completed", table_name="job_history")
@@ -0,0 +1,50 @@
+"""Add job_stats_rollup table with pre-aggregated job counters."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_03"
+down_revision = "20261019_02"
+branch_labels = None
+depends_on = None
+
+DURATION_BUCKETS_SECONDS = (1, 5, 10, 20, 30, 40, 48, 60)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "job_stats_rollup",
+        sa.Column("resolution", sa.String(length=8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("slot_id", sa.String(length=32), nullable=False),
+        sa.Column("provider", sa.String(length=64), nullable=False),
+        sa.Column("status", sa.String(length=32), nullable=False),
+        sa.Column("failure_reason", sa.String(length=64), nullable=False),
+        sa.Column("started", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("duration_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "duration_sum_seconds", sa.Float(), nullable=False, server_default="0"
+        ),
+        *[
+            sa.Column(
+                f"duration_le_{bucket}", sa.Integer(), nullable=False, server_default="0"
+            )
+            for bucket in DURATION_BUCKETS_SECONDS
+        ],
+        sa.PrimaryKeyConstraint(
+            "resolution",
+            "bucket_start",
+            "slot_id",
+            "provider",
+            "status",
+            "failure_reason",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("job_stats_rollup")
@@ -0,0 +1,31 @@
+"""Add covering indexes for bucketed latency/throughput series."""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20261019_06"
+down_revision = "20261019_05"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_job_duration_sketch_series",
+        "job_duration_sketch",
+        ["resolution", "bucket_start", "bin", "count"],
+    )
+    op.create_index(
+        "ix_job_duration_sketch_slot_series",
+        "job_duration_sketch",
+        ["resolution", "slot_id", "bucket_start", "bin", "count"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_job_duration_sketch_slot_series", table_name="job_duration_sketch"
+    )
+    op.drop_index("ix_job_duration_sketch_series", table_name="job_duration_sketch")
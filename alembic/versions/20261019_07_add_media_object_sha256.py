@@ -0,0 +1,21 @@
+"""Add media_object.sha256 content hash for public HTTP caching."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_07"
+down_revision = "20261019_06"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # старые строки остаются без хэша — ETag для них строится по stat файла
+    op.add_column("media_object", sa.Column("sha256", sa.String(length=64)))
+
+
+def downgrade() -> None:
+    op.drop_column("media_object", "sha256")
@@ -0,0 +1,26 @@
+"""Index live media_object rows by sha256 for content-addressed storage."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_08"
+down_revision = "20261019_07"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_media_object_sha256_live",
+        "media_object",
+        ["sha256"],
+        sqlite_where=sa.text("cleaned_at IS NULL"),
+        postgresql_where=sa.text("cleaned_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_object_sha256_live", table_name="media_object")
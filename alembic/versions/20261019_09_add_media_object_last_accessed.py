@@ -0,0 +1,29 @@
+"""Track last public access of results for disk-pressure eviction."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_09"
+down_revision = "20261019_08"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # NULL — результат ещё ни разу не скачивали, он вытесняется первым
+    op.add_column("media_object", sa.Column("last_accessed_at", sa.DateTime()))
+    op.create_index(
+        "ix_media_object_scope_accessed",
+        "media_object",
+        ["scope", "last_accessed_at", "expires_at", "id"],
+        sqlite_where=sa.text("cleaned_at IS NULL"),
+        postgresql_where=sa.text("cleaned_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_object_scope_accessed", table_name="media_object")
+    op.drop_column("media_object", "last_accessed_at")
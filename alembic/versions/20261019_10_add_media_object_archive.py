@@ -0,0 +1,30 @@
+"""Cold-tier result archives: member offset/size and live-member index."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_10"
+down_revision = "20261019_09"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("media_object", sa.Column("archive_offset", sa.BigInteger()))
+    op.add_column("media_object", sa.Column("archive_size", sa.BigInteger()))
+    op.create_index(
+        "ix_media_object_archive_live",
+        "media_object",
+        ["path"],
+        sqlite_where=sa.text("archive_offset IS NOT NULL AND cleaned_at IS NULL"),
+        postgresql_where=sa.text("archive_offset IS NOT NULL AND cleaned_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_object_archive_live", table_name="media_object")
+    op.drop_column("media_object", "archive_size")
+    op.drop_column("media_object", "archive_offset")
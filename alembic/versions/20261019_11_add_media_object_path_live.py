@@ -0,0 +1,43 @@
+"""Live media_object paths in path order for orphan reconciliation."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_11"
+down_revision = "20261019_10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # индекс по всем живым путям покрывает и запросы живых членов архива
+    op.drop_index("ix_media_object_archive_live", table_name="media_object")
+    op.create_index(
+        "ix_media_object_path_live",
+        "media_object",
+        ["path"],
+        sqlite_where=sa.text("cleaned_at IS NULL"),
+        postgresql_where=sa.text("cleaned_at IS NULL"),
+    )
+    op.create_index(
+        "ix_media_object_preview_live",
+        "media_object",
+        ["preview_path"],
+        sqlite_where=sa.text("preview_path IS NOT NULL AND cleaned_at IS NULL"),
+        postgresql_where=sa.text("preview_path IS NOT NULL AND cleaned_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_object_preview_live", table_name="media_object")
+    op.drop_index("ix_media_object_path_live", table_name="media_object")
+    op.create_index(
+        "ix_media_object_archive_live",
+        "media_object",
+        ["path"],
+        sqlite_where=sa.text("archive_offset IS NOT NULL AND cleaned_at IS NULL"),
+        postgresql_where=sa.text("archive_offset IS NOT NULL AND cleaned_at IS NULL"),
+    )
@@ -0,0 +1,46 @@
+"""Evict never-served results by write time, not ahead of everything served."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_12"
+down_revision = "20261019_11"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("media_object", sa.Column("created_at", sa.DateTime()))
+    # время записи раньше не хранилось: ближайшее известное — завершение задачи
+    op.execute(
+        """
+        UPDATE media_object SET created_at = (
+            SELECT COALESCE(job_history.completed_at, job_history.started_at)
+            FROM job_history
+            WHERE job_history.job_id = media_object.job_id
+        )
+        """
+    )
+    op.drop_index("ix_media_object_scope_accessed", table_name="media_object")
+    op.create_index(
+        "ix_media_object_scope_lru",
+        "media_object",
+        ["scope", sa.text("coalesce(last_accessed_at, created_at)"), "expires_at", "id"],
+        sqlite_where=sa.text("cleaned_at IS NULL"),
+        postgresql_where=sa.text("cleaned_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_object_scope_lru", table_name="media_object")
+    op.create_index(
+        "ix_media_object_scope_accessed",
+        "media_object",
+        ["scope", "last_accessed_at", "expires_at", "id"],
+        sqlite_where=sa.text("cleaned_at IS NULL"),
+        postgresql_where=sa.text("cleaned_at IS NULL"),
+    )
+    op.drop_column("media_object", "created_at")
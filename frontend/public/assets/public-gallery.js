@@ -1,13 +1,75 @@
 (function () {
   const dataset = document.body.dataset || {};
   const endpoint = dataset.publicGalleryEndpoint || "/pub/gallery";
+  const streamEndpoint = dataset.publicGalleryStream || endpoint + "/stream";
+  // без живого потока (лимит зрителей, старый браузер) — редкий опрос
+  const POLL_INTERVAL_MS = 60000;
+  const MAX_RESULTS = 10;
+  let pollTimer = null;
   const listEl = document.getElementById("public-list");
   const statusEl = document.getElementById("public-status");
   const reloadBtn = document.getElementById("public-reload");
 
   if (reloadBtn) reloadBtn.addEventListener("click", loadGallery);
   buildSkeleton();
-  loadGallery();
+  connectStream();
+
+  // новые кадры приходят событиями; полная загрузка — на старте потока и resync
+  function connectStream() {
+    if (!window.EventSource) {
+      startPolling();
+      return;
+    }
+    const source = new EventSource(streamEndpoint);
+    source.addEventListener("ready", () => {
+      stopPolling();
+      loadGallery();
+    });
+    source.addEventListener("result", (event) => {
+      const payload = JSON.parse(event.data);
+      addResult(payload.slot_id, payload.result);
+    });
+    source.addEventListener("resync", loadGallery);
+    source.addEventListener("closed", () => {
+      source.close();
+      loadGallery();
+    });
+    source.addEventListener("error", () => {
+      // CLOSED — сервер отказал (403/503); иначе браузер переподключится сам
+      if (source.readyState === EventSource.CLOSED) startPolling();
+    });
+  }
+
+  function startPolling() {
+    if (pollTimer) return;
+    loadGallery();
+    pollTimer = setInterval(loadGallery, POLL_INTERVAL_MS);
+  }
+
+  function stopPolling() {
+    if (!pollTimer) return;
+    clearInterval(pollTimer);
+    pollTimer = null;
+  }
+
+  function addResult(slotId, item) {
+    if (!listEl || !item) return;
+    const details = listEl.querySelector(`[data-slot-id="${slotId}"]`);
+    const body = details && details.querySelector(".gallery-body");
+    if (!body) return;
+    if (body.querySelector(`[data-job-id="${item.job_id}"]`)) return;
+    let grid = body.querySelector(".slot-results__grid");
+    if (!grid) {
+      grid = document.createElement("div");
+      grid.className = "slot-results__grid";
+      body.innerHTML = "";
+      body.appendChild(grid);
+    }
+    grid.prepend(buildResultCard(item));
+    while (grid.children.length > MAX_RESULTS) {
+      grid.lastElementChild.remove();
+    }
+  }
 
   function buildSkeleton() {
     if (!listEl) return;
@@ -63,6 +125,7 @@
       if (resp.status === 403) {
         setStatus("Ссылка больше не активна. Обратитесь к администратору.", "error");
         renderInactive();
+        stopPolling();
         return;
       }
       if (resp.status === 429) {
@@ -146,6 +209,7 @@
   function buildResultCard(item) {
     const node = document.createElement("article");
     node.className = "slot-results__item";
+    if (item.job_id) node.dataset.jobId = item.job_id;
 
     const thumbWrap = document.createElement("div");
     thumbWrap.className = "slot-results__thumb-wrap";
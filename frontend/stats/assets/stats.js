@@ -2,6 +2,9 @@
   const root = document.body;
   const overviewEndpoint = root.dataset.overviewEndpoint;
   const slotsEndpoint = root.dataset.slotsEndpoint;
+  const latencyEndpoint = root.dataset.latencyEndpoint;
+  const timeseriesEndpoint = root.dataset.timeseriesEndpoint;
+  const streamEndpoint = root.dataset.streamEndpoint;
   if (!overviewEndpoint || !slotsEndpoint) {
     console.warn("Stats page is missing API endpoints.");
     return;
@@ -14,6 +17,7 @@
   const loadingWindowLabel = document.getElementById("loading-window-label");
   const errorBox = document.getElementById("stats-error");
   const lastRefreshEl = document.getElementById("last-refresh");
+  const liveStatusEl = document.getElementById("live-status");
   const summaryWindowChip = document.getElementById("summary-window");
   const summaryValues = {
     jobsTotal: document.getElementById("summary-jobs-total"),
@@ -25,15 +29,29 @@
   const tableBody = document.getElementById("slots-table-body");
   const failuresBody = document.getElementById("failures-table-body");
   const chartList = document.getElementById("slots-chart");
+  const latencyList = document.getElementById("latency-chart");
+  const latencyBucketChip = document.getElementById("latency-bucket");
+  const throughputList = document.getElementById("throughput-chart");
+  const throughputBucketChip = document.getElementById("throughput-bucket");
 
   const numberFormatter = new Intl.NumberFormat("ru-RU");
   const percentFormatter = new Intl.NumberFormat("ru-RU", { maximumFractionDigits: 1 });
+  const secondsFormatter = new Intl.NumberFormat("ru-RU", { maximumFractionDigits: 2 });
   const dateFormatter = new Intl.DateTimeFormat("ru-RU", {
     dateStyle: "short",
     timeStyle: "short",
   });
 
   const TOKEN_KEY = "photochanger.jwt";
+  // без живого потока страница опрашивает API сама
+  const POLL_INTERVAL_MS = 30000;
+  const RECONNECT_DELAY_MS = 5000;
+
+  // последние загруженные данные; события потока применяются к ним
+  let currentOverview = null;
+  let currentSlots = null;
+  let inFlight = { total: 0, slots: {} };
+  let pollTimer = null;
 
   const readToken = () => {
     try {
@@ -65,6 +83,15 @@
     return `${percentFormatter.format(Math.max(fraction * 100, 0))}%`;
   };
 
+  const formatSeconds = (value) => (value == null ? "—" : secondsFormatter.format(value));
+
+  // ~24 точки на окно; кратные часу интервалы читаются из часовых корзин
+  const bucketForWindow = (windowMinutes) => {
+    if (windowMinutes <= 120) return 5;
+    if (windowMinutes <= 720) return 30;
+    return Math.ceil(windowMinutes / 24 / 60) * 60;
+  };
+
   const formatDate = (value) => {
     if (!value) return "—";
     try {
@@ -87,7 +114,7 @@
 
   const renderTable = (slots) => {
     if (!slots.length) {
-      tableBody.innerHTML = `<tr><td colspan="8" class="muted-hint">Нет активных слотов за выбранное окно.</td></tr>`;
+      tableBody.innerHTML = `<tr><td colspan="11" class="muted-hint">Нет активных слотов за выбранное окно.</td></tr>`;
       return;
     }
 
@@ -99,13 +126,16 @@
           <tr>
             <td>
               <strong>${slot.display_name}</strong>
-              <div class="muted-hint">${slot.slot_id}</div>
+              <div class="muted-hint">${slot.slot_id}${inFlight.slots[slot.slot_id] ? ` · в работе ${formatNumber(inFlight.slots[slot.slot_id])}` : ""}</div>
             </td>
             <td>${formatNumber(slot.jobs_last_window)}</td>
             <td>${formatNumber(slot.success_last_window)}</td>
             <td>${formatNumber(slot.timeouts_last_window)}</td>
             <td>${successRate}</td>
             <td>${timeoutRate}</td>
+            <td>${formatSeconds(slot.latency_p50_seconds)}</td>
+            <td>${formatSeconds(slot.latency_p95_seconds)}</td>
+            <td>${formatSeconds(slot.latency_p99_seconds)}</td>
             <td>${formatDate(slot.last_success_at)}</td>
             <td>${slot.last_error_reason ?? "—"}</td>
           </tr>
@@ -144,6 +174,64 @@
     chartList.innerHTML = items;
   };
 
+  const renderLatency = (series) => {
+    if (!latencyList || !series) {
+      return;
+    }
+    latencyBucketChip.textContent = `Интервал ${series.bucket_minutes} мин`;
+    const points = (series.points || []).filter((point) => point.count > 0);
+    if (!points.length) {
+      latencyList.innerHTML = `<li class="muted-hint">Нет завершённых задач за выбранное окно.</li>`;
+      return;
+    }
+    const maxValue = Math.max(...points.map((point) => point.p99 ?? 0)) || 1;
+    latencyList.innerHTML = points
+      .map((point) => {
+        const width = Math.max(Math.min(((point.p95 ?? 0) / maxValue) * 100, 100), 0);
+        return `
+          <li class="chart-item">
+            <div class="chart-item__header">
+              <strong>${formatDate(point.bucket_start)}</strong>
+              <span>p50 ${formatSeconds(point.p50)} · p95 ${formatSeconds(point.p95)} · p99 ${formatSeconds(point.p99)} с · ${formatNumber(point.count)} задач</span>
+            </div>
+            <div class="chart-bar" aria-label="p95 длительности">
+              <span class="chart-bar__latency" style="width:${width}%;"></span>
+            </div>
+          </li>
+        `;
+      })
+      .join("");
+  };
+
+  const renderThroughput = (series) => {
+    if (!throughputList || !series) {
+      return;
+    }
+    throughputBucketChip.textContent = `Интервал ${series.bucket_minutes} мин`;
+    const points = series.points || [];
+    const peak = Math.max(0, ...points.map((point) => point.jobs));
+    if (!peak) {
+      throughputList.innerHTML = `<li class="muted-hint">Нет задач за выбранное окно.</li>`;
+      return;
+    }
+    throughputList.innerHTML = points
+      .map((point) => {
+        const width = Math.max(Math.min((point.jobs / peak) * 100, 100), 0);
+        return `
+          <li class="chart-item">
+            <div class="chart-item__header">
+              <strong>${formatDate(point.bucket_start)}</strong>
+              <span>${formatNumber(point.jobs)} задач · ${formatNumber(point.successes)} успехов · ${formatNumber(point.timeouts)} таймаутов · ${formatNumber(point.errors)} ошибок · ср. ${formatSeconds(point.mean_duration_seconds)} с</span>
+            </div>
+            <div class="chart-bar" aria-label="Число задач">
+              <span class="chart-bar__success" style="width:${width}%;"></span>
+            </div>
+          </li>
+        `;
+      })
+      .join("");
+  };
+
   const renderFailures = (failures) => {
     if (!failuresBody) {
       return;
@@ -173,6 +261,134 @@
     lastRefreshEl.textContent = `Обновлено ${dateFormatter.format(now)}`;
   };
 
+  const renderLiveStatus = (text) => {
+    if (!liveStatusEl) return;
+    liveStatusEl.textContent = text;
+  };
+
+  const renderInFlight = () => {
+    renderLiveStatus(`В реальном времени · в работе ${formatNumber(inFlight.total)}`);
+  };
+
+  const renderSlots = () => {
+    const slots = currentSlots?.slots || [];
+    renderTable(slots);
+    renderChart(slots);
+  };
+
+  const applySnapshot = (snapshot) => {
+    inFlight = { total: snapshot.in_flight_total ?? 0, slots: {} };
+    (snapshot.slots || []).forEach((item) => {
+      inFlight.slots[item.slot_id] = (inFlight.slots[item.slot_id] ?? 0) + item.in_flight;
+    });
+    renderSlots();
+    renderInFlight();
+  };
+
+  // завершённая задача попадает в текущее окно: счётчики растут до следующей
+  // полной загрузки, БД при этом не опрашивается
+  const applyCompleted = (event) => {
+    if (currentOverview) {
+      const system = currentOverview.system;
+      system.jobs_total += 1;
+      system.jobs_last_window += 1;
+      if (event.status === "timeout") system.timeouts_last_window += 1;
+      if (event.failure_reason === "provider_error") system.provider_errors_last_window += 1;
+      renderSummary(currentOverview);
+    }
+    const slot = (currentSlots?.slots || []).find((item) => item.slot_id === event.slot_id);
+    if (slot) {
+      slot.jobs_last_window += 1;
+      if (event.status === "done") {
+        slot.success_last_window += 1;
+        slot.last_success_at = event.completed_at;
+      } else {
+        if (event.status === "timeout") slot.timeouts_last_window += 1;
+        slot.last_error_reason = event.failure_reason ?? slot.last_error_reason;
+      }
+      slot.success_rate = slot.success_last_window / slot.jobs_last_window;
+      slot.timeout_rate = slot.timeouts_last_window / slot.jobs_last_window;
+      renderSlots();
+    }
+  };
+
+  const handleStreamEvent = (name, data) => {
+    const payload = JSON.parse(data);
+    if (name === "snapshot") {
+      applySnapshot(payload);
+      return;
+    }
+    if (name !== "job") return;
+    inFlight.total = payload.in_flight_total;
+    inFlight.slots[payload.slot_id] = payload.slot_in_flight;
+    if (payload.type === "completed") {
+      applyCompleted(payload);
+    } else {
+      renderSlots();
+    }
+    renderInFlight();
+    updateTimestamp();
+  };
+
+  // EventSource не умеет заголовок Authorization, поэтому поток читается через fetch
+  const readStream = async (token) => {
+    const response = await fetch(streamEndpoint, {
+      headers: { Authorization: `Bearer ${token}`, Accept: "text/event-stream" },
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`stream: ${response.status}`);
+    }
+    stopPolling();
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) return;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary = buffer.indexOf("\n\n");
+      while (boundary !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        let name = "message";
+        const data = [];
+        block.split("\n").forEach((line) => {
+          if (line.startsWith("event:")) name = line.slice(6).trim();
+          else if (line.startsWith("data:")) data.push(line.slice(5).trim());
+        });
+        if (data.length) handleStreamEvent(name, data.join("\n"));
+        boundary = buffer.indexOf("\n\n");
+      }
+    }
+  };
+
+  const startPolling = () => {
+    if (pollTimer) return;
+    pollTimer = window.setInterval(loadStats, POLL_INTERVAL_MS);
+  };
+
+  const stopPolling = () => {
+    if (!pollTimer) return;
+    window.clearInterval(pollTimer);
+    pollTimer = null;
+  };
+
+  const connectStream = async () => {
+    const token = readToken();
+    if (!streamEndpoint || !token || !window.TextDecoder) {
+      startPolling();
+      return;
+    }
+    try {
+      await readStream(token);
+    } catch (error) {
+      console.warn("Stats stream unavailable, falling back to polling.", error);
+    }
+    renderLiveStatus(`Автообновление раз в ${POLL_INTERVAL_MS / 1000} с`);
+    startPolling();
+    window.setTimeout(connectStream, RECONNECT_DELAY_MS);
+  };
+
   const loadStats = async () => {
     const windowValue = clampWindow(windowInput.value);
     windowInput.value = windowValue;
@@ -195,9 +411,16 @@
       Authorization: `Bearer ${token}`,
     };
     try {
-      const [overviewResp, slotsResp] = await Promise.all([
+      const seriesQuery = `${query}&bucket_minutes=${bucketForWindow(windowValue)}`;
+      const [overviewResp, slotsResp, latencyResp, timeseriesResp] = await Promise.all([
         fetch(`${overviewEndpoint}${query}`, { headers: authHeaders }),
         fetch(`${slotsEndpoint}${query}`, { headers: authHeaders }),
+        latencyEndpoint
+          ? fetch(`${latencyEndpoint}${seriesQuery}`, { headers: authHeaders })
+          : Promise.resolve(null),
+        timeseriesEndpoint
+          ? fetch(`${timeseriesEndpoint}${seriesQuery}`, { headers: authHeaders })
+          : Promise.resolve(null),
       ]);
 
       if (!overviewResp.ok) {
@@ -209,11 +432,18 @@
 
       const overviewData = await overviewResp.json();
       const slotsData = await slotsResp.json();
+      // ряды — необязательная часть страницы, их ошибка не прячет остальное
+      const latencyData = latencyResp && latencyResp.ok ? await latencyResp.json() : null;
+      const timeseriesData =
+        timeseriesResp && timeseriesResp.ok ? await timeseriesResp.json() : null;
 
+      currentOverview = overviewData;
+      currentSlots = slotsData;
       renderSummary(overviewData);
-      renderTable(slotsData.slots || []);
-      renderChart(slotsData.slots || []);
+      renderSlots();
       renderFailures(slotsData.recent_failures || []);
+      renderLatency(latencyData);
+      renderThroughput(timeseriesData);
       updateTimestamp();
     } catch (error) {
       console.error(error);
@@ -231,5 +461,8 @@
     windowInput.value = clampWindow(windowInput.value);
   });
 
-  document.addEventListener("DOMContentLoaded", loadStats);
+  document.addEventListener("DOMContentLoaded", async () => {
+    await loadStats();
+    connectStream();
+  });
 })();
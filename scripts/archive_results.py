@@ -0,0 +1,85 @@
+"""Pack aged results into per-slot, per-day archives (cold tier, online)."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import timedelta
+
+from src.app.config import load_config
+from src.app.media.result_archive import (
+    ArchiveSummary,
+    ResultArchive,
+    archive_aged_results,
+)
+from src.app.repositories.media_object_repository import MediaObjectRepository
+from src.app.repositories.storage_ledger import StorageLedger
+
+
+def perform_archive(
+    *, older_than_hours: float, batch_size: int, limit: int | None
+) -> ArchiveSummary:
+    """Archive results completed more than ``older_than_hours`` ago."""
+    # схему создаёт приложение; скрипту не нужен init_db на каждом запуске
+    config = load_config(init_schema=False)
+    media_repo = MediaObjectRepository(config.session_factory)
+    ledger = StorageLedger(config.session_factory)
+    return archive_aged_results(
+        config.session_factory,
+        ResultArchive.for_paths(config.media_paths, media_repo, ledger),
+        config.media_paths.results,
+        older_than=timedelta(hours=older_than_hours),
+        ledger=ledger,
+        batch_size=batch_size,
+        limit=limit,
+    )
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Move aged media/results into media/archive/<slot>/<day>.zip."
+    )
+    parser.add_argument(
+        "--older-than-hours",
+        type=float,
+        default=24.0,
+        help="Archive results completed at least this long ago (default: 24).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Results per archive part and per DB batch (default: 1000).",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Stop after archiving N results (default: everything).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv or [])
+    try:
+        summary = perform_archive(
+            older_than_hours=args.older_than_hours,
+            batch_size=args.batch_size,
+            limit=args.limit,
+        )
+    except Exception as exc:
+        print(f"result archive failed: {exc}", file=sys.stderr)
+        return 2
+
+    print(
+        f"result archive done, archived={summary.archived}, "
+        f"archives={summary.archives}, files_removed={summary.files_removed}, "
+        f"missing={summary.missing}, bytes={summary.bytes_archived}",
+        file=sys.stdout,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
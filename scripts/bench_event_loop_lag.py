@@ -0,0 +1,163 @@
+"""Measure event-loop lag caused by repository calls (sync vs DB thread pool)."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.app.db.db_executor import DbExecutor
+from src.app.db.db_init import init_db
+from src.app.repositories.job_history_repository import JobHistoryRepository
+
+
+@dataclass(slots=True)
+class LagReport:
+    mode: str
+    samples: int
+    p50_ms: float
+    p99_ms: float
+    max_ms: float
+    elapsed_seconds: float
+
+
+def _build_repo(db_path: Path, commit_delay_ms: float) -> JobHistoryRepository:
+    engine = create_engine(
+        f"sqlite:///{db_path.as_posix()}",
+        future=True,
+        connect_args={"check_same_thread": False},
+    )
+    session_factory: sessionmaker[Session] = sessionmaker(
+        bind=engine, expire_on_commit=False
+    )
+    init_db(engine, session_factory)
+    if commit_delay_ms > 0:
+        # имитируем медленный диск/fsync: каждый commit «висит» заданное время
+        @event.listens_for(session_factory, "before_commit")
+        def _slow_commit(_session: Session) -> None:
+            time.sleep(commit_delay_ms / 1000)
+
+    return JobHistoryRepository(session_factory)
+
+
+async def _probe(stop: asyncio.Event, interval: float, lags: list[float]) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected) * 1000)
+
+
+async def _job(
+    repo: JobHistoryRepository,
+    slot_id: str,
+    executor: DbExecutor | None,
+) -> None:
+    job_id = uuid4().hex
+    now = datetime.utcnow()
+    kwargs = {
+        "job_id": job_id,
+        "slot_id": slot_id,
+        "started_at": now,
+        "sync_deadline": now + timedelta(seconds=48),
+    }
+    if executor is None:
+        repo.create_pending(**kwargs)
+    else:
+        await executor.run(repo.create_pending, **kwargs)
+    await asyncio.sleep(0)  # «ожидание провайдера»
+    if executor is None:
+        repo.set_failure(job_id=job_id, failure_reason="bench", status="failed")
+    else:
+        await executor.run(
+            repo.set_failure, job_id=job_id, failure_reason="bench", status="failed"
+        )
+
+
+async def run_mode(
+    mode: str,
+    *,
+    jobs: int,
+    slots: int,
+    commit_delay_ms: float,
+    pool_size: int,
+    workdir: Path,
+) -> LagReport:
+    repo = _build_repo(workdir / f"bench-{mode}.db", commit_delay_ms)
+    executor = DbExecutor(max_workers=pool_size) if mode == "pool" else None
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(stop, 0.005, lags))
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(
+                _job(repo, f"slot-{index % slots:03d}", executor)
+                for index in range(jobs)
+            )
+        )
+    finally:
+        stop.set()
+        await probe
+        if executor is not None:
+            executor.shutdown()
+    elapsed = time.perf_counter() - started
+    ordered = sorted(lags) or [0.0]
+    return LagReport(
+        mode=mode,
+        samples=len(lags),
+        p50_ms=statistics.median(ordered),
+        p99_ms=ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        max_ms=ordered[-1],
+        elapsed_seconds=elapsed,
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--slots", type=int, default=15)
+    parser.add_argument(
+        "--commit-delay-ms",
+        type=float,
+        default=5.0,
+        help="Искусственная задержка каждого commit (мс)",
+    )
+    parser.add_argument("--pool-size", type=int, default=4)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("sync", "pool"):
+            report = asyncio.run(
+                run_mode(
+                    mode,
+                    jobs=args.jobs,
+                    slots=args.slots,
+                    commit_delay_ms=args.commit_delay_ms,
+                    pool_size=args.pool_size,
+                    workdir=Path(tmp),
+                )
+            )
+            print(
+                f"{report.mode}: loop lag p50={report.p50_ms:.1f}ms "
+                f"p99={report.p99_ms:.1f}ms max={report.max_ms:.1f}ms "
+                f"samples={report.samples} elapsed={report.elapsed_seconds:.2f}s"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Compare row-by-row and batched cleanup on a synthetic backlog of expired media."""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.app.config import MediaPaths
+from src.app.db.db_engine import create_db_engine
+from src.app.db.db_init import init_db
+from src.app.db.db_models import MediaObjectModel
+from src.app.media.media_cleanup import CleanupLimits, cleanup_expired_results
+from src.app.media.media_service import ResultStore
+from src.app.repositories.media_object_repository import MediaObjectRepository
+from src.app.repositories.storage_ledger import StorageLedger
+
+
+def seed(
+    session_factory: sessionmaker[Session],
+    paths: MediaPaths,
+    rows: int,
+    now: datetime,
+    *,
+    prefix: str,
+    with_files: bool,
+) -> None:
+    """``rows`` expired results (a week of outage), optionally with payload files."""
+    rng = random.Random(11)
+    batch: list[dict[str, Any]] = []
+    with session_factory() as session:
+        for index in range(rows):
+            job_id = f"{prefix}-{index:08d}"
+            slot_id = f"slot-{rng.randint(1, 15):03d}"
+            path = paths.results / slot_id / job_id / "payload.png"
+            if with_files:
+                path.parent.mkdir(parents=True)
+                path.write_bytes(b"x" * 64)
+            batch.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "job_id": job_id,
+                    "slot_id": slot_id,
+                    "scope": "result",
+                    "path": str(path),
+                    "expires_at": now - timedelta(minutes=rng.randint(1, 60 * 24 * 7)),
+                    "created_at": now - timedelta(days=8),
+                }
+            )
+            if len(batch) >= 10_000:
+                session.execute(insert(MediaObjectModel), batch)
+                batch = []
+        if batch:
+            session.execute(insert(MediaObjectModel), batch)
+        session.execute(text("ANALYZE"))
+        session.commit()
+
+
+def legacy_cleanup(
+    media_repo: MediaObjectRepository, result_store: ResultStore, now: datetime
+) -> int:
+    """Previous implementation: load everything, one commit per row."""
+    removed = 0
+    for media in media_repo.list_expired_results(now):
+        result_store.remove_result_dir(media.slot_id, media.job_id)
+        media_repo.mark_cleaned(media.id, now)
+        removed += 1
+    return removed
+
+
+def _measure(func: Callable[[], int], trace_memory: bool) -> tuple[int, float, float]:
+    """Rows removed, seconds, peak Python heap in MiB (0 without tracing)."""
+    # tracemalloc замедляет аллокации в разы — время с ним не сравнимо
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    removed = func()
+    elapsed = time.perf_counter() - started
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return removed, elapsed, peak / (1024 * 1024)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument(
+        "--legacy-rows",
+        type=int,
+        default=20_000,
+        help="Backlog for the row-by-row variant (it is far too slow for --rows).",
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--no-files",
+        action="store_true",
+        help="Database rows only: measure queries/commits without filesystem work.",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Report peak Python heap per variant (slows both variants down).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    now = datetime.utcnow()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = MediaPaths(
+            root=root / "media",
+            results=root / "media" / "results",
+            templates=root / "media" / "templates",
+            temp=root / "media" / "temp",
+        )
+        engine = create_db_engine(f"sqlite:///{(root / 'cleanup.db').as_posix()}")
+        session_factory: sessionmaker[Session] = sessionmaker(
+            bind=engine, expire_on_commit=False
+        )
+        init_db(engine, session_factory)
+        media_repo = MediaObjectRepository(session_factory)
+        result_store = ResultStore(paths, ledger=StorageLedger(session_factory))
+
+        seed(
+            session_factory, paths, args.legacy_rows, now,
+            prefix="legacy", with_files=not args.no_files,
+        )
+        legacy_removed, legacy_s, legacy_mib = _measure(
+            lambda: legacy_cleanup(media_repo, result_store, now), args.trace_memory
+        )
+
+        seed(
+            session_factory, paths, args.rows, now,
+            prefix="batched", with_files=not args.no_files,
+        )
+        limits = CleanupLimits(batch_size=args.batch_size, workers=args.workers)
+        batched_removed, batched_s, batched_mib = _measure(
+            lambda: cleanup_expired_results(media_repo, result_store, now, limits=limits),
+            args.trace_memory,
+        )
+        left = media_repo.count_expired("result", now)
+        engine.dispose()
+
+    print(f"files={'no' if args.no_files else 'yes'} workers={args.workers}")
+    print(
+        f"row-by-row: rows={legacy_removed} {legacy_s:.1f}s "
+        f"({legacy_removed / legacy_s:.0f} rows/s) peak={legacy_mib:.1f}MiB"
+    )
+    print(
+        f"batched({args.batch_size}): rows={batched_removed} {batched_s:.1f}s "
+        f"({batched_removed / batched_s:.0f} rows/s) peak={batched_mib:.1f}MiB"
+    )
+    print(f"left uncleaned: {left}")
+    return 0 if batched_removed == args.rows and left == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Measure inode count and public serving latency before and after result archival."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.app.config import MediaPaths
+from src.app.db.db_engine import create_db_engine
+from src.app.db.db_init import init_db
+from src.app.db.db_models import JobHistoryModel, MediaObjectModel
+from src.app.media.public_result_service import PublicResultService
+from src.app.media.result_archive import ResultArchive, archive_aged_results
+from src.app.public.public_results_router import build_public_results_router
+from src.app.repositories.job_history_repository import JobHistoryRepository
+from src.app.repositories.media_object_repository import MediaObjectRepository
+
+
+def seed(
+    session_factory: sessionmaker[Session],
+    paths: MediaPaths,
+    jobs: int,
+    days: int,
+    payload_size: int,
+    now: datetime,
+) -> list[str]:
+    """``jobs`` finished results spread over the last ``days`` days and 15 slots."""
+    rng = random.Random(7)
+    job_ids: list[str] = []
+    history: list[dict[str, Any]] = []
+    media: list[dict[str, Any]] = []
+    for index in range(jobs):
+        job_id = f"job-{index:08d}"
+        slot_id = f"slot-{rng.randint(1, 15):03d}"
+        completed_at = now - timedelta(days=1 + rng.random() * days)
+        path = paths.results / slot_id / job_id / "payload.jpg"
+        path.parent.mkdir(parents=True)
+        path.write_bytes(rng.randbytes(payload_size))
+        expires_at = now + timedelta(days=30)
+        history.append(
+            {
+                "job_id": job_id,
+                "slot_id": slot_id,
+                "source": "ingest",
+                "status": "done",
+                "started_at": completed_at - timedelta(seconds=5),
+                "completed_at": completed_at,
+                "result_path": str(path),
+                "result_expires_at": expires_at,
+            }
+        )
+        media.append(
+            {
+                "id": str(uuid.uuid4()),
+                "job_id": job_id,
+                "slot_id": slot_id,
+                "scope": "result",
+                "path": str(path),
+                "expires_at": expires_at,
+                "created_at": completed_at,
+            }
+        )
+        job_ids.append(job_id)
+    with session_factory() as session:
+        session.execute(insert(JobHistoryModel), history)
+        session.execute(insert(MediaObjectModel), media)
+        session.execute(text("ANALYZE"))
+        session.commit()
+    return job_ids
+
+
+def count_inodes(root: Path) -> int:
+    """Files plus directories under ``root`` (what the filesystem has to track)."""
+    total = 0
+    for _, dirnames, filenames in os.walk(root):
+        total += len(dirnames) + len(filenames)
+    return total
+
+
+def serve_latency(
+    job_repo: JobHistoryRepository, job_ids: list[str], requests: int
+) -> tuple[float, float]:
+    """p50/p99 in ms of full GETs through the public router (warm location cache)."""
+    app = FastAPI()
+    app.include_router(build_public_results_router(PublicResultService(job_repo=job_repo)))
+    client = TestClient(app)
+    rng = random.Random(3)
+    sample = [rng.choice(job_ids) for _ in range(requests)]
+    for job_id in set(sample):
+        # прогрев: кэш расположений заполнен, как у работающего сервиса
+        client.get(f"/public/results/{job_id}")
+    timings: list[float] = []
+    for job_id in sample:
+        started = time.perf_counter()
+        response = client.get(f"/public/results/{job_id}")
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{job_id}: HTTP {response.status_code}")
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--payload-kib", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    now = datetime.utcnow()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = MediaPaths(
+            root=root / "media",
+            results=root / "media" / "results",
+            templates=root / "media" / "templates",
+            temp=root / "media" / "temp",
+        )
+        engine = create_db_engine(f"sqlite:///{(root / 'archive.db').as_posix()}")
+        session_factory: sessionmaker[Session] = sessionmaker(
+            bind=engine, expire_on_commit=False
+        )
+        init_db(engine, session_factory)
+        job_repo = JobHistoryRepository(session_factory)
+        job_ids = seed(
+            session_factory, paths, args.jobs, args.days, args.payload_kib * 1024, now
+        )
+
+        inodes_before = count_inodes(paths.root)
+        direct_p50, direct_p99 = serve_latency(job_repo, job_ids, args.requests)
+
+        started = time.perf_counter()
+        summary = archive_aged_results(
+            session_factory,
+            ResultArchive.for_paths(paths, MediaObjectRepository(session_factory)),
+            paths.results,
+            older_than=timedelta(hours=24),
+            batch_size=args.batch_size,
+            reference_time=now,
+        )
+        archive_s = time.perf_counter() - started
+
+        inodes_after = count_inodes(paths.root)
+        archived_p50, archived_p99 = serve_latency(job_repo, job_ids, args.requests)
+        engine.dispose()
+
+    print(
+        f"jobs={args.jobs} payload={args.payload_kib}KiB archived={summary.archived} "
+        f"archives={summary.archives} in {archive_s:.1f}s"
+    )
+    print(
+        f"inodes: before={inodes_before} after={inodes_after} "
+        f"({inodes_before / max(inodes_after, 1):.0f}x fewer)"
+    )
+    print(f"direct file: p50={direct_p50:.2f}ms p99={direct_p99:.2f}ms")
+    print(f"archive member: p50={archived_p50:.2f}ms p99={archived_p99:.2f}ms")
+    return 0 if summary.archived == args.jobs else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Benchmark 15 slots writing job history into SQLite in parallel."""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, TypeVar
+from uuid import uuid4
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.app.db.db_engine import SqliteProfile, create_db_engine
+from src.app.db.db_init import init_db
+from src.app.repositories.job_history_repository import JobHistoryRepository
+from src.app.repositories.job_unit_of_work import JobUnitOfWork
+
+T = TypeVar("T")
+
+MODES = ("bare", "profile", "profile+writer")
+
+
+@dataclass(slots=True)
+class BenchResult:
+    mode: str
+    jobs: int
+    lock_errors: int
+    elapsed_seconds: float
+    latencies_ms: list[float] = field(default_factory=list)
+
+    @property
+    def jobs_per_second(self) -> float:
+        return self.jobs / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def p95_ms(self) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def _build_engine(mode: str, db_path: Path) -> Engine:
+    url = f"sqlite:///{db_path.as_posix()}"
+    if mode == "bare":
+        # как раньше в load_config: create_engine без профиля
+        return create_engine(url, future=True, connect_args={"check_same_thread": False})
+    return create_db_engine(url, sqlite_profile=SqliteProfile())
+
+
+def _run_job(
+    session_factory: sessionmaker[Session],
+    repo: JobHistoryRepository,
+    slot_id: str,
+    write: Callable[[Callable[[], None]], None],
+) -> None:
+    job_id = uuid4().hex
+    now = datetime.utcnow()
+    unit_of_work = JobUnitOfWork(session_factory)
+    unit_of_work.create_pending(
+        job_id=job_id,
+        slot_id=slot_id,
+        started_at=now,
+        sync_deadline=now + timedelta(seconds=48),
+    )
+    unit_of_work.add_media(
+        scope="provider",
+        job_id=job_id,
+        slot_id=slot_id,
+        path=Path(f"/tmp/{job_id}/upload.png"),
+        expires_at=now + timedelta(seconds=48),
+    )
+    write(unit_of_work.flush)
+    repo.list_recent_by_slot(slot_id, limit=10)  # чтение галереи/статистики
+    completed_at = datetime.utcnow()
+    unit_of_work.set_result(
+        job_id=job_id,
+        status="done",
+        result_path=f"/tmp/{job_id}/payload.png",
+        result_expires_at=completed_at + timedelta(hours=168),
+        completed_at=completed_at,
+    )
+    write(unit_of_work.flush)
+
+
+def run_mode(mode: str, *, slots: int, jobs_per_slot: int, workdir: Path) -> BenchResult:
+    engine = _build_engine(mode, workdir / f"bench-{mode.replace('+', '-')}.db")
+    session_factory: sessionmaker[Session] = sessionmaker(
+        bind=engine, expire_on_commit=False
+    )
+    init_db(engine, session_factory)
+    repo = JobHistoryRepository(session_factory)
+    writer = ThreadPoolExecutor(max_workers=1) if mode.endswith("+writer") else None
+
+    def write(func: Callable[[], T]) -> T:
+        if writer is None:
+            return func()
+        return writer.submit(func).result()
+
+    result = BenchResult(mode=mode, jobs=0, lock_errors=0, elapsed_seconds=0.0)
+    lock = threading.Lock()
+
+    def slot_worker(index: int) -> None:
+        slot_id = f"slot-{index + 1:03d}"
+        for _ in range(jobs_per_slot):
+            started = time.perf_counter()
+            try:
+                _run_job(session_factory, repo, slot_id, write)
+            except OperationalError as exc:
+                if "locked" not in str(exc):
+                    raise
+                with lock:
+                    result.lock_errors += 1
+                continue
+            with lock:
+                result.jobs += 1
+                result.latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=slots) as pool:
+        list(pool.map(slot_worker, range(slots)))
+    result.elapsed_seconds = time.perf_counter() - started
+    if writer is not None:
+        writer.shutdown()
+    engine.dispose()
+    return result
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slots", type=int, default=15)
+    parser.add_argument("--jobs-per-slot", type=int, default=100)
+    parser.add_argument("--mode", choices=MODES, action="append")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    modes: list[Any] = args.mode or list(MODES)
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in modes:
+            result = run_mode(
+                mode,
+                slots=args.slots,
+                jobs_per_slot=args.jobs_per_slot,
+                workdir=Path(tmp),
+            )
+            print(
+                f"{result.mode}: jobs={result.jobs} lock_errors={result.lock_errors} "
+                f"jobs/s={result.jobs_per_second:.0f} "
+                f"p50={statistics.median(result.latencies_ms or [0.0]):.1f}ms "
+                f"p95={result.p95_ms:.1f}ms"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""Compare raw, set-based and rollup-backed stats queries on a synthetic history."""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import func, insert, nullslast, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.app.db.db_engine import create_db_engine
+from src.app.db.db_init import init_db
+from src.app.db.db_models import JobHistoryModel, SlotModel
+from src.app.stats.stats_repository import StatsRepository
+from src.app.stats.stats_rollup_repository import StatsRollupRepository
+
+STATUSES = ("done", "done", "done", "done", "failed", "timeout", "pending")
+FAILURES = {"failed": "provider_error", "timeout": "provider_timeout"}
+
+
+def seed(session_factory: sessionmaker[Session], rows: int, now: datetime) -> None:
+    rng = random.Random(7)
+    batch: list[dict[str, Any]] = []
+    with session_factory() as session:
+        for index in range(rows):
+            status = rng.choice(STATUSES)
+            started_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+            batch.append(
+                {
+                    "job_id": f"job-{index:08d}",
+                    "slot_id": f"slot-{rng.randint(1, 15):03d}",
+                    "source": "ingest",
+                    "status": status,
+                    "failure_reason": FAILURES.get(status),
+                    "started_at": started_at,
+                    "completed_at": None
+                    if status == "pending"
+                    else started_at + timedelta(seconds=rng.randint(1, 60)),
+                }
+            )
+            if len(batch) >= 10_000:
+                session.execute(insert(JobHistoryModel), batch)
+                batch = []
+        if batch:
+            session.execute(insert(JobHistoryModel), batch)
+        session.execute(text("ANALYZE"))
+        session.commit()
+
+
+def legacy_slot_metrics(
+    session_factory: sessionmaker[Session], window_start: datetime
+) -> list[dict[str, Any]]:
+    """Previous implementation: six queries per slot."""
+
+    def _count(session: Session, *conditions: Any) -> int:
+        return (
+            session.query(func.count(JobHistoryModel.job_id))
+            .filter(*conditions)
+            .scalar()
+            or 0
+        )
+
+    metrics: list[dict[str, Any]] = []
+    with session_factory() as session:
+        for slot in session.query(SlotModel).order_by(SlotModel.id).all():
+            by_slot = JobHistoryModel.slot_id == slot.id
+            in_window = JobHistoryModel.completed_at >= window_start
+            timeouts = _count(session, by_slot, JobHistoryModel.status == "timeout", in_window)
+            errors = _count(
+                session,
+                by_slot,
+                JobHistoryModel.failure_reason == "provider_error",
+                in_window,
+            )
+            last_success = (
+                session.query(JobHistoryModel)
+                .filter(by_slot, JobHistoryModel.status == "done")
+                .order_by(nullslast(JobHistoryModel.completed_at.desc()))
+                .first()
+            )
+            last_error = (
+                session.query(JobHistoryModel)
+                .filter(by_slot, JobHistoryModel.failure_reason.isnot(None))
+                .order_by(
+                    nullslast(JobHistoryModel.completed_at.desc()),
+                    JobHistoryModel.started_at.desc(),
+                )
+                .first()
+            )
+            metrics.append(
+                {
+                    "slot_id": slot.id,
+                    "display_name": slot.display_name or slot.id,
+                    "is_active": slot.is_active,
+                    "jobs_last_window": _count(
+                        session, by_slot, JobHistoryModel.started_at >= window_start
+                    ),
+                    "timeouts_last_window": timeouts,
+                    "provider_errors_last_window": errors,
+                    "failures_last_window": timeouts + errors,
+                    "success_last_window": _count(
+                        session, by_slot, JobHistoryModel.status == "done", in_window
+                    ),
+                    "last_success_at": last_success.completed_at if last_success else None,
+                    "last_error_reason": last_error.failure_reason if last_error else None,
+                }
+            )
+    return metrics
+
+
+def _time(func: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    result = func()  # прогрев кэша страниц
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return min(samples), result
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--window-minutes", type=int, default=1440)
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    now = datetime.utcnow()
+    window_start = now - timedelta(minutes=args.window_minutes)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{(Path(tmp) / 'stats.db').as_posix()}")
+        session_factory: sessionmaker[Session] = sessionmaker(
+            bind=engine, expire_on_commit=False
+        )
+        init_db(engine, session_factory)
+        seed(session_factory, args.rows, now)
+        repo = StatsRepository(session_factory)
+        rollup = StatsRollupRepository(session_factory)
+
+        legacy_ms, legacy = _time(
+            lambda: legacy_slot_metrics(session_factory, window_start), args.repeat
+        )
+        set_based_ms, current = _time(
+            lambda: repo.slot_metrics(window_start), args.repeat
+        )
+        started = time.perf_counter()
+        rollup.rebuild()
+        rebuild_ms = (time.perf_counter() - started) * 1000
+        timings = [
+            (
+                name,
+                _time(partial(getattr(repo, name), *call_args), args.repeat)[0],
+                _time(partial(getattr(rollup, name), *call_args), args.repeat)[0],
+            )
+            for name, call_args in (
+                ("system_metrics", (window_start,)),
+                ("slot_metrics", (window_start,)),
+                ("slot_totals", ()),
+                ("slot_duration_histograms", (window_start,)),
+            )
+        ]
+        # rollup учитывает только завершённые задачи — сверяем без pending
+        pending = _pending_by_slot(session_factory)
+        rollup_matches = rollup.slot_totals() == [
+            {**item, "jobs_total": item["jobs_total"] - pending.get(item["slot_id"], 0)}
+            for item in repo.slot_totals()
+        ]
+        engine.dispose()
+
+    matches = legacy == list(current)
+    print(f"rows={args.rows} slots={len(current)}")
+    print(f"legacy slot_metrics (6 queries/slot): {legacy_ms:.1f}ms")
+    print(f"set-based slot_metrics (1 query):     {set_based_ms:.1f}ms")
+    print(f"results match: {matches}")
+    print(f"rollup rebuild: {rebuild_ms:.0f}ms")
+    for name, raw_ms, rollup_ms in timings:
+        print(f"{name}: raw={raw_ms:.1f}ms rollup={rollup_ms:.1f}ms")
+    print(f"rollup totals match: {rollup_matches}")
+    return 0 if matches and rollup_matches else 1
+
+
+def _pending_by_slot(session_factory: sessionmaker[Session]) -> dict[str, int]:
+    with session_factory() as session:
+        rows = (
+            session.query(JobHistoryModel.slot_id, func.count())
+            .filter(JobHistoryModel.completed_at.is_(None))
+            .group_by(JobHistoryModel.slot_id)
+            .all()
+        )
+    return dict(rows)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
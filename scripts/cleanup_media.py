@@ -8,10 +8,13 @@ from dataclasses import dataclass
 from datetime import datetime
 
 from src.app.config import load_config
-from src.app.media.media_cleanup import cleanup_expired_results
+from src.app.media.media_cleanup import CleanupLimits, MediaCleanup
 from src.app.media.media_service import ResultStore
+from src.app.media.object_store import ObjectStore
+from src.app.media.result_archive import ResultArchive
 from src.app.media.temp_media_store import TempMediaStore
 from src.app.repositories.media_object_repository import MediaObjectRepository
+from src.app.repositories.storage_ledger import StorageLedger
 
 
 @dataclass(slots=True)
@@ -22,33 +25,53 @@ class CleanupSummary:
 
 
 def perform_cleanup(
-    *, dry_run: bool, reference_time: datetime | None = None
+    *,
+    dry_run: bool,
+    reference_time: datetime | None = None,
+    limits: CleanupLimits | None = None,
 ) -> CleanupSummary:
-    """Execute cleanup logic and return summary counters."""
-    config = load_config()
+    """Execute cleanup logic and return summary counters.
+
+    A thin wrapper over :class:`MediaCleanup`, the engine the application's
+    in-process scheduler runs. ``limits`` bound the run (batch size, batches,
+    seconds, delete threads); rows left over are cleaned by the next run.
+    """
+    # схему создаёт приложение; скрипту не нужен init_db на каждом запуске
+    config = load_config(init_schema=False)
     media_repo = MediaObjectRepository(config.session_factory)
-    result_store = ResultStore(config.media_paths)
-    temp_store = TempMediaStore(
-        paths=config.media_paths,
-        media_repo=media_repo,
-        temp_ttl_seconds=config.temp_ttl_seconds,
-    )
-
     now = reference_time or datetime.utcnow()
 
     if dry_run:
-        expired_results = media_repo.list_expired_results(now)
-        expired_temp = media_repo.list_expired_by_scope("provider", now)
         return CleanupSummary(
-            results_removed=len(expired_results),
-            temp_removed=len(expired_temp),
+            results_removed=media_repo.count_expired("result", now),
+            temp_removed=media_repo.count_expired("provider", now),
             dry_run=True,
         )
 
-    removed_results = cleanup_expired_results(media_repo, result_store, now)
-    removed_temp = temp_store.cleanup_expired(now)
+    ledger = StorageLedger(config.session_factory)
+    # объекты общего хранилища освобождаются по счётчику живых ссылок
+    object_store = ObjectStore.for_paths(config.media_paths, media_repo, ledger)
+    cleanup = MediaCleanup(
+        media_repo=media_repo,
+        result_store=ResultStore(
+            config.media_paths,
+            ledger=ledger,
+            object_store=object_store,
+            # архив холодного слоя удаляется вместе с последним живым членом
+            archive=ResultArchive.for_paths(config.media_paths, media_repo, ledger),
+        ),
+        temp_store=TempMediaStore(
+            paths=config.media_paths,
+            media_repo=media_repo,
+            temp_ttl_seconds=config.temp_ttl_seconds,
+            ledger=ledger,
+        ),
+    )
+    report = cleanup.run(limits, now)
     return CleanupSummary(
-        results_removed=removed_results, temp_removed=removed_temp, dry_run=False
+        results_removed=report.results_removed,
+        temp_removed=report.temp_removed,
+        dry_run=False,
     )
 
 
@@ -59,13 +82,44 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
         action="store_true",
         help="Only report counts without deleting files.",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="media_object rows per batch, one UPDATE each (default: 500).",
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=600,
+        help="Stop starting new batches after N seconds; the next run resumes "
+        "(default: 600, inside the 15-minute cron slot).",
+    )
+    parser.add_argument(
+        "--max-batches",
+        type=int,
+        default=None,
+        help="Stop after N batches per media scope (default: no limit).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Threads deleting files in parallel (default: 4).",
+    )
     return parser.parse_args(argv)
 
 
 def main(argv: list[str] | None = None) -> int:
     args = parse_args(argv or [])
     try:
-        summary = perform_cleanup(dry_run=args.dry_run)
+        limits = CleanupLimits.for_run(
+            batch_size=args.batch_size,
+            max_batches=args.max_batches,
+            max_seconds=args.max_seconds,
+            workers=args.workers,
+        )
+        summary = perform_cleanup(dry_run=args.dry_run, limits=limits)
     except Exception as exc:
         print(f"cleanup failed: {exc}", file=sys.stderr)
         return 2
@@ -84,4 +138,4 @@ def main(argv: list[str] | None = None) -> int:
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,72 @@
+"""Move existing per-job media into the content-addressed object store (online)."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from src.app.config import load_config
+from src.app.media.media_layout_migration import (
+    LayoutMigrationSummary,
+    migrate_to_object_store,
+)
+from src.app.media.object_store import ObjectStore
+from src.app.repositories.media_object_repository import MediaObjectRepository
+from src.app.repositories.storage_ledger import StorageLedger
+
+
+def perform_migration(
+    *, batch_size: int, limit: int | None
+) -> LayoutMigrationSummary:
+    """Convert result/template files while the app keeps serving them."""
+    config = load_config()
+    media_repo = MediaObjectRepository(config.session_factory)
+    ledger = StorageLedger(config.session_factory)
+    object_store = ObjectStore.for_paths(config.media_paths, media_repo, ledger)
+    return migrate_to_object_store(
+        config.session_factory,
+        object_store,
+        ledger=ledger,
+        batch_size=batch_size,
+        limit=limit,
+    )
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Move media/results and media/templates into media/objects."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=200,
+        help="media_object rows per batch (default: 200).",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Stop after moving N files (default: everything).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv or [])
+    try:
+        summary = perform_migration(batch_size=args.batch_size, limit=args.limit)
+    except Exception as exc:
+        print(f"media layout migration failed: {exc}", file=sys.stderr)
+        return 2
+
+    print(
+        f"media layout migration done, moved={summary.moved}, "
+        f"deduplicated={summary.deduplicated}, missing={summary.missing}, "
+        f"bytes_freed={summary.bytes_freed}",
+        file=sys.stdout,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
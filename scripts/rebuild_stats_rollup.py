@@ -0,0 +1,67 @@
+"""Repair job: recompute job_stats_rollup buckets from job_history."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from src.app.config import load_config
+from src.app.stats.stats_rollup_repository import StatsRollupRepository
+
+
+@dataclass(slots=True)
+class RebuildSummary:
+    rows_written: int
+    minute_buckets_pruned: int
+    since: datetime | None
+
+
+def perform_rebuild(
+    *, since_hours: int | None, reference_time: datetime | None = None
+) -> RebuildSummary:
+    """Rebuild the last ``since_hours`` hours (or everything) and prune old buckets."""
+    config = load_config()
+    repo = StatsRollupRepository(config.session_factory)
+    now = reference_time or datetime.utcnow()
+    since = now - timedelta(hours=since_hours) if since_hours is not None else None
+    rows_written = repo.rebuild(since=since, until=now)
+    pruned = repo.prune(now)
+    return RebuildSummary(
+        rows_written=rows_written, minute_buckets_pruned=pruned, since=since
+    )
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Rebuild job_stats_rollup from job_history."
+    )
+    parser.add_argument(
+        "--since-hours",
+        type=int,
+        default=None,
+        help="Only rebuild the last N hours (default: full rebuild incl. totals).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv or [])
+    try:
+        summary = perform_rebuild(since_hours=args.since_hours)
+    except Exception as exc:
+        print(f"rollup rebuild failed: {exc}", file=sys.stderr)
+        return 2
+
+    scope = summary.since.isoformat() if summary.since else "full"
+    print(
+        f"rollup rebuild done, scope={scope}, rows={summary.rows_written}, "
+        f"pruned={summary.minute_buckets_pruned}",
+        file=sys.stdout,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
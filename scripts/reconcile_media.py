@@ -0,0 +1,101 @@
+"""Find (and with --fix repair) orphan media files and media_object rows without files."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from src.app.config import load_config
+from src.app.media.media_orphans import OrphanReconciler, OrphanReport
+from src.app.repositories.media_object_repository import MediaObjectRepository
+from src.app.repositories.storage_ledger import StorageLedger
+
+
+def perform_reconcile(
+    *,
+    fix: bool,
+    grace_seconds: float,
+    batch_size: int,
+    max_seconds: float | None,
+    resume_from: str | None,
+) -> OrphanReport:
+    """One merge-join pass over media/, optionally bounded by ``max_seconds``."""
+    # схему создаёт приложение; скрипту не нужен init_db на каждом запуске
+    config = load_config(init_schema=False)
+    reconciler = OrphanReconciler(
+        media_repo=MediaObjectRepository(config.session_factory),
+        paths=config.media_paths,
+        ledger=StorageLedger(config.session_factory),
+        grace_seconds=grace_seconds,
+        batch_size=batch_size,
+    )
+    deadline = time.monotonic() + max_seconds if max_seconds is not None else None
+    return reconciler.run(fix=fix, start_after=resume_from, deadline=deadline)
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Merge-join media/ with media_object: report or fix orphans."
+    )
+    parser.add_argument(
+        "--fix",
+        action="store_true",
+        help="Delete orphan files and empty directories, mark rows without files cleaned.",
+    )
+    parser.add_argument(
+        "--grace-seconds",
+        type=float,
+        default=3600.0,
+        help="Ignore files and directories modified more recently (default: 3600).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Rows per keyset page and entries per fix batch (default: 1000).",
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="Stop after N seconds and print the cursor to resume from.",
+    )
+    parser.add_argument(
+        "--resume-from",
+        default=None,
+        help="Cursor printed by a previous bounded run.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv or [])
+    try:
+        report = perform_reconcile(
+            fix=args.fix,
+            grace_seconds=args.grace_seconds,
+            batch_size=args.batch_size,
+            max_seconds=args.max_seconds,
+            resume_from=args.resume_from,
+        )
+    except Exception as exc:
+        print(f"media reconcile failed: {exc}", file=sys.stderr)
+        return 2
+
+    print(
+        f"media reconcile {'fix' if args.fix else 'report'}, "
+        f"files={report.files_scanned}, rows={report.rows_scanned}, "
+        f"orphan_files={report.orphan_files}, orphan_bytes={report.orphan_bytes}, "
+        f"missing_rows={report.missing_rows}, missing_previews={report.missing_previews}, "
+        f"empty_dirs={report.empty_dirs}, files_removed={report.files_removed}, "
+        f"rows_cleaned={report.rows_cleaned}, dirs_removed={report.dirs_removed}",
+        file=sys.stdout,
+    )
+    if report.cursor is not None:
+        print(f"stopped at limit, resume with --resume-from '{report.cursor}'", file=sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
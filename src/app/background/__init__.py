@@ -0,0 +1 @@
+"""Background work package."""
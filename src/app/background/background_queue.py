@@ -0,0 +1,287 @@
+"""Bounded in-process queue for work that must not block HTTP responses."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any
+
+
+@dataclass(slots=True)
+class BackgroundTask:
+    """Unit of deferred work executed by the queue workers."""
+
+    name: str
+    func: Callable[[], Any]
+    attempt: int = 1
+    context: dict[str, Any] = field(default_factory=dict)
+    # выполняется один раз, когда попытки исчерпаны (например, пометить задачу failed)
+    fallback: Callable[[], Any] | None = None
+
+
+@dataclass(slots=True)
+class BackgroundTaskQueue:
+    """Run synchronous bookkeeping callables on a small worker pool.
+
+    Tasks are executed in a thread executor so blocking DB/filesystem calls never
+    run on the event loop. A failing task is retried with exponential backoff up
+    to ``max_attempts``; the worker itself never dies on task errors. Once the
+    attempts are exhausted the task's ``fallback`` runs, if it has one. When
+    the queue is not started or is full, tasks are not dropped either: on the
+    event loop they are handed straight to the executor, elsewhere (CLI,
+    worker threads) they run in the calling thread; a retry of such a task is
+    scheduled on the queue's loop while it runs, so that thread never sleeps.
+
+    Tasks live only in process memory: work queued when the process dies is
+    lost, so callers must tolerate a deferred write that never happens.
+    """
+
+    max_size: int = 256
+    workers: int = 2
+    max_attempts: int = 3
+    retry_delay_seconds: float = 0.5
+    executor: Executor | None = None
+    log: logging.Logger = field(default_factory=lambda: logging.getLogger(__name__))
+    _queue: asyncio.Queue[BackgroundTask] | None = field(default=None, init=False)
+    _workers: list[asyncio.Task[None]] = field(default_factory=list, init=False)
+    _loop: asyncio.AbstractEventLoop | None = field(default=None, init=False)
+    _retries: dict[asyncio.TimerHandle, BackgroundTask] = field(
+        default_factory=dict, init=False
+    )
+    _outstanding: int = field(default=0, init=False)
+    # задачи, отданные в executor мимо очереди (очередь остановлена или полна)
+    _detached: set[asyncio.Future[None]] = field(default_factory=set, init=False)
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None and bool(self._workers)
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        """Spawn worker coroutines on the current event loop."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [
+            asyncio.create_task(self._worker(index), name=f"background-worker-{index}")
+            for index in range(max(1, self.workers))
+        ]
+        self.log.info(
+            "background.queue.started",
+            extra={"workers": len(self._workers), "max_size": self.max_size},
+        )
+
+    async def stop(self, *, drain: bool = True) -> None:
+        """Stop workers; remaining tasks are executed inline when ``drain`` is set."""
+        queue = self._queue
+        if queue is None:
+            return
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._outstanding = 0
+        if self._detached:
+            await asyncio.gather(*self._detached, return_exceptions=True)
+        # задачи, ожидающие повтора, не теряем — выполняем вместе с очередью
+        leftovers = list(self._retries.values())
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        while not queue.empty():
+            leftovers.append(queue.get_nowait())
+        if drain:
+            for task in leftovers:
+                await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self._run_inline, task
+                )
+        elif leftovers:
+            self.log.warning(
+                "background.queue.dropped", extra={"count": len(leftovers)}
+            )
+        self.log.info("background.queue.stopped", extra={"drained": len(leftovers)})
+
+    def submit(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        /,
+        *args: Any,
+        context: dict[str, Any] | None = None,
+        fallback: Callable[[], Any] | None = None,
+        **kwargs: Any,
+    ) -> bool:
+        """Schedule ``func`` for background execution.
+
+        Returns ``True`` when the task was queued and ``False`` when it bypassed
+        the queue (stopped or saturated). ``fallback`` runs once if every
+        attempt fails.
+        """
+        task = BackgroundTask(
+            name=name,
+            func=partial(func, *args, **kwargs),
+            context=context or {},
+            fallback=fallback,
+        )
+        queue = self._queue
+        if queue is None or not self._workers or not self._on_loop_thread():
+            self._run_detached(task)
+            return False
+        try:
+            queue.put_nowait(task)
+        except asyncio.QueueFull:
+            self.log.warning(
+                "background.queue.full",
+                extra={"task": name, "max_size": self.max_size, **task.context},
+            )
+            self._run_detached(task)
+            return False
+        self._outstanding += 1
+        return True
+
+    async def join(self) -> None:
+        """Wait until every queued task (including retries) is processed."""
+        while (self._queue is not None and self._outstanding) or self._detached:
+            await asyncio.sleep(0.01)
+
+    async def _worker(self, index: int) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            task = await queue.get()
+            try:
+                await self._execute(task)
+            finally:
+                queue.task_done()
+
+    async def _execute(self, task: BackgroundTask) -> None:
+        try:
+            await self._run_in_executor(task)
+        except Exception:
+            if self._handle_failure(task):
+                return  # задача переставлена в очередь, счётчик не уменьшаем
+            if task.fallback is not None:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self.executor, self._run_fallback, task)
+        self._outstanding -= 1
+
+    async def _run_in_executor(self, task: BackgroundTask) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, task.func)
+
+    def _run_detached(self, task: BackgroundTask) -> None:
+        """Run a task that bypasses the queue without blocking the event loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # CLI или поток воркера: мы и так не на event loop
+            self._run_inline(task)
+            return
+        future = loop.run_in_executor(self.executor, self._run_inline, task)
+        self._detached.add(future)
+        future.add_done_callback(self._detached.discard)
+
+    def _run_inline(self, task: BackgroundTask) -> None:
+        """Run ``task`` in the calling thread with retries; never on the event loop.
+
+        While the queue runs, a retry is handed to its loop timer instead of
+        sleeping here: the calling thread may be the DB writer.
+        """
+        while True:
+            try:
+                task.func()
+                return
+            except Exception as exc:
+                if task.attempt >= self.max_attempts:
+                    self._log_exhausted(task)
+                    self._run_fallback(task)
+                    return
+                loop = self._loop
+                if self.running and loop is not None and not loop.is_closed():
+                    loop.call_soon_threadsafe(self._retry_detached, task, exc)
+                    return
+                # CLI: без event loop ждать повтора больше негде
+                time.sleep(self.retry_delay_seconds * (2 ** (task.attempt - 1)))
+                task.attempt += 1
+
+    def _retry_detached(self, task: BackgroundTask, exc: Exception) -> None:
+        if self._queue is None:
+            # очередь успели остановить — повтор уходит в executor, как при drain
+            task.attempt += 1
+            self._run_detached(task)
+            return
+        # попытки ещё есть (проверено в _run_inline): повтор ставит таймер loop,
+        # а join() ждёт его так же, как задачу из очереди
+        self._handle_failure(task, exc)
+        self._outstanding += 1
+
+    def _run_fallback(self, task: BackgroundTask) -> None:
+        if task.fallback is None:
+            return
+        try:
+            task.fallback()
+        except Exception:
+            self.log.exception(
+                "background.task.fallback_failed",
+                extra={"task": task.name, **task.context},
+            )
+
+    def _handle_failure(
+        self, task: BackgroundTask, exc: Exception | None = None
+    ) -> bool:
+        """Schedule a retry; return ``False`` when attempts are exhausted."""
+        if task.attempt >= self.max_attempts or self._loop is None:
+            self._log_exhausted(task)
+            return False
+        delay = self.retry_delay_seconds * (2 ** (task.attempt - 1))
+        self.log.warning(
+            "background.task.retry",
+            exc_info=exc or True,
+            extra={
+                "task": task.name,
+                "attempt": task.attempt,
+                "retry_in_seconds": delay,
+                **task.context,
+            },
+        )
+        task.attempt += 1
+        handle: asyncio.TimerHandle | None = None
+
+        def _requeue() -> None:
+            if handle is not None:
+                self._retries.pop(handle, None)
+            queue = self._queue
+            if queue is None:
+                self._run_detached(task)
+                return
+            try:
+                queue.put_nowait(task)
+            except asyncio.QueueFull:
+                self._outstanding -= 1
+                self._run_detached(task)
+
+        handle = self._loop.call_later(delay, _requeue)
+        self._retries[handle] = task
+        return True
+
+    def _log_exhausted(self, task: BackgroundTask) -> None:
+        self.log.error(
+            "background.task.failed",
+            exc_info=True,
+            extra={"task": task.name, "attempts": task.attempt, **task.context},
+        )
+
+    def _on_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
@@ -8,10 +8,11 @@ from pathlib import Path
 from typing import Sequence
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
 
+from .db.db_engine import SqliteProfile, create_db_engine, is_sqlite_url
+from .db.db_executor import DEFAULT_DB_POOL_SIZE
 from .db.db_init import init_db
 
 # Load environment variables from local files (non-fatal if missing)
@@ -49,6 +50,31 @@ class AppConfig:
     jwt_signing_key: str
     admin_credentials_path: Path
     admin_jwt_ttl_hours: int
+    background_workers: int = 2
+    background_queue_size: int = 256
+    background_max_attempts: int = 3
+    db_thread_pool_size: int = DEFAULT_DB_POOL_SIZE
+    db_single_writer: bool = False
+    storage_reconcile_interval_seconds: int = 3600
+    # пусто — ключ подписи ссылок выводится из JWT_SIGNING_KEY
+    public_media_signing_key: str = ""
+    public_media_url_ttl_seconds: int = 0
+    # x-accel-redirect | x-sendfile: тела файлов отдаёт реверс-прокси
+    media_offload_mode: str = ""
+    media_offload_prefix: str = "/_media/"
+    # job — каталог на задачу (по умолчанию); content — media/objects/ab/cd/<sha256>
+    media_layout: str = "job"
+    # очистка внутри приложения; 0 — только cron scripts/cleanup_media.py
+    cleanup_interval_seconds: int = 30
+    cleanup_slice_seconds: float = 1.0
+    # доля занятого тома media: выше high — досрочное вытеснение результатов до low
+    media_disk_high_watermark: float = 0.90
+    media_disk_low_watermark: float = 0.80
+    quota_check_interval_seconds: int = 15
+    # сверка дерева media/ с media_object: файлы без строк и строки без файлов
+    orphan_reconcile_interval_seconds: int = 3600
+    orphan_reconcile_fix: bool = False
+    orphan_grace_seconds: int = 3600
 
 
 def _ensure_media_paths(paths: MediaPaths) -> None:
@@ -58,8 +84,12 @@ def _ensure_media_paths(paths: MediaPaths) -> None:
     paths.temp.mkdir(parents=True, exist_ok=True)
 
 
-def load_config() -> AppConfig:
-    """Load configuration from environment (SQLite по умолчанию)."""
+def load_config(*, init_schema: bool = True) -> AppConfig:
+    """Load configuration from environment (SQLite по умолчанию).
+
+    ``init_schema=False`` skips ``init_db`` for short-lived tools (cron
+    cleanup) that run against a schema the application already created.
+    """
     root = Path(os.getenv("MEDIA_ROOT", "media"))
     media_paths = MediaPaths(
         root=root,
@@ -79,7 +109,8 @@ def load_config() -> AppConfig:
     )
 
     database_url = os.getenv("DATABASE_URL", "sqlite:///photochanger.db")
-    engine = create_engine(database_url, future=True)
+    sqlite_profile = SqliteProfile.from_env()
+    engine = create_db_engine(database_url, sqlite_profile=sqlite_profile)
     session_factory: sessionmaker[Session] = sessionmaker(
         bind=engine, expire_on_commit=False
     )
@@ -95,8 +126,48 @@ def load_config() -> AppConfig:
         os.getenv("ADMIN_CREDENTIALS_PATH", "secrets/runtime_credentials.json")
     )
     admin_jwt_ttl_hours = int(os.getenv("ADMIN_JWT_TTL_HOURS", 168))
+    background_workers = int(os.getenv("BACKGROUND_WORKERS", 2))
+    background_queue_size = int(os.getenv("BACKGROUND_QUEUE_SIZE", 256))
+    background_max_attempts = int(os.getenv("BACKGROUND_MAX_ATTEMPTS", 3))
+    db_thread_pool_size = int(os.getenv("DB_THREAD_POOL_SIZE", DEFAULT_DB_POOL_SIZE))
+    db_single_writer = is_sqlite_url(database_url) and sqlite_profile.single_writer
+    storage_reconcile_interval_seconds = int(
+        os.getenv("STORAGE_RECONCILE_INTERVAL_SECONDS", 3600)
+    )
+
+    public_media_signing_key = os.getenv("PUBLIC_MEDIA_SIGNING_KEY", "")
+    # ссылка для провайдера живёт столько же, сколько временный файл
+    public_media_url_ttl_seconds = int(
+        os.getenv("PUBLIC_MEDIA_URL_TTL_SECONDS", temp_ttl_seconds)
+    )
+    media_offload_mode = os.getenv("MEDIA_OFFLOAD", "")
+    media_offload_prefix = os.getenv("MEDIA_OFFLOAD_PREFIX", "/_media/")
+    media_layout = os.getenv("MEDIA_LAYOUT", "job").strip().lower()
+    if media_layout not in {"job", "content"}:
+        raise RuntimeError(f"Unsupported MEDIA_LAYOUT '{media_layout}' (job|content)")
+
+    cleanup_interval_seconds = int(os.getenv("CLEANUP_INTERVAL_SECONDS", 30))
+    cleanup_slice_seconds = float(os.getenv("CLEANUP_SLICE_SECONDS", 1.0))
+    media_disk_high_watermark = float(os.getenv("MEDIA_DISK_HIGH_WATERMARK", 0.90))
+    media_disk_low_watermark = float(os.getenv("MEDIA_DISK_LOW_WATERMARK", 0.80))
+    if not 0 < media_disk_low_watermark < media_disk_high_watermark <= 1:
+        raise RuntimeError(
+            "MEDIA_DISK_LOW_WATERMARK must be below MEDIA_DISK_HIGH_WATERMARK (0..1]"
+        )
+    quota_check_interval_seconds = int(os.getenv("QUOTA_CHECK_INTERVAL_SECONDS", 15))
+    orphan_reconcile_interval_seconds = int(
+        os.getenv("ORPHAN_RECONCILE_INTERVAL_SECONDS", 3600)
+    )
+    # по умолчанию только отчёт: удаление включается явно
+    orphan_reconcile_fix = os.getenv("ORPHAN_RECONCILE_FIX", "0").lower() in {
+        "1",
+        "true",
+        "yes",
+    }
+    orphan_grace_seconds = int(os.getenv("ORPHAN_GRACE_SECONDS", 3600))
 
-    init_db(engine, session_factory)
+    if init_schema:
+        init_db(engine, session_factory)
 
     return AppConfig(
         media_paths=media_paths,
@@ -111,4 +182,23 @@ def load_config() -> AppConfig:
         jwt_signing_key=jwt_signing_key,
         admin_credentials_path=admin_credentials_path,
         admin_jwt_ttl_hours=admin_jwt_ttl_hours,
+        background_workers=background_workers,
+        background_queue_size=background_queue_size,
+        background_max_attempts=background_max_attempts,
+        db_thread_pool_size=db_thread_pool_size,
+        db_single_writer=db_single_writer,
+        storage_reconcile_interval_seconds=storage_reconcile_interval_seconds,
+        public_media_signing_key=public_media_signing_key,
+        public_media_url_ttl_seconds=public_media_url_ttl_seconds,
+        media_offload_mode=media_offload_mode,
+        media_offload_prefix=media_offload_prefix,
+        media_layout=media_layout,
+        cleanup_interval_seconds=cleanup_interval_seconds,
+        cleanup_slice_seconds=cleanup_slice_seconds,
+        media_disk_high_watermark=media_disk_high_watermark,
+        media_disk_low_watermark=media_disk_low_watermark,
+        quota_check_interval_seconds=quota_check_interval_seconds,
+        orphan_reconcile_interval_seconds=orphan_reconcile_interval_seconds,
+        orphan_reconcile_fix=orphan_reconcile_fix,
+        orphan_grace_seconds=orphan_grace_seconds,
     )
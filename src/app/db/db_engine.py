@@ -0,0 +1,108 @@
+"""Engine factory with a tuned SQLite profile for concurrent ingest."""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import StaticPool
+
+
+@dataclass(slots=True)
+class SqliteProfile:
+    """PRAGMA and pool settings applied to every SQLite connection."""
+
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    busy_timeout_ms: int = 5000
+    mmap_size_bytes: int = 64 * 1024 * 1024
+    cache_size_kib: int = 16 * 1024
+    pool_size: int = 8
+    max_overflow: int = 8
+    pool_timeout_seconds: int = 30
+    single_writer: bool = True
+
+    @classmethod
+    def from_env(cls) -> "SqliteProfile":
+        return cls(
+            journal_mode=os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+            synchronous=os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+            busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+            mmap_size_bytes=int(os.getenv("SQLITE_MMAP_SIZE_MB", 64)) * 1024 * 1024,
+            cache_size_kib=int(os.getenv("SQLITE_CACHE_SIZE_KB", 16 * 1024)),
+            pool_size=int(os.getenv("SQLITE_POOL_SIZE", 8)),
+            max_overflow=int(os.getenv("SQLITE_MAX_OVERFLOW", 8)),
+            single_writer=os.getenv("SQLITE_SINGLE_WRITER", "1").lower()
+            not in {"0", "false", "no"},
+        )
+
+    def pragmas(self) -> list[tuple[str, Any]]:
+        return [
+            ("journal_mode", self.journal_mode),
+            ("synchronous", self.synchronous),
+            ("busy_timeout", self.busy_timeout_ms),
+            ("mmap_size", self.mmap_size_bytes),
+            # отрицательное значение — размер в KiB, а не в страницах
+            ("cache_size", -abs(self.cache_size_kib)),
+            ("temp_store", "MEMORY"),
+        ]
+
+
+def is_sqlite_url(database_url: str) -> bool:
+    return make_url(database_url).get_backend_name() == "sqlite"
+
+
+def is_memory_sqlite(database_url: str) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def create_db_engine(
+    database_url: str, *, sqlite_profile: SqliteProfile | None = None
+) -> Engine:
+    """Create an engine; SQLite URLs get WAL/pragmas and a thread-shared pool."""
+    if not is_sqlite_url(database_url):
+        return create_engine(database_url, future=True, pool_pre_ping=True)
+
+    profile = sqlite_profile or SqliteProfile()
+    connect_args = {
+        "check_same_thread": False,
+        "timeout": profile.busy_timeout_ms / 1000,
+    }
+    if is_memory_sqlite(database_url):
+        # одна общая in-memory БД для всех потоков; WAL для :memory: неприменим
+        engine = create_engine(
+            database_url,
+            future=True,
+            connect_args=connect_args,
+            poolclass=StaticPool,
+        )
+        pragmas = [
+            (name, value)
+            for name, value in profile.pragmas()
+            if name not in {"journal_mode", "mmap_size"}
+        ]
+    else:
+        engine = create_engine(
+            database_url,
+            future=True,
+            connect_args=connect_args,
+            pool_size=profile.pool_size,
+            max_overflow=profile.max_overflow,
+            pool_timeout=profile.pool_timeout_seconds,
+        )
+        pragmas = profile.pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection: Any, _record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return engine
@@ -0,0 +1,136 @@
+"""Dedicated bounded thread pool for blocking SQLAlchemy calls."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_DB_POOL_SIZE = 4
+
+# executor, которому принадлежит текущий поток (см. DbExecutor.call)
+_current = threading.local()
+
+
+class DbExecutor:
+    """Run synchronous repository calls off the event loop.
+
+    The pool is intentionally small and separate from Starlette's shared
+    threadpool: DB latency then queues behind at most ``max_workers`` threads
+    instead of stalling provider awaits of other slots.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_DB_POOL_SIZE) -> None:
+        self._max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._max_workers,
+            thread_name_prefix="db",
+            initializer=self._bind_thread,
+        )
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        return self._executor
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    async def run(self, func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Execute ``func`` in the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = partial(context.run, func, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    def call(self, func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Execute ``func`` in the pool from a worker thread and wait for it.
+
+        For background jobs already running off the event loop. A call made
+        from one of this pool's own threads runs inline instead of queueing
+        behind itself.
+        """
+        if getattr(_current, "executor", None) is self:
+            return func(*args, **kwargs)
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, func, *args, **kwargs).result()
+
+    def _bind_thread(self) -> None:
+        _current.executor = self
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+_default_executor: DbExecutor | None = None
+_writer_executor: DbExecutor | None = None
+_default_lock = threading.Lock()
+
+
+def get_db_executor() -> DbExecutor:
+    """Return the process-wide executor, creating it lazily."""
+    global _default_executor
+    if _default_executor is None:
+        with _default_lock:
+            if _default_executor is None:
+                _default_executor = DbExecutor()
+    return _default_executor
+
+
+def configure_db_executor(max_workers: int) -> DbExecutor:
+    """Replace the process-wide executor (called once during app wiring)."""
+    global _default_executor
+    with _default_lock:
+        previous = _default_executor
+        _default_executor = DbExecutor(max_workers=max_workers)
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return _default_executor
+
+
+async def run_db(func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Await a blocking DB callable on the shared DB executor."""
+    return await get_db_executor().run(func, *args, **kwargs)
+
+
+def configure_db_writer(*, single_writer: bool) -> DbExecutor:
+    """Route write-heavy calls through one dedicated thread or the shared pool.
+
+    SQLite allows a single writer at a time; queueing writes on one thread turns
+    lock contention ("database is locked") into plain in-process ordering.
+    """
+    global _writer_executor
+    with _default_lock:
+        previous = _writer_executor
+        _writer_executor = DbExecutor(max_workers=1) if single_writer else None
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return get_db_writer()
+
+
+def get_db_writer() -> DbExecutor:
+    """Return the write executor (falls back to the shared pool)."""
+    return _writer_executor or get_db_executor()
+
+
+async def run_db_write(func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Await a blocking DB write on the write executor."""
+    return await get_db_writer().run(func, *args, **kwargs)
+
+
+def call_db_write(func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Blocking :func:`run_db_write` for worker threads (never the event loop).
+
+    Without a dedicated writer there is nothing to queue behind, so ``func``
+    runs in the calling thread (scripts, non-SQLite databases).
+    """
+    writer = _writer_executor
+    if writer is None:
+        return func(*args, **kwargs)
+    return writer.call(func, *args, **kwargs)
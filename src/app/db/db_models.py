@@ -2,10 +2,21 @@
 
 from __future__ import annotations
 
-from datetime import datetime
 import uuid
+from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    text,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -73,6 +84,34 @@ class SlotTemplateMediaModel(Base):
 
 class JobHistoryModel(Base):
     __tablename__ = "job_history"
+    __table_args__ = (
+        # статистика по слоту/статусу за окно и «последний успех»
+        Index(
+            "ix_job_history_slot_status_completed",
+            "slot_id",
+            "status",
+            "completed_at",
+        ),
+        # ошибки за окно: строки без failure_reason в индекс не попадают
+        Index(
+            "ix_job_history_failure_completed",
+            "failure_reason",
+            "completed_at",
+            sqlite_where=text("failure_reason IS NOT NULL"),
+            postgresql_where=text("failure_reason IS NOT NULL"),
+        ),
+        # последняя ошибка слота (top-1 по completed_at без сортировки)
+        Index(
+            "ix_job_history_slot_failure_completed",
+            "slot_id",
+            "completed_at",
+            "started_at",
+            sqlite_where=text("failure_reason IS NOT NULL"),
+            postgresql_where=text("failure_reason IS NOT NULL"),
+        ),
+        Index("ix_job_history_started_at", "started_at"),
+        Index("ix_job_history_completed_at", "completed_at"),
+    )
 
     job_id: Mapped[str] = mapped_column(String(64), primary_key=True)
     slot_id: Mapped[str] = mapped_column(
@@ -98,6 +137,49 @@ class JobHistoryModel(Base):
 
 class MediaObjectModel(Base):
     __tablename__ = "media_object"
+    __table_args__ = (
+        # выборка просроченных медиа для cleanup: только ещё не очищенные
+        Index(
+            "ix_media_object_scope_expires",
+            "scope",
+            "expires_at",
+            sqlite_where=text("cleaned_at IS NULL"),
+            postgresql_where=text("cleaned_at IS NULL"),
+        ),
+        # живые ссылки на объект content-addressed хранилища (счётчик ссылок)
+        Index(
+            "ix_media_object_sha256_live",
+            "sha256",
+            sqlite_where=text("cleaned_at IS NULL"),
+            postgresql_where=text("cleaned_at IS NULL"),
+        ),
+        # кандидаты на вытеснение при нехватке места: LRU по последней выдаче,
+        # для ни разу не скачанных — по времени записи
+        Index(
+            "ix_media_object_scope_lru",
+            "scope",
+            text("coalesce(last_accessed_at, created_at)"),
+            "expires_at",
+            "id",
+            sqlite_where=text("cleaned_at IS NULL"),
+            postgresql_where=text("cleaned_at IS NULL"),
+        ),
+        # живые строки по пути: сверка с деревом media/ (merge-join в порядке
+        # путей) и живые члены архива холодного слоя (диапазон по префиксу)
+        Index(
+            "ix_media_object_path_live",
+            "path",
+            sqlite_where=text("cleaned_at IS NULL"),
+            postgresql_where=text("cleaned_at IS NULL"),
+        ),
+        # превью пишутся не всегда: в индекс попадают только строки с превью
+        Index(
+            "ix_media_object_preview_live",
+            "preview_path",
+            sqlite_where=text("preview_path IS NOT NULL AND cleaned_at IS NULL"),
+            postgresql_where=text("preview_path IS NOT NULL AND cleaned_at IS NULL"),
+        ),
+    )
 
     id: Mapped[str] = mapped_column(String(64), primary_key=True)
     job_id: Mapped[str] = mapped_column(
@@ -111,10 +193,115 @@ class MediaObjectModel(Base):
     preview_path: Mapped[str | None] = mapped_column(String(512))
     expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     cleaned_at: Mapped[datetime | None] = mapped_column(DateTime)
+    # sha256 содержимого, посчитанный при записи файла; ETag публичной выдачи
+    sha256: Mapped[str | None] = mapped_column(String(64))
+    # запись файла; строки до миграции 20261019_12 — время завершения задачи
+    created_at: Mapped[datetime | None] = mapped_column(DateTime, default=datetime.utcnow)
+    # последняя публичная выдача результата (сбрасывается пачками, не на запрос)
+    last_accessed_at: Mapped[datetime | None] = mapped_column(DateTime)
+    # результат упакован в архив: path — <архив>.zip/<job_id>/<файл>, байты лежат
+    # несжатыми по смещению archive_offset
+    archive_offset: Mapped[int | None] = mapped_column(BigInteger)
+    archive_size: Mapped[int | None] = mapped_column(BigInteger)
 
     job: Mapped[JobHistoryModel] = relationship(back_populates="media_objects")
 
 
+# верхние границы (секунды) кумулятивных корзин гистограммы длительности задач
+DURATION_BUCKETS_SECONDS = (1, 5, 10, 20, 30, 40, 48, 60)
+
+
+class JobStatsRollupModel(Base):
+    """Pre-aggregated job counters per time bucket and slot/provider/outcome.
+
+    ``resolution`` is ``minute``, ``hour`` or ``total`` (a single all-time bucket).
+    Job starts are stored under the ``pending`` status with ``started`` set;
+    completions under the final status/failure reason with ``completed`` and
+    duration counters set.
+    """
+
+    __tablename__ = "job_stats_rollup"
+
+    resolution: Mapped[str] = mapped_column(String(8), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    slot_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    provider: Mapped[str] = mapped_column(String(64), primary_key=True)
+    status: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # пустая строка вместо NULL: колонка входит в первичный ключ
+    failure_reason: Mapped[str] = mapped_column(
+        String(64), primary_key=True, default=""
+    )
+    started: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_sum_seconds: Mapped[float] = mapped_column(
+        Float, nullable=False, default=0.0
+    )
+    duration_le_1: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_le_5: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_le_10: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_le_20: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_le_30: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_le_40: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_le_48: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_le_60: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class JobDurationSketchModel(Base):
+    """Latency sketch bins stored next to the rollups (see ``stats_sketch``).
+
+    One row per non-empty log bucket ``bin`` of completed job durations, keyed
+    like ``job_stats_rollup`` by resolution/bucket and slot/provider; sketches
+    of several buckets merge by summing ``count`` per ``bin``.
+    """
+
+    __tablename__ = "job_duration_sketch"
+    __table_args__ = (
+        # ряды по времени (все слоты / один слот): покрывающие индексы без
+        # обращений к таблице
+        Index(
+            "ix_job_duration_sketch_series",
+            "resolution",
+            "bucket_start",
+            "bin",
+            "count",
+        ),
+        Index(
+            "ix_job_duration_sketch_slot_series",
+            "resolution",
+            "slot_id",
+            "bucket_start",
+            "bin",
+            "count",
+        ),
+    )
+
+    resolution: Mapped[str] = mapped_column(String(8), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    slot_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    provider: Mapped[str] = mapped_column(String(64), primary_key=True)
+    bin: Mapped[int] = mapped_column(Integer, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class MediaStorageUsageModel(Base):
+    """Storage ledger: bytes and files on disk per media scope and slot.
+
+    Write/delete paths add deltas; a periodic scan of ``media/`` corrects drift.
+    """
+
+    __tablename__ = "media_storage_usage"
+
+    scope: Mapped[str] = mapped_column(String(16), primary_key=True)
+    # пустая строка — файлы вне каталогов слотов
+    slot_id: Mapped[str] = mapped_column(String(32), primary_key=True, default="")
+    bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    files: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False
+    )
+
+
 class SettingModel(Base):
     __tablename__ = "settings"
 
@@ -1,5 +1,7 @@
 ﻿"""Dependency wiring helpers."""
 
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -7,13 +9,26 @@ from fastapi.staticfiles import StaticFiles
 
 from .auth.auth_api import router as auth_router
 from .auth.auth_service import AuthService
+from .background.background_queue import BackgroundTaskQueue
 from .config import AppConfig
+from .db.db_executor import configure_db_executor, configure_db_writer, run_db_write
 from .ingest.ingest_api import router as ingest_router
 from .ingest.ingest_service import IngestService
 from .ingest.validation import UploadValidator
+from .media.media_cleanup import MediaCleanup
+from .media.media_cleanup_scheduler import CleanupScheduler
+from .media.media_http import MediaOffload
+from .media.media_orphan_scheduler import OrphanScheduler
+from .media.media_orphans import OrphanReconciler
+from .media.media_quota import QuotaManager
 from .media.media_service import ResultStore
+from .media.object_store import ObjectStore
+from .media.media_storage_reconciler import StorageReconciler
+from .media.public_media_links import MediaUrlDenylist, MediaUrlSigner
 from .media.public_media_service import PublicMediaService
 from .media.public_result_service import PublicResultService
+from .media.result_archive import ResultArchive
+from .media.result_location_cache import ResultLocationCache
 from .media.template_media_api import router as template_media_router
 from .media.temp_media_store import TempMediaStore
 from .providers.providers_factory import create_driver
@@ -22,8 +37,11 @@ from .public.public_results_router import build_public_results_router
 from .public.public_gallery_router import build_public_gallery_router
 from .public.public_gallery_admin_router import build_public_gallery_admin_router
 from .public.public_gallery_service import GalleryCache, GalleryRateLimiter, GalleryShareState
+from .public.public_gallery_stream import GalleryStream
 from .repositories.job_history_repository import JobHistoryRepository
+from .repositories.job_unit_of_work import JobUnitOfWork
 from .repositories.media_object_repository import MediaObjectRepository
+from .repositories.storage_ledger import StorageLedger
 from .slots.slots_repository import SlotRepository
 from .slots.slots_api import router as slots_router
 from .settings.settings_api import router as settings_router
@@ -32,7 +50,10 @@ from .settings.settings_service import SettingsService
 from .stats.stats_api import router as stats_router
 from .stats.metrics_api import router as metrics_router
 from .stats.metrics_exporter import MetricsExporter
-from .stats.stats_repository import StatsRepository
+from .stats.metrics_registry import MetricsRegistry
+from .stats.stats_broadcaster import StatsBroadcaster
+from .stats.stats_rollup_backfill import RollupBackfill
+from .stats.stats_rollup_repository import StatsRollupRepository
 from .stats.stats_service import StatsService
 from .ui.stats_router import router as ui_stats_router
 
@@ -40,17 +61,131 @@ from .ui.stats_router import router as ui_stats_router
 FRONTEND_ROOT = Path(__file__).resolve().parents[2] / "frontend"
 
 
+LifecycleHook = Callable[[], Awaitable[None]]
+
+
+def register_lifecycle(
+    app: FastAPI,
+    *,
+    startup: LifecycleHook | None = None,
+    shutdown: LifecycleHook | None = None,
+) -> None:
+    """Register async hooks executed by the application lifespan."""
+    if not hasattr(app.state, "startup_hooks"):
+        app.state.startup_hooks = []
+        app.state.shutdown_hooks = []
+    if startup is not None:
+        app.state.startup_hooks.append(startup)
+    if shutdown is not None:
+        app.state.shutdown_hooks.append(shutdown)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Run registered startup hooks, then shutdown hooks in reverse order."""
+    for hook in getattr(app.state, "startup_hooks", []):
+        await hook()
+    try:
+        yield
+    finally:
+        for hook in reversed(getattr(app.state, "shutdown_hooks", [])):
+            await hook()
+
+
 def include_routers(app: FastAPI, config: AppConfig) -> None:
     """Mount module routers and attach services."""
     slot_repo = SlotRepository(config.session_factory)
     validator = UploadValidator(config.ingest_limits)
     job_repo = JobHistoryRepository(config.session_factory)
     media_repo = MediaObjectRepository(config.session_factory)
-    result_store = ResultStore(config.media_paths)
+    # место в media/ учитывается на записи/удалении, а не обходом дерева
+    storage_ledger = StorageLedger(config.session_factory)
+    object_store = ObjectStore.for_paths(config.media_paths, media_repo, storage_ledger)
+    result_store = ResultStore(
+        config.media_paths,
+        ledger=storage_ledger,
+        object_store=object_store,
+        content_addressed=config.media_layout == "content",
+        archive=ResultArchive.for_paths(config.media_paths, media_repo, storage_ledger),
+    )
     temp_store = TempMediaStore(
         paths=config.media_paths,
         media_repo=media_repo,
         temp_ttl_seconds=config.temp_ttl_seconds,
+        ledger=storage_ledger,
+    )
+    storage_reconciler = StorageReconciler(
+        ledger=storage_ledger,
+        paths=config.media_paths,
+        interval_seconds=config.storage_reconcile_interval_seconds,
+    )
+
+    db_executor = configure_db_executor(config.db_thread_pool_size)
+    db_writer = configure_db_writer(single_writer=config.db_single_writer)
+    background_queue = BackgroundTaskQueue(
+        max_size=config.background_queue_size,
+        workers=config.background_workers,
+        max_attempts=config.background_max_attempts,
+        # bookkeeping — это записи; для SQLite они идут через единственный writer
+        executor=db_writer.executor,
+    )
+
+    # статистика читается из rollup-таблицы; ingest дописывает её хуком завершения
+    stats_repo = StatsRollupRepository(config.session_factory)
+    # счётчики /metrics живут в памяти процесса, из БД — только стартовый seed
+    metrics_registry = MetricsRegistry()
+    # живые дельты для дашбордов: подписчики SSE не трогают БД
+    stats_broadcaster = StatsBroadcaster(metrics_registry)
+    # публичная галерея пересобирается только после нового результата
+    gallery_cache = GalleryCache()
+    gallery_share_state = GalleryShareState()
+    gallery_stream = GalleryStream(gallery_share_state)
+    # job_id → файл результата: публичная выдача без запроса к БД
+    result_locations = ResultLocationCache()
+
+    # очистка срезами внутри процесса: временные файлы живут не дольше минуты,
+    # кэши галереи и мест результатов сбрасываются тут же, без ожидания TTL
+    media_cleanup = MediaCleanup(
+        media_repo=media_repo,
+        result_store=result_store,
+        temp_store=temp_store,
+        on_removed=gallery_cache.invalidate,
+        on_result_removed=result_locations.evict,
+    )
+    cleanup_scheduler = CleanupScheduler(
+        cleanup=media_cleanup,
+        interval_seconds=config.cleanup_interval_seconds,
+        slice_seconds=config.cleanup_slice_seconds,
+    )
+    # при нехватке места результаты вытесняются до TTL, давно не скачанные первыми
+    quota_manager = QuotaManager(
+        cleanup=media_cleanup,
+        media_repo=media_repo,
+        media_root=config.media_paths.root,
+        high_watermark=config.media_disk_high_watermark,
+        low_watermark=config.media_disk_low_watermark,
+        interval_seconds=config.quota_check_interval_seconds,
+    )
+
+    # файлы без живых строк и строки без файлов (упавшие задачи, убитые воркеры)
+    orphan_scheduler = OrphanScheduler(
+        reconciler=OrphanReconciler(
+            media_repo=media_repo,
+            paths=config.media_paths,
+            ledger=storage_ledger,
+            grace_seconds=config.orphan_grace_seconds,
+            on_removed=gallery_cache.invalidate,
+        ),
+        interval_seconds=config.orphan_reconcile_interval_seconds,
+        fix=config.orphan_reconcile_fix,
+    )
+
+    # ссылки провайдерам подписаны HMAC и проверяются без БД
+    media_url_ttl = config.public_media_url_ttl_seconds or config.temp_ttl_seconds
+    media_url_signer = MediaUrlSigner.from_secret(
+        config.public_media_signing_key or config.jwt_signing_key,
+        config.media_paths.root,
+        media_url_ttl,
     )
 
     ingest_service = IngestService(
@@ -64,8 +199,20 @@ def include_routers(app: FastAPI, config: AppConfig) -> None:
         sync_response_seconds=config.sync_response_seconds,
         ingest_password=config.ingest_password,
         provider_factory=lambda provider_name: create_driver(
-            provider_name, media_repo=media_repo
+            provider_name, media_repo=media_repo, url_signer=media_url_signer
         ),
+        background=background_queue,
+        unit_of_work_factory=lambda: JobUnitOfWork(config.session_factory),
+        completion_hooks=[
+            stats_repo.record_outcome,
+            metrics_registry.record_outcome,
+            stats_broadcaster.record_outcome,
+            gallery_cache.record_outcome,
+            gallery_stream.record_outcome,
+            result_locations.record_outcome,
+        ],
+        start_hooks=[stats_broadcaster.record_start],
+        reclaim_space=quota_manager.reclaim,
     )
 
     settings_repo = SettingsRepository(config.session_factory)
@@ -73,12 +220,16 @@ def include_routers(app: FastAPI, config: AppConfig) -> None:
         repo=settings_repo, ingest_service=ingest_service, config=config
     )
     settings_service.load()
-    stats_repo = StatsRepository(config.session_factory)
-    stats_service = StatsService(repo=stats_repo, media_paths=config.media_paths)
+    stats_service = StatsService(repo=stats_repo, ledger=storage_ledger)
     metrics_exporter = MetricsExporter(
         stats_repo=stats_repo,
+        registry=metrics_registry,
+        ledger=storage_ledger,
         media_root=config.media_paths.root,
         sync_response_seconds=config.sync_response_seconds,
+        background=background_queue,
+        quota=quota_manager,
+        orphans=orphan_scheduler,
     )
     auth_service = AuthService.from_file(
         path=config.admin_credentials_path,
@@ -87,22 +238,81 @@ def include_routers(app: FastAPI, config: AppConfig) -> None:
     )
 
     app.state.config = config
+    app.state.db_executor = db_executor
+    app.state.background_queue = background_queue
     app.state.ingest_service = ingest_service
     app.state.result_store = result_store
+    app.state.object_store = object_store
     app.state.temp_store = temp_store
     app.state.slot_repo = slot_repo
     app.state.job_repo = job_repo
     app.state.media_repo = media_repo
+    app.state.storage_ledger = storage_ledger
     app.state.settings_service = settings_service
     app.state.stats_service = stats_service
     app.state.auth_service = auth_service
     app.state.metrics_exporter = metrics_exporter
-    app.state.gallery_share_state = GalleryShareState()
+    app.state.stats_broadcaster = stats_broadcaster
+    app.state.gallery_share_state = gallery_share_state
     app.state.gallery_rate_limiter = GalleryRateLimiter(limit_per_minute=30)
-    app.state.gallery_cache = GalleryCache(ttl_seconds=30)
+    app.state.gallery_cache = gallery_cache
+    app.state.gallery_stream = gallery_stream
+    app.state.result_locations = result_locations
+    app.state.cleanup_scheduler = cleanup_scheduler
+    app.state.quota_manager = quota_manager
+    app.state.orphan_scheduler = orphan_scheduler
+
+    # в проде за nginx: сервисы только проверяют доступ, байты отдаёт прокси
+    media_offload = MediaOffload.from_config(
+        config.media_offload_mode,
+        config.media_paths.root,
+        config.media_offload_prefix,
+    )
+    public_media_service = PublicMediaService(
+        signer=media_url_signer,
+        denylist=MediaUrlDenylist(ttl_seconds=media_url_ttl),
+        offload=media_offload,
+        on_expired=cleanup_scheduler.request_run,
+    )
+    app.state.public_media_service = public_media_service
+    public_result_service = PublicResultService(
+        job_repo=job_repo,
+        cache=result_locations,
+        offload=media_offload,
+        on_expired=cleanup_scheduler.request_run,
+        on_served=quota_manager.access_log.touch,
+    )
+
+    register_lifecycle(
+        app, startup=background_queue.start, shutdown=background_queue.stop
+    )
+
+    # первый запуск на существующей истории — backfill в фоне по часу на запись
+    # (записи ingest проходят между ними); счётчики /metrics засеваются после
+    rollup_backfill = RollupBackfill(repo=stats_repo, on_done=metrics_exporter.seed)
+
+    async def prepare_stats_rollup() -> None:
+        # далее только ретеншн минутных корзин
+        await run_db_write(stats_repo.prune)
 
-    public_media_service = PublicMediaService(media_repo=media_repo)
-    public_result_service = PublicResultService(job_repo=job_repo)
+    register_lifecycle(app, startup=prepare_stats_rollup)
+    register_lifecycle(
+        app, startup=rollup_backfill.start, shutdown=rollup_backfill.stop
+    )
+    register_lifecycle(
+        app, startup=stats_broadcaster.start, shutdown=stats_broadcaster.stop
+    )
+    register_lifecycle(app, startup=gallery_stream.start, shutdown=gallery_stream.stop)
+    register_lifecycle(
+        app, startup=storage_reconciler.start, shutdown=storage_reconciler.stop
+    )
+    register_lifecycle(
+        app, startup=cleanup_scheduler.start, shutdown=cleanup_scheduler.stop
+    )
+    register_lifecycle(app, startup=quota_manager.start, shutdown=quota_manager.stop)
+    register_lifecycle(
+        app, startup=orphan_scheduler.start, shutdown=orphan_scheduler.stop
+    )
 
     app.include_router(auth_router)
     app.include_router(ingest_router)
@@ -119,6 +329,7 @@ def include_routers(app: FastAPI, config: AppConfig) -> None:
             share_state=app.state.gallery_share_state,
             rate_limiter=app.state.gallery_rate_limiter,
             cache=app.state.gallery_cache,
+            stream=app.state.gallery_stream,
             slot_repo=slot_repo,
             job_repo=job_repo,
             settings_service=settings_service,
@@ -114,7 +114,7 @@ async def submit_ingest(
         )
     async with slot_lock:
         try:
-            job = service.prepare_job(slot_id)
+            job = await service.prepare_job_async(slot_id)
         except SlotDisabledError as exc:
             logger.warning("ingest.slot_disabled", extra={"slot_id": slot_id})
             raise HTTPException(
@@ -139,7 +139,7 @@ async def submit_ingest(
         try:
             await service.validate_upload(job, upload, hash_value)
         except UnsupportedMediaError as exc:
-            service.record_failure(job, failure_reason=FailureReason.UNSUPPORTED_MEDIA_TYPE)
+            service.schedule_failure(job, failure_reason=FailureReason.UNSUPPORTED_MEDIA_TYPE)
             raise HTTPException(
                 status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
                 detail={
@@ -148,7 +148,7 @@ async def submit_ingest(
                 },
             ) from exc
         except PayloadTooLargeError as exc:
-            service.record_failure(job, failure_reason=FailureReason.PAYLOAD_TOO_LARGE)
+            service.schedule_failure(job, failure_reason=FailureReason.PAYLOAD_TOO_LARGE)
             raise HTTPException(
                 status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 detail={
@@ -157,7 +157,7 @@ async def submit_ingest(
                 },
             ) from exc
         except ChecksumMismatchError as exc:
-            service.record_failure(job, failure_reason=FailureReason.INVALID_REQUEST)
+            service.schedule_failure(job, failure_reason=FailureReason.INVALID_REQUEST)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={
@@ -166,7 +166,7 @@ async def submit_ingest(
                 },
             ) from exc
         except UploadReadError as exc:
-            service.record_failure(job, failure_reason=FailureReason.INVALID_REQUEST)
+            service.schedule_failure(job, failure_reason=FailureReason.INVALID_REQUEST)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={
@@ -196,7 +196,7 @@ async def submit_ingest(
             ) from exc
         except Exception as exc:  # pragma: no cover - defensive
             logger.exception("ingest.unexpected_error", extra={"slot_id": slot_id})
-            service.record_failure(job, failure_reason=FailureReason.INTERNAL_ERROR)
+            service.schedule_failure(job, failure_reason=FailureReason.INTERNAL_ERROR)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail={
@@ -8,6 +8,7 @@ from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:  # pragma: no cover - type checking only
     from ..media.temp_media_store import TempMediaHandle
+    from ..repositories.job_unit_of_work import JobUnitOfWork
 
 
 class JobStatus(StrEnum):
@@ -53,6 +54,7 @@ class JobContext:
     slot_settings: dict[str, Any] = field(default_factory=dict)
     slot_template_media: dict[str, str] = field(default_factory=dict)
     slot_version: int = 1
+    started_at: datetime | None = None
     sync_deadline: datetime | None = None
     result_dir: Path | None = None
     result_expires_at: datetime | None = None
@@ -60,3 +62,30 @@ class JobContext:
     metadata: dict[str, str] = field(default_factory=dict)
     temp_media: list["TempMediaHandle"] = field(default_factory=list)
     temp_payload_path: Path | None = None
+    unit_of_work: "JobUnitOfWork | None" = None
+
+
+@dataclass(slots=True)
+class JobOutcome:
+    """Final state of a job passed to post-completion hooks (stats, caches)."""
+
+    job_id: str
+    slot_id: str
+    provider: str
+    status: str
+    source: str = "ingest"
+    failure_reason: str | None = None
+    started_at: datetime | None = None
+    completed_at: datetime | None = None
+    result_path: Path | None = None
+    result_expires_at: datetime | None = None
+    content_type: str | None = None
+    size_bytes: int | None = None
+    sha256: str | None = None
+
+    @property
+    def duration_seconds(self) -> float | None:
+        if self.started_at is None or self.completed_at is None:
+            return None
+        duration = (self.completed_at - self.started_at).total_seconds()
+        return duration if duration >= 0 else None
@@ -3,20 +3,26 @@
 from __future__ import annotations
 
 import asyncio
+import errno
 import logging
 import uuid
 from collections.abc import Callable
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from functools import partial
+from hashlib import sha256
 from pathlib import Path
 from typing import Any
 
 from fastapi import UploadFile
 
 from ..auth.auth_service import hash_password
+from ..background.background_queue import BackgroundTaskQueue
+from ..db.db_executor import run_db_write
 from ..providers.providers_base import ProviderDriver, ProviderResult
 from ..providers.providers_factory import create_driver
 from ..repositories.job_history_repository import JobHistoryRepository
+from ..repositories.job_unit_of_work import JobUnitOfWork
 from ..repositories.media_object_repository import MediaObjectRepository
 from ..slots.template_media import merge_template_media, template_media_map
 from ..slots.slots_repository import SlotRepository
@@ -31,7 +37,13 @@ from .ingest_errors import (
     UnsupportedMediaError,
     UploadReadError,
 )
-from .ingest_models import FailureReason, JobContext, JobStatus, UploadValidationResult
+from .ingest_models import (
+    FailureReason,
+    JobContext,
+    JobOutcome,
+    JobStatus,
+    UploadValidationResult,
+)
 from .validation import UploadValidator
 
 logger = logging.getLogger(__name__)
@@ -56,6 +68,12 @@ class IngestService:
     provider_factory: Callable[[str], ProviderDriver] = field(
         default_factory=lambda: create_driver
     )
+    background: BackgroundTaskQueue | None = None
+    unit_of_work_factory: Callable[[], JobUnitOfWork] | None = None
+    completion_hooks: list[Callable[[JobOutcome], None]] = field(default_factory=list)
+    start_hooks: list[Callable[[JobContext], None]] = field(default_factory=list)
+    # ENOSPC при записи результата: досрочно вытеснить старые результаты и повторить
+    reclaim_space: Callable[[], int] | None = None
     log: logging.Logger = field(default_factory=lambda: logger)
     _slot_locks: dict[str, asyncio.Lock] = field(default_factory=dict, init=False)
 
@@ -68,7 +86,12 @@ class IngestService:
         started_at = datetime.utcnow()
         sync_deadline = started_at + timedelta(seconds=self.sync_response_seconds)
 
-        self.job_repo.create_pending(
+        # с unit of work запись только ставится в очередь и уходит в БД
+        # одной транзакцией вместе с temp media перед вызовом провайдера
+        unit_of_work: JobUnitOfWork | None = None
+        if self.unit_of_work_factory is not None:
+            unit_of_work = self.unit_of_work_factory()
+        (unit_of_work or self.job_repo).create_pending(
             job_id=job_id,
             slot_id=slot.id,
             started_at=started_at,
@@ -76,7 +99,7 @@ class IngestService:
             source=source,
         )
 
-        result_dir = self.result_store.ensure_structure(slot.id, job_id)
+        result_dir = self.result_store.prepare(slot.id, job_id)
         result_expires_at = started_at + timedelta(hours=self.result_ttl_hours)
 
         job = JobContext(
@@ -87,9 +110,11 @@ class IngestService:
                 media.media_kind: media.media_object_id for media in slot.template_media
             },
             slot_version=slot.version,
+            started_at=started_at,
             sync_deadline=sync_deadline,
             result_dir=result_dir,
             result_expires_at=result_expires_at,
+            unit_of_work=unit_of_work,
         )
         job.metadata["provider"] = slot.provider
         job.metadata["size_limit_mb"] = str(slot.size_limit_mb)
@@ -98,8 +123,15 @@ class IngestService:
             job.metadata["slot_updated_by"] = slot.updated_by
         job.metadata["slot_display_name"] = slot.display_name
         job.metadata["source"] = source
+        self._notify_start(job)
         return job
 
+    async def prepare_job_async(
+        self, slot_id: str, *, source: str = "ingest"
+    ) -> JobContext:
+        """Async variant of :meth:`prepare_job` executed on the DB write executor."""
+        return await run_db_write(self.prepare_job, slot_id, source=source)
+
     def slot_lock(self, slot_id: str) -> asyncio.Lock:
         """Return a per-slot lock to serialize ingest requests."""
         if slot_id not in self._slot_locks:
@@ -130,7 +162,7 @@ class IngestService:
             extra={"slot_id": job.slot_id, "job_id": job.job_id},
         )
         try:
-            slot = self.slot_repo.get_slot(job.slot_id)
+            slot = await self.slot_repo.get_slot_async(job.slot_id)
         except KeyError:
             self.log.exception(
                 "ingest.test_run.validate.lookup_slot.not_found",
@@ -175,6 +207,7 @@ class IngestService:
             job_id=job.job_id,
             upload=upload,
             expires_at=job.sync_deadline,
+            unit_of_work=job.unit_of_work,
         )
         job.temp_media.append(handle)
         job.temp_payload_path = handle.path
@@ -196,33 +229,53 @@ class IngestService:
         job: JobContext,
         payload: bytes,
         content_type: str,
+        *,
+        completed_at: datetime | None = None,
     ) -> Path:
         """Persist successful result to disk and DB."""
         if job.job_id is None or job.result_dir is None:
             raise RuntimeError("JobContext is not fully initialized")
 
         extension = self._extension_from_content_type(content_type)
-        payload_path = self.result_store.save_payload(
-            job.slot_id, job.job_id, payload, extension
-        )
+        payload_path = self._save_result(job, job.job_id, payload, extension)
 
+        completed_at = completed_at or datetime.utcnow()
         expires_at = job.result_expires_at or (
-            datetime.utcnow() + timedelta(hours=self.result_ttl_hours)
+            completed_at + timedelta(hours=self.result_ttl_hours)
         )
-        self.job_repo.set_result(
+        # хэш считается по байтам в памяти и становится ETag публичной выдачи
+        digest = sha256(payload).hexdigest()
+        unit_of_work = job.unit_of_work
+        (unit_of_work or self.job_repo).set_result(
             job_id=job.job_id,
             status=JobStatus.DONE.value,
             result_path=str(payload_path),
             result_expires_at=expires_at,
+            completed_at=completed_at,
         )
-        self.media_repo.register_result(
-            job_id=job.job_id,
-            slot_id=job.slot_id,
-            path=payload_path,
-            preview_path=None,
-            expires_at=expires_at,
+        if unit_of_work is not None:
+            unit_of_work.add_media(
+                scope="result",
+                job_id=job.job_id,
+                slot_id=job.slot_id,
+                path=payload_path,
+                expires_at=expires_at,
+                sha256=digest,
+            )
+        else:
+            self.media_repo.register_result(
+                job_id=job.job_id,
+                slot_id=job.slot_id,
+                path=payload_path,
+                preview_path=None,
+                expires_at=expires_at,
+                sha256=digest,
+            )
+        self.temp_store.cleanup(
+            job.slot_id, job.job_id, job.temp_media, unit_of_work=unit_of_work
         )
-        self.temp_store.cleanup(job.slot_id, job.job_id, job.temp_media)
+        if unit_of_work is not None:
+            unit_of_work.flush()
         self.log.info(
             "ingest.job.completed",
             extra={
@@ -231,13 +284,76 @@ class IngestService:
                 "result_path": str(payload_path),
             },
         )
+        self._notify_completion(
+            self._build_outcome(
+                job,
+                status=JobStatus.DONE.value,
+                completed_at=completed_at,
+                result_path=payload_path,
+                result_expires_at=expires_at,
+                content_type=content_type,
+                size_bytes=len(payload),
+                sha256=digest,
+            )
+        )
         return payload_path
 
+    def _save_result(
+        self, job: JobContext, job_id: str, payload: bytes, extension: str
+    ) -> Path:
+        """Write the result; on a full volume reclaim space once and retry."""
+        try:
+            return self.result_store.save_payload(
+                job.slot_id, job_id, payload, extension, unit_of_work=job.unit_of_work
+            )
+        except OSError as exc:
+            if exc.errno != errno.ENOSPC or self.reclaim_space is None:
+                raise
+            self.log.warning(
+                "ingest.result.disk_full",
+                extra={"slot_id": job.slot_id, "job_id": job_id},
+            )
+            if not self.reclaim_space():
+                raise
+        return self.result_store.save_payload(
+            job.slot_id, job_id, payload, extension, unit_of_work=job.unit_of_work
+        )
+
+    def schedule_success(
+        self,
+        job: JobContext,
+        payload: bytes,
+        content_type: str,
+    ) -> None:
+        """Defer result persistence so the HTTP response is not blocked.
+
+        If every attempt fails the job is recorded as ``internal_error`` rather
+        than left pending.
+        """
+        completed_at = datetime.utcnow()
+        self._defer(
+            "ingest.record_success",
+            job,
+            self.record_success,
+            job,
+            payload,
+            content_type,
+            completed_at=completed_at,
+            fallback=partial(
+                self.record_failure,
+                job,
+                FailureReason.INTERNAL_ERROR,
+                completed_at=completed_at,
+            ),
+        )
+
     def record_failure(
         self,
         job: JobContext,
         failure_reason: FailureReason | str,
         status: JobStatus = JobStatus.FAILED,
+        *,
+        completed_at: datetime | None = None,
     ) -> None:
         """Update job status and cleanup result dir on failure/timeout."""
         if job.job_id is None:
@@ -247,13 +363,25 @@ class IngestService:
             if isinstance(failure_reason, FailureReason)
             else failure_reason
         )
-        self.job_repo.set_failure(
+        completed_at = completed_at or datetime.utcnow()
+        unit_of_work = job.unit_of_work
+        if unit_of_work is not None:
+            # строка результата от неудавшегося record_success не должна попасть в БД
+            unit_of_work.discard_media("result")
+        (unit_of_work or self.job_repo).set_failure(
             job_id=job.job_id,
             status=status.value,
             failure_reason=reason,
+            completed_at=completed_at,
+        )
+        self.result_store.remove_result_dir(
+            job.slot_id, job.job_id, unit_of_work=unit_of_work
+        )
+        self.temp_store.cleanup(
+            job.slot_id, job.job_id, job.temp_media, unit_of_work=unit_of_work
         )
-        self.result_store.remove_result_dir(job.slot_id, job.job_id)
-        self.temp_store.cleanup(job.slot_id, job.job_id, job.temp_media)
+        if unit_of_work is not None:
+            unit_of_work.flush()
         self.log.warning(
             "ingest.job.failed",
             extra={
@@ -263,6 +391,31 @@ class IngestService:
                 "status": status.value,
             },
         )
+        self._notify_completion(
+            self._build_outcome(
+                job,
+                status=status.value,
+                completed_at=completed_at,
+                failure_reason=reason,
+            )
+        )
+
+    def schedule_failure(
+        self,
+        job: JobContext,
+        failure_reason: FailureReason | str,
+        status: JobStatus = JobStatus.FAILED,
+    ) -> None:
+        """Defer failure bookkeeping (status update, cleanup) to the background queue."""
+        self._defer(
+            "ingest.record_failure",
+            job,
+            self.record_failure,
+            job,
+            failure_reason,
+            status,
+            completed_at=datetime.utcnow(),
+        )
 
     async def run_test_job(
         self,
@@ -275,7 +428,7 @@ class IngestService:
         """Execute validate+process flow for admin test runs."""
         self.log.info("ingest.test_run.prepare_job.start", extra={"slot_id": slot_id})
         try:
-            job = self.prepare_job(slot_id, source="ui_test")
+            job = await self.prepare_job_async(slot_id, source="ui_test")
         except KeyError:
             self.log.warning(
                 "ingest.test_run.prepare_job.slot_not_found", extra={"slot_id": slot_id}
@@ -307,27 +460,57 @@ class IngestService:
                 },
             )
         except UnsupportedMediaError:
-            self.record_failure(job, FailureReason.UNSUPPORTED_MEDIA_TYPE)
+            await run_db_write(
+                self.record_failure, job, FailureReason.UNSUPPORTED_MEDIA_TYPE
+            )
             raise
         except PayloadTooLargeError:
-            self.record_failure(job, FailureReason.PAYLOAD_TOO_LARGE)
+            await run_db_write(
+                self.record_failure, job, FailureReason.PAYLOAD_TOO_LARGE
+            )
             raise
         except (ChecksumMismatchError, UploadReadError):
-            self.record_failure(job, FailureReason.INVALID_REQUEST)
+            await run_db_write(
+                self.record_failure, job, FailureReason.INVALID_REQUEST
+            )
             raise
 
         if overrides:
             self._apply_test_overrides(job, overrides)
 
-        await self.process(job)
+        # админский тест сразу открывает результат — bookkeeping дожидаемся,
+        # но выполняем на потоке записи, а не на event loop
+        await self.process(job, defer_bookkeeping=False)
         duration = (datetime.utcnow() - started_at).total_seconds()
         return job, duration
 
-    async def process(self, job: JobContext) -> bytes:
-        """Invoke provider driver with timeout and persist result."""
+    async def process(
+        self, job: JobContext, *, defer_bookkeeping: bool = True
+    ) -> bytes:
+        """Invoke provider driver with timeout and persist result.
+
+        With ``defer_bookkeeping`` the result file, DB updates and temp cleanup are
+        handed to the background queue so the payload can be returned immediately;
+        otherwise they are awaited on the DB write executor.
+        """
         if job.job_id is None:
             raise RuntimeError("JobContext is not fully initialized")
 
+        async def record_failure(
+            job: JobContext,
+            failure_reason: FailureReason,
+            status: JobStatus = JobStatus.FAILED,
+        ) -> None:
+            if defer_bookkeeping:
+                self.schedule_failure(job, failure_reason, status)
+            else:
+                await run_db_write(self.record_failure, job, failure_reason, status)
+
+        # провайдер может запросить temp media по публичной ссылке — фиксируем
+        # стартовую транзакцию (job + temp media) до вызова
+        if job.unit_of_work is not None:
+            await run_db_write(job.unit_of_work.flush)
+
         provider_name = job.metadata.get("provider", "unknown")
         started_at = datetime.utcnow()
         try:
@@ -347,7 +530,7 @@ class IngestService:
                     "duration_seconds": duration,
                 },
             )
-            self.record_failure(
+            await record_failure(
                 job, FailureReason.PROVIDER_TIMEOUT, status=JobStatus.TIMEOUT
             )
             raise ProviderTimeoutError("Provider did not finish in time") from exc
@@ -363,7 +546,7 @@ class IngestService:
                     "error": str(exc),
                 },
             )
-            self.record_failure(
+            await record_failure(
                 job, FailureReason.PROVIDER_TIMEOUT, status=JobStatus.TIMEOUT
             )
             raise
@@ -379,11 +562,14 @@ class IngestService:
                     "error": str(exc),
                 },
             )
-            self.record_failure(job, FailureReason.PROVIDER_ERROR)
+            await record_failure(job, FailureReason.PROVIDER_ERROR)
             raise
 
         job.metadata["result_content_type"] = content_type
-        self.record_success(job, payload, content_type)
+        if defer_bookkeeping:
+            self.schedule_success(job, payload, content_type)
+        else:
+            await run_db_write(self.record_success, job, payload, content_type)
         return payload
 
     async def _invoke_provider(
@@ -424,6 +610,77 @@ class IngestService:
         )
         return result.payload, content_type
 
+    def _defer(
+        self,
+        name: str,
+        job: JobContext,
+        func: Callable[..., Any],
+        /,
+        *args: Any,
+        fallback: Callable[[], Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        context = {"slot_id": job.slot_id, "job_id": job.job_id}
+        if self.background is None:
+            func(*args, **kwargs)
+            return
+        self.background.submit(
+            name, func, *args, context=context, fallback=fallback, **kwargs
+        )
+
+    def _build_outcome(
+        self,
+        job: JobContext,
+        *,
+        status: str,
+        completed_at: datetime,
+        failure_reason: str | None = None,
+        result_path: Path | None = None,
+        result_expires_at: datetime | None = None,
+        content_type: str | None = None,
+        size_bytes: int | None = None,
+        sha256: str | None = None,
+    ) -> JobOutcome:
+        return JobOutcome(
+            job_id=job.job_id or "",
+            slot_id=job.slot_id,
+            provider=job.metadata.get("provider", "unknown"),
+            status=status,
+            source=job.metadata.get("source", "ingest"),
+            failure_reason=failure_reason,
+            started_at=job.started_at,
+            completed_at=completed_at,
+            result_path=result_path,
+            result_expires_at=result_expires_at,
+            content_type=content_type,
+            size_bytes=size_bytes,
+            sha256=sha256,
+        )
+
+    def _notify_start(self, job: JobContext) -> None:
+        """Run start hooks (live stats) inline; they must be cheap and thread-safe."""
+        for hook in self.start_hooks:
+            try:
+                hook(job)
+            except Exception:
+                self.log.exception(
+                    "ingest.start_hook.failed",
+                    extra={"slot_id": job.slot_id, "job_id": job.job_id},
+                )
+
+    def _notify_completion(self, outcome: JobOutcome) -> None:
+        """Run post-completion hooks (stats, caches) without failing the job."""
+        for hook in self.completion_hooks:
+            name = f"ingest.hook.{getattr(hook, '__qualname__', type(hook).__name__)}"
+            context = {"slot_id": outcome.slot_id, "job_id": outcome.job_id}
+            if self.background is not None:
+                self.background.submit(name, hook, outcome, context=context)
+                continue
+            try:
+                hook(outcome)
+            except Exception:
+                self.log.exception("ingest.hook.failed", extra={"hook": name, **context})
+
     @staticmethod
     def _extension_from_content_type(content_type: str) -> str:
         mapping = {
@@ -3,33 +3,352 @@
 from __future__ import annotations
 
 import logging
+import time
+from collections import defaultdict
+from collections.abc import Callable, Collection
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from typing import TYPE_CHECKING
 
+from ..db.db_executor import call_db_write
 from ..repositories.media_object_repository import MediaObjectRepository
+from ..repositories.storage_ledger import StorageLedger, UsageKey
+from .media_models import MediaObject
 from .media_service import ResultStore
 
+if TYPE_CHECKING:  # pragma: no cover - type checking only
+    from .temp_media_store import TempMediaStore
+
 logger = logging.getLogger(__name__)
 
+# (удалено байт, удалено файлов) для одного media_object
+Removal = tuple[int, int]
+# строки, вернувшиеся в живые после пачки (их объект ещё держит grace-период)
+Restored = Collection[str] | None
+
+
+@dataclass(frozen=True, slots=True)
+class CleanupLimits:
+    """Bounds for one cleanup run; whatever is left is picked up by the next run.
+
+    Rows are marked cleaned batch by batch, so the committed batches are the
+    run's progress: an interrupted or time-boxed run resumes where it stopped.
+    """
+
+    batch_size: int = 500
+    max_batches: int | None = None
+    # time.monotonic(), общий для результатов и временных файлов одного запуска
+    deadline: float | None = None
+    workers: int = 4
+
+    @classmethod
+    def for_run(
+        cls,
+        *,
+        batch_size: int = 500,
+        max_batches: int | None = None,
+        max_seconds: float | None = None,
+        workers: int = 4,
+    ) -> CleanupLimits:
+        deadline = time.monotonic() + max_seconds if max_seconds is not None else None
+        return cls(
+            batch_size=batch_size,
+            max_batches=max_batches,
+            deadline=deadline,
+            workers=workers,
+        )
+
+    def exhausted(self, batches: int) -> bool:
+        if self.max_batches is not None and batches >= self.max_batches:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+@dataclass(slots=True)
+class CleanupReport:
+    results_removed: int = 0
+    temp_removed: int = 0
+
+    @property
+    def removed(self) -> int:
+        return self.results_removed + self.temp_removed
+
+
+@dataclass(slots=True)
+class MediaCleanup:
+    """Cleanup engine shared by the in-app scheduler and ``cleanup_media.py``."""
+
+    media_repo: MediaObjectRepository
+    result_store: ResultStore
+    temp_store: TempMediaStore
+    on_removed: Callable[[], None] | None = None
+    on_result_removed: Callable[[str], None] | None = None
+
+    def run(
+        self,
+        limits: CleanupLimits | None = None,
+        reference_time: datetime | None = None,
+    ) -> CleanupReport:
+        now = reference_time or datetime.utcnow()
+        # временные файлы первыми: их TTL — секунды, а не часы
+        temp_removed = self.temp_store.cleanup_expired(now, limits=limits)
+        results_removed = cleanup_expired_results(
+            self.media_repo,
+            self.result_store,
+            now,
+            on_removed=self.on_removed,
+            on_result_removed=self.on_result_removed,
+            limits=limits,
+        )
+        return CleanupReport(results_removed=results_removed, temp_removed=temp_removed)
+
+    def evict_results(
+        self,
+        *,
+        batch_size: int = 100,
+        workers: int = 2,
+        reference_time: datetime | None = None,
+    ) -> list[tuple[MediaObject, Removal]]:
+        """Remove one batch of live results ahead of their TTL, least recently served first.
+
+        Evicted rows are marked cleaned exactly like expired ones, so their
+        public links answer 410 and the caches are dropped the same way.
+        """
+        now = reference_time or datetime.utcnow()
+        victims = self.media_repo.list_eviction_candidates(limit=batch_size)
+        if not victims:
+            return []
+        delete, after_batch = result_removal(
+            self.media_repo,
+            self.result_store,
+            self.on_result_removed,
+            event="media.quota.evicted",
+        )
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="media-quota"
+        ) as pool:
+            done = remove_batch(
+                self.media_repo,
+                victims,
+                now,
+                pool=pool,
+                delete=delete,
+                after_batch=after_batch,
+            )
+        if done and self.on_removed is not None:
+            self.on_removed()
+        return done
+
+    def count_expired(self, reference_time: datetime | None = None) -> CleanupReport:
+        now = reference_time or datetime.utcnow()
+        return CleanupReport(
+            results_removed=self.media_repo.count_expired("result", now),
+            temp_removed=self.media_repo.count_expired("provider", now),
+        )
+
+
+def cleanup_expired_batches(
+    media_repo: MediaObjectRepository,
+    scope: str,
+    reference_time: datetime,
+    *,
+    delete: Callable[[MediaObject], Removal | None],
+    after_batch: Callable[[list[tuple[MediaObject, Removal]]], Restored] | None = None,
+    limits: CleanupLimits | None = None,
+) -> int:
+    """Clean expired ``scope`` rows in keyset-paginated batches.
+
+    ``delete`` removes one row's files and runs in a thread pool, so it must
+    not touch the database (SQLite connections are per thread). Each batch is
+    then marked cleaned with one UPDATE and handed to ``after_batch`` for
+    ledger accounting and cache eviction. A row whose delete fails, or
+    returns ``None`` (not removable yet), stays uncleaned and is retried by
+    the next run without being counted as removed.
+    """
+    limits = limits or CleanupLimits()
+    removed = batches = 0
+    cursor: tuple[datetime, str] | None = None
+    with ThreadPoolExecutor(
+        max_workers=limits.workers, thread_name_prefix="media-cleanup"
+    ) as pool:
+        while True:
+            if limits.exhausted(batches):
+                logger.info(
+                    "media.cleanup.limit_reached",
+                    extra={"scope": scope, "batches": batches, "removed": removed},
+                )
+                break
+            batch = media_repo.list_expired_batch(
+                scope, reference_time, limit=limits.batch_size, after=cursor
+            )
+            if not batch:
+                break
+            cursor = (batch[-1].expires_at, batch[-1].id)
+            batches += 1
+            done = remove_batch(
+                media_repo,
+                batch,
+                reference_time,
+                pool=pool,
+                delete=delete,
+                after_batch=after_batch,
+            )
+            removed += len(done)
+    return removed
+
+
+def remove_batch(
+    media_repo: MediaObjectRepository,
+    batch: list[MediaObject],
+    reference_time: datetime,
+    *,
+    pool: ThreadPoolExecutor,
+    delete: Callable[[MediaObject], Removal | None],
+    after_batch: Callable[[list[tuple[MediaObject, Removal]]], Restored] | None = None,
+) -> list[tuple[MediaObject, Removal]]:
+    """Delete one batch's files in ``pool`` and mark the removed rows cleaned.
+
+    The marking and ``after_batch`` (ledger, object release) run on the DB
+    write executor, so a slice never writes past the single SQLite writer;
+    the file deletes stay in ``pool``. Rows ``after_batch`` returns to live
+    are left out of the result.
+    """
+    outcomes = list(pool.map(_attempt(delete), batch))
+    done = [
+        (media, outcome)
+        for media, outcome in zip(batch, outcomes)
+        if outcome is not None
+    ]
+    return call_db_write(_commit_batch, media_repo, done, reference_time, after_batch)
+
+
+def _commit_batch(
+    media_repo: MediaObjectRepository,
+    done: list[tuple[MediaObject, Removal]],
+    reference_time: datetime,
+    after_batch: Callable[[list[tuple[MediaObject, Removal]]], Restored] | None,
+) -> list[tuple[MediaObject, Removal]]:
+    media_repo.mark_cleaned_many([media.id for media, _ in done], reference_time)
+    if after_batch is not None and done:
+        restored = after_batch(done)
+        if restored:
+            done = [(media, outcome) for media, outcome in done if media.id not in restored]
+    return done
+
 
 def cleanup_expired_results(
     media_repo: MediaObjectRepository,
     result_store: ResultStore,
     reference_time: datetime | None = None,
+    on_removed: Callable[[], None] | None = None,
+    on_result_removed: Callable[[str], None] | None = None,
+    *,
+    limits: CleanupLimits | None = None,
 ) -> int:
-    """Remove expired media results and mark records cleaned."""
+    """Remove expired media results and mark records cleaned.
+
+    ``on_removed`` runs once if anything was removed (e.g. gallery cache
+    invalidation when cleanup runs inside the app process);
+    ``on_result_removed`` runs with each removed job id (result location
+    cache eviction).
+    """
     now = reference_time or datetime.utcnow()
-    expired = media_repo.list_expired_results(now)
-    removed = 0
-    for media in expired:
-        result_store.remove_result_dir(media.slot_id, media.job_id)
-        media_repo.mark_cleaned(media.id, now)
-        removed += 1
-        logger.info(
-            "media.cleanup.removed",
-            extra={
-                "media_id": media.id,
-                "slot_id": media.slot_id,
-                "job_id": media.job_id,
-            },
-        )
+    delete, after_batch = result_removal(media_repo, result_store, on_result_removed)
+    removed = cleanup_expired_batches(
+        media_repo,
+        "result",
+        now,
+        delete=delete,
+        after_batch=after_batch,
+        limits=limits,
+    )
+    if removed and on_removed is not None:
+        on_removed()
     return removed
+
+
+def result_removal(
+    media_repo: MediaObjectRepository,
+    result_store: ResultStore,
+    on_result_removed: Callable[[str], None] | None = None,
+    *,
+    event: str = "media.cleanup.removed",
+) -> tuple[
+    Callable[[MediaObject], Removal | None],
+    Callable[[list[tuple[MediaObject, Removal]]], Restored],
+]:
+    """``delete``/``after_batch`` pair for result rows, expired or evicted.
+
+    A row whose shared object is still within the release grace period is
+    skipped and stays live: cleaning it now would leave the object without
+    any row pointing at it. Should the object be refreshed between the check
+    and the release, the row goes back to live and is not reported removed.
+    """
+
+    def _delete(media: MediaObject) -> Removal | None:
+        if media.sha256 is not None and result_store.object_held(media.path):
+            return None
+        return result_store.delete_result_dir(media.slot_id, media.job_id)
+
+    def _after_batch(done: list[tuple[MediaObject, Removal]]) -> Restored:
+        record_removals(result_store.ledger, "result", done)
+        # объект общего хранилища удаляется только без других живых ссылок
+        deferred = set(
+            result_store.release_results([(media.path, media.sha256) for media, _ in done])
+        )
+        retry = [media.id for media, _ in done if media.path in deferred]
+        if retry:
+            media_repo.restore_cleaned(retry)
+            logger.info(
+                "media.cleanup.release_deferred",
+                extra={"media_ids": retry, "objects": len(deferred)},
+            )
+        for media, _ in done:
+            if media.path in deferred:
+                continue
+            if on_result_removed is not None:
+                on_result_removed(media.job_id)
+            logger.info(
+                event,
+                extra={
+                    "media_id": media.id,
+                    "slot_id": media.slot_id,
+                    "job_id": media.job_id,
+                },
+            )
+        return retry
+
+    return _delete, _after_batch
+
+
+def record_removals(
+    ledger: StorageLedger | None,
+    scope: str,
+    done: list[tuple[MediaObject, Removal]],
+) -> None:
+    """One ledger transaction per batch instead of one per removed row."""
+    if ledger is None:
+        return
+    deltas: dict[UsageKey, list[int]] = defaultdict(lambda: [0, 0])
+    for media, (removed_bytes, removed_files) in done:
+        delta = deltas[(scope, media.slot_id)]
+        delta[0] -= removed_bytes
+        delta[1] -= removed_files
+    ledger.record_many(dict(deltas))
+
+
+def _attempt(
+    delete: Callable[[MediaObject], Removal],
+) -> Callable[[MediaObject], Removal | None]:
+    def _run(media: MediaObject) -> Removal | None:
+        try:
+            return delete(media)
+        except Exception:
+            logger.exception(
+                "media.cleanup.delete_failed",
+                extra={"media_id": media.id, "path": str(media.path)},
+            )
+            return None
+
+    return _run
@@ -0,0 +1,108 @@
+"""In-process scheduler running media cleanup in short, budgeted slices."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+
+from .media_cleanup import CleanupLimits, CleanupReport, MediaCleanup
+
+
+@dataclass(slots=True)
+class CleanupScheduler:
+    """Run :class:`MediaCleanup` every ``interval_seconds`` (± jitter) in a worker thread.
+
+    Each slice is bounded by ``slice_seconds`` and ``batch_size``, and is
+    followed by a pause of at least ``elapsed * (1 / duty_cycle - 1)``, so
+    cleanup takes at most ``duty_cycle`` of a thread and of the disk even
+    while it works through a backlog. Files are deleted in the worker thread;
+    each batch's row and ledger updates are queued on the DB writer. While
+    slices keep finding expired rows the next one starts right after that
+    pause. :meth:`request_run` (a public service saw an expired object) wakes
+    the scheduler early.
+    ``interval_seconds <= 0`` disables it and leaves cleanup to cron.
+    """
+
+    cleanup: MediaCleanup
+    interval_seconds: float = 30.0
+    slice_seconds: float = 1.0
+    batch_size: int = 200
+    workers: int = 2
+    duty_cycle: float = 0.1
+    jitter_ratio: float = 0.2
+    log: logging.Logger = field(default_factory=lambda: logging.getLogger(__name__))
+    _task: asyncio.Task[None] | None = field(default=None, init=False)
+    _wakeup: asyncio.Event | None = field(default=None, init=False)
+    _loop: asyncio.AbstractEventLoop | None = field(default=None, init=False)
+
+    async def start(self) -> None:
+        if self.interval_seconds <= 0 or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="media-cleanup")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        self._loop = None
+        self._wakeup = None
+
+    def request_run(self) -> None:
+        """Ask for a slice soon; safe from request threads and the event loop."""
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(wakeup.set)
+
+    def run_slice(self) -> CleanupReport:
+        limits = CleanupLimits.for_run(
+            batch_size=self.batch_size,
+            max_seconds=self.slice_seconds,
+            workers=self.workers,
+        )
+        return self.cleanup.run(limits)
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        # несколько процессов приложения не должны стартовать срезы синхронно
+        await self._wait(random.uniform(0, self._jittered_interval()))
+        while True:
+            self._wakeup.clear()
+            started = time.monotonic()
+            backlog = False
+            try:
+                report = await asyncio.to_thread(self.run_slice)
+                backlog = report.removed > 0
+                if backlog:
+                    self.log.info(
+                        "media.cleanup.slice",
+                        extra={
+                            "results_removed": report.results_removed,
+                            "temp_removed": report.temp_removed,
+                        },
+                    )
+            except Exception:
+                self.log.exception("media.cleanup.slice_failed")
+            elapsed = time.monotonic() - started
+            # бюджет: срез занимает не больше duty_cycle времени потока и диска
+            await asyncio.sleep(elapsed * (1 / self.duty_cycle - 1))
+            if not backlog:
+                await self._wait(self._jittered_interval())
+
+    async def _wait(self, timeout: float) -> None:
+        assert self._wakeup is not None
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+
+    def _jittered_interval(self) -> float:
+        spread = self.interval_seconds * self.jitter_ratio
+        return self.interval_seconds + random.uniform(-spread, spread)
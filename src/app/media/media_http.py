@@ -0,0 +1,240 @@
+"""HTTP caching helpers for public media files (ETag, Cache-Control, 304)."""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+import anyio
+from fastapi import status
+from fastapi.responses import FileResponse, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import Receive, Scope, Send
+
+OFFLOAD_MODES = ("x-accel-redirect", "x-sendfile")
+
+
+@dataclass(frozen=True, slots=True)
+class MediaOffload:
+    """Hand file bodies to the reverse proxy instead of streaming them in Python.
+
+    ``x-accel-redirect`` (nginx) points at an ``internal`` location that maps
+    ``internal_prefix`` onto ``media_root``; ``x-sendfile`` (Apache,
+    lighttpd) carries the absolute path. The proxy then serves the bytes,
+    ranges and ``HEAD`` itself.
+    """
+
+    mode: str
+    media_root: Path
+    internal_prefix: str = "/_media/"
+
+    @classmethod
+    def from_config(
+        cls, mode: str, media_root: Path, internal_prefix: str
+    ) -> MediaOffload | None:
+        normalized = mode.strip().lower()
+        if not normalized:
+            return None
+        if normalized not in OFFLOAD_MODES:
+            expected = ", ".join(OFFLOAD_MODES)
+            raise ValueError(f"Unsupported MEDIA_OFFLOAD '{mode}' (expected {expected})")
+        prefix = "/" + internal_prefix.strip("/") + "/"
+        return cls(mode=normalized, media_root=media_root.resolve(), internal_prefix=prefix)
+
+    def headers(self, path: Path) -> dict[str, str]:
+        resolved = path.resolve()
+        if self.mode == "x-sendfile":
+            return {"X-Sendfile": str(resolved)}
+        relative = resolved.relative_to(self.media_root).as_posix()
+        return {"X-Accel-Redirect": self.internal_prefix + quote(relative)}
+
+
+def file_etag(sha256: str | None, stat_result: os.stat_result) -> str:
+    """Strong ETag: content hash from write time, else mtime/size for legacy rows."""
+    if sha256:
+        return f'"{sha256}"'
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def cache_control(expires_at: datetime | None, now: datetime | None = None) -> str:
+    """Files never change once written: cache them until the link expires."""
+    if expires_at is None:
+        return "no-cache"
+    remaining = int((expires_at - (now or datetime.utcnow())).total_seconds())
+    if remaining <= 0:
+        # просроченный, но ещё не очищенный файл: отдаём, но не кэшируем
+        return "no-cache"
+    return f"public, max-age={remaining}, immutable"
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """``If-None-Match`` check; weak comparison per RFC 9110 (``W/`` ignored)."""
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def cached_file_response(
+    path: Path,
+    stat_result: os.stat_result,
+    *,
+    media_type: str,
+    etag: str,
+    cache_control: str,
+    if_none_match: str | None,
+    headers: dict[str, str] | None = None,
+    offload: MediaOffload | None = None,
+) -> Response:
+    """304 for a matching ``If-None-Match``, otherwise the file.
+
+    ``FileResponse`` serves ``Range``/``If-Range`` and ``HEAD`` itself (Starlette
+    0.39+, hence the pins in ``requirements.txt``); the stat result is reused
+    so the file is not stat-ed twice. With ``offload``
+    only headers are returned and the proxy sends the body.
+    """
+    caching = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=caching)
+    if offload is not None:
+        return Response(
+            media_type=media_type,
+            headers={**caching, **(headers or {}), **offload.headers(path)},
+        )
+    return FileResponse(
+        path=path,
+        media_type=media_type,
+        filename=path.name,
+        stat_result=stat_result,
+        headers={**caching, **(headers or {})},
+    )
+
+
+def cached_member_response(
+    archive: Path,
+    offset: int,
+    size: int,
+    *,
+    media_type: str,
+    etag: str,
+    cache_control: str,
+    if_none_match: str | None,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """:func:`cached_file_response` for a member stored uncompressed in an archive.
+
+    The proxy cannot address a slice of a file, so members are always
+    streamed by the application, offload or not.
+    """
+    caching = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=caching)
+    return FileSliceResponse(
+        archive,
+        offset,
+        size,
+        media_type=media_type,
+        headers={**caching, **(headers or {})},
+    )
+
+
+class FileSliceResponse(Response):
+    """``size`` bytes at ``offset`` of ``path``, with ``HEAD`` and single ``Range``.
+
+    Multi-range requests get the whole member (a server may ignore
+    ``Range``); ``If-Range`` is honoured against the response ETag.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        path: Path,
+        offset: int,
+        size: int,
+        *,
+        media_type: str,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        self.path = path
+        self.offset = offset
+        self.size = size
+        self.status_code = status.HTTP_200_OK
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(
+            {**(headers or {}), "accept-ranges": "bytes", "content-length": str(size)}
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        headers = MutableHeaders(raw=list(self.raw_headers))
+        start, end = 0, self.size
+        status_code = self.status_code
+        http_range = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if http_range is not None and (if_range is None or if_range == headers.get("etag")):
+            span = single_byte_range(http_range, self.size)
+            if span == ():
+                response = Response(
+                    status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+                    headers={"Content-Range": f"bytes */{self.size}"},
+                )
+                await response(scope, receive, send)
+                return
+            if span is not None:
+                start, end = span
+                status_code = status.HTTP_206_PARTIAL_CONTENT
+                headers["content-range"] = f"bytes {start}-{end - 1}/{self.size}"
+                headers["content-length"] = str(end - start)
+
+        await send(
+            {"type": "http.response.start", "status": status_code, "headers": headers.raw}
+        )
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.offset + start)
+            remaining = end - start
+            while True:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                remaining -= len(chunk)
+                more_body = bool(chunk) and remaining > 0
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": more_body}
+                )
+                if not more_body:
+                    break
+
+
+def single_byte_range(header: str, size: int) -> tuple[int, int] | tuple[()] | None:
+    """``(start, end)`` (end exclusive) of a single ``bytes=`` range.
+
+    ``None`` — not a single well-formed range, serve the whole body;
+    ``()`` — the range lies outside the body (416).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                return ()
+            return max(size - suffix, 0), size
+        start = int(first)
+        end = int(last) + 1 if last else size
+    except ValueError:
+        return None
+    if start >= size:
+        return ()
+    if end <= start:
+        return None
+    return start, min(end, size)
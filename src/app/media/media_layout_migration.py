@@ -0,0 +1,149 @@
+"""Online move of per-job media files into the content-addressed object store."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from hashlib import sha256
+from pathlib import Path
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ..db.db_models import JobHistoryModel, MediaObjectModel
+from ..repositories.storage_ledger import StorageLedger
+from .object_store import ObjectStore
+
+logger = logging.getLogger(__name__)
+
+MIGRATED_SCOPES = ("result", "template")
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(slots=True)
+class LayoutMigrationSummary:
+    moved: int = 0
+    deduplicated: int = 0
+    missing: int = 0
+    bytes_freed: int = 0
+
+
+def file_sha256(path: Path) -> str:
+    digest = sha256()
+    with path.open("rb") as source:
+        while chunk := source.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def migrate_to_object_store(
+    session_factory: Callable[[], Session],
+    object_store: ObjectStore,
+    *,
+    ledger: StorageLedger | None = None,
+    batch_size: int = 200,
+    limit: int | None = None,
+    expiry_margin: timedelta = timedelta(hours=1),
+    reference_time: datetime | None = None,
+) -> LayoutMigrationSummary:
+    """Move live result/template files into ``object_store`` while the app runs.
+
+    Rows are walked in primary-key batches. Each file is hard-linked into the
+    store first, then ``media_object.path`` (and ``job_history.result_path``)
+    are switched in one transaction, and only then is the old path removed —
+    a reader sees either the old file or the new one. Readers holding the old
+    path re-read it from the database. Rows about to expire are left to
+    cleanup. The run can be interrupted and restarted: moved rows already
+    point into the store and are skipped.
+    """
+    summary = LayoutMigrationSummary()
+    cutoff = (reference_time or datetime.utcnow()) + expiry_margin
+    last_id = ""
+    while limit is None or summary.moved < limit:
+        with session_factory() as session:
+            rows = session.execute(
+                select(
+                    MediaObjectModel.id,
+                    MediaObjectModel.job_id,
+                    MediaObjectModel.slot_id,
+                    MediaObjectModel.scope,
+                    MediaObjectModel.path,
+                    MediaObjectModel.sha256,
+                )
+                .where(
+                    MediaObjectModel.id > last_id,
+                    MediaObjectModel.scope.in_(MIGRATED_SCOPES),
+                    MediaObjectModel.cleaned_at.is_(None),
+                    MediaObjectModel.expires_at > cutoff,
+                )
+                .order_by(MediaObjectModel.id)
+                .limit(batch_size)
+            ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for row in rows:
+            if limit is not None and summary.moved >= limit:
+                break
+            source = Path(row.path)
+            if object_store.contains(source):
+                continue
+            if not source.is_file():
+                summary.missing += 1
+                continue
+            _move_row(session_factory, object_store, ledger, row, source, summary)
+    logger.info(
+        "media.layout.migrated",
+        extra={
+            "moved": summary.moved,
+            "deduplicated": summary.deduplicated,
+            "missing": summary.missing,
+            "bytes_freed": summary.bytes_freed,
+        },
+    )
+    return summary
+
+
+def _move_row(
+    session_factory: Callable[[], Session],
+    object_store: ObjectStore,
+    ledger: StorageLedger | None,
+    row,
+    source: Path,
+    summary: LayoutMigrationSummary,
+) -> None:
+    digest = row.sha256 or file_sha256(source)
+    stored = object_store.adopt(source, digest)
+    with session_factory() as session:
+        session.execute(
+            update(MediaObjectModel)
+            .where(MediaObjectModel.id == row.id, MediaObjectModel.path == row.path)
+            .values(path=str(stored.path), sha256=digest)
+        )
+        # результаты и синтетические задачи загрузки шаблонов хранят путь в job_history
+        session.execute(
+            update(JobHistoryModel)
+            .where(
+                JobHistoryModel.job_id == row.job_id,
+                JobHistoryModel.result_path == row.path,
+            )
+            .values(result_path=str(stored.path))
+        )
+        session.commit()
+
+    size = source.stat().st_size
+    source.unlink(missing_ok=True)
+    if ledger is not None:
+        ledger.record(row.scope, row.slot_id, -size, -1)
+    if row.scope == "result":
+        # каталог results/<slot>/<job_id> больше не нужен
+        try:
+            source.parent.rmdir()
+        except OSError:
+            pass
+    summary.moved += 1
+    if not stored.created:
+        summary.deduplicated += 1
+        summary.bytes_freed += size
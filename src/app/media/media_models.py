@@ -15,3 +15,8 @@ class MediaObject:
     expires_at: datetime
     scope: str
     cleaned_at: datetime | None = None
+    sha256: str | None = None
+    last_accessed_at: datetime | None = None
+    # член архива холодного слоя: байты по смещению в файле архива
+    archive_offset: int | None = None
+    archive_size: int | None = None
@@ -0,0 +1,82 @@
+"""In-process scheduler for orphan reconciliation passes over media/."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+
+from .media_orphans import OrphanReconciler, OrphanReport
+
+
+@dataclass(slots=True)
+class OrphanScheduler:
+    """Run an :class:`OrphanReconciler` pass every ``interval_seconds`` in a worker thread.
+
+    A pass is cut into slices of ``slice_seconds``; each slice resumes from the
+    previous slice's cursor and is followed by a pause of
+    ``elapsed * (1 / duty_cycle - 1)``, so walking millions of entries never
+    takes more than ``duty_cycle`` of a thread and of the disk; row and ledger
+    fixes are queued on the DB writer. The counters of the last complete pass
+    are kept in :attr:`last_pass` for ``/metrics``. Without ``fix`` orphans
+    are only reported. ``interval_seconds <= 0`` disables the scheduler and
+    leaves reconciliation to ``scripts/reconcile_media.py``.
+    """
+
+    reconciler: OrphanReconciler
+    interval_seconds: float = 3600.0
+    fix: bool = False
+    slice_seconds: float = 2.0
+    duty_cycle: float = 0.1
+    log: logging.Logger = field(default_factory=lambda: logging.getLogger(__name__))
+    last_pass: OrphanReport | None = field(default=None, init=False)
+    _task: asyncio.Task[None] | None = field(default=None, init=False)
+
+    async def start(self) -> None:
+        if self.interval_seconds <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="media-orphans")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    def run_slice(self, start_after: str | None) -> OrphanReport:
+        return self.reconciler.run(
+            fix=self.fix,
+            start_after=start_after,
+            deadline=time.monotonic() + self.slice_seconds,
+        )
+
+    async def run_pass(self) -> OrphanReport:
+        """One full pass over the tree, slice by slice."""
+        progress = OrphanReport()
+        while True:
+            started = time.monotonic()
+            report = await asyncio.to_thread(self.run_slice, progress.cursor)
+            progress.add(report)
+            if progress.cursor is None:
+                break
+            # бюджет: срез занимает не больше duty_cycle времени потока и диска
+            await asyncio.sleep((time.monotonic() - started) * (1 / self.duty_cycle - 1))
+        self.last_pass = progress
+        extra = {key: value for key, value in asdict(progress).items() if key != "cursor"}
+        if progress.orphan_files or progress.missing_rows:
+            self.log.warning("media.orphans.found", extra=extra)
+        else:
+            self.log.info("media.orphans.pass", extra=extra)
+        return progress
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_pass()
+            except Exception:
+                self.log.exception("media.orphans.pass_failed")
+            await asyncio.sleep(self.interval_seconds)
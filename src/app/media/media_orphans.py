@@ -0,0 +1,355 @@
+"""Orphan reconciliation: merge-join of the media tree with live media_object rows."""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from heapq import merge
+from pathlib import Path
+
+from ..config import MediaPaths
+from ..db.db_executor import call_db_write
+from ..repositories.media_object_repository import MediaObjectRepository
+from ..repositories.storage_ledger import (
+    ARCHIVE_DIR,
+    ARCHIVE_SCOPE,
+    OBJECT_SCOPE,
+    OBJECTS_DIR,
+    SCOPE_DIRS,
+    StorageLedger,
+    UsageKey,
+)
+from .result_archive import member_archive
+
+# поддерево p — это ровно диапазон строк [p + SEP, p + SEP_NEXT)
+SEP = os.sep
+SEP_NEXT = chr(ord(SEP) + 1)
+
+
+@dataclass(frozen=True, slots=True)
+class TreeEntry:
+    """A file (or an empty directory) met by :func:`walk_sorted`."""
+
+    path: str
+    size: int
+    mtime: float
+    is_dir: bool = False
+
+
+def walk_sorted(root: Path | str, after: str | None = None) -> Iterator[TreeEntry]:
+    """Files under ``root`` in binary path-string order, skipping up to ``after``.
+
+    Siblings are sorted with a trailing separator on directory names, so the
+    depth-first walk yields paths exactly as ``sorted(str(path))`` — the
+    order of ``ORDER BY path``. Only one directory listing per level is held
+    in memory. Empty directories below ``root`` are yielded with ``is_dir``.
+    """
+    yield from _walk(str(root), after, top=True)
+
+
+def _walk(directory: str, after: str | None, *, top: bool = False) -> Iterator[TreeEntry]:
+    try:
+        with os.scandir(directory) as entries:
+            keys = sorted(
+                entry.name + SEP if entry.is_dir(follow_symlinks=False) else entry.name
+                for entry in entries
+            )
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    if not keys:
+        if not top and after is None:
+            try:
+                mtime = os.stat(directory).st_mtime
+            except FileNotFoundError:
+                return
+            yield TreeEntry(directory, 0, mtime, is_dir=True)
+        return
+    prefix = directory + SEP
+    for key in keys:
+        if key.endswith(SEP):
+            path = prefix + key[:-1]
+            if after is not None and after >= path + SEP_NEXT:
+                continue
+            inside = after is not None and after >= path + SEP
+            yield from _walk(path, after if inside else None)
+            continue
+        path = prefix + key
+        if after is not None and path <= after:
+            continue
+        try:
+            stat = os.stat(path, follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        yield TreeEntry(path, stat.st_size, stat.st_mtime)
+
+
+@dataclass(slots=True)
+class OrphanReport:
+    files_scanned: int = 0
+    rows_scanned: int = 0
+    # файлы старше grace-периода без живой строки (до исправления)
+    orphan_files: int = 0
+    orphan_bytes: int = 0
+    # живые строки без файла; превью только считаются
+    missing_rows: int = 0
+    missing_previews: int = 0
+    empty_dirs: int = 0
+    files_removed: int = 0
+    bytes_removed: int = 0
+    rows_cleaned: int = 0
+    dirs_removed: int = 0
+    # путь, на котором остановился ограниченный по времени запуск; None — дерево пройдено
+    cursor: str | None = None
+
+    def add(self, other: OrphanReport) -> None:
+        """Accumulate counters of ``other`` (next slice of the same pass)."""
+        for item in fields(self):
+            if item.name != "cursor":
+                setattr(self, item.name, getattr(self, item.name) + getattr(other, item.name))
+        self.cursor = other.cursor
+
+
+@dataclass(slots=True)
+class OrphanReconciler:
+    """Find, and with ``fix`` repair, files without live rows and live rows without files.
+
+    Each tree (results, temp, templates, objects, archive) is walked with
+    :func:`walk_sorted` and merge-joined with live ``media_object`` paths read
+    in keyset pages of the same order, so memory is one page plus one
+    directory listing per level however many millions of entries there are.
+    Archived rows (``<archive>.zip/<job_id>/<file>``) match their archive.
+
+    Findings are handled in batches and re-checked first: a file is removed
+    only when it is older than ``grace_seconds`` and no live row points at it
+    any more; a row is marked cleaned only when its file is still absent and
+    it still has that path (template rows are only reported). A run bounded
+    by ``deadline`` (``time.monotonic()``) stops at a batch boundary and
+    returns ``cursor`` — the next run passes it as ``start_after``. Rows are
+    matched by path string, so they must have been written under the
+    ``MEDIA_ROOT`` configured here.
+    """
+
+    media_repo: MediaObjectRepository
+    paths: MediaPaths
+    ledger: StorageLedger | None = None
+    grace_seconds: float = 3600.0
+    batch_size: int = 1000
+    # что-то удалено или очищено: сбросить кэш галереи
+    on_removed: Callable[[], None] | None = None
+    log: logging.Logger = field(default_factory=lambda: logging.getLogger(__name__))
+
+    def roots(self) -> list[tuple[str, Path]]:
+        """``(ledger scope, directory)`` pairs in path order."""
+        roots = [
+            (scope, getattr(self.paths, attribute)) for scope, attribute in SCOPE_DIRS.items()
+        ]
+        roots.append((OBJECT_SCOPE, self.paths.root / OBJECTS_DIR))
+        roots.append((ARCHIVE_SCOPE, self.paths.root / ARCHIVE_DIR))
+        return sorted(roots, key=lambda item: str(item[1]) + SEP)
+
+    def run(
+        self,
+        *,
+        fix: bool = False,
+        start_after: str | None = None,
+        deadline: float | None = None,
+        reference_time: datetime | None = None,
+    ) -> OrphanReport:
+        merge_join = _MergeJoin(self, fix, reference_time or datetime.utcnow(), deadline)
+        for scope, root in self.roots():
+            lower, upper = str(root) + SEP, str(root) + SEP_NEXT
+            if start_after is not None and start_after >= upper:
+                continue
+            after = start_after if start_after is not None and start_after >= lower else None
+            if not merge_join.run(scope, root, lower, upper, after):
+                break
+        merge_join.flush()
+        report = merge_join.report
+        changed = report.files_removed or report.rows_cleaned
+        if changed and self.on_removed is not None:
+            self.on_removed()
+        return report
+
+
+class _MergeJoin:
+    """State of one :meth:`OrphanReconciler.run`: pending findings and counters."""
+
+    def __init__(
+        self,
+        reconciler: OrphanReconciler,
+        fix: bool,
+        now: datetime,
+        deadline: float | None,
+    ) -> None:
+        self.reconciler = reconciler
+        self.fix = fix
+        self.now = now
+        self.deadline = deadline
+        self.report = OrphanReport()
+        # mtime моложе — файл мог быть только что записан, а строка ещё не закоммичена
+        self.young_after = time.time() - reconciler.grace_seconds
+        self.orphans: list[tuple[TreeEntry, UsageKey]] = []
+        self.missing: list[str] = []
+        self.empty_dirs: list[TreeEntry] = []
+        self.processed = 0
+        self.last: str | None = None
+
+    def run(self, scope: str, root: Path, lower: str, upper: str, after: str | None) -> bool:
+        """Merge one tree; ``False`` when the deadline stopped the run."""
+        files = walk_sorted(root, after)
+        rows = self._rows(lower, upper, after)
+        entry, row = next(files, None), next(rows, None)
+        while entry is not None or row is not None:
+            if entry is not None and entry.is_dir:
+                if entry.mtime < self.young_after:
+                    self.empty_dirs.append(entry)
+                self._processed(entry.path + SEP)
+                entry = next(files, None)
+            elif entry is not None and (
+                row is None
+                or (row[0] > entry.path and not row[0].startswith(entry.path + SEP))
+            ):
+                self.report.files_scanned += 1
+                if entry.mtime < self.young_after:
+                    self.orphans.append((entry, _usage_key(scope, lower, entry.path)))
+                self._processed(entry.path)
+                entry = next(files, None)
+            elif entry is None or row[0] < entry.path:
+                self.report.rows_scanned += 1
+                if row[1]:
+                    self.report.missing_previews += 1
+                else:
+                    self.missing.append(row[0])
+                self._processed(row[0])
+                row = next(rows, None)
+            else:
+                # файл и его строки: сам путь или члены архива <файл>/<job_id>/...
+                self.report.files_scanned += 1
+                self._processed(entry.path)
+                while row is not None and (
+                    row[0] == entry.path or row[0].startswith(entry.path + SEP)
+                ):
+                    self.report.rows_scanned += 1
+                    self._processed(row[0])
+                    row = next(rows, None)
+                entry = next(files, None)
+            if self.processed >= self.reconciler.batch_size:
+                self.flush()
+                if self.deadline is not None and time.monotonic() >= self.deadline:
+                    self.report.cursor = self.last
+                    return False
+        return True
+
+    def flush(self) -> None:
+        self.processed = 0
+        if self.orphans:
+            self._handle_orphans(self.orphans)
+            self.orphans = []
+        if self.missing:
+            self._handle_missing(self.missing)
+            self.missing = []
+        if self.empty_dirs:
+            self._handle_empty_dirs(self.empty_dirs)
+            self.empty_dirs = []
+
+    def _rows(self, lower: str, upper: str, after: str | None) -> Iterator[tuple[str, bool]]:
+        """Live ``(path, is_preview)`` in path order; a path that is both counts once."""
+        paths = ((path, False) for path in self._pages("path", lower, upper, after))
+        previews = ((path, True) for path in self._pages("preview_path", lower, upper, after))
+        previous = None
+        for path, is_preview in merge(paths, previews):
+            if path != previous:
+                yield path, is_preview
+            previous = path
+
+    def _pages(self, column: str, lower: str, upper: str, after: str | None) -> Iterator[str]:
+        limit = self.reconciler.batch_size
+        while True:
+            page = self.reconciler.media_repo.live_paths(
+                column, lower=lower, upper=upper, after=after, limit=limit
+            )
+            yield from page
+            if len(page) < limit:
+                return
+            after = page[-1]
+
+    def _processed(self, key: str) -> None:
+        self.processed += 1
+        if self.last is None or key > self.last:
+            self.last = key
+
+    def _handle_orphans(self, orphans: list[tuple[TreeEntry, UsageKey]]) -> None:
+        # страница строк могла устареть: ссылки перепроверяются перед решением
+        referenced = self.reconciler.media_repo.referenced_paths(
+            [entry.path for entry, _ in orphans]
+        )
+        deltas: dict[UsageKey, list[int]] = defaultdict(lambda: [0, 0])
+        for entry, key in orphans:
+            if entry.path in referenced:
+                continue
+            self.report.orphan_files += 1
+            self.report.orphan_bytes += entry.size
+            if not self.fix:
+                continue
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                continue
+            except OSError:
+                self.reconciler.log.exception(
+                    "media.orphans.remove_failed", extra={"path": entry.path}
+                )
+                continue
+            self.report.files_removed += 1
+            self.report.bytes_removed += entry.size
+            deltas[key][0] -= entry.size
+            deltas[key][1] -= 1
+            self.reconciler.log.info(
+                "media.orphans.file_removed",
+                extra={"path": entry.path, "bytes": entry.size},
+            )
+        if deltas and self.reconciler.ledger is not None:
+            call_db_write(self.reconciler.ledger.record_many, dict(deltas))
+
+    def _handle_missing(self, paths: list[str]) -> None:
+        # файл пишется до регистрации строки: отсутствие сейчас — окончательное
+        missing = [
+            path for path in paths if not os.path.lexists(member_archive(Path(path)) or path)
+        ]
+        self.report.missing_rows += len(missing)
+        if not self.fix or not missing:
+            return
+        cleaned = call_db_write(
+            self.reconciler.media_repo.clean_missing, missing, self.now
+        )
+        self.report.rows_cleaned += cleaned
+        if cleaned:
+            self.reconciler.log.info(
+                "media.orphans.rows_cleaned",
+                extra={"rows": cleaned, "first_path": missing[0]},
+            )
+
+    def _handle_empty_dirs(self, directories: list[TreeEntry]) -> None:
+        for entry in directories:
+            self.report.empty_dirs += 1
+            if not self.fix:
+                continue
+            try:
+                os.rmdir(entry.path)
+            except OSError:
+                # каталог успели заполнить (или удалить) — не наша забота
+                continue
+            self.report.dirs_removed += 1
+
+
+def _usage_key(scope: str, lower: str, path: str) -> UsageKey:
+    """Storage ledger key of a file, as :meth:`StorageLedger.reconcile` counts it."""
+    if scope == OBJECT_SCOPE:
+        return scope, ""
+    head, separator, _ = path[len(lower):].partition(SEP)
+    return scope, head if separator else ""
@@ -0,0 +1,145 @@
+"""Disk-pressure quota manager: evict results before the media volume fills up."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import shutil
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from ..db.db_executor import call_db_write
+from ..repositories.media_object_repository import MediaObjectRepository
+from .media_cleanup import MediaCleanup
+
+
+def volume_usage(path: Path) -> tuple[int, int]:
+    """(used_bytes, capacity_bytes) of the volume holding ``path``."""
+    usage = shutil.disk_usage(path)
+    return usage.used, usage.total
+
+
+@dataclass
+class ResultAccessLog:
+    """Last public access per job id, buffered in memory between flushes.
+
+    Public result serving only records a timestamp here; the quota manager
+    writes the buffer to ``media_object.last_accessed_at`` in one statement,
+    so a download never costs a database write. When the buffer is full new
+    job ids are dropped until the next flush (such results just look older).
+    """
+
+    max_entries: int = 65536
+    _accessed: dict[str, datetime] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __len__(self) -> int:
+        return len(self._accessed)
+
+    def touch(self, job_id: str) -> None:
+        with self._lock:
+            if job_id in self._accessed or len(self._accessed) < self.max_entries:
+                self._accessed[job_id] = datetime.utcnow()
+
+    def drain(self) -> dict[str, datetime]:
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+        return accessed
+
+
+@dataclass(slots=True)
+class QuotaManager:
+    """Keep the media volume under ``high_watermark`` by evicting results early.
+
+    Every ``interval_seconds`` the access log is flushed and the volume is
+    checked; above ``high_watermark`` the least recently served results (the
+    never-served ones first) are evicted in batches until usage drops to
+    ``low_watermark``. :meth:`reclaim` is also the ingest fallback on
+    ``ENOSPC``. Eviction stops early when a batch frees nothing (objects
+    still shared or inside the object store grace period), so a pass never
+    wipes out every result. ``interval_seconds <= 0`` disables the loop.
+    """
+
+    cleanup: MediaCleanup
+    media_repo: MediaObjectRepository
+    media_root: Path
+    access_log: ResultAccessLog = field(default_factory=ResultAccessLog)
+    high_watermark: float = 0.90
+    low_watermark: float = 0.80
+    interval_seconds: float = 15.0
+    batch_size: int = 100
+    workers: int = 2
+    disk_usage: Callable[[Path], tuple[int, int]] = volume_usage
+    log: logging.Logger = field(default_factory=lambda: logging.getLogger(__name__))
+    evicted_total: int = field(default=0, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+    _task: asyncio.Task[None] | None = field(default=None, init=False)
+
+    async def start(self) -> None:
+        if self.interval_seconds <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="media-quota")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    def usage_ratio(self) -> float:
+        used, capacity = self.disk_usage(self.media_root)
+        return used / capacity if capacity else 0.0
+
+    def flush_access_log(self) -> int:
+        return call_db_write(self.media_repo.touch_results, self.access_log.drain())
+
+    def check(self) -> int:
+        """Flush access times, then evict if the volume is above the high watermark."""
+        self.flush_access_log()
+        if self.usage_ratio() < self.high_watermark:
+            return 0
+        return self.reclaim()
+
+    def reclaim(self) -> int:
+        """Evict LRU results until usage is at ``low_watermark``; returns rows evicted."""
+        with self._lock:
+            self.flush_access_log()
+            used, capacity = self.disk_usage(self.media_root)
+            before = used
+            evicted = 0
+            while capacity and used / capacity > self.low_watermark:
+                done = self.cleanup.evict_results(
+                    batch_size=self.batch_size, workers=self.workers
+                )
+                evicted += len(done)
+                previous = used
+                used, capacity = self.disk_usage(self.media_root)
+                if not done or used >= previous:
+                    break
+            self.evicted_total += evicted
+        ratio = used / capacity if capacity else 0.0
+        extra = {
+            "evicted": evicted,
+            "freed_bytes": max(before - used, 0),
+            "usage_ratio": round(ratio, 4),
+        }
+        if ratio > self.low_watermark:
+            # места не хватает даже после вытеснения — нужен диск побольше
+            self.log.warning("media.quota.pressure_persists", extra=extra)
+        elif evicted:
+            self.log.info("media.quota.reclaimed", extra=extra)
+        return evicted
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.check)
+            except Exception:
+                self.log.exception("media.quota.check_failed")
+            await asyncio.sleep(self.interval_seconds)
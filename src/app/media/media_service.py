@@ -5,32 +5,132 @@ from __future__ import annotations
 import shutil
 from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from ..config import MediaPaths
+from ..repositories.storage_ledger import StorageLedger, measure_path
+
+if TYPE_CHECKING:  # pragma: no cover - type checking only
+    from ..repositories.job_unit_of_work import JobUnitOfWork
+    from .object_store import ObjectStore
+    from .result_archive import ResultArchive
 
 
 @dataclass(slots=True)
 class ResultStore:
-    """Manage storing processed media results on disk."""
+    """Manage storing processed media results on disk.
+
+    With ``content_addressed`` payloads go to the shared :class:`ObjectStore`
+    instead of a directory per job. ``object_store`` is also used to release
+    objects on cleanup, whichever layout new results are written with.
+    ``archive`` likewise drops cold-tier archives whose members are all cleaned.
+    """
 
     paths: MediaPaths
+    ledger: StorageLedger | None = None
+    object_store: ObjectStore | None = None
+    content_addressed: bool = False
+    archive: ResultArchive | None = None
 
     def result_dir(self, slot_id: str, job_id: str) -> Path:
         return self.paths.results / slot_id / job_id
 
+    def prepare(self, slot_id: str, job_id: str) -> Path:
+        """Job result location; a directory is created only for the per-job layout."""
+        if self.content_addressed and self.object_store is not None:
+            return self.result_dir(slot_id, job_id)
+        return self.ensure_structure(slot_id, job_id)
+
     def ensure_structure(self, slot_id: str, job_id: str) -> Path:
         directory = self.result_dir(slot_id, job_id)
         directory.mkdir(parents=True, exist_ok=True)
         return directory
 
-    def save_payload(self, slot_id: str, job_id: str, data: bytes, suffix: str) -> Path:
+    def save_payload(
+        self,
+        slot_id: str,
+        job_id: str,
+        data: bytes,
+        suffix: str,
+        *,
+        unit_of_work: JobUnitOfWork | None = None,
+    ) -> Path:
+        object_store = self.object_store
+        if self.content_addressed and object_store is not None:
+            return object_store.put_bytes(data, suffix, unit_of_work=unit_of_work).path
         directory = self.ensure_structure(slot_id, job_id)
         sanitized = suffix.lstrip(".") or "bin"
         path = directory / f"payload.{sanitized}"
+        previous_bytes, previous_files = measure_path(path)
+        key = None
+        if unit_of_work is not None:
+            # повтор после неудачной попытки считается от размера до первой
+            key = str(path)
+            previous_bytes, previous_files = unit_of_work.baseline(
+                key, (previous_bytes, previous_files)
+            )
         path.write_bytes(data)
+        self._account(
+            slot_id,
+            len(data) - previous_bytes,
+            1 - previous_files,
+            unit_of_work,
+            key=key,
+        )
         return path
 
-    def remove_result_dir(self, slot_id: str, job_id: str) -> None:
+    def remove_result_dir(
+        self,
+        slot_id: str,
+        job_id: str,
+        *,
+        unit_of_work: JobUnitOfWork | None = None,
+    ) -> None:
+        removed_bytes, removed_files = self.delete_result_dir(slot_id, job_id)
+        self._account(slot_id, -removed_bytes, -removed_files, unit_of_work)
+
+    def delete_result_dir(self, slot_id: str, job_id: str) -> tuple[int, int]:
+        """Filesystem part of :meth:`remove_result_dir`: no ledger, safe in a worker thread."""
         directory = self.result_dir(slot_id, job_id)
-        if directory.exists():
-            shutil.rmtree(directory, ignore_errors=True)
+        if not directory.exists():
+            return 0, 0
+        removed = measure_path(directory)
+        shutil.rmtree(directory, ignore_errors=True)
+        return removed
+
+    def release_result(self, path: Path, sha256: str | None) -> None:
+        """Drop a cleaned result's object once nothing else references it."""
+        if self.object_store is not None:
+            self.object_store.release(path, sha256)
+
+    def object_held(self, path: Path) -> bool:
+        """A shared object that cleanup must not release yet (see :meth:`ObjectStore.held`)."""
+        return self.object_store is not None and self.object_store.held(path)
+
+    def release_results(self, objects: list[tuple[Path, str | None]]) -> list[Path]:
+        """Release cleaned results' objects; returns objects deferred by the grace period."""
+        deferred: list[Path] = []
+        if self.object_store is not None:
+            deferred = self.object_store.release_many(objects).deferred
+        if self.archive is not None:
+            self.archive.release_many(path for path, _ in objects)
+        return deferred
+
+    def _account(
+        self,
+        slot_id: str,
+        bytes_delta: int,
+        files_delta: int,
+        unit_of_work: JobUnitOfWork | None,
+        *,
+        key: str | None = None,
+    ) -> None:
+        if self.ledger is not None:
+            self.ledger.record(
+                "result",
+                slot_id,
+                bytes_delta,
+                files_delta,
+                unit_of_work=unit_of_work,
+                key=key,
+            )
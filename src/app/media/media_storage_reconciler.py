@@ -0,0 +1,48 @@
+"""Periodic low-priority scan that corrects storage ledger drift."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from dataclasses import dataclass, field
+
+from ..config import MediaPaths
+from ..repositories.storage_ledger import StorageLedger
+
+
+@dataclass(slots=True)
+class StorageReconciler:
+    """Rescan ``media/`` every ``interval_seconds`` in a worker thread.
+
+    The scan runs outside the DB writer and the background queue so a large
+    tree never delays ingest bookkeeping; only the final correction is queued
+    on the writer. ``interval_seconds <= 0`` disables it.
+    """
+
+    ledger: StorageLedger
+    paths: MediaPaths
+    interval_seconds: float = 3600.0
+    log: logging.Logger = field(default_factory=lambda: logging.getLogger(__name__))
+    _task: asyncio.Task[None] | None = field(default=None, init=False)
+
+    async def start(self) -> None:
+        if self.interval_seconds <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="media-storage-reconcile")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.ledger.reconcile, self.paths)
+            except Exception:
+                self.log.exception("media.ledger.reconcile_failed")
+            await asyncio.sleep(self.interval_seconds)
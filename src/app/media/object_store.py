@@ -0,0 +1,216 @@
+"""Content-addressed media storage shared by all slots and jobs."""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import time
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from hashlib import sha256
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from ..config import MediaPaths
+from ..repositories.media_object_repository import MediaObjectRepository
+from ..repositories.storage_ledger import OBJECT_SCOPE, OBJECTS_DIR, StorageLedger
+
+if TYPE_CHECKING:  # pragma: no cover - type checking only
+    from ..repositories.job_unit_of_work import JobUnitOfWork
+
+
+@dataclass(slots=True)
+class StoredObject:
+    """Object file written (or found) for a payload."""
+
+    path: Path
+    sha256: str
+    size: int
+    created: bool
+
+
+@dataclass(slots=True)
+class ReleaseReport:
+    """Outcome of :meth:`ObjectStore.release_many`."""
+
+    released: int = 0
+    # без живых ссылок, но моложе grace-периода: освобождать повторно позже
+    deferred: list[Path] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class ObjectStore:
+    """Files stored once per content under ``media/objects/ab/cd/<sha256>.<ext>``.
+
+    Two levels of hashed fan-out keep every directory small. Identical bytes
+    are written once; ``media_object`` rows that point at the same file are
+    its references, and :meth:`release` removes the file when the last live
+    row is cleaned. A file reused by a new job has its mtime refreshed, and
+    files younger than ``release_grace_seconds`` are never released, so a
+    reference still being committed cannot lose its file.
+    """
+
+    root: Path
+    media_repo: MediaObjectRepository
+    ledger: StorageLedger | None = None
+    release_grace_seconds: float = 3600.0
+    log: logging.Logger = field(default_factory=lambda: logging.getLogger(__name__))
+
+    @classmethod
+    def for_paths(
+        cls,
+        paths: MediaPaths,
+        media_repo: MediaObjectRepository,
+        ledger: StorageLedger | None = None,
+    ) -> ObjectStore:
+        return cls(root=paths.root / OBJECTS_DIR, media_repo=media_repo, ledger=ledger)
+
+    def object_path(self, digest: str, suffix: str) -> Path:
+        # расширение сохраняется: MIME результата определяется по суффиксу пути
+        extension = suffix.lstrip(".") or "bin"
+        return self.root / digest[:2] / digest[2:4] / f"{digest}.{extension}"
+
+    def contains(self, path: Path) -> bool:
+        return Path(os.path.abspath(path)).is_relative_to(os.path.abspath(self.root))
+
+    def put_bytes(
+        self,
+        data: bytes,
+        suffix: str,
+        *,
+        unit_of_work: JobUnitOfWork | None = None,
+    ) -> StoredObject:
+        """Store ``data`` unless an object with the same content exists."""
+        digest = sha256(data).hexdigest()
+        target = self.object_path(digest, suffix)
+        if self._touch(target):
+            return StoredObject(target, digest, len(data), created=False)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        staging = self._staging_path(target)
+        staging.write_bytes(data)
+        created = self._publish(staging, target)
+        if created:
+            self._account(len(data), 1, unit_of_work)
+        return StoredObject(target, digest, len(data), created=created)
+
+    def adopt(
+        self,
+        source: Path,
+        digest: str,
+        *,
+        unit_of_work: JobUnitOfWork | None = None,
+    ) -> StoredObject:
+        """Hard-link an existing file into the store (no copy on one filesystem)."""
+        target = self.object_path(digest, source.suffix)
+        size = source.stat().st_size
+        if self._touch(target):
+            return StoredObject(target, digest, size, created=False)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        staging = self._staging_path(target)
+        try:
+            os.link(source, staging)
+        except OSError:
+            # другой раздел или ФС без жёстких ссылок — копируем
+            shutil.copy2(source, staging)
+        created = self._publish(staging, target)
+        if created:
+            self._account(size, 1, unit_of_work)
+        return StoredObject(target, digest, size, created=created)
+
+    def held(self, path: Path) -> bool:
+        """Whether ``path`` is an object still within the release grace period."""
+        if not self.contains(path):
+            return False
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return time.time() - mtime < self.release_grace_seconds
+
+    def release(self, path: Path, digest: str | None) -> bool:
+        """Delete the object at ``path`` once no live media_object references it."""
+        return self.release_many([(path, digest)]).released == 1
+
+    def release_many(self, objects: Iterable[tuple[Path, str | None]]) -> ReleaseReport:
+        """:meth:`release` for a cleanup batch with one reference query.
+
+        Unreferenced objects still within the grace period are reported as
+        ``deferred``: the caller has to retry them, nothing else will.
+        """
+        report = ReleaseReport()
+        candidates = {
+            path: digest
+            for path, digest in objects
+            if digest is not None and self.contains(path)
+        }
+        if not candidates:
+            return report
+        referenced = self.media_repo.live_object_paths(sorted(set(candidates.values())))
+        for path, digest in candidates.items():
+            if str(path) in referenced:
+                continue
+            removed = self._remove(path, digest)
+            if removed is None:
+                report.deferred.append(path)
+            elif removed:
+                report.released += 1
+        return report
+
+    def _remove(self, path: Path, digest: str) -> bool | None:
+        """Delete an unreferenced object; ``None`` while it is within the grace period."""
+        try:
+            stat_result = path.stat()
+        except FileNotFoundError:
+            return False
+        if time.time() - stat_result.st_mtime < self.release_grace_seconds:
+            return None
+        path.unlink(missing_ok=True)
+        self._account(-stat_result.st_size, -1, None)
+        for directory in (path.parent, path.parent.parent):
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+        self.log.info(
+            "media.object.released", extra={"sha256": digest, "path": str(path)}
+        )
+        return True
+
+    @staticmethod
+    def _touch(target: Path) -> bool:
+        try:
+            os.utime(target)
+        except FileNotFoundError:
+            return False
+        return True
+
+    @staticmethod
+    def _staging_path(target: Path) -> Path:
+        return target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+
+    @staticmethod
+    def _publish(staging: Path, target: Path) -> bool:
+        """Atomically expose ``staging`` as ``target``; False if it already exists."""
+        try:
+            os.link(staging, target)
+        except FileExistsError:
+            return False
+        except OSError:
+            # ФС без жёстких ссылок: замена не атомарна относительно гонки
+            # одинаковых записей, но содержимое у них совпадает
+            if target.exists():
+                return False
+            os.replace(staging, target)
+        finally:
+            staging.unlink(missing_ok=True)
+        return True
+
+    def _account(
+        self, bytes_delta: int, files_delta: int, unit_of_work: JobUnitOfWork | None
+    ) -> None:
+        if self.ledger is not None:
+            self.ledger.record(
+                OBJECT_SCOPE, "", bytes_delta, files_delta, unit_of_work=unit_of_work
+            )
@@ -1,10 +1,90 @@
-"""Helpers for building public media URLs."""
+"""Helpers for building and verifying signed public media URLs."""
 
 from __future__ import annotations
 
-from urllib.parse import urljoin
+import base64
+import hashlib
+import hmac
+import time
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from threading import Lock
+from urllib.parse import quote, urljoin
 
+PUBLIC_MEDIA_PREFIX = "public/provider-media"
 
-def build_public_media_url(base_url: str, media_id: str) -> str:
+
+@dataclass(frozen=True, slots=True)
+class MediaUrlSigner:
+    """Stateless provider media links: ``{expires}/{signature}/{relative path}``.
+
+    The path is relative to the media root and the signature is an HMAC over
+    the expiry and the path, so serving a link needs no database lookup and a
+    link cannot be guessed or extended.
+    """
+
+    key: bytes
+    media_root: Path
+    ttl_seconds: int
+
+    @classmethod
+    def from_secret(cls, secret: str, media_root: Path, ttl_seconds: int) -> MediaUrlSigner:
+        # отдельный ключ, производный от секрета: подпись ссылки не равна подписи JWT
+        key = hmac.new(secret.encode(), b"public-media-url", hashlib.sha256).digest()
+        return cls(key=key, media_root=media_root.resolve(), ttl_seconds=ttl_seconds)
+
+    def sign(self, path: Path, *, now: float | None = None) -> str:
+        """Relative URL (without base) for ``path``, valid ``ttl_seconds``."""
+        relative = path.resolve().relative_to(self.media_root).as_posix()
+        expires = int((now if now is not None else time.time()) + self.ttl_seconds)
+        signature = self._signature(expires, relative)
+        return f"{PUBLIC_MEDIA_PREFIX}/{expires}/{signature}/{quote(relative)}"
+
+    def verify(self, expires: int, signature: str, relative: str) -> bool:
+        """Constant-time signature check; expiry is checked by the caller."""
+        return hmac.compare_digest(signature, self._signature(expires, relative))
+
+    def resolve(self, relative: str) -> Path | None:
+        """Absolute path for a verified link, ``None`` if it leaves the media root."""
+        parts = PurePosixPath(relative).parts
+        if not parts or ".." in parts or PurePosixPath(relative).is_absolute():
+            return None
+        path = (self.media_root / relative).resolve()
+        if not path.is_relative_to(self.media_root):
+            return None
+        return path
+
+    def _signature(self, expires: int, relative: str) -> str:
+        digest = hmac.new(
+            self.key, f"{expires}:{relative}".encode(), hashlib.sha256
+        ).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+@dataclass
+class MediaUrlDenylist:
+    """Revoked media paths, kept only until every link to them has expired."""
+
+    ttl_seconds: int
+    _revoked: dict[str, float] = field(default_factory=dict)
+    _lock: Lock = field(default_factory=Lock)
+
+    def revoke(self, relative: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._revoked = {
+                path: until for path, until in self._revoked.items() if until > now
+            }
+            self._revoked[relative] = now + self.ttl_seconds
+
+    def is_revoked(self, relative: str) -> bool:
+        if not self._revoked:
+            return False
+        with self._lock:
+            until = self._revoked.get(relative)
+        return until is not None and until > time.time()
+
+
+def build_public_media_url(base_url: str, signer: MediaUrlSigner, path: Path) -> str:
     base = base_url.rstrip("/") + "/"
-    return urljoin(base, f"public/provider-media/{media_id}")
+    return urljoin(base, signer.sign(path))
@@ -2,48 +2,82 @@
 
 from __future__ import annotations
 
+import time
+from collections.abc import Callable
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 
 from fastapi import HTTPException, status
-from fastapi.responses import FileResponse
+from fastapi.responses import Response
 
-from ..repositories.media_object_repository import MediaObjectRepository
+from .media_http import MediaOffload, cache_control, cached_file_response, file_etag
+from .public_media_links import MediaUrlDenylist, MediaUrlSigner
 
 
 @dataclass(slots=True)
 class PublicMediaService:
-    """Expose media files for short-lived external access."""
+    """Expose media files for short-lived external access via signed links."""
 
-    media_repo: MediaObjectRepository
+    signer: MediaUrlSigner
+    denylist: MediaUrlDenylist
+    offload: MediaOffload | None = None
+    # срок ссылки совпадает с TTL временного файла: истёкшая ссылка — повод для очистки
+    on_expired: Callable[[], None] | None = None
 
-    def open_media(self, media_id: str) -> FileResponse:
-        """Return FileResponse for media_id or raise HTTP errors."""
-        try:
-            media = self.media_repo.get_media(media_id)
-        except KeyError as exc:
+    def open_media(
+        self,
+        expires: int,
+        signature: str,
+        relative_path: str,
+        if_none_match: str | None = None,
+    ) -> Response:
+        """Return the media file (or 304) for a signed link or raise HTTP errors.
+
+        Everything needed is in the link itself: no database access.
+        """
+        if not self.signer.verify(expires, signature, relative_path):
+            # неверная подпись неотличима от несуществующего файла
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Media not found"
-            ) from exc
-
-        if media.expires_at and media.expires_at < datetime.utcnow():
+            )
+        if expires < time.time():
+            if self.on_expired is not None:
+                self.on_expired()
             raise HTTPException(
                 status_code=status.HTTP_410_GONE, detail="Media expired"
             )
+        if self.denylist.is_revoked(relative_path):
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE, detail="Media revoked"
+            )
 
-        path: Path = media.path
-        if not path.exists():
+        path = self.signer.resolve(relative_path)
+        if path is None:
             raise HTTPException(
-                status_code=status.HTTP_410_GONE, detail="Media file missing"
+                status_code=status.HTTP_404_NOT_FOUND, detail="Media not found"
             )
+        try:
+            stat_result = path.stat()
+        except FileNotFoundError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE, detail="Media file missing"
+            ) from exc
 
-        return FileResponse(
-            path=path,
+        return cached_file_response(
+            path,
+            stat_result,
             media_type=_guess_mime(path.suffix),
-            filename=path.name,
+            etag=file_etag(None, stat_result),
+            cache_control=cache_control(datetime.utcfromtimestamp(expires)),
+            if_none_match=if_none_match,
+            offload=self.offload,
         )
 
+    def revoke(self, path: Path) -> None:
+        """Stop serving ``path`` through links that were already handed out."""
+        self.denylist.revoke(path.resolve().relative_to(self.signer.media_root).as_posix())
+
 
 def _guess_mime(suffix: str) -> str:
     lowered = suffix.lower()
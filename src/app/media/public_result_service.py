@@ -3,13 +3,25 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Callable
 from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
 
 from fastapi import status
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import JSONResponse, Response
 
+from ..db.db_executor import run_db
 from ..repositories.job_history_repository import JobHistoryRepository
+from .media_http import (
+    MediaOffload,
+    cache_control,
+    cached_file_response,
+    cached_member_response,
+    file_etag,
+)
+from .result_archive import member_archive
+from .result_location_cache import ResultLocation, ResultLocationCache, ResultMiss
 
 
 def _guess_mime(suffix: str) -> str:
@@ -28,15 +40,59 @@ class PublicResultService:
     """Expose processed results for public download."""
 
     job_repo: JobHistoryRepository
+    cache: ResultLocationCache = field(default_factory=ResultLocationCache)
+    offload: MediaOffload | None = None
+    # просроченный, но ещё не очищенный результат: разбудить планировщик очистки
+    on_expired: Callable[[], None] | None = None
+    # успешная выдача (включая 304) с job_id: учёт обращений для вытеснения по LRU
+    on_served: Callable[[str], None] | None = None
     log: logging.Logger = field(default_factory=lambda: logging.getLogger(__name__))
 
-    def open_result(self, job_id: str) -> FileResponse | JSONResponse:
-        """Return the processed result file or error payload."""
+    def open_result(
+        self, job_id: str, if_none_match: str | None = None
+    ) -> Response:
+        """Return the processed result file (or 304) or an error payload.
+
+        The location comes from :class:`ResultLocationCache`; the database is
+        read only on a cache miss (one query, GET and HEAD alike), or when the
+        cached file is gone — it may have moved to the object store.
+        """
+        cached = self.cache.get(job_id)
+        if cached is not None:
+            response = self._respond(job_id, cached, if_none_match)
+            if response is not None:
+                return response
+        location = self._load_location(job_id)
+        response = self._respond(job_id, location, if_none_match)
+        if response is None:
+            # файл отсутствует (вероятно, cron уже очистил) — считаем ссылку истёкшей
+            self.log.warning("public.result.missing_file", extra={"job_id": job_id})
+            self.cache.put(job_id, ResultMiss(status.HTTP_410_GONE, "result_expired"))
+            return self._error(status.HTTP_410_GONE, "result_expired")
+        if cached is None:
+            # 404, прочитанный до коммита задачи, не затирает запись из хука
+            self.cache.add(job_id, location)
+        else:
+            self.cache.put(job_id, location)
+        return response
+
+    async def open_result_async(
+        self, job_id: str, if_none_match: str | None = None
+    ) -> Response:
+        """Async variant of :meth:`open_result`; only cache misses use the DB pool."""
+        cached = self.cache.get(job_id)
+        if cached is not None:
+            response = self._respond(job_id, cached, if_none_match)
+            if response is not None:
+                return response
+        return await run_db(self.open_result, job_id, if_none_match)
+
+    def _load_location(self, job_id: str) -> ResultLocation | ResultMiss:
         try:
-            job = self.job_repo.get_job(job_id)
+            job = self.job_repo.get_result(job_id)
         except KeyError:
             self.log.debug("public.result.not_found", extra={"job_id": job_id})
-            return self._error(status.HTTP_404_NOT_FOUND, "result_not_found")
+            return ResultMiss(status.HTTP_404_NOT_FOUND, "result_not_found")
 
         if job.status != "done" or not job.result_path:
             self.log.debug(
@@ -47,26 +103,67 @@ class PublicResultService:
                     "status": job.status,
                 },
             )
-            return self._error(status.HTTP_404_NOT_FOUND, "result_not_found")
+            return ResultMiss(status.HTTP_404_NOT_FOUND, "result_not_found")
 
         result_path = Path(job.result_path)
-        if not result_path.exists():
-            # файл отсутствует (вероятно, cron уже очистил) — считаем ссылку истёкшей
-            self.log.warning(
-                "public.result.missing_file",
-                extra={
-                    "job_id": job.job_id,
-                    "slot_id": job.slot_id,
-                    "path": job.result_path,
-                },
-            )
-            return self._error(status.HTTP_410_GONE, "result_expired")
-
-        return FileResponse(
+        archived = job.result_archive_offset is not None
+        return ResultLocation(
             path=result_path,
-            media_type=_guess_mime(result_path.suffix),
-            filename=result_path.name,
-            headers={"Content-Disposition": f'inline; filename="{result_path.name}"'},
+            mime=_guess_mime(result_path.suffix),
+            size=job.result_size if archived else None,
+            etag=f'"{job.result_sha256}"' if job.result_sha256 else None,
+            expires_at=job.result_expires_at,
+            archive=member_archive(result_path) if archived else None,
+            offset=job.result_archive_offset,
+        )
+
+    def _respond(
+        self,
+        job_id: str,
+        location: ResultLocation | ResultMiss,
+        if_none_match: str | None,
+    ) -> Response | None:
+        """Response for ``location``; ``None`` when the file is not on disk."""
+        if isinstance(location, ResultMiss):
+            return self._error(location.status_code, location.failure_reason)
+        if (
+            self.on_expired is not None
+            and location.expires_at is not None
+            and location.expires_at <= datetime.utcnow()
+        ):
+            # по контракту файл отдаётся, пока он на диске; очистка — сразу, не по cron
+            self.on_expired()
+
+        result_path = location.path
+        try:
+            stat_result = (location.archive or result_path).stat()
+        except FileNotFoundError:
+            return None
+
+        if self.on_served is not None:
+            self.on_served(job_id)
+        disposition = {"Content-Disposition": f'inline; filename="{result_path.name}"'}
+        if location.archive is not None and location.offset is not None:
+            # холодный слой: член архива читается по смещению, без распаковки
+            return cached_member_response(
+                location.archive,
+                location.offset,
+                location.size or 0,
+                media_type=location.mime,
+                etag=location.etag or file_etag(None, stat_result),
+                cache_control=cache_control(location.expires_at),
+                if_none_match=if_none_match,
+                headers=disposition,
+            )
+        return cached_file_response(
+            result_path,
+            stat_result,
+            media_type=location.mime,
+            etag=location.etag or file_etag(None, stat_result),
+            cache_control=cache_control(location.expires_at),
+            if_none_match=if_none_match,
+            headers=disposition,
+            offload=self.offload,
         )
 
     @staticmethod
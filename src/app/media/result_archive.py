@@ -0,0 +1,336 @@
+"""Cold tier: aged results packed into per-slot, per-day uncompressed zip archives."""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import struct
+import uuid
+import zipfile
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from ..config import MediaPaths
+from ..db.db_models import JobHistoryModel, MediaObjectModel, SlotModel
+from ..repositories.media_object_repository import MediaObjectRepository
+from ..repositories.storage_ledger import (
+    ARCHIVE_DIR,
+    ARCHIVE_SCOPE,
+    StorageLedger,
+    measure_path,
+)
+
+logger = logging.getLogger(__name__)
+
+# локальный заголовок zip: длины имени и extra — по смещениям 26 и 28
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+def member_archive(path: Path) -> Path | None:
+    """Archive file of a member path ``<archive>.zip/<job_id>/<file>``."""
+    for parent in path.parents:
+        if parent.suffix == ".zip":
+            return parent
+    return None
+
+
+@dataclass(slots=True)
+class ArchiveSummary:
+    archived: int = 0
+    archives: int = 0
+    missing: int = 0
+    files_removed: int = 0
+    bytes_archived: int = 0
+
+
+@dataclass(slots=True)
+class ResultArchive:
+    """Immutable archives under ``media/archive/<slot_id>/<YYYY-MM-DD>[.N].zip``.
+
+    Members are stored without compression (images are compressed already),
+    so a member is served by reading ``archive_size`` bytes at
+    ``archive_offset``; those two columns of ``media_object`` are the index
+    and the zip central directory stays valid for standard tools. An archive
+    is never appended to — a later run for the same day writes the next
+    part — and is deleted when its last member is cleaned.
+    """
+
+    root: Path
+    media_repo: MediaObjectRepository
+    ledger: StorageLedger | None = None
+    log: logging.Logger = field(default_factory=lambda: logging.getLogger(__name__))
+
+    @classmethod
+    def for_paths(
+        cls,
+        paths: MediaPaths,
+        media_repo: MediaObjectRepository,
+        ledger: StorageLedger | None = None,
+    ) -> ResultArchive:
+        return cls(root=paths.root / ARCHIVE_DIR, media_repo=media_repo, ledger=ledger)
+
+    def contains(self, path: Path) -> bool:
+        archive = member_archive(path)
+        return archive is not None and Path(os.path.abspath(archive)).is_relative_to(
+            os.path.abspath(self.root)
+        )
+
+    def pack(
+        self, slot_id: str, day: date, members: list[tuple[str, Path]]
+    ) -> tuple[Path, dict[str, tuple[int, int]]]:
+        """Write ``(arcname, source)`` members into a new archive part.
+
+        Returns the archive path and ``arcname -> (offset, size)`` of each
+        member's bytes.
+        """
+        directory = self.root / slot_id
+        directory.mkdir(parents=True, exist_ok=True)
+        staging = directory / f".{day.isoformat()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with zipfile.ZipFile(staging, "w", compression=zipfile.ZIP_STORED) as bundle:
+                for arcname, source in members:
+                    bundle.write(source, arcname)
+            with staging.open("rb") as handle:
+                spans = _member_spans(handle, bundle.infolist())
+                os.fsync(handle.fileno())
+            archive = self._publish(staging, directory, day)
+        finally:
+            staging.unlink(missing_ok=True)
+        self._account(slot_id, archive.stat().st_size, 1)
+        return archive, spans
+
+    def release_many(self, paths: Iterable[Path]) -> int:
+        """Delete archives of these member paths once no member is live."""
+        archives = {
+            archive
+            for path in paths
+            if self.contains(path) and (archive := member_archive(path)) is not None
+        }
+        if not archives:
+            return 0
+        live = self.media_repo.live_archives(sorted(str(archive) for archive in archives))
+        released = 0
+        for archive in archives:
+            if str(archive) not in live and self.remove(archive):
+                released += 1
+        return released
+
+    def remove(self, archive: Path) -> bool:
+        try:
+            size = archive.stat().st_size
+        except FileNotFoundError:
+            return False
+        archive.unlink(missing_ok=True)
+        self._account(archive.parent.name, -size, -1)
+        self.log.info("media.archive.released", extra={"archive": str(archive)})
+        return True
+
+    @staticmethod
+    def _publish(staging: Path, directory: Path, day: date) -> Path:
+        """Expose ``staging`` under the first free part name for ``day``."""
+        part = 0
+        while True:
+            suffix = f".{part}" if part else ""
+            target = directory / f"{day.isoformat()}{suffix}.zip"
+            try:
+                os.link(staging, target)
+            except FileExistsError:
+                part += 1
+                continue
+            return target
+
+    def _account(self, slot_id: str, bytes_delta: int, files_delta: int) -> None:
+        if self.ledger is not None:
+            self.ledger.record(ARCHIVE_SCOPE, slot_id, bytes_delta, files_delta)
+
+
+def _member_spans(handle, infos: list[zipfile.ZipInfo]) -> dict[str, tuple[int, int]]:
+    spans: dict[str, tuple[int, int]] = {}
+    for info in infos:
+        handle.seek(info.header_offset)
+        signature, name_length, extra_length = _LOCAL_HEADER.unpack(
+            handle.read(_LOCAL_HEADER.size)
+        )
+        if signature != _LOCAL_HEADER_SIGNATURE:
+            raise ValueError(f"Corrupt local header for '{info.filename}'")
+        offset = info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+        spans[info.filename] = (offset, info.file_size)
+    return spans
+
+
+def archive_aged_results(
+    session_factory: Callable[[], Session],
+    archive: ResultArchive,
+    results_root: Path,
+    *,
+    older_than: timedelta,
+    ledger: StorageLedger | None = None,
+    batch_size: int = 1000,
+    limit: int | None = None,
+    expiry_margin: timedelta = timedelta(hours=1),
+    reference_time: datetime | None = None,
+) -> ArchiveSummary:
+    """Pack live results completed before ``now - older_than`` into archives.
+
+    Rows are walked per slot in ``(completed_at, id)`` order and grouped by
+    completion day; each group of up to ``batch_size`` files becomes one
+    archive part. The archive is published first, then ``media_object.path``
+    and ``job_history.result_path`` are switched to the member path in one
+    transaction, and only then are the per-job directories removed — a
+    reader holding the old path re-reads it from the database. Results in
+    the object store, already archived or about to expire are skipped.
+    """
+    summary = ArchiveSummary()
+    now = reference_time or datetime.utcnow()
+    cutoff = now - older_than
+    results_root = Path(os.path.abspath(results_root))
+    with session_factory() as session:
+        slot_ids = list(session.execute(select(SlotModel.id).order_by(SlotModel.id)).scalars())
+    for slot_id in slot_ids:
+        cursor: tuple[datetime, str] | None = None
+        group: list = []
+        while not _reached(limit, summary, group):
+            rows = _candidates(
+                session_factory, slot_id, cutoff, now + expiry_margin, cursor, batch_size
+            )
+            if not rows:
+                break
+            cursor = (rows[-1].completed_at, rows[-1].id)
+            for row in rows:
+                if _reached(limit, summary, group):
+                    break
+                source = Path(row.path)
+                if not Path(os.path.abspath(source)).is_relative_to(results_root):
+                    continue
+                if not source.is_file():
+                    summary.missing += 1
+                    continue
+                if group and (
+                    group[0].completed_at.date() != row.completed_at.date()
+                    or len(group) >= batch_size
+                ):
+                    _archive_group(session_factory, archive, ledger, slot_id, group, summary)
+                    group = []
+                group.append(row)
+        if group:
+            _archive_group(session_factory, archive, ledger, slot_id, group, summary)
+    logger.info(
+        "media.archive.packed",
+        extra={
+            "archived": summary.archived,
+            "archives": summary.archives,
+            "missing": summary.missing,
+            "files_removed": summary.files_removed,
+        },
+    )
+    return summary
+
+
+def _reached(limit: int | None, summary: ArchiveSummary, group: list) -> bool:
+    return limit is not None and summary.archived + len(group) >= limit
+
+
+def _candidates(
+    session_factory: Callable[[], Session],
+    slot_id: str,
+    completed_before: datetime,
+    expires_after: datetime,
+    cursor: tuple[datetime, str] | None,
+    batch_size: int,
+):
+    # обход идёт по ix_job_history_slot_status_completed в порядке завершения
+    filters = [
+        JobHistoryModel.slot_id == slot_id,
+        JobHistoryModel.status == "done",
+        MediaObjectModel.slot_id == slot_id,
+        MediaObjectModel.scope == "result",
+        MediaObjectModel.cleaned_at.is_(None),
+        MediaObjectModel.archive_offset.is_(None),
+        MediaObjectModel.expires_at > expires_after,
+        JobHistoryModel.completed_at <= completed_before,
+    ]
+    if cursor is not None:
+        completed_at, media_id = cursor
+        filters.append(
+            or_(
+                JobHistoryModel.completed_at > completed_at,
+                (JobHistoryModel.completed_at == completed_at)
+                & (MediaObjectModel.id > media_id),
+            )
+        )
+    with session_factory() as session:
+        return session.execute(
+            select(
+                MediaObjectModel.id,
+                MediaObjectModel.job_id,
+                MediaObjectModel.path,
+                JobHistoryModel.completed_at,
+            )
+            .join(JobHistoryModel, JobHistoryModel.job_id == MediaObjectModel.job_id)
+            .where(*filters)
+            .order_by(JobHistoryModel.completed_at, MediaObjectModel.id)
+            .limit(batch_size)
+        ).all()
+
+
+def _archive_group(
+    session_factory: Callable[[], Session],
+    archive: ResultArchive,
+    ledger: StorageLedger | None,
+    slot_id: str,
+    group: list,
+    summary: ArchiveSummary,
+) -> None:
+    members = [(f"{row.job_id}/{Path(row.path).name}", Path(row.path)) for row in group]
+    archive_path, spans = archive.pack(slot_id, group[0].completed_at.date(), members)
+    switched = []
+    with session_factory() as session:
+        for row, (arcname, _) in zip(group, members):
+            offset, size = spans[arcname]
+            member_path = str(archive_path / arcname)
+            result = session.execute(
+                update(MediaObjectModel)
+                .where(
+                    MediaObjectModel.id == row.id,
+                    MediaObjectModel.path == row.path,
+                    MediaObjectModel.cleaned_at.is_(None),
+                )
+                .values(path=member_path, archive_offset=offset, archive_size=size)
+            )
+            if not result.rowcount:
+                # строку успели очистить — её байты в архиве останутся мёртвым грузом
+                continue
+            session.execute(
+                update(JobHistoryModel)
+                .where(
+                    JobHistoryModel.job_id == row.job_id,
+                    JobHistoryModel.result_path == row.path,
+                )
+                .values(result_path=member_path)
+            )
+            switched.append(row)
+        session.commit()
+    if not switched:
+        archive.remove(archive_path)
+        return
+
+    removed_bytes = removed_files = 0
+    for row in switched:
+        directory = Path(row.path).parent
+        dir_bytes, dir_files = measure_path(directory)
+        shutil.rmtree(directory, ignore_errors=True)
+        removed_bytes += dir_bytes
+        removed_files += dir_files
+    if ledger is not None:
+        ledger.record("result", slot_id, -removed_bytes, -removed_files)
+    summary.archived += len(switched)
+    summary.archives += 1
+    summary.files_removed += removed_files
+    summary.bytes_archived += sum(spans[arcname][1] for arcname, _ in members)
@@ -0,0 +1,109 @@
+"""In-process cache of where public results live on disk."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+
+from ..ingest.ingest_models import JobOutcome, JobStatus
+
+
+@dataclass(frozen=True, slots=True)
+class ResultLocation:
+    """Everything ``/public/results/{job_id}`` needs besides the file itself."""
+
+    path: Path
+    mime: str
+    size: int | None
+    # None — хэша нет (результат записан до sha256), ETag строится из stat
+    etag: str | None
+    expires_at: datetime | None
+    # результат в архиве холодного слоя: файл архива и смещение члена (size — длина)
+    archive: Path | None = None
+    offset: int | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class ResultMiss:
+    """Cached 404/410 answer; kept only for ``negative_ttl_seconds``."""
+
+    status_code: int
+    failure_reason: str
+
+
+@dataclass
+class ResultLocationCache:
+    """Bounded LRU of job_id → :class:`ResultLocation` (or a recent miss).
+
+    Filled by the ingest completion hook when a result is written, and on a
+    database miss; cleanup and failed jobs evict entries. A gallery page
+    fetching dozens of results then costs no database session per image. The
+    file is still ``stat``-ed on every request, so files removed by the cron
+    cleanup (another process) are noticed without invalidation. Negative
+    answers expire quickly: a job may complete right after a 404.
+    """
+
+    max_entries: int = 4096
+    negative_ttl_seconds: float = 5.0
+    _entries: OrderedDict[str, tuple[ResultLocation | ResultMiss, float]] = field(
+        default_factory=OrderedDict
+    )
+    _lock: Lock = field(default_factory=Lock)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, job_id: str) -> ResultLocation | ResultMiss | None:
+        with self._lock:
+            item = self._entries.get(job_id)
+            if item is None:
+                return None
+            value, stored_at = item
+            if (
+                isinstance(value, ResultMiss)
+                and time.monotonic() - stored_at > self.negative_ttl_seconds
+            ):
+                del self._entries[job_id]
+                return None
+            self._entries.move_to_end(job_id)
+            return value
+
+    def put(self, job_id: str, value: ResultLocation | ResultMiss) -> None:
+        with self._lock:
+            self._store(job_id, value)
+
+    def add(self, job_id: str, value: ResultLocation | ResultMiss) -> None:
+        """Store a database lookup unless the completion hook got there first."""
+        with self._lock:
+            if job_id not in self._entries:
+                self._store(job_id, value)
+
+    def evict(self, job_id: str) -> None:
+        with self._lock:
+            self._entries.pop(job_id, None)
+
+    def record_outcome(self, outcome: JobOutcome) -> None:
+        """Ingest completion hook: remember a new result, forget a failed job."""
+        if outcome.status != JobStatus.DONE.value or outcome.result_path is None:
+            self.evict(outcome.job_id)
+            return
+        self.put(
+            outcome.job_id,
+            ResultLocation(
+                path=Path(outcome.result_path),
+                mime=outcome.content_type or "application/octet-stream",
+                size=outcome.size_bytes,
+                etag=f'"{outcome.sha256}"' if outcome.sha256 else None,
+                expires_at=outcome.result_expires_at,
+            ),
+        )
+
+    def _store(self, job_id: str, value: ResultLocation | ResultMiss) -> None:
+        self._entries[job_id] = (value, time.monotonic())
+        self._entries.move_to_end(job_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -6,12 +6,18 @@ import logging
 import shutil
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from hashlib import sha256
 from pathlib import Path
 
 from fastapi import UploadFile
 
 from ..config import MediaPaths
+from ..db.db_executor import run_db_write
+from ..repositories.job_unit_of_work import JobUnitOfWork
 from ..repositories.media_object_repository import MediaObjectRepository
+from ..repositories.storage_ledger import StorageLedger, measure_path
+from .media_cleanup import CleanupLimits, cleanup_expired_batches, record_removals
+from .media_models import MediaObject
 
 CHUNK_SIZE = 1 * 1024 * 1024  # 1 MiB
 
@@ -31,6 +37,7 @@ class TempMediaStore:
     paths: MediaPaths
     media_repo: MediaObjectRepository
     temp_ttl_seconds: int
+    ledger: StorageLedger | None = None
     log: logging.Logger = field(default_factory=lambda: logging.getLogger(__name__))
 
     def temp_dir(self, slot_id: str, job_id: str) -> Path:
@@ -48,27 +55,53 @@ class TempMediaStore:
         upload: UploadFile,
         *,
         expires_at: datetime,
+        unit_of_work: JobUnitOfWork | None = None,
     ) -> TempMediaHandle:
-        """Copy upload contents to temp storage and register metadata."""
+        """Copy upload contents to temp storage and register metadata.
+
+        With ``unit_of_work`` the media_object insert is only staged; the caller
+        flushes it together with the rest of the job start.
+        """
         directory = self.ensure_structure(slot_id, job_id)
         target = directory / self._derive_filename(upload.filename)
 
+        written = 0
+        digest = sha256()
         with target.open("wb") as sink:
             while True:
                 chunk = await upload.read(CHUNK_SIZE)
                 if not chunk:
                     break
                 sink.write(chunk)
+                digest.update(chunk)
+                written += len(chunk)
         await upload.seek(0)
 
         max_expires = datetime.utcnow() + timedelta(seconds=self.temp_ttl_seconds)
         lease_until = min(expires_at, max_expires)
-        media_id = self.media_repo.register_temp(
-            job_id=job_id,
-            slot_id=slot_id,
-            path=target,
-            expires_at=lease_until,
-        )
+        if unit_of_work is not None:
+            media_id = unit_of_work.add_media(
+                scope="provider",
+                job_id=job_id,
+                slot_id=slot_id,
+                path=target,
+                expires_at=lease_until,
+                sha256=digest.hexdigest(),
+            )
+            if self.ledger is not None:
+                self.ledger.record(
+                    "provider", slot_id, written, 1, unit_of_work=unit_of_work
+                )
+        else:
+            media_id = await self.media_repo.register_temp_async(
+                job_id=job_id,
+                slot_id=slot_id,
+                path=target,
+                expires_at=lease_until,
+                sha256=digest.hexdigest(),
+            )
+            if self.ledger is not None:
+                await run_db_write(self.ledger.record, "provider", slot_id, written, 1)
         self.log.info(
             "media.temp.persisted",
             extra={
@@ -82,14 +115,25 @@ class TempMediaStore:
         return TempMediaHandle(media_id=media_id, path=target)
 
     def cleanup(
-        self, slot_id: str, job_id: str, handles: list[TempMediaHandle]
+        self,
+        slot_id: str,
+        job_id: str,
+        handles: list[TempMediaHandle],
+        *,
+        unit_of_work: JobUnitOfWork | None = None,
     ) -> None:
         """Remove temp directory and mark records cleaned."""
         if not handles:
-            self._remove_directory(slot_id, job_id)
+            self._remove_directory(slot_id, job_id, unit_of_work)
             return
 
         cleaned_at = datetime.utcnow()
+        if unit_of_work is not None:
+            unit_of_work.mark_cleaned(
+                [handle.media_id for handle in handles], cleaned_at
+            )
+            self._remove_directory(slot_id, job_id, unit_of_work)
+            return
         for handle in handles:
             try:
                 self.media_repo.mark_cleaned(handle.media_id, cleaned_at)
@@ -104,29 +148,64 @@ class TempMediaStore:
                 )
         self._remove_directory(slot_id, job_id)
 
-    def cleanup_expired(self, reference_time: datetime | None = None) -> int:
+    def cleanup_expired(
+        self,
+        reference_time: datetime | None = None,
+        *,
+        limits: CleanupLimits | None = None,
+    ) -> int:
         """Purge temp media that exceeded TTL (fallback for cron)."""
         now = reference_time or datetime.utcnow()
-        expired = self.media_repo.list_expired_by_scope("provider", now)
-        removed = 0
-        for media in expired:
+
+        def _delete(media: MediaObject) -> tuple[int, int]:
+            removed = measure_path(media.path)
             self._remove_single_path(media.path)
-            self.media_repo.mark_cleaned(media.id, now)
-            removed += 1
-            self.log.info(
-                "media.temp.cleanup.removed",
-                extra={
-                    "media_id": media.id,
-                    "slot_id": media.slot_id,
-                    "job_id": media.job_id,
-                },
-            )
-        return removed
+            return removed
 
-    def _remove_directory(self, slot_id: str, job_id: str) -> None:
+        def _after_batch(done: list[tuple[MediaObject, tuple[int, int]]]) -> None:
+            record_removals(self.ledger, "provider", done)
+            for media, _ in done:
+                self.log.info(
+                    "media.temp.cleanup.removed",
+                    extra={
+                        "media_id": media.id,
+                        "slot_id": media.slot_id,
+                        "job_id": media.job_id,
+                    },
+                )
+
+        return cleanup_expired_batches(
+            self.media_repo,
+            "provider",
+            now,
+            delete=_delete,
+            after_batch=_after_batch,
+            limits=limits,
+        )
+
+    def _remove_directory(
+        self,
+        slot_id: str,
+        job_id: str,
+        unit_of_work: JobUnitOfWork | None = None,
+    ) -> None:
         directory = self.temp_dir(slot_id, job_id)
         if directory.exists():
+            removed_bytes, removed_files = measure_path(directory)
             shutil.rmtree(directory, ignore_errors=True)
+            self._account(slot_id, -removed_bytes, -removed_files, unit_of_work)
+
+    def _account(
+        self,
+        slot_id: str,
+        bytes_delta: int,
+        files_delta: int,
+        unit_of_work: JobUnitOfWork | None = None,
+    ) -> None:
+        if self.ledger is not None:
+            self.ledger.record(
+                "provider", slot_id, bytes_delta, files_delta, unit_of_work=unit_of_work
+            )
 
     @staticmethod
     def _remove_single_path(path: Path) -> None:
@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
+import logging
 import uuid
 from datetime import datetime, timedelta
+from hashlib import sha256
 from pathlib import Path
 
 from fastapi import (
@@ -21,7 +23,10 @@ from ..auth.auth_dependencies import require_admin_user
 from ..config import AppConfig
 from ..repositories.job_history_repository import JobHistoryRepository
 from ..repositories.media_object_repository import MediaObjectRepository
+from ..repositories.storage_ledger import StorageLedger, measure_path
 from ..slots.slots_repository import SlotRepository
+from .object_store import ObjectStore
+from .public_media_service import PublicMediaService
 
 router = APIRouter(
     prefix="/api/template-media",
@@ -29,6 +34,8 @@ router = APIRouter(
     dependencies=[Depends(require_admin_user)],
 )
 
+log = logging.getLogger(__name__)
+
 
 def _get_slot_repo(request: Request) -> SlotRepository:
     try:
@@ -51,6 +58,27 @@ def _get_job_repo(request: Request) -> JobHistoryRepository:
         raise RuntimeError("JobHistoryRepository is not configured") from exc
 
 
+def _get_storage_ledger(request: Request) -> StorageLedger | None:
+    return getattr(request.app.state, "storage_ledger", None)
+
+
+def _get_app_object_store(request: Request) -> ObjectStore | None:
+    """``app.state.object_store`` regardless of ``MEDIA_LAYOUT`` (releasing files)."""
+    return getattr(request.app.state, "object_store", None)
+
+
+def _get_object_store(request: Request) -> ObjectStore | None:
+    """Object store for new uploads, only with ``MEDIA_LAYOUT=content``."""
+    config = getattr(request.app.state, "config", None)
+    if config is None or config.media_layout != "content":
+        return None
+    return _get_app_object_store(request)
+
+
+def _get_public_media_service(request: Request) -> PublicMediaService | None:
+    return getattr(request.app.state, "public_media_service", None)
+
+
 def _get_config(request: Request) -> AppConfig:
     try:
         return request.app.state.config  # type: ignore[attr-defined]
@@ -66,6 +94,8 @@ async def register_template_media(
     slot_repo: SlotRepository = Depends(_get_slot_repo),
     media_repo: MediaObjectRepository = Depends(_get_media_repo),
     job_repo: JobHistoryRepository = Depends(_get_job_repo),
+    ledger: StorageLedger | None = Depends(_get_storage_ledger),
+    object_store: ObjectStore | None = Depends(_get_object_store),
     config: AppConfig = Depends(_get_config),
 ) -> dict[str, str]:
     """Upload a template media file and return its media_object_id."""
@@ -85,14 +115,22 @@ async def register_template_media(
             detail={"status": "error", "failure_reason": "unsupported_media_type"},
         )
 
-    # persist file to templates folder
-    slot_dir = config.media_paths.templates / slot_id
-    slot_dir.mkdir(parents=True, exist_ok=True)
     suffix = Path(file.filename or "template").suffix or ".bin"
-    media_filename = f"{uuid.uuid4().hex}{suffix}"
-    media_path = slot_dir / media_filename
-    with media_path.open("wb") as output:
-        output.write(await file.read())
+    content = await file.read()
+    if object_store is not None:
+        # один файл на содержимое: шаблон, загруженный в несколько слотов, не копируется
+        stored = object_store.put_bytes(content, suffix)
+        media_path, digest = stored.path, stored.sha256
+    else:
+        # persist file to templates folder
+        slot_dir = config.media_paths.templates / slot_id
+        slot_dir.mkdir(parents=True, exist_ok=True)
+        media_path = slot_dir / f"{uuid.uuid4().hex}{suffix}"
+        with media_path.open("wb") as output:
+            output.write(content)
+        digest = sha256(content).hexdigest()
+        if ledger is not None:
+            ledger.record("template", slot_id, len(content), 1)
 
     now = datetime.utcnow()
     # record a pseudo job to satisfy media_object FK
@@ -109,6 +147,59 @@ async def register_template_media(
         slot_id=slot_id,
         path=media_path,
         expires_at=expires_at,
+        sha256=digest,
     )
 
     return {"media_object_id": media_object_id, "media_kind": media_kind}
+
+
+@router.delete("/{media_object_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_template_media(
+    media_object_id: str,
+    media_repo: MediaObjectRepository = Depends(_get_media_repo),
+    ledger: StorageLedger | None = Depends(_get_storage_ledger),
+    object_store: ObjectStore | None = Depends(_get_app_object_store),
+    public_media: PublicMediaService | None = Depends(_get_public_media_service),
+) -> None:
+    """Delete an unbound template file and revoke provider links handed out for it."""
+    try:
+        media = media_repo.get_media(media_object_id)
+    except KeyError:
+        media = None
+    if media is None or media.scope != "template":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"status": "error", "failure_reason": "media_not_found"},
+        )
+
+    # проверка привязки и очистка — один UPDATE: слот, сохранённый между ними,
+    # не останется со стёртым шаблоном
+    if not media_repo.clean_unbound_template(media.id, datetime.utcnow()):
+        if media_repo.template_bound(media.id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"status": "error", "failure_reason": "template_in_use"},
+            )
+        # строку успел очистить параллельный запрос
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"status": "error", "failure_reason": "media_not_found"},
+        )
+    if object_store is not None and object_store.contains(media.path):
+        # общий объект удаляется с последней ссылкой и не раньше grace-периода;
+        # отложенный объект без строк подберёт сверка сирот (scripts/reconcile_media.py --fix)
+        report = object_store.release_many([(media.path, media.sha256)])
+        if report.deferred:
+            log.info(
+                "media.template.release_deferred",
+                extra={"media_id": media.id, "path": str(media.path)},
+            )
+    else:
+        removed_bytes, removed_files = measure_path(media.path)
+        media.path.unlink(missing_ok=True)
+        if ledger is not None:
+            ledger.record("template", media.slot_id, -removed_bytes, -removed_files)
+    # подписанные ссылки у провайдеров живут до своего срока и не читают БД;
+    # путь, на который ещё ссылается другой шаблон, не отзываем
+    if public_media is not None and not media_repo.referenced_paths([str(media.path)]):
+        public_media.revoke(media.path)
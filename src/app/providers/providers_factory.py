@@ -1,5 +1,6 @@
 ﻿"""Factory for provider drivers."""
 
+from ..media.public_media_links import MediaUrlSigner
 from ..repositories.media_object_repository import MediaObjectRepository
 from .providers_base import ProviderDriver
 from .providers_gemini import GeminiDriver
@@ -9,7 +10,10 @@ from .providers_turbotext import TurbotextDriver
 
 
 def create_driver(
-    name: str, *, media_repo: MediaObjectRepository | None = None
+    name: str,
+    *,
+    media_repo: MediaObjectRepository | None = None,
+    url_signer: MediaUrlSigner | None = None,
 ) -> ProviderDriver:
     """Instantiate provider driver by name."""
     lower = name.lower()
@@ -28,5 +32,5 @@ def create_driver(
     if lower == "turbotext":
         if media_repo is None:
             raise ValueError("media_repo is required to instantiate TurbotextDriver")
-        return TurbotextDriver(media_repo=media_repo)
+        return TurbotextDriver(media_repo=media_repo, url_signer=url_signer)
     raise ValueError(f"Unsupported provider '{name}'")
@@ -13,7 +13,7 @@ import httpx
 
 from ..ingest.ingest_errors import ProviderExecutionError
 from ..ingest.ingest_models import JobContext
-from ..media.public_media_links import build_public_media_url
+from ..media.public_media_links import MediaUrlSigner, build_public_media_url
 from ..media.temp_media_store import TempMediaHandle
 from ..repositories.media_object_repository import MediaObjectRepository
 from .providers_base import ProviderDriver, ProviderResult
@@ -26,6 +26,7 @@ class TurbotextDriver(ProviderDriver):
     """Call Turbotext API using polling."""
 
     media_repo: MediaObjectRepository
+    url_signer: MediaUrlSigner | None = None
     api_endpoint: str = "https://www.turbotext.ru/api_ai/generate_image2image"
     timeout_seconds: float = 15.0
     poll_interval_seconds: float = 2.0
@@ -49,18 +50,22 @@ class TurbotextDriver(ProviderDriver):
         api_key = os.getenv("TURBOTEXT_API_KEY")
         if not api_key:
             raise ProviderExecutionError("TURBOTEXT_API_KEY is not set")
+        signer = self.url_signer
+        if signer is None:
+            raise ProviderExecutionError("Public media URL signer is not configured")
 
         ingest_handle = _select_ingest_handle(job.temp_media)
         if ingest_handle is None:
             raise ProviderExecutionError("Ingest media handle missing for Turbotext")
 
-        ingest_url = build_public_media_url(base_url, ingest_handle.media_id)
+        ingest_url = build_public_media_url(base_url, signer, ingest_handle.path)
         create_payload = self._build_create_payload(
             settings=settings,
             ingest_url=ingest_url,
             prompt=prompt,
             job=job,
             base_url=base_url,
+            signer=signer,
         )
 
         headers = {
@@ -154,6 +159,7 @@ class TurbotextDriver(ProviderDriver):
         prompt: str,
         job: JobContext,
         base_url: str,
+        signer: MediaUrlSigner,
     ) -> dict[str, Any]:
         payload: dict[str, Any] = {
             "do": "create_queue",
@@ -177,12 +183,14 @@ class TurbotextDriver(ProviderDriver):
                 continue
 
             media_id = entry.get("media_object_id")
+            media_path = None
             if not media_id and entry.get("media_kind"):
                 try:
                     media = self.media_repo.get_media_by_kind(
                         job.slot_id, entry["media_kind"]
                     )
                     media_id = media.id
+                    media_path = media.path
                 except (KeyError, ValueError):
                     if entry.get("optional"):
                         continue
@@ -197,7 +205,15 @@ class TurbotextDriver(ProviderDriver):
                     f"Turbotext template media requires media_object_id or media_kind (role={entry.get('role')})"
                 )
 
-            payload[form_field] = build_public_media_url(base_url, media_id)
+            if media_path is None:
+                try:
+                    media_path = self.media_repo.get_media(media_id).path
+                except KeyError:
+                    raise ProviderExecutionError(
+                        f"Turbotext template media '{media_id}' not found (role={entry.get('role')})"
+                    ) from None
+
+            payload[form_field] = build_public_media_url(base_url, signer, media_path)
 
         return payload
 
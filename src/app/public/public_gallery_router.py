@@ -2,17 +2,29 @@
 
 from __future__ import annotations
 
+import json
 from datetime import datetime
-from pathlib import Path
+from hashlib import sha256
 from typing import Any
 
 from fastapi import APIRouter, HTTPException, Request, status
-from fastapi.responses import FileResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 
+from ..db.db_executor import run_db
+from ..media.media_http import etag_matches
 from ..slots.slots_repository import SlotRepository
 from ..repositories.job_history_repository import JobHistoryRepository, JobHistoryRecord
 from ..settings.settings_service import SettingsService
-from .public_gallery_service import GalleryCache, GalleryRateLimiter, GalleryShareState, utcnow
+from .public_gallery_service import (
+    GalleryCache,
+    GalleryEntry,
+    GalleryRateLimiter,
+    GalleryShareState,
+    result_card,
+    utcnow,
+)
+from .public_gallery_stream import GalleryStream
 
 
 def build_public_gallery_router(
@@ -20,6 +32,7 @@ def build_public_gallery_router(
     share_state: GalleryShareState,
     rate_limiter: GalleryRateLimiter,
     cache: GalleryCache,
+    stream: GalleryStream,
     slot_repo: SlotRepository,
     job_repo: JobHistoryRepository,
     settings_service: SettingsService,
@@ -32,33 +45,82 @@ def build_public_gallery_router(
         return FileResponse(gallery_page_path)
 
     @router.get("/pub/gallery")
-    def fetch_public_gallery(request: Request) -> dict[str, Any]:
-        if not share_state.is_enabled():
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail={"status": "forbidden", "reason": "gallery_not_shared"},
-            )
+    async def fetch_public_gallery(request: Request) -> Response:
+        _ensure_shared(share_state)
         client_ip = (request.client.host if request.client else "unknown") or "unknown"
         rate_limiter.check(client_ip)
-        cached = cache.get()
-        if cached is not None:
-            return cached
-        payload = _build_gallery_payload(slot_repo, job_repo, settings_service)
-        cache.set(payload)
-        return payload
+        entry = cache.get()
+        if entry is None:
+            generation = cache.generation
+            entry = await run_db(
+                _render_gallery_payload, slot_repo, job_repo, settings_service
+            )
+            cache.set(entry, generation)
+        # no-cache: браузер хранит ответ, но каждый раз сверяет ETag
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    @router.get("/pub/gallery/stream")
+    async def stream_public_gallery(request: Request) -> StreamingResponse:
+        # без rate limit: после рестарта сотня телефонов за одним NAT
+        # переподключается разом; число потоков — всего и на адрес — ограничивает
+        # сам GalleryStream, остальные зрители опрашивают /pub/gallery
+        _ensure_shared(share_state)
+        client_ip = (request.client.host if request.client else "unknown") or "unknown"
+        queue = stream.subscribe(client_ip)
+        return StreamingResponse(
+            stream.stream(queue),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     return router
 
 
+def _ensure_shared(share_state: GalleryShareState) -> None:
+    if not share_state.is_enabled():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={"status": "forbidden", "reason": "gallery_not_shared"},
+        )
+
+
+def _render_gallery_payload(
+    slot_repo: SlotRepository,
+    job_repo: JobHistoryRepository,
+    settings_service: SettingsService,
+) -> GalleryEntry:
+    """Gallery JSON serialised once; cache hits return these bytes as is."""
+    content = jsonable_encoder(
+        _build_gallery_payload(slot_repo, job_repo, settings_service)
+    )
+    # generated_at меняется при каждой пересборке и в ETag не входит
+    fingerprint = json.dumps(
+        {key: value for key, value in content.items() if key != "generated_at"},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return GalleryEntry(
+        body=JSONResponse(content=content).body,
+        etag=f'"{sha256(fingerprint.encode()).hexdigest()[:32]}"',
+    )
+
+
 def _build_gallery_payload(
     slot_repo: SlotRepository,
     job_repo: JobHistoryRepository,
     settings_service: SettingsService,
+    limit: int = 10,
 ) -> dict[str, Any]:
     slots = slot_repo.list_slots()
     runtime = settings_service.snapshot()
+    # одна выборка на все слоты; наличие файла берётся из media_object.cleaned_at
+    records_by_slot = job_repo.list_recent_results(limit=limit)
     items: list[dict[str, Any]] = []
     for slot in slots:
+        recent = [_record_to_result(rec) for rec in records_by_slot.get(slot.id, [])]
         items.append(
             {
                 "slot_id": slot.id,
@@ -66,8 +128,8 @@ def _build_gallery_payload(
                 "provider": slot.provider,
                 "operation": slot.operation,
                 "is_active": slot.is_active,
-                "latest_result": _build_latest(job_repo, slot.id),
-                "recent_results": _build_recent(job_repo, slot.id),
+                "latest_result": recent[0] if recent else None,
+                "recent_results": recent,
             }
         )
     return {
@@ -79,36 +141,8 @@ def _build_gallery_payload(
     }
 
 
-def _build_recent(job_repo: JobHistoryRepository, slot_id: str, limit: int = 10) -> list[dict[str, Any]]:
-    records = job_repo.list_recent_by_slot(slot_id, limit=limit)
-    results: list[dict[str, Any]] = []
-    for rec in records:
-        if not _is_result_available(rec):
-            continue
-        result = _record_to_result(rec)
-        results.append(result)
-    return results
-
-
-def _build_latest(job_repo: JobHistoryRepository, slot_id: str) -> dict[str, Any] | None:
-    records = job_repo.list_recent_by_slot(slot_id, limit=1)
-    if not records:
-        return None
-    rec = records[0]
-    if not _is_result_available(rec):
-        return None
-    return _record_to_result(rec)
-
-
-def _is_result_available(record: JobHistoryRecord) -> bool:
-    if record.status != "done" or not record.result_path:
-        return False
-    return Path(record.result_path).exists()
-
-
 def _record_to_result(record: JobHistoryRecord) -> dict[str, Any]:
     finished_at: datetime | None = record.completed_at or record.started_at
-    public_url = f"/public/results/{record.job_id}"
     mime = None
     if record.result_path:
         path = record.result_path.lower()
@@ -118,14 +152,10 @@ def _record_to_result(record: JobHistoryRecord) -> dict[str, Any]:
             mime = "image/jpeg"
         elif path.endswith(".webp"):
             mime = "image/webp"
-    return {
-        "job_id": record.job_id,
-        "status": record.status,
-        "finished_at": finished_at,
-        "public_url": public_url,
-        "download_url": public_url,
-        "thumbnail_url": public_url,
-        "result_expires_at": record.result_expires_at,
-        "expires_at": record.result_expires_at,
-        "mime": mime,
-    }
+    return result_card(
+        job_id=record.job_id,
+        status=record.status,
+        finished_at=finished_at,
+        expires_at=record.result_expires_at,
+        mime=mime,
+    )
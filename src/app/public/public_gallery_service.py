@@ -4,15 +4,41 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
+from threading import Lock
 from typing import Any
 
 from fastapi import HTTPException, status
 
+from ..ingest.ingest_models import JobOutcome, JobStatus
+
 
 def utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def result_card(
+    *,
+    job_id: str,
+    status: str,
+    finished_at: datetime | None,
+    expires_at: datetime | None,
+    mime: str | None,
+) -> dict[str, Any]:
+    """Gallery card for one result (shared by the snapshot and the live stream)."""
+    public_url = f"/public/results/{job_id}"
+    return {
+        "job_id": job_id,
+        "status": status,
+        "finished_at": finished_at,
+        "public_url": public_url,
+        "download_url": public_url,
+        "thumbnail_url": public_url,
+        "result_expires_at": expires_at,
+        "expires_at": expires_at,
+        "mime": mime,
+    }
+
+
 @dataclass
 class GalleryShareState:
     """Stores share-until timestamp for public gallery access."""
@@ -59,21 +85,58 @@ class GalleryRateLimiter:
         self.buckets[key] = (count + 1, window_start)
 
 
+@dataclass(slots=True)
+class GalleryEntry:
+    """Serialised gallery payload and its strong ETag."""
+
+    body: bytes
+    etag: str
+
+
 @dataclass
 class GalleryCache:
-    """In-memory cache for aggregated gallery payload."""
-
-    ttl_seconds: int = 30
-    _data: Any | None = None
-    _stored_at: datetime | None = None
+    """Serialised gallery payload, rebuilt after job completion or cleanup.
 
-    def get(self) -> Any | None:
-        if self._data is None or self._stored_at is None:
-            return None
-        if (utcnow() - self._stored_at).total_seconds() > self.ttl_seconds:
-            return None
-        return self._data
+    ``invalidate`` is called from ingest completion hooks (worker threads) and
+    cleanup. A rebuild started before an invalidation is not stored, so new
+    results never hide behind an older body. ``ttl_seconds`` is only a
+    backstop for changes made elsewhere (cron cleanup, slot edits); the ETag
+    ignores ``generated_at``, so such a rebuild still answers 304.
+    """
 
-    def set(self, data: Any) -> None:
-        self._data = data
-        self._stored_at = utcnow()
+    ttl_seconds: int = 60
+    _entry: GalleryEntry | None = None
+    _stored_at: datetime | None = None
+    _generation: int = 0
+    _lock: Lock = field(default_factory=Lock)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self) -> GalleryEntry | None:
+        with self._lock:
+            if self._entry is None or self._stored_at is None:
+                return None
+            if (utcnow() - self._stored_at).total_seconds() > self.ttl_seconds:
+                return None
+            return self._entry
+
+    def set(self, entry: GalleryEntry, generation: int) -> None:
+        """Store ``entry`` built at ``generation`` unless invalidated meanwhile."""
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entry = entry
+            self._stored_at = utcnow()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entry = None
+            self._stored_at = None
+
+    def record_outcome(self, outcome: JobOutcome) -> None:
+        """Ingest completion hook: only a new result changes the gallery."""
+        if outcome.status == JobStatus.DONE.value:
+            self.invalidate()
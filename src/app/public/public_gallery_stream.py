@@ -0,0 +1,162 @@
+"""Live public gallery updates over Server-Sent Events."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import Counter
+from collections.abc import AsyncIterator
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+
+from ..ingest.ingest_models import JobOutcome, JobStatus
+from .public_gallery_service import GalleryShareState, result_card
+
+logger = logging.getLogger(__name__)
+
+READY_EVENT = b"retry: 15000\nevent: ready\ndata: {}\n\n"
+# очередь переполнилась: клиент перечитывает /pub/gallery (дешёвый 304 по ETag)
+RESYNC_EVENT = b"event: resync\ndata: {}\n\n"
+CLOSED_EVENT = b"event: closed\ndata: {}\n\n"
+KEEPALIVE = b": keepalive\n\n"
+
+
+class GalleryStream:
+    """Fan-out of new result cards to public gallery viewers.
+
+    A completed job is rendered into one SSE frame, and the same bytes are
+    queued for every subscriber, so a new photo costs one serialisation and no
+    database work however many phones watch. Queues are bounded: a viewer that
+    stops reading gets a single ``resync`` instead of an ever-growing backlog.
+    One client address holds at most ``max_per_client`` of the
+    ``max_subscribers`` streams, so a single host cannot take every slot;
+    viewers turned away fall back to polling ``/pub/gallery``. Streams end
+    once sharing is switched off or expires.
+    """
+
+    def __init__(
+        self,
+        share_state: GalleryShareState,
+        *,
+        max_subscribers: int = 200,
+        max_per_client: int = 50,
+        queue_size: int = 32,
+        heartbeat_seconds: float = 15.0,
+    ) -> None:
+        self._share_state = share_state
+        self._max_subscribers = max_subscribers
+        self._max_per_client = max_per_client
+        self._queue_size = queue_size
+        self._heartbeat_seconds = heartbeat_seconds
+        # очередь зрителя → адрес клиента; число потоков на адрес — отдельно
+        self._subscribers: dict[asyncio.Queue[bytes | None], str] = {}
+        self._per_client: Counter[str] = Counter()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        for queue in list(self._subscribers):
+            self._replace(queue, None)
+        self._subscribers.clear()
+        self._per_client.clear()
+
+    def record_outcome(self, outcome: JobOutcome) -> None:
+        """Ingest completion hook: push the new result card to every viewer."""
+        if outcome.status != JobStatus.DONE.value or not self._subscribers:
+            return
+        card = result_card(
+            job_id=outcome.job_id,
+            status=outcome.status,
+            finished_at=outcome.completed_at,
+            expires_at=outcome.result_expires_at,
+            mime=outcome.content_type,
+        )
+        data = json.dumps(
+            jsonable_encoder({"slot_id": outcome.slot_id, "result": card}),
+            separators=(",", ":"),
+        )
+        self._publish(f"event: result\ndata: {data}\n\n".encode())
+
+    def subscribe(self, client: str = "unknown") -> asyncio.Queue[bytes | None]:
+        """Register a viewer of ``client``; 503 once either stream limit is reached."""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        # клиент остаётся на обычной загрузке /pub/gallery
+        if len(self._subscribers) >= self._max_subscribers:
+            raise _unavailable("too_many_viewers", max_subscribers=self._max_subscribers)
+        if self._per_client[client] >= self._max_per_client:
+            logger.warning("public.gallery.stream.client_limit", extra={"client": client})
+            raise _unavailable(
+                "too_many_viewers_from_client", max_per_client=self._max_per_client
+            )
+        queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers[queue] = client
+        self._per_client[client] += 1
+        return queue
+
+    async def stream(self, queue: asyncio.Queue[bytes | None]) -> AsyncIterator[bytes]:
+        """SSE bytes for a subscribed viewer until sharing ends or the app stops."""
+        try:
+            yield READY_EVENT
+            while True:
+                try:
+                    frame = await asyncio.wait_for(
+                        queue.get(), timeout=self._heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    frame = KEEPALIVE
+                if frame is None:
+                    return
+                if not self._share_state.is_enabled():
+                    yield CLOSED_EVENT
+                    return
+                yield frame
+        finally:
+            self._unsubscribe(queue)
+
+    def _unsubscribe(self, queue: asyncio.Queue[bytes | None]) -> None:
+        client = self._subscribers.pop(queue, None)
+        if client is None:
+            return
+        self._per_client[client] -= 1
+        if self._per_client[client] <= 0:
+            del self._per_client[client]
+
+    def _publish(self, frame: bytes) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._fanout, frame)
+        except RuntimeError:  # pragma: no cover - loop closed between checks
+            return
+
+    def _fanout(self, frame: bytes) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                logger.warning("public.gallery.stream.resync")
+                self._replace(queue, RESYNC_EVENT)
+
+    @staticmethod
+    def _replace(queue: asyncio.Queue[bytes | None], item: bytes | None) -> None:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(item)
+
+
+def _unavailable(reason: str, **limits: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail={"status": "error", "reason": reason, **limits},
+        headers={"Retry-After": "30"},
+    )
@@ -1,6 +1,6 @@
 """Public media endpoints (provider access)."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
 from ..media.public_media_service import PublicMediaService
 
@@ -8,8 +8,13 @@ from ..media.public_media_service import PublicMediaService
 def build_public_media_router(service: PublicMediaService) -> APIRouter:
     router = APIRouter(prefix="/public/provider-media", tags=["public-media"])
 
-    @router.get("/{media_id}")
-    def get_media(media_id: str):
-        return service.open_media(media_id)
+    @router.api_route(
+        "/{expires}/{signature}/{relative_path:path}", methods=["GET", "HEAD"]
+    )
+    def get_media(expires: int, signature: str, relative_path: str, request: Request):
+        # подпись проверяется без БД, поэтому обработчик не уходит в пул run_db
+        return service.open_media(
+            expires, signature, relative_path, request.headers.get("if-none-match")
+        )
 
     return router
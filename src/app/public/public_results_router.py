@@ -1,6 +1,6 @@
 """Public endpoint for result downloads."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
 from ..media.public_result_service import PublicResultService
 
@@ -8,8 +8,10 @@ from ..media.public_result_service import PublicResultService
 def build_public_results_router(service: PublicResultService) -> APIRouter:
     router = APIRouter(prefix="/public/results", tags=["public-results"])
 
-    @router.get("/{job_id}")
-    def get_result(job_id: str):
-        return service.open_result(job_id)
+    @router.api_route("/{job_id}", methods=["GET", "HEAD"])
+    async def get_result(job_id: str, request: Request):
+        return await service.open_result_async(
+            job_id, request.headers.get("if-none-match")
+        )
 
     return router
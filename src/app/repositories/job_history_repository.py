@@ -2,14 +2,14 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
 from collections.abc import Callable, Sequence
+from dataclasses import dataclass
 from datetime import datetime
 
-from sqlalchemy import nullslast
-from sqlalchemy.orm import Session
+from sqlalchemy import exists, nullslast, select
+from sqlalchemy.orm import Session, aliased
 
-from ..db.db_models import JobHistoryModel
+from ..db.db_models import JobHistoryModel, MediaObjectModel, SlotModel
 
 
 @dataclass(slots=True)
@@ -25,6 +25,10 @@ class JobHistoryRecord:
     result_expires_at: datetime | None
     completed_at: datetime | None = None
     started_at: datetime | None = None
+    result_sha256: str | None = None
+    # результат в архиве холодного слоя: смещение и длина члена архива
+    result_archive_offset: int | None = None
+    result_size: int | None = None
 
 
 class JobHistoryRepository:
@@ -86,6 +90,7 @@ class JobHistoryRepository:
         status: str,
         result_path: str,
         result_expires_at: datetime,
+        completed_at: datetime | None = None,
     ) -> None:
         with self._session_factory() as session:
             model = session.get(JobHistoryModel, job_id)
@@ -94,7 +99,7 @@ class JobHistoryRepository:
             model.status = status
             model.result_path = result_path
             model.result_expires_at = result_expires_at
-            model.completed_at = datetime.utcnow()
+            model.completed_at = completed_at or datetime.utcnow()
             model.failure_reason = None
             session.commit()
 
@@ -104,6 +109,7 @@ class JobHistoryRepository:
         job_id: str,
         status: str,
         failure_reason: str,
+        completed_at: datetime | None = None,
     ) -> None:
         with self._session_factory() as session:
             model = session.get(JobHistoryModel, job_id)
@@ -111,7 +117,7 @@ class JobHistoryRepository:
                 raise KeyError(f"Job '{job_id}' not found")
             model.status = status
             model.failure_reason = failure_reason
-            model.completed_at = datetime.utcnow()
+            model.completed_at = completed_at or datetime.utcnow()
             session.commit()
 
     def get_job(self, job_id: str) -> JobHistoryRecord:
@@ -122,6 +128,33 @@ class JobHistoryRepository:
                 raise KeyError(f"Job '{job_id}' not found")
             return self._to_record(model)
 
+    def get_result(self, job_id: str) -> JobHistoryRecord:
+        """Job snapshot plus the sha256 (and archive slice) of its result, in one query."""
+        statement = (
+            select(
+                JobHistoryModel,
+                MediaObjectModel.sha256,
+                MediaObjectModel.archive_offset,
+                MediaObjectModel.archive_size,
+            )
+            .outerjoin(
+                MediaObjectModel,
+                (MediaObjectModel.job_id == JobHistoryModel.job_id)
+                & (MediaObjectModel.scope == "result"),
+            )
+            .where(JobHistoryModel.job_id == job_id)
+            .limit(1)
+        )
+        with self._session_factory() as session:
+            row = session.execute(statement).first()
+            if row is None:
+                raise KeyError(f"Job '{job_id}' not found")
+            record = self._to_record(row[0])
+            record.result_sha256 = row[1]
+            record.result_archive_offset = row[2]
+            record.result_size = row[3]
+            return record
+
     def list_recent_by_slot(
         self, slot_id: str, limit: int = 10
     ) -> Sequence[JobHistoryRecord]:
@@ -138,6 +171,49 @@ class JobHistoryRepository:
             )
             return [self._to_record(row) for row in rows]
 
+    def list_recent_results(self, limit: int = 10) -> dict[str, list[JobHistoryRecord]]:
+        """Newest ``limit`` done jobs per slot whose result is not cleaned up yet.
+
+        One query for all slots; availability is taken from
+        ``media_object.cleaned_at`` instead of checking files on disk.
+        """
+        # top-N коррелирован со слотом и идёт по ix_job_history_slot_status_completed;
+        # ROW_NUMBER() OVER (PARTITION BY slot_id) в SQLite читает все done-задачи
+        candidate = aliased(JobHistoryModel)
+        top_jobs = (
+            select(candidate.job_id)
+            .where(
+                candidate.slot_id == SlotModel.id,
+                candidate.status == "done",
+                candidate.result_path.is_not(None),
+            )
+            .order_by(candidate.completed_at.desc(), candidate.started_at.desc())
+            .limit(limit)
+            .correlate(SlotModel)
+        )
+        # очищенный результат занимает место в top-N, как и раньше при проверке
+        # файла: EXISTS считается только для N строк на слот
+        available = exists().where(
+            MediaObjectModel.job_id == JobHistoryModel.job_id,
+            MediaObjectModel.scope == "result",
+            MediaObjectModel.cleaned_at.is_(None),
+        )
+        statement = (
+            select(JobHistoryModel)
+            .join(SlotModel, JobHistoryModel.job_id.in_(top_jobs))
+            .where(available)
+            .order_by(
+                JobHistoryModel.slot_id,
+                JobHistoryModel.completed_at.desc(),
+                JobHistoryModel.started_at.desc(),
+            )
+        )
+        results: dict[str, list[JobHistoryRecord]] = {}
+        with self._session_factory() as session:
+            for model in session.scalars(statement):
+                results.setdefault(model.slot_id, []).append(self._to_record(model))
+        return results
+
     @staticmethod
     def _to_record(model: JobHistoryModel) -> JobHistoryRecord:
         return JobHistoryRecord(
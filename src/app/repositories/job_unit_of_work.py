@@ -0,0 +1,217 @@
+"""Job-scoped unit of work batching job_history/media_object writes."""
+
+from __future__ import annotations
+
+import uuid
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from ..db.db_models import JobHistoryModel, MediaObjectModel
+from .storage_ledger import UsageKey, upsert_usage
+
+
+class JobUnitOfWork:
+    """Collect per-job mutations and persist them in a single transaction.
+
+    Ingest stages the pending job and temp media at start and the result/failure
+    and temp cleanup at finish, together with storage ledger deltas; each
+    :meth:`flush` issues bulk INSERT/UPDATE statements and exactly one commit,
+    so a job costs at most two transactions.
+    Staged state survives a failed flush, letting the caller retry it; a
+    retried file write re-stages its ledger delta under the same key
+    (see :meth:`baseline`) instead of adding it a second time.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]) -> None:
+        self._session_factory = session_factory
+        self._jobs: list[dict[str, Any]] = []
+        self._media: dict[str, dict[str, Any]] = {}  # ключ — путь файла
+        self._job_updates: dict[str, dict[str, Any]] = {}
+        self._cleaned: dict[str, datetime] = {}
+        self._storage: dict[UsageKey, list[int]] = {}
+        # дельты файлов по пути: повтор записи заменяет дельту, а не прибавляет
+        self._file_storage: dict[str, tuple[UsageKey, int, int]] = {}
+        self._baselines: dict[str, tuple[int, int]] = {}
+        self.commits = 0
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(
+            self._jobs
+            or self._media
+            or self._job_updates
+            or self._cleaned
+            or self._storage
+            or self._file_storage
+        )
+
+    def create_pending(
+        self,
+        *,
+        job_id: str,
+        slot_id: str,
+        started_at: datetime,
+        sync_deadline: datetime,
+        source: str = "ingest",
+    ) -> None:
+        self._jobs.append(
+            {
+                "job_id": job_id,
+                "slot_id": slot_id,
+                "source": source,
+                "status": "pending",
+                "started_at": started_at,
+                "sync_deadline": sync_deadline,
+            }
+        )
+
+    def add_media(
+        self,
+        *,
+        scope: str,
+        job_id: str,
+        slot_id: str,
+        path: Path,
+        expires_at: datetime,
+        preview_path: Path | None = None,
+        sha256: str | None = None,
+    ) -> str:
+        """Stage a media_object insert and return its id (stable per path)."""
+        key = str(path)
+        existing = self._media.get(key)
+        media_id = existing["id"] if existing else uuid.uuid4().hex
+        self._media[key] = {
+            "id": media_id,
+            "job_id": job_id,
+            "slot_id": slot_id,
+            "scope": scope,
+            "path": key,
+            "preview_path": str(preview_path) if preview_path else None,
+            "expires_at": expires_at,
+            "sha256": sha256,
+        }
+        return media_id
+
+    def discard_media(self, scope: str) -> None:
+        """Drop staged inserts of ``scope`` (a result whose bookkeeping failed)."""
+        for key in [key for key, row in self._media.items() if row["scope"] == scope]:
+            del self._media[key]
+
+    def set_result(
+        self,
+        *,
+        job_id: str,
+        status: str,
+        result_path: str,
+        result_expires_at: datetime,
+        completed_at: datetime,
+    ) -> None:
+        self._job_updates[job_id] = {
+            "status": status,
+            "result_path": result_path,
+            "result_expires_at": result_expires_at,
+            "completed_at": completed_at,
+            "failure_reason": None,
+        }
+
+    def set_failure(
+        self,
+        *,
+        job_id: str,
+        status: str,
+        failure_reason: str,
+        completed_at: datetime,
+    ) -> None:
+        self._job_updates[job_id] = {
+            "status": status,
+            "failure_reason": failure_reason,
+            "completed_at": completed_at,
+        }
+
+    def mark_cleaned(self, media_ids: list[str], cleaned_at: datetime) -> None:
+        for media_id in media_ids:
+            self._cleaned[media_id] = cleaned_at
+
+    def baseline(self, key: str, measured: tuple[int, int]) -> tuple[int, int]:
+        """Size of ``key`` before this job first wrote it; ``measured`` is kept on first call.
+
+        A retried write measures a file the failed attempt already (partly)
+        wrote; deltas against the baseline count it exactly once.
+        """
+        return self._baselines.setdefault(key, measured)
+
+    def add_storage(
+        self,
+        scope: str,
+        slot_id: str,
+        bytes_delta: int,
+        files_delta: int,
+        *,
+        key: str | None = None,
+    ) -> None:
+        """Stage a storage ledger delta (see :class:`StorageLedger`).
+
+        With ``key`` the delta replaces the one staged earlier under that key.
+        """
+        if key is not None:
+            self._file_storage[key] = ((scope, slot_id), bytes_delta, files_delta)
+            return
+        delta = self._storage.setdefault((scope, slot_id), [0, 0])
+        delta[0] += bytes_delta
+        delta[1] += files_delta
+
+    def flush(self) -> None:
+        """Persist staged mutations in one transaction (no-op when empty)."""
+        if not self.has_pending:
+            return
+        with self._session_factory() as session:
+            # порядок важен: media_object ссылается на job_history по FK
+            if self._jobs:
+                session.execute(insert(JobHistoryModel), self._jobs)
+            if self._media:
+                session.execute(insert(MediaObjectModel), list(self._media.values()))
+            for job_id, values in self._job_updates.items():
+                result = session.execute(
+                    update(JobHistoryModel)
+                    .where(JobHistoryModel.job_id == job_id)
+                    .values(**values)
+                )
+                if result.rowcount == 0:
+                    session.rollback()
+                    raise KeyError(f"Job '{job_id}' not found")
+            for cleaned_at in set(self._cleaned.values()):
+                ids = [
+                    media_id
+                    for media_id, value in self._cleaned.items()
+                    if value == cleaned_at
+                ]
+                session.execute(
+                    update(MediaObjectModel)
+                    .where(MediaObjectModel.id.in_(ids))
+                    .values(cleaned_at=cleaned_at)
+                )
+            storage = self._storage_deltas()
+            if storage:
+                upsert_usage(session, storage)
+            session.commit()
+        self.commits += 1
+        self._jobs.clear()
+        self._media.clear()
+        self._job_updates.clear()
+        self._cleaned.clear()
+        self._storage.clear()
+        self._file_storage.clear()
+        self._baselines.clear()
+
+    def _storage_deltas(self) -> dict[UsageKey, list[int]]:
+        deltas = {usage: list(values) for usage, values in self._storage.items()}
+        for usage, bytes_delta, files_delta in self._file_storage.values():
+            delta = deltas.setdefault(usage, [0, 0])
+            delta[0] += bytes_delta
+            delta[1] += files_delta
+        return deltas
@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
+import os
 import uuid
 from collections.abc import Callable
 from datetime import datetime
 from pathlib import Path
 
+from sqlalchemy import bindparam, func, or_, select, update
 from sqlalchemy.orm import Session
 
+from ..db.db_executor import run_db_write
 from ..db.db_models import MediaObjectModel, SlotTemplateMediaModel
 from ..media.media_models import MediaObject
 
@@ -27,6 +30,7 @@ class MediaObjectRepository:
         path: Path,
         preview_path: Path | None,
         expires_at: datetime,
+        sha256: str | None = None,
     ) -> str:
         return self._register_media(
             scope="result",
@@ -35,6 +39,7 @@ class MediaObjectRepository:
             path=path,
             preview_path=preview_path,
             expires_at=expires_at,
+            sha256=sha256,
         )
 
     def register_temp(
@@ -44,6 +49,7 @@ class MediaObjectRepository:
         slot_id: str,
         path: Path,
         expires_at: datetime,
+        sha256: str | None = None,
     ) -> str:
         return self._register_media(
             scope="provider",
@@ -52,6 +58,26 @@ class MediaObjectRepository:
             path=path,
             preview_path=None,
             expires_at=expires_at,
+            sha256=sha256,
+        )
+
+    async def register_temp_async(
+        self,
+        *,
+        job_id: str,
+        slot_id: str,
+        path: Path,
+        expires_at: datetime,
+        sha256: str | None = None,
+    ) -> str:
+        """Async variant of :meth:`register_temp` run on the DB write executor."""
+        return await run_db_write(
+            self.register_temp,
+            job_id=job_id,
+            slot_id=slot_id,
+            path=path,
+            expires_at=expires_at,
+            sha256=sha256,
         )
 
     def register_template(
@@ -61,6 +87,7 @@ class MediaObjectRepository:
         slot_id: str,
         path: Path,
         expires_at: datetime,
+        sha256: str | None = None,
     ) -> str:
         return self._register_media(
             scope="template",
@@ -69,6 +96,7 @@ class MediaObjectRepository:
             path=path,
             preview_path=None,
             expires_at=expires_at,
+            sha256=sha256,
         )
 
     def list_expired_results(self, reference_time: datetime) -> list[MediaObject]:
@@ -80,15 +108,81 @@ class MediaObjectRepository:
         with self._session_factory() as session:
             rows = (
                 session.query(MediaObjectModel)
-                .filter(
-                    MediaObjectModel.scope == scope,
-                    MediaObjectModel.cleaned_at.is_(None),
-                    MediaObjectModel.expires_at <= reference_time,
+                .filter(*self._expired_filters(scope, reference_time))
+                .all()
+            )
+            return [self._to_domain(row) for row in rows]
+
+    def list_expired_batch(
+        self,
+        scope: str,
+        reference_time: datetime,
+        *,
+        limit: int,
+        after: tuple[datetime, str] | None = None,
+    ) -> list[MediaObject]:
+        """Next ``limit`` expired rows in ``(expires_at, id)`` order after ``after``.
+
+        Keyset pagination over ``ix_media_object_scope_expires``: each batch
+        costs the same however large the backlog is.
+        """
+        filters = self._expired_filters(scope, reference_time)
+        if after is not None:
+            expires_at, media_id = after
+            filters.append(
+                or_(
+                    MediaObjectModel.expires_at > expires_at,
+                    (MediaObjectModel.expires_at == expires_at)
+                    & (MediaObjectModel.id > media_id),
                 )
+            )
+        with self._session_factory() as session:
+            rows = (
+                session.query(MediaObjectModel)
+                .filter(*filters)
+                .order_by(MediaObjectModel.expires_at, MediaObjectModel.id)
+                .limit(limit)
                 .all()
             )
             return [self._to_domain(row) for row in rows]
 
+    def count_expired(self, scope: str, reference_time: datetime) -> int:
+        with self._session_factory() as session:
+            return int(
+                session.query(func.count(MediaObjectModel.id))
+                .filter(*self._expired_filters(scope, reference_time))
+                .scalar()
+            )
+
+    def mark_cleaned_many(self, media_ids: list[str], cleaned_at: datetime) -> int:
+        """Mark a batch cleaned with a single UPDATE; returns rows changed."""
+        if not media_ids:
+            return 0
+        with self._session_factory() as session:
+            result = session.execute(
+                update(MediaObjectModel)
+                .where(
+                    MediaObjectModel.id.in_(media_ids),
+                    MediaObjectModel.cleaned_at.is_(None),
+                )
+                .values(cleaned_at=cleaned_at)
+            )
+            session.commit()
+            return result.rowcount
+
+    def restore_cleaned(self, media_ids: list[str]) -> int:
+        """Return cleaned rows to live so the next cleanup pass retries them."""
+        if not media_ids:
+            return 0
+        with self._session_factory() as session:
+            result = session.execute(
+                update(MediaObjectModel)
+                .where(MediaObjectModel.id.in_(media_ids))
+                .values(cleaned_at=None)
+            )
+            session.commit()
+            return result.rowcount
+
     def mark_cleaned(self, media_id: str, cleaned_at: datetime) -> None:
         with self._session_factory() as session:
             model = session.get(MediaObjectModel, media_id)
@@ -97,6 +191,175 @@ class MediaObjectRepository:
             model.cleaned_at = cleaned_at
             session.commit()
 
+    def list_eviction_candidates(self, *, limit: int) -> list[MediaObject]:
+        """Live results least recently used: last public download, else write time.
+
+        A result nobody has downloaded yet is as recent as its write, so a
+        fresh result outlives one served long ago. Ties go by ``expires_at``:
+        the result closest to its TTL is given up first. Backed by
+        ``ix_media_object_scope_lru``.
+        """
+        with self._session_factory() as session:
+            rows = (
+                session.query(MediaObjectModel)
+                .filter(
+                    MediaObjectModel.scope == "result",
+                    MediaObjectModel.cleaned_at.is_(None),
+                )
+                .order_by(
+                    func.coalesce(
+                        MediaObjectModel.last_accessed_at, MediaObjectModel.created_at
+                    ),
+                    MediaObjectModel.expires_at,
+                    MediaObjectModel.id,
+                )
+                .limit(limit)
+                .all()
+            )
+            return [self._to_domain(row) for row in rows]
+
+    def touch_results(self, accessed: dict[str, datetime]) -> int:
+        """Store last public access per job id with one executemany UPDATE."""
+        if not accessed:
+            return 0
+        table = MediaObjectModel.__table__
+        statement = (
+            table.update()
+            .where(
+                table.c.job_id == bindparam("touched_job_id"),
+                table.c.scope == "result",
+                table.c.cleaned_at.is_(None),
+            )
+            .values(last_accessed_at=bindparam("touched_at"))
+        )
+        with self._session_factory() as session:
+            result = session.execute(
+                statement,
+                [
+                    {"touched_job_id": job_id, "touched_at": accessed_at}
+                    for job_id, accessed_at in accessed.items()
+                ],
+            )
+            session.commit()
+            return result.rowcount
+
+    def live_object_paths(self, digests: list[str]) -> set[str]:
+        """Paths still referenced by uncleaned media objects with these hashes."""
+        if not digests:
+            return set()
+        with self._session_factory() as session:
+            rows = (
+                session.query(MediaObjectModel.path)
+                .filter(
+                    MediaObjectModel.sha256.in_(digests),
+                    MediaObjectModel.cleaned_at.is_(None),
+                )
+                .distinct()
+                .all()
+            )
+            return {row.path for row in rows}
+
+    def live_archives(self, archives: list[str]) -> set[str]:
+        """Archive files that still hold at least one uncleaned member.
+
+        Member paths are ``<archive>/<job_id>/<file>``, so each check is a
+        range scan over ``ix_media_object_path_live``.
+        """
+        live: set[str] = set()
+        with self._session_factory() as session:
+            for archive in archives:
+                found = (
+                    session.query(MediaObjectModel.id)
+                    .filter(
+                        MediaObjectModel.archive_offset.is_not(None),
+                        MediaObjectModel.cleaned_at.is_(None),
+                        MediaObjectModel.path >= archive + os.sep,
+                        MediaObjectModel.path < archive + chr(ord(os.sep) + 1),
+                    )
+                    .first()
+                )
+                if found is not None:
+                    live.add(archive)
+        return live
+
+    def live_paths(
+        self,
+        column: str,
+        *,
+        lower: str,
+        upper: str,
+        after: str | None = None,
+        limit: int = 1000,
+    ) -> list[str]:
+        """Next ``limit`` distinct live ``path``/``preview_path`` values in ``[lower, upper)``.
+
+        Keyset page in binary string order (the order the media tree is
+        walked in) over ``ix_media_object_path_live`` or
+        ``ix_media_object_preview_live``.
+        """
+        with self._session_factory() as session:
+            value = getattr(MediaObjectModel, column)
+            if session.get_bind().dialect.name == "postgresql":
+                # порядок по байтам, как у сортировки имён при обходе дерева
+                value = value.collate("C")
+            filters = [
+                MediaObjectModel.cleaned_at.is_(None),
+                value >= lower,
+                value < upper,
+            ]
+            if after is not None:
+                filters.append(value > after)
+            rows = (
+                session.query(value)
+                .filter(*filters)
+                .distinct()
+                .order_by(value)
+                .limit(limit)
+                .all()
+            )
+            return [row[0] for row in rows]
+
+    def referenced_paths(self, paths: list[str]) -> set[str]:
+        """Which of ``paths`` a live row still points at (file, preview or archive)."""
+        if not paths:
+            return set()
+        with self._session_factory() as session:
+            rows = (
+                session.query(MediaObjectModel.path, MediaObjectModel.preview_path)
+                .filter(
+                    MediaObjectModel.cleaned_at.is_(None),
+                    or_(
+                        MediaObjectModel.path.in_(paths),
+                        MediaObjectModel.preview_path.in_(paths),
+                    ),
+                )
+                .all()
+            )
+        wanted = set(paths)
+        referenced = {value for row in rows for value in row if value in wanted}
+        archives = [path for path in paths if path.endswith(".zip") and path not in referenced]
+        return referenced | self.live_archives(archives)
+
+    def clean_missing(self, paths: list[str], cleaned_at: datetime) -> int:
+        """Mark live result/provider rows whose file is gone cleaned; returns rows changed.
+
+        Template rows are left for an operator: a slot keeps pointing at them.
+        """
+        if not paths:
+            return 0
+        with self._session_factory() as session:
+            result = session.execute(
+                update(MediaObjectModel)
+                .where(
+                    MediaObjectModel.path.in_(paths),
+                    MediaObjectModel.cleaned_at.is_(None),
+                    MediaObjectModel.scope != "template",
+                )
+                .values(cleaned_at=cleaned_at)
+            )
+            session.commit()
+            return result.rowcount
+
     def get_media(self, media_id: str) -> MediaObject:
         """Return media object by ID, guarding against cleaned records."""
         with self._session_factory() as session:
@@ -130,6 +393,42 @@ class MediaObjectRepository:
             media_id = rows[0].media_object_id
         return self.get_media(media_id)
 
+    def clean_unbound_template(self, media_id: str, cleaned_at: datetime) -> bool:
+        """Mark live template media cleaned unless a slot binds it.
+
+        The binding check is part of the UPDATE itself, so a slot bound after
+        a separate check cannot lose its template; returns whether the row
+        was cleaned.
+        """
+        bound = (
+            select(SlotTemplateMediaModel.id)
+            .where(SlotTemplateMediaModel.media_object_id == media_id)
+            .exists()
+        )
+        with self._session_factory() as session:
+            result = session.execute(
+                update(MediaObjectModel)
+                .where(
+                    MediaObjectModel.id == media_id,
+                    MediaObjectModel.scope == "template",
+                    MediaObjectModel.cleaned_at.is_(None),
+                    ~bound,
+                )
+                .values(cleaned_at=cleaned_at)
+            )
+            session.commit()
+            return bool(result.rowcount)
+
+    def template_bound(self, media_id: str) -> bool:
+        """Whether a slot still binds template media ``media_id``."""
+        with self._session_factory() as session:
+            return (
+                session.query(SlotTemplateMediaModel.id)
+                .filter(SlotTemplateMediaModel.media_object_id == media_id)
+                .first()
+                is not None
+            )
+
     def _register_media(
         self,
         *,
@@ -139,6 +438,7 @@ class MediaObjectRepository:
         path: Path,
         preview_path: Path | None,
         expires_at: datetime,
+        sha256: str | None = None,
     ) -> str:
         media_id = uuid.uuid4().hex
         with self._session_factory() as session:
@@ -151,11 +451,20 @@ class MediaObjectRepository:
                     path=str(path),
                     preview_path=str(preview_path) if preview_path else None,
                     expires_at=expires_at,
+                    sha256=sha256,
                 )
             )
             session.commit()
         return media_id
 
+    @staticmethod
+    def _expired_filters(scope: str, reference_time: datetime) -> list:
+        return [
+            MediaObjectModel.scope == scope,
+            MediaObjectModel.cleaned_at.is_(None),
+            MediaObjectModel.expires_at <= reference_time,
+        ]
+
     @staticmethod
     def _to_domain(model: MediaObjectModel) -> MediaObject:
         return MediaObject(
@@ -167,4 +476,8 @@ class MediaObjectRepository:
             expires_at=model.expires_at,
             scope=model.scope,
             cleaned_at=model.cleaned_at,
+            sha256=model.sha256,
+            last_accessed_at=model.last_accessed_at,
+            archive_offset=model.archive_offset,
+            archive_size=model.archive_size,
         )
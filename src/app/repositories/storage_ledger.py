@@ -0,0 +1,255 @@
+"""Incremental accounting of bytes and files stored under media/."""
+
+from __future__ import annotations
+
+import logging
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..config import MediaPaths
+from ..db.db_executor import call_db_write
+from ..db.db_models import MediaStorageUsageModel
+
+if TYPE_CHECKING:  # pragma: no cover - type checking only
+    from .job_unit_of_work import JobUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+# scope совпадает с media_object.scope, значение — атрибут MediaPaths
+SCOPE_DIRS = {"result": "results", "provider": "temp", "template": "templates"}
+# content-addressed хранилище (media/objects/ab/cd/<sha256>.<ext>) общее для
+# всех слотов: учитывается одной строкой ledger без slot_id
+OBJECTS_DIR = "objects"
+OBJECT_SCOPE = "object"
+# холодный слой: архивы media/archive/<slot_id>/<YYYY-MM-DD>.zip
+ARCHIVE_DIR = "archive"
+ARCHIVE_SCOPE = "archive"
+
+UsageKey = tuple[str, str]
+
+
+@dataclass(slots=True)
+class ReconcileSummary:
+    """Result of a ledger reconciliation scan."""
+
+    bytes: int
+    files: int
+    drift_bytes: int
+    drift_files: int
+
+
+def measure_path(path: Path) -> tuple[int, int]:
+    """Return ``(bytes, files)`` for a file or a whole directory tree."""
+    try:
+        if path.is_file():
+            return path.stat().st_size, 1
+        if not path.is_dir():
+            return 0, 0
+    except OSError:
+        return 0, 0
+    total = files = 0
+    pending = [path]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+                        files += 1
+        except OSError:
+            continue
+    return total, files
+
+
+def upsert_usage(session: Session, deltas: dict[UsageKey, list[int]]) -> None:
+    """Add ``[bytes, files]`` deltas to ledger rows (INSERT ... ON CONFLICT)."""
+    rows = [
+        {
+            "scope": scope,
+            "slot_id": slot_id,
+            "bytes": values[0],
+            "files": values[1],
+            "updated_at": datetime.utcnow(),
+        }
+        for (scope, slot_id), values in deltas.items()
+        if values[0] or values[1]
+    ]
+    if not rows:
+        return
+    table = MediaStorageUsageModel.__table__
+    dialect = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=["scope", "slot_id"],
+        set_={
+            "bytes": table.c.bytes + statement.excluded.bytes,
+            "files": table.c.files + statement.excluded.files,
+            "updated_at": statement.excluded.updated_at,
+        },
+    )
+    session.execute(statement, rows)
+
+
+class StorageLedger:
+    """Per-scope/per-slot storage usage kept up to date by write/delete paths.
+
+    Ledger updates are best effort: a failed update is logged and the drift is
+    corrected by the next :meth:`reconcile` scan.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]) -> None:
+        self._session_factory = session_factory
+
+    def record(
+        self,
+        scope: str,
+        slot_id: str,
+        bytes_delta: int,
+        files_delta: int,
+        *,
+        unit_of_work: JobUnitOfWork | None = None,
+        key: str | None = None,
+    ) -> None:
+        """Apply a delta now or stage it in the job's unit of work.
+
+        A staged delta with ``key`` replaces the one staged earlier under it.
+        """
+        if unit_of_work is not None and key is not None:
+            # нулевая дельта по ключу тоже нужна: она заменяет прежнюю
+            unit_of_work.add_storage(scope, slot_id, bytes_delta, files_delta, key=key)
+            return
+        if not bytes_delta and not files_delta:
+            return
+        if unit_of_work is not None:
+            unit_of_work.add_storage(scope, slot_id, bytes_delta, files_delta)
+            return
+        self.record_many({(scope, slot_id): [bytes_delta, files_delta]})
+
+    def record_many(self, deltas: dict[UsageKey, list[int]]) -> None:
+        """Apply deltas for several scope/slot keys in one transaction (cleanup batches)."""
+        if not any(values[0] or values[1] for values in deltas.values()):
+            return
+        try:
+            with self._session_factory() as session:
+                upsert_usage(session, deltas)
+                session.commit()
+        except Exception:
+            logger.exception(
+                "media.ledger.record_failed",
+                extra={
+                    "keys": [f"{scope}/{slot_id}" for scope, slot_id in deltas],
+                    "bytes": sum(values[0] for values in deltas.values()),
+                },
+            )
+
+    def usage(self) -> list[dict[str, Any]]:
+        """Ledger rows ordered by scope and slot."""
+        ledger = MediaStorageUsageModel
+        with self._session_factory() as session:
+            rows = session.execute(
+                select(ledger.scope, ledger.slot_id, ledger.bytes, ledger.files).order_by(
+                    ledger.scope, ledger.slot_id
+                )
+            ).all()
+        return [
+            {
+                "scope": row.scope,
+                "slot_id": row.slot_id,
+                "bytes": row.bytes,
+                "files": row.files,
+            }
+            for row in rows
+        ]
+
+    def usage_bytes(self, scope: str | None = None) -> int:
+        """Total bytes, optionally for a single scope."""
+        query = select(func.coalesce(func.sum(MediaStorageUsageModel.bytes), 0))
+        if scope is not None:
+            query = query.where(MediaStorageUsageModel.scope == scope)
+        with self._session_factory() as session:
+            return int(session.execute(query).scalar_one())
+
+    def reconcile(self, paths: MediaPaths) -> ReconcileSummary:
+        """Scan media/ and correct ledger drift.
+
+        Corrections are applied as deltas against the values read before the
+        scan, so the scan never overwrites the ledger. The window is not exact:
+        a delta recorded during the scan for a directory already walked is kept,
+        but one for a directory not walked yet is counted twice (on disk and in
+        the ledger). That drift is bounded by the writes of one scan and is
+        corrected by the next pass.
+        """
+        before = {
+            (item["scope"], item["slot_id"]): (item["bytes"], item["files"])
+            for item in self.usage()
+        }
+        actual = self._scan(paths)
+        corrections = {
+            key: [
+                actual.get(key, (0, 0))[0] - before.get(key, (0, 0))[0],
+                actual.get(key, (0, 0))[1] - before.get(key, (0, 0))[1],
+            ]
+            for key in before.keys() | actual.keys()
+        }
+        call_db_write(self._apply, corrections)
+        summary = ReconcileSummary(
+            bytes=sum(value[0] for value in actual.values()),
+            files=sum(value[1] for value in actual.values()),
+            drift_bytes=sum(value[0] for value in corrections.values()),
+            drift_files=sum(value[1] for value in corrections.values()),
+        )
+        logger.info(
+            "media.ledger.reconciled",
+            extra={
+                "bytes": summary.bytes,
+                "files": summary.files,
+                "drift_bytes": summary.drift_bytes,
+                "drift_files": summary.drift_files,
+            },
+        )
+        return summary
+
+    def _apply(self, deltas: dict[UsageKey, list[int]]) -> None:
+        with self._session_factory() as session:
+            upsert_usage(session, deltas)
+            session.commit()
+
+    @staticmethod
+    def _scan(paths: MediaPaths) -> dict[UsageKey, tuple[int, int]]:
+        usage: dict[UsageKey, tuple[int, int]] = {}
+        for scope, attribute in SCOPE_DIRS.items():
+            root: Path = getattr(paths, attribute)
+            if not root.is_dir():
+                continue
+            loose = [0, 0]
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        usage[(scope, entry.name)] = measure_path(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        loose[0] += entry.stat(follow_symlinks=False).st_size
+                        loose[1] += 1
+            if loose[1]:
+                usage[(scope, "")] = (loose[0], loose[1])
+        objects_bytes, objects_files = measure_path(paths.root / OBJECTS_DIR)
+        if objects_files:
+            usage[(OBJECT_SCOPE, "")] = (objects_bytes, objects_files)
+        archive_root = paths.root / ARCHIVE_DIR
+        if archive_root.is_dir():
+            with os.scandir(archive_root) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        usage[(ARCHIVE_SCOPE, entry.name)] = measure_path(Path(entry.path))
+        return usage
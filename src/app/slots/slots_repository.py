@@ -10,6 +10,7 @@ from typing import Iterable
 from sqlalchemy import delete
 from sqlalchemy.orm import Session, selectinload
 
+from ..db.db_executor import run_db
 from ..db.db_models import SlotModel, SlotTemplateMediaModel
 from .slots_models import Slot, SlotTemplateMedia
 from .template_media import merge_template_media
@@ -43,6 +44,10 @@ class SlotRepository:
                 raise KeyError(f"Slot '{slot_id}' not found")
             return self._to_domain(row)
 
+    async def get_slot_async(self, slot_id: str) -> Slot:
+        """Async variant of :meth:`get_slot` run on the DB executor."""
+        return await run_db(self.get_slot, slot_id)
+
     def list_template_media(self, slot_id: str) -> Sequence[SlotTemplateMedia]:
         with self._session_factory() as session:
             rows = (
@@ -2,17 +2,28 @@
 
 from __future__ import annotations
 
-import os
 import shutil
+import time
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import TYPE_CHECKING, Iterable, Sequence
 
-from .stats_repository import StatsRepository
+from ..db.db_models import DURATION_BUCKETS_SECONDS
+from .stats_sketch import QUANTILES, quantile_label
 
-BUCKETS = [1, 5, 10, 20, 30, 40, 48, 60]
+if TYPE_CHECKING:  # pragma: no cover - type checking only
+    from ..background.background_queue import BackgroundTaskQueue
+    from ..media.media_orphan_scheduler import OrphanScheduler
+    from ..media.media_quota import QuotaManager
+    from ..repositories.storage_ledger import StorageLedger
+    from .metrics_registry import MetricsRegistry
+    from .stats_rollup_repository import StatsRollupRepository
+
+BUCKETS = list(DURATION_BUCKETS_SECONDS)
+# окно скользящих перцентилей ingest_latency_seconds
+SUMMARY_WINDOW_MINUTES = 10
 
 
 @dataclass(slots=True)
@@ -32,6 +43,26 @@ class DurationSample:
     seconds: float
 
 
+@dataclass(slots=True)
+class DurationHistogram:
+    """Pre-bucketed durations; ``bucket_counts`` are cumulative per ``BUCKETS``."""
+
+    slot_id: str
+    provider: str
+    bucket_counts: Sequence[int]
+    count: int
+    sum_seconds: float
+
+
+@dataclass(slots=True)
+class LatencySummary:
+    """Recent duration percentiles (``{"p50": ...}``) of one slot/provider."""
+
+    slot_id: str
+    provider: str
+    quantiles: dict[str, float | None] = field(default_factory=dict)
+
+
 @dataclass(slots=True)
 class MetricsSnapshot:
     totals: Sequence[SlotTotals]
@@ -40,75 +71,108 @@ class MetricsSnapshot:
     media_capacity_bytes: int
     window_minutes: int
     sync_response_seconds: int
+    histograms: Sequence[DurationHistogram] = ()
+    summaries: Sequence[LatencySummary] = ()
+    quota_evictions_total: int = 0
+    # последний полный проход сверки media/ с media_object (до исправлений)
+    orphan_files: int = 0
+    orphan_bytes: int = 0
+    orphan_rows: int = 0
 
 
 class MetricsExporter:
-    """Collects statistics and renders them as Prometheus text format."""
+    """Renders in-process metrics as Prometheus text format.
+
+    Counters come from :class:`MetricsRegistry` (seeded once from the rollups),
+    media gauges from the storage ledger, re-read in the background at most
+    every ``media_refresh_seconds``; a scrape itself does no DB or disk I/O.
+    """
 
     def __init__(
         self,
-        stats_repo: StatsRepository,
+        stats_repo: StatsRollupRepository,
+        registry: MetricsRegistry,
+        ledger: StorageLedger,
         media_root: Path,
         sync_response_seconds: int,
+        background: BackgroundTaskQueue | None = None,
+        media_refresh_seconds: float = 15.0,
+        quota: QuotaManager | None = None,
+        orphans: OrphanScheduler | None = None,
     ) -> None:
         self._stats_repo = stats_repo
+        self._registry = registry
+        self._ledger = ledger
         self._media_root = media_root
         self._sync_response_seconds = sync_response_seconds
+        self._background = background
+        self._media_refresh_seconds = media_refresh_seconds
+        self._quota = quota
+        self._orphans = orphans
+        self._media_usage: tuple[int, int] = (0, 0)
+        self._media_refreshed_at: float | None = None
+        self._media_refresh_pending = False
+
+    def seed(self) -> None:
+        """Load persisted totals into the registry and read media usage once."""
+        since = datetime.utcnow() - timedelta(minutes=SUMMARY_WINDOW_MINUTES)
+        self._registry.seed(
+            self._stats_repo.slot_totals(),
+            self._stats_repo.slot_total_histograms(),
+            self._stats_repo.recent_sketches(since),
+        )
+        self.refresh_media_usage()
+
+    def refresh_media_usage(self) -> None:
+        try:
+            self._media_usage = self._disk_usage()
+            self._media_refreshed_at = time.monotonic()
+        finally:
+            self._media_refresh_pending = False
 
     def collect(self, window_minutes: int = 5) -> str:
         """Build metrics text for Prometheus scraping."""
-        window_minutes = max(1, window_minutes)
-        window_start = datetime.utcnow() - timedelta(minutes=window_minutes)
-        totals = [
-            SlotTotals(
-                slot_id=item["slot_id"],
-                provider=item["provider"],
-                jobs_total=int(item["jobs_total"]),
-                timeouts_total=int(item["timeouts_total"]),
-                provider_errors_total=int(item["provider_errors_total"]),
-                success_total=int(item["success_total"]),
-            )
-            for item in self._stats_repo.slot_totals()
-        ]
-        durations = [
-            DurationSample(
-                slot_id=item["slot_id"],
-                provider=item["provider"],
-                seconds=float(item["seconds"]),
-            )
-            for item in self._stats_repo.slot_durations(window_start)
-        ]
-        usage_bytes, capacity_bytes = self._disk_usage()
+        totals, histograms, summaries = self._registry.snapshot()
+        self._schedule_media_refresh()
+        usage_bytes, capacity_bytes = self._media_usage
         snapshot = MetricsSnapshot(
             totals=totals,
-            durations=durations,
+            durations=[],
             media_usage_bytes=usage_bytes,
             media_capacity_bytes=capacity_bytes,
-            window_minutes=window_minutes,
+            window_minutes=max(1, window_minutes),
             sync_response_seconds=self._sync_response_seconds,
+            histograms=histograms,
+            summaries=summaries,
+            quota_evictions_total=self._quota.evicted_total if self._quota else 0,
         )
+        last_pass = self._orphans.last_pass if self._orphans else None
+        if last_pass is not None:
+            snapshot.orphan_files = last_pass.orphan_files
+            snapshot.orphan_bytes = last_pass.orphan_bytes
+            snapshot.orphan_rows = last_pass.missing_rows
         return format_prometheus(snapshot)
 
+    def _schedule_media_refresh(self) -> None:
+        if self._background is None or self._media_refresh_pending:
+            return
+        refreshed_at = self._media_refreshed_at
+        if (
+            refreshed_at is not None
+            and time.monotonic() - refreshed_at < self._media_refresh_seconds
+        ):
+            return
+        # скрейп отдаёт прошлое значение, чтение ledger уходит в фоновую очередь
+        self._media_refresh_pending = True
+        self._background.submit("metrics.media_usage", self.refresh_media_usage)
+
     def _disk_usage(self) -> tuple[int, int]:
         """Return (used_bytes, capacity_bytes) for media root."""
         try:
-            stat = shutil.disk_usage(self._media_root)
-            capacity = stat.total
+            capacity = shutil.disk_usage(self._media_root).total
         except OSError:
-            return 0, 0
-        return self._calc_usage_bytes(self._media_root), capacity
-
-    @staticmethod
-    def _calc_usage_bytes(root: Path) -> int:
-        total = 0
-        if root.exists():
-            for dirpath, _, filenames in os.walk(root):
-                for name in filenames:
-                    try:
-                        total += (Path(dirpath) / name).stat().st_size
-                    except OSError:
-                        continue
-        return total
+            capacity = 0
+        return self._ledger.usage_bytes(), capacity
 
 
 def format_prometheus(snapshot: MetricsSnapshot) -> str:
@@ -143,7 +207,12 @@ def format_prometheus(snapshot: MetricsSnapshot) -> str:
             f'ingest_provider_error_total{{slot_id="{total.slot_id}",provider="{total.provider}"}} {total.provider_errors_total}'
         )
 
-    lines.extend(_format_histogram(snapshot.totals, snapshot.durations))
+    histograms = list(snapshot.histograms) or histograms_from_samples(
+        snapshot.durations
+    )
+    lines.extend(_format_histogram(snapshot.totals, histograms))
+    if snapshot.summaries:
+        lines.extend(_format_summary(snapshot.totals, histograms, snapshot.summaries))
 
     lines.append("# HELP media_storage_bytes Current size of media/ directory (bytes).")
     lines.append("# TYPE media_storage_bytes gauge")
@@ -153,38 +222,112 @@ def format_prometheus(snapshot: MetricsSnapshot) -> str:
     lines.append("# TYPE media_disk_capacity_bytes gauge")
     lines.append(f"media_disk_capacity_bytes {snapshot.media_capacity_bytes}")
 
+    lines.append(
+        "# HELP media_quota_evictions_total Results evicted before TTL under disk pressure."
+    )
+    lines.append("# TYPE media_quota_evictions_total counter")
+    lines.append(f"media_quota_evictions_total {snapshot.quota_evictions_total}")
+
+    lines.append(
+        "# HELP media_orphan_files Files under media/ without a live media_object row."
+    )
+    lines.append("# TYPE media_orphan_files gauge")
+    lines.append(f"media_orphan_files {snapshot.orphan_files}")
+
+    lines.append("# HELP media_orphan_bytes Bytes held by orphan files under media/.")
+    lines.append("# TYPE media_orphan_bytes gauge")
+    lines.append(f"media_orphan_bytes {snapshot.orphan_bytes}")
+
+    lines.append("# HELP media_orphan_rows Live media_object rows whose file is missing.")
+    lines.append("# TYPE media_orphan_rows gauge")
+    lines.append(f"media_orphan_rows {snapshot.orphan_rows}")
+
     return "\n".join(lines) + "\n"
 
 
+def histograms_from_samples(
+    durations: Sequence[DurationSample],
+) -> list[DurationHistogram]:
+    """Bucket raw duration samples per slot/provider."""
+    grouped: dict[tuple[str, str], list[float]] = defaultdict(list)
+    for sample in durations:
+        grouped[(sample.slot_id, sample.provider)].append(sample.seconds)
+    return [
+        DurationHistogram(
+            slot_id=slot_id,
+            provider=provider,
+            bucket_counts=[
+                sum(1 for seconds in samples if seconds <= bucket) for bucket in BUCKETS
+            ],
+            count=len(samples),
+            sum_seconds=sum(samples),
+        )
+        for (slot_id, provider), samples in grouped.items()
+    ]
+
+
 def _format_histogram(
-    totals: Sequence[SlotTotals], durations: Sequence[DurationSample]
+    totals: Sequence[SlotTotals], histograms: Sequence[DurationHistogram]
 ) -> Iterable[str]:
     """Render histogram buckets, sum and count for ingest duration."""
     lines: list[str] = []
-    grouped: dict[tuple[str, str], list[float]] = defaultdict(list)
-    for sample in durations:
-        grouped[(sample.slot_id, sample.provider)].append(sample.seconds)
+    by_key = {(item.slot_id, item.provider): item for item in histograms}
 
     # Ensure every slot/provider from totals has a histogram series, even without samples
     for total in totals:
-        key = (total.slot_id, total.provider)
-        samples_sorted = sorted(grouped.get(key, []))
-        count = len(samples_sorted)
-        idx = 0
-        for bucket in BUCKETS:
-            while idx < count and samples_sorted[idx] <= bucket:
-                idx += 1
+        histogram = by_key.get((total.slot_id, total.provider))
+        counts = list(histogram.bucket_counts) if histogram else [0] * len(BUCKETS)
+        count = histogram.count if histogram else 0
+        sum_seconds = histogram.sum_seconds if histogram else 0.0
+        for bucket, bucket_count in zip(BUCKETS, counts):
             lines.append(
-                f'ingest_duration_seconds_bucket{{slot_id="{total.slot_id}",provider="{total.provider}",le="{bucket}"}} {idx}'
+                f'ingest_duration_seconds_bucket{{slot_id="{total.slot_id}",provider="{total.provider}",le="{bucket}"}} {bucket_count}'
             )
         lines.append(
             f'ingest_duration_seconds_bucket{{slot_id="{total.slot_id}",provider="{total.provider}",le="+Inf"}} {count}'
         )
         lines.append(
-            f'ingest_duration_seconds_sum{{slot_id="{total.slot_id}",provider="{total.provider}"}} {sum(samples_sorted):.6f}'
+            f'ingest_duration_seconds_sum{{slot_id="{total.slot_id}",provider="{total.provider}"}} {sum_seconds:.6f}'
         )
         lines.append(
             f'ingest_duration_seconds_count{{slot_id="{total.slot_id}",provider="{total.provider}"}} {count}'
         )
 
     return lines
+
+
+def _format_summary(
+    totals: Sequence[SlotTotals],
+    histograms: Sequence[DurationHistogram],
+    summaries: Sequence[LatencySummary],
+) -> Iterable[str]:
+    """Render recent p50/p95/p99 as a summary; _sum/_count match the histogram."""
+    lines = [
+        "# HELP ingest_latency_seconds Ingest duration percentiles over the last "
+        f"{SUMMARY_WINDOW_MINUTES} minutes.",
+        "# TYPE ingest_latency_seconds summary",
+    ]
+    by_key = {(item.slot_id, item.provider): item for item in histograms}
+    quantiles_by_key = {
+        (item.slot_id, item.provider): item.quantiles for item in summaries
+    }
+    for total in totals:
+        key = (total.slot_id, total.provider)
+        labels = f'slot_id="{total.slot_id}",provider="{total.provider}"'
+        values = quantiles_by_key.get(key, {})
+        for quantile in QUANTILES:
+            value = values.get(quantile_label(quantile))
+            rendered = "NaN" if value is None else f"{value:.3f}"
+            lines.append(
+                f'ingest_latency_seconds{{{labels},quantile="{quantile:g}"}} {rendered}'
+            )
+        histogram = by_key.get(key)
+        lines.append(
+            f"ingest_latency_seconds_sum{{{labels}}} "
+            f"{histogram.sum_seconds if histogram else 0.0:.6f}"
+        )
+        lines.append(
+            f"ingest_latency_seconds_count{{{labels}}} "
+            f"{histogram.count if histogram else 0}"
+        )
+    return lines
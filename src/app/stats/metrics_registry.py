@@ -0,0 +1,162 @@
+"""In-process Prometheus counters updated by ingest completion hooks."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any
+
+from ..ingest.ingest_models import FailureReason, JobOutcome, JobStatus
+from .metrics_exporter import (
+    BUCKETS,
+    SUMMARY_WINDOW_MINUTES,
+    DurationHistogram,
+    LatencySummary,
+    SlotTotals,
+)
+from .stats_sketch import DurationSketch
+
+logger = logging.getLogger(__name__)
+
+SeriesKey = tuple[str, str]
+
+
+@dataclass(slots=True)
+class _Series:
+    jobs_total: int = 0
+    success_total: int = 0
+    timeouts_total: int = 0
+    provider_errors_total: int = 0
+    bucket_counts: list[int] = field(default_factory=lambda: [0] * len(BUCKETS))
+    duration_count: int = 0
+    duration_sum_seconds: float = 0.0
+    # минута завершения -> скетч длительностей за эту минуту
+    recent: dict[datetime, DurationSketch] = field(default_factory=dict)
+
+
+class MetricsRegistry:
+    """Counters and duration histograms per slot/provider kept in memory.
+
+    Seeded once from the rollup totals, then advanced by
+    :meth:`record_outcome` as jobs complete, so a scrape only copies
+    ``O(series)`` numbers and never touches the database. Per-minute latency
+    sketches of the last ``SUMMARY_WINDOW_MINUTES`` back the percentile summary.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._series: dict[SeriesKey, _Series] = {}
+
+    def seed(
+        self,
+        totals: Iterable[dict[str, Any]],
+        histograms: Iterable[dict[str, Any]],
+        sketches: Iterable[dict[str, Any]] = (),
+    ) -> None:
+        """Replace all series with persisted totals (``slot_totals`` shape).
+
+        ``sketches`` are minute sketch rows (``recent_sketches`` shape).
+        """
+        series: dict[SeriesKey, _Series] = {}
+        for item in totals:
+            series[(item["slot_id"], item["provider"])] = _Series(
+                jobs_total=int(item["jobs_total"]),
+                success_total=int(item["success_total"]),
+                timeouts_total=int(item["timeouts_total"]),
+                provider_errors_total=int(item["provider_errors_total"]),
+            )
+        for item in histograms:
+            target = series.setdefault((item["slot_id"], item["provider"]), _Series())
+            target.bucket_counts = [int(value) for value in item["buckets"]]
+            target.duration_count = int(item["count"])
+            target.duration_sum_seconds = float(item["sum_seconds"])
+        for item in sketches:
+            target = series.setdefault((item["slot_id"], item["provider"]), _Series())
+            target.recent.setdefault(item["bucket_start"], DurationSketch()).add_bin(
+                int(item["bin"]), int(item["count"])
+            )
+        with self._lock:
+            self._series = series
+        logger.info("metrics.registry.seeded", extra={"series": len(series)})
+
+    def record_outcome(self, outcome: JobOutcome) -> None:
+        """Ingest completion hook: count the job and observe its duration."""
+        duration = outcome.duration_seconds
+        with self._lock:
+            series = self._series.setdefault(
+                (outcome.slot_id, outcome.provider), _Series()
+            )
+            series.jobs_total += 1
+            if outcome.status == JobStatus.DONE.value:
+                series.success_total += 1
+            elif outcome.status == JobStatus.TIMEOUT.value:
+                series.timeouts_total += 1
+            if outcome.failure_reason == FailureReason.PROVIDER_ERROR.value:
+                series.provider_errors_total += 1
+            if duration is None:
+                return
+            series.duration_count += 1
+            series.duration_sum_seconds += duration
+            for index, bucket in enumerate(BUCKETS):
+                if duration <= bucket:
+                    series.bucket_counts[index] += 1
+            minute = outcome.completed_at.replace(second=0, microsecond=0)
+            series.recent.setdefault(minute, DurationSketch()).add(duration)
+            _drop_expired(series.recent, datetime.utcnow())
+
+    def snapshot(
+        self, now: datetime | None = None
+    ) -> tuple[list[SlotTotals], list[DurationHistogram], list[LatencySummary]]:
+        """Copy current values for rendering outside the lock."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            items = sorted(self._series.items())
+            recent: list[tuple[SeriesKey, DurationSketch]] = []
+            for key, series in items:
+                _drop_expired(series.recent, now)
+                merged = DurationSketch()
+                for sketch in series.recent.values():
+                    merged.merge(sketch)
+                recent.append((key, merged))
+            return (
+                [
+                    SlotTotals(
+                        slot_id=slot_id,
+                        provider=provider,
+                        jobs_total=series.jobs_total,
+                        timeouts_total=series.timeouts_total,
+                        provider_errors_total=series.provider_errors_total,
+                        success_total=series.success_total,
+                    )
+                    for (slot_id, provider), series in items
+                ],
+                [
+                    DurationHistogram(
+                        slot_id=slot_id,
+                        provider=provider,
+                        bucket_counts=list(series.bucket_counts),
+                        count=series.duration_count,
+                        sum_seconds=series.duration_sum_seconds,
+                    )
+                    for (slot_id, provider), series in items
+                ],
+                [
+                    LatencySummary(
+                        slot_id=slot_id,
+                        provider=provider,
+                        quantiles=sketch.quantiles(),
+                    )
+                    for (slot_id, provider), sketch in recent
+                ],
+            )
+
+
+def _drop_expired(recent: dict[datetime, DurationSketch], now: datetime) -> None:
+    cutoff = now.replace(second=0, microsecond=0) - timedelta(
+        minutes=SUMMARY_WINDOW_MINUTES - 1
+    )
+    for minute in [minute for minute in recent if minute < cutoff]:
+        del recent[minute]
@@ -5,9 +5,11 @@ from __future__ import annotations
 from typing import Any
 
 from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 
 from ..auth.auth_dependencies import require_admin_user
 
+from .stats_broadcaster import StatsBroadcaster
 from .stats_service import StatsService
 
 router = APIRouter(
@@ -40,3 +42,49 @@ def stats_slots(
 ) -> dict[str, Any]:
     """Return per-slot metrics tailored for graphs."""
     return service.slot_stats(window_minutes=window_minutes)
+
+
+@router.get("/latency")
+def stats_latency(
+    window_minutes: int = 60,
+    bucket_minutes: int = 5,
+    slot_id: str | None = None,
+    service: StatsService = Depends(get_stats_service),
+) -> dict[str, Any]:
+    """Return latency percentiles per time bucket."""
+    return service.latency_series(
+        window_minutes=window_minutes, bucket_minutes=bucket_minutes, slot_id=slot_id
+    )
+
+
+@router.get("/timeseries")
+def stats_timeseries(
+    window_minutes: int = 60,
+    bucket_minutes: int = 5,
+    slot_id: str | None = None,
+    service: StatsService = Depends(get_stats_service),
+) -> dict[str, Any]:
+    """Return job counters and durations per time bucket."""
+    return service.timeseries(
+        window_minutes=window_minutes, bucket_minutes=bucket_minutes, slot_id=slot_id
+    )
+
+
+def get_stats_broadcaster(request: Request) -> StatsBroadcaster:
+    try:
+        return request.app.state.stats_broadcaster  # type: ignore[attr-defined]
+    except AttributeError as exc:  # pragma: no cover - defensive path
+        raise RuntimeError("StatsBroadcaster is not configured") from exc
+
+
+@router.get("/stream")
+def stats_stream(
+    broadcaster: StatsBroadcaster = Depends(get_stats_broadcaster),
+) -> StreamingResponse:
+    """Push a counters snapshot, then job deltas, as Server-Sent Events."""
+    return StreamingResponse(
+        broadcaster.stream(),
+        media_type="text/event-stream",
+        # буферизация в nginx задержала бы события до закрытия соединения
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,210 @@
+"""Live stat deltas pushed to admin dashboards over Server-Sent Events."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import AsyncIterator
+from datetime import datetime
+from threading import Lock
+from typing import TYPE_CHECKING, Any
+
+from ..ingest.ingest_models import JobContext, JobOutcome
+
+if TYPE_CHECKING:  # pragma: no cover - type checking only
+    from .metrics_registry import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# событие-маркер: очередь подписчика переполнилась, нужен свежий snapshot
+_RESYNC = ("resync", {})
+
+
+class StatsBroadcaster:
+    """Fan-out of job start/completion deltas to SSE subscribers.
+
+    Fed by ingest start/completion hooks (called from worker threads), so the
+    state is guarded by a lock and events are handed to the event loop with
+    ``call_soon_threadsafe``. A new subscriber first receives a snapshot built
+    from :class:`MetricsRegistry` and the in-flight jobs, so dashboards cost no
+    database work however many are open. A subscriber that falls behind gets
+    its queue replaced by a single resync snapshot instead of blocking others.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        *,
+        queue_size: int = 256,
+        heartbeat_seconds: float = 15.0,
+        stale_after_seconds: float = 3600.0,
+    ) -> None:
+        self._registry = registry
+        self._queue_size = queue_size
+        self._heartbeat_seconds = heartbeat_seconds
+        self._stale_after_seconds = stale_after_seconds
+        self._lock = Lock()
+        # job_id -> (slot_id, monotonic start)
+        self._in_flight: dict[str, tuple[str, float]] = {}
+        self._subscribers: set[asyncio.Queue[tuple[str, dict[str, Any]] | None]] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        """End all streams so the server can shut down without waiting on them."""
+        for queue in list(self._subscribers):
+            self._replace(queue, None)
+        self._subscribers.clear()
+
+    def record_start(self, job: JobContext) -> None:
+        """Ingest start hook: count the job as in flight."""
+        if job.job_id is None:
+            return
+        with self._lock:
+            self._in_flight[job.job_id] = (job.slot_id, time.monotonic())
+            slot_in_flight, total = self._in_flight_counts(job.slot_id)
+        self._publish(
+            "job",
+            {
+                "type": "started",
+                "job_id": job.job_id,
+                "slot_id": job.slot_id,
+                "provider": job.metadata.get("provider", "unknown"),
+                "started_at": _isoformat(job.started_at),
+                "slot_in_flight": slot_in_flight,
+                "in_flight_total": total,
+            },
+        )
+
+    def record_outcome(self, outcome: JobOutcome) -> None:
+        """Ingest completion hook: publish the outcome and release the in-flight slot."""
+        with self._lock:
+            self._in_flight.pop(outcome.job_id, None)
+            slot_in_flight, total = self._in_flight_counts(outcome.slot_id)
+        self._publish(
+            "job",
+            {
+                "type": "completed",
+                "job_id": outcome.job_id,
+                "slot_id": outcome.slot_id,
+                "provider": outcome.provider,
+                "status": outcome.status,
+                "failure_reason": outcome.failure_reason,
+                "completed_at": _isoformat(outcome.completed_at),
+                "duration_seconds": outcome.duration_seconds,
+                "slot_in_flight": slot_in_flight,
+                "in_flight_total": total,
+            },
+        )
+
+    def snapshot(self) -> dict[str, Any]:
+        """All-time counters per slot/provider plus jobs currently in flight."""
+        totals, _, _ = self._registry.snapshot()
+        with self._lock:
+            self._drop_stale()
+            in_flight: dict[str, int] = {}
+            for slot_id, _ in self._in_flight.values():
+                in_flight[slot_id] = in_flight.get(slot_id, 0) + 1
+        return {
+            "slots": [
+                {
+                    "slot_id": item.slot_id,
+                    "provider": item.provider,
+                    "jobs_total": item.jobs_total,
+                    "success_total": item.success_total,
+                    "timeouts_total": item.timeouts_total,
+                    "provider_errors_total": item.provider_errors_total,
+                    "in_flight": in_flight.get(item.slot_id, 0),
+                }
+                for item in totals
+            ],
+            "in_flight_total": sum(in_flight.values()),
+        }
+
+    async def stream(self) -> AsyncIterator[str]:
+        """SSE text for one subscriber: snapshot, then deltas and heartbeats."""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[tuple[str, dict[str, Any]] | None] = asyncio.Queue(
+            maxsize=self._queue_size
+        )
+        self._subscribers.add(queue)
+        logger.info("stats.stream.subscribed", extra={"subscribers": self.subscribers})
+        try:
+            yield _format_event("snapshot", self.snapshot())
+            while True:
+                try:
+                    item = await asyncio.wait_for(
+                        queue.get(), timeout=self._heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    # комментарий держит соединение через прокси и выявляет обрыв
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    return
+                event, payload = item
+                if item is _RESYNC:
+                    event, payload = "snapshot", self.snapshot()
+                yield _format_event(event, payload)
+        finally:
+            self._subscribers.discard(queue)
+            logger.info(
+                "stats.stream.unsubscribed", extra={"subscribers": self.subscribers}
+            )
+
+    def _publish(self, event: str, payload: dict[str, Any]) -> None:
+        loop = self._loop
+        if loop is None or not self._subscribers or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._fanout, (event, payload))
+        except RuntimeError:  # pragma: no cover - loop closed between checks
+            return
+
+    def _fanout(self, item: tuple[str, dict[str, Any]]) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                logger.warning("stats.stream.resync", extra={"queue_size": queue.qsize()})
+                self._replace(queue, _RESYNC)
+
+    @staticmethod
+    def _replace(
+        queue: asyncio.Queue[tuple[str, dict[str, Any]] | None],
+        item: tuple[str, dict[str, Any]] | None,
+    ) -> None:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(item)
+
+    def _in_flight_counts(self, slot_id: str) -> tuple[int, int]:
+        self._drop_stale()
+        slot_count = sum(1 for slot, _ in self._in_flight.values() if slot == slot_id)
+        return slot_count, len(self._in_flight)
+
+    def _drop_stale(self) -> None:
+        # задача, не дошедшая до хука завершения (падение процесса, отмена), не
+        # должна висеть «в работе» вечно
+        cutoff = time.monotonic() - self._stale_after_seconds
+        for job_id in [
+            job_id for job_id, (_, started) in self._in_flight.items() if started < cutoff
+        ]:
+            del self._in_flight[job_id]
+
+
+def _isoformat(moment: datetime | None) -> str | None:
+    return moment.isoformat() if moment is not None else None
+
+
+def _format_event(event: str, payload: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
@@ -2,15 +2,109 @@
 
 from __future__ import annotations
 
+from collections import defaultdict
 from collections.abc import Callable, Sequence
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Any
 
-from sqlalchemy import case, func, nullslast
+from sqlalchemy import and_, case, func, nullslast, or_, select
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.base import ReadOnlyColumnCollection
+from sqlalchemy.sql.elements import ColumnElement, Label
+from sqlalchemy.sql.selectable import Subquery
 
-from ..db.db_models import JobHistoryModel, SlotModel
+from ..db.db_models import DURATION_BUCKETS_SECONDS, JobHistoryModel, SlotModel
 from ..ingest.ingest_models import FailureReason, JobStatus
+from .stats_sketch import DurationSketch
+
+EPOCH = datetime(1970, 1, 1)
+SERIES_COUNTERS = ("jobs", "successes", "timeouts", "errors", "provider_errors")
+
+
+# ряды сворачивают тысячи строк с несколькими десятками разных bucket_start
+@lru_cache(maxsize=4096)
+def align_bucket(moment: datetime, bucket_minutes: int) -> datetime:
+    """Start of the ``bucket_minutes`` bucket (aligned to the epoch, UTC)."""
+    minutes = int((moment - EPOCH).total_seconds() // 60)
+    return EPOCH + timedelta(minutes=minutes - minutes % bucket_minutes)
+
+
+def bucket_starts(
+    window_start: datetime, bucket_minutes: int, now: datetime | None = None
+) -> list[datetime]:
+    """Consecutive bucket starts from the aligned window start to ``now``."""
+    step = timedelta(minutes=bucket_minutes)
+    current = align_bucket(window_start, bucket_minutes)
+    last = align_bucket(now or datetime.utcnow(), bucket_minutes)
+    starts: list[datetime] = []
+    while current <= last:
+        starts.append(current)
+        current += step
+    return starts
+
+
+def series_points(
+    sketches: dict[datetime, DurationSketch],
+    window_start: datetime,
+    bucket_minutes: int,
+    now: datetime | None = None,
+) -> list[dict[str, Any]]:
+    """Latency percentiles for every bucket of the window."""
+    points: list[dict[str, Any]] = []
+    for start in bucket_starts(window_start, bucket_minutes, now):
+        sketch = sketches.get(start) or DurationSketch()
+        points.append(
+            {"bucket_start": start, "count": sketch.count, **sketch.quantiles()}
+        )
+    return points
+
+
+def count_outcome(
+    counters: dict[str, float], status: str, failure_reason: str | None, count: int = 1
+) -> None:
+    """Add ``count`` completed jobs with ``status`` to throughput counters."""
+    if status == JobStatus.DONE.value:
+        counters["successes"] += count
+    elif status == JobStatus.TIMEOUT.value:
+        counters["timeouts"] += count
+    elif status == JobStatus.FAILED.value:
+        counters["errors"] += count
+    if failure_reason == FailureReason.PROVIDER_ERROR.value:
+        counters["provider_errors"] += count
+
+
+def new_counters() -> dict[str, float]:
+    return dict.fromkeys((*SERIES_COUNTERS, "duration_count", "duration_sum_seconds"), 0)
+
+
+def throughput_points(
+    counters: dict[datetime, dict[str, float]],
+    sketches: dict[datetime, DurationSketch],
+    window_start: datetime,
+    bucket_minutes: int,
+    now: datetime | None = None,
+) -> list[dict[str, Any]]:
+    """Job counters with mean and p95 duration for every bucket of the window."""
+    points: list[dict[str, Any]] = []
+    for start in bucket_starts(window_start, bucket_minutes, now):
+        values = counters.get(start) or new_counters()
+        measured = values["duration_count"]
+        sketch = sketches.get(start) or DurationSketch()
+        p95 = sketch.quantile(0.95)
+        points.append(
+            {
+                "bucket_start": start,
+                **{name: int(values[name]) for name in SERIES_COUNTERS},
+                "mean_duration_seconds": (
+                    round(values["duration_sum_seconds"] / measured, 3)
+                    if measured
+                    else None
+                ),
+                "p95_duration_seconds": round(p95, 3) if p95 is not None else None,
+            }
+        )
+    return points
 
 
 class StatsRepository:
@@ -22,102 +116,47 @@ class StatsRepository:
     def system_metrics(self, window_start: datetime) -> dict[str, Any]:
         with self._session_factory() as session:
             total_jobs = session.query(func.count(JobHistoryModel.job_id)).scalar() or 0
-
-            jobs_last_window = (
-                session.query(func.count(JobHistoryModel.job_id))
-                .filter(JobHistoryModel.started_at >= window_start)
-                .scalar()
-                or 0
-            )
-
-            timeouts_last_window = (
-                session.query(func.count(JobHistoryModel.job_id))
-                .filter(
-                    JobHistoryModel.status == JobStatus.TIMEOUT.value,
-                    JobHistoryModel.completed_at >= window_start,
-                )
-                .scalar()
-                or 0
-            )
-
-            provider_errors_last_window = (
-                session.query(func.count(JobHistoryModel.job_id))
-                .filter(
-                    JobHistoryModel.failure_reason
-                    == FailureReason.PROVIDER_ERROR.value,
-                    JobHistoryModel.completed_at >= window_start,
+            row = (
+                session.query(
+                    *self._window_counters(window_start, JobHistoryModel.__table__.c)
                 )
-                .scalar()
-                or 0
+                .filter(self._in_window(window_start))
+                .one()
             )
 
         return {
             "jobs_total": total_jobs,
-            "jobs_last_window": jobs_last_window,
-            "timeouts_last_window": timeouts_last_window,
-            "provider_errors_last_window": provider_errors_last_window,
+            "jobs_last_window": row.jobs or 0,
+            "timeouts_last_window": row.timeouts or 0,
+            "provider_errors_last_window": row.provider_errors or 0,
         }
 
     def slot_metrics(self, window_start: datetime) -> Sequence[dict[str, Any]]:
-        with self._session_factory() as session:
-            slots = session.query(SlotModel).order_by(SlotModel.id).all()
-            metrics: list[dict[str, Any]] = []
-            for slot in slots:
-                slot_id = slot.id
-                jobs_last_window = self._count_jobs(session, slot_id, window_start)
-                timeouts_last_window = self._count_timeouts(
-                    session, slot_id, window_start
-                )
-                provider_errors_last_window = self._count_provider_errors(
-                    session, slot_id, window_start
-                )
-                success_last_window = self._count_success(
-                    session, slot_id, window_start
-                )
-
-                last_success = (
-                    session.query(JobHistoryModel)
-                    .filter(
-                        JobHistoryModel.slot_id == slot_id,
-                        JobHistoryModel.status == JobStatus.DONE.value,
-                    )
-                    .order_by(nullslast(JobHistoryModel.completed_at.desc()))
-                    .first()
-                )
-                last_error = (
-                    session.query(JobHistoryModel)
-                    .filter(
-                        JobHistoryModel.slot_id == slot_id,
-                        JobHistoryModel.failure_reason.isnot(None),
-                    )
-                    .order_by(
-                        nullslast(JobHistoryModel.completed_at.desc()),
-                        JobHistoryModel.started_at.desc(),
-                    )
-                    .first()
-                )
-
-                metrics.append(
-                    {
-                        "slot_id": slot_id,
-                        "display_name": slot.display_name or slot_id,
-                        "is_active": slot.is_active,
-                        "jobs_last_window": jobs_last_window,
-                        "timeouts_last_window": timeouts_last_window,
-                        "provider_errors_last_window": provider_errors_last_window,
-                        "failures_last_window": (
-                            timeouts_last_window + provider_errors_last_window
-                        ),
-                        "success_last_window": success_last_window,
-                        "last_success_at": (
-                            last_success.completed_at if last_success else None
-                        ),
-                        "last_error_reason": (
-                            last_error.failure_reason if last_error else None
-                        ),
-                    }
-                )
-        return metrics
+        """Per-slot window counters and last success/error in a single query."""
+        # окно выбираем по индексам started_at/completed_at и группируем уже
+        # материализованную выборку — иначе планировщик SQLite идёт полным
+        # проходом по индексу slot_id ради GROUP BY
+        window_jobs = (
+            select(
+                JobHistoryModel.slot_id,
+                JobHistoryModel.status,
+                JobHistoryModel.failure_reason,
+                JobHistoryModel.started_at,
+                JobHistoryModel.completed_at,
+            )
+            .where(self._in_window(window_start))
+            .cte("window_jobs")
+            .prefix_with("MATERIALIZED")
+        )
+        counters = (
+            select(
+                window_jobs.c.slot_id,
+                *self._window_counters(window_start, window_jobs.c),
+            )
+            .group_by(window_jobs.c.slot_id)
+            .subquery("counters")
+        )
+        return self._slot_metrics_with(counters)
 
     def recent_failures(
         self,
@@ -234,60 +273,208 @@ class StatsRepository:
                 {
                     "slot_id": slot_id,
                     "provider": provider,
+                    "completed_at": completed_at,
                     "seconds": duration,
                 }
             )
         return durations
 
-    @staticmethod
-    def _count_jobs(session: Session, slot_id: str, window_start: datetime) -> int:
-        return (
-            session.query(func.count(JobHistoryModel.job_id))
-            .filter(
-                JobHistoryModel.slot_id == slot_id,
-                JobHistoryModel.started_at >= window_start,
-            )
-            .scalar()
-            or 0
+    def slot_duration_histograms(
+        self, window_start: datetime
+    ) -> Sequence[dict[str, Any]]:
+        """Cumulative duration histogram per slot/provider for the window."""
+        grouped: dict[tuple[str, str], list[float]] = defaultdict(list)
+        for item in self.slot_durations(window_start):
+            grouped[(item["slot_id"], item["provider"])].append(item["seconds"])
+        return [
+            {
+                "slot_id": slot_id,
+                "provider": provider,
+                "buckets": [
+                    sum(1 for seconds in samples if seconds <= bucket)
+                    for bucket in DURATION_BUCKETS_SECONDS
+                ],
+                "count": len(samples),
+                "sum_seconds": sum(samples),
+            }
+            for (slot_id, provider), samples in sorted(grouped.items())
+        ]
+
+    def slot_latency(self, window_start: datetime) -> dict[str, dict[str, Any]]:
+        """p50/p95/p99 duration per slot for jobs completed in the window."""
+        sketches: dict[str, DurationSketch] = defaultdict(DurationSketch)
+        for item in self.slot_durations(window_start):
+            sketches[item["slot_id"]].add(item["seconds"])
+        return {slot_id: sketch.quantiles() for slot_id, sketch in sketches.items()}
+
+    def latency_series(
+        self,
+        window_start: datetime,
+        bucket_minutes: int,
+        slot_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Latency percentiles per ``bucket_minutes`` bucket (by completion time).
+
+        Buckets are aligned to ``bucket_minutes`` boundaries, so the first one
+        may start before ``window_start``.
+        """
+        return series_points(
+            self._bucket_sketches(window_start, bucket_minutes, slot_id),
+            window_start,
+            bucket_minutes,
         )
 
-    @staticmethod
-    def _count_timeouts(session: Session, slot_id: str, window_start: datetime) -> int:
-        return (
-            session.query(func.count(JobHistoryModel.job_id))
-            .filter(
-                JobHistoryModel.slot_id == slot_id,
-                JobHistoryModel.status == JobStatus.TIMEOUT.value,
-                JobHistoryModel.completed_at >= window_start,
-            )
-            .scalar()
-            or 0
+    def throughput_series(
+        self,
+        window_start: datetime,
+        bucket_minutes: int,
+        slot_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Jobs, outcomes and mean/p95 duration per ``bucket_minutes`` bucket.
+
+        Jobs are counted in the bucket of their start, outcomes and durations
+        in the bucket of their completion.
+        """
+        start = align_bucket(window_start, bucket_minutes)
+        jobs = JobHistoryModel
+        query = select(
+            jobs.status, jobs.failure_reason, jobs.started_at, jobs.completed_at
+        ).where(or_(jobs.started_at >= start, jobs.completed_at >= start))
+        if slot_id is not None:
+            query = query.where(jobs.slot_id == slot_id)
+        counters: dict[datetime, dict[str, float]] = defaultdict(new_counters)
+        with self._session_factory() as session:
+            rows = session.execute(query).all()
+        for status, reason, started_at, completed_at in rows:
+            if started_at is not None and started_at >= start:
+                counters[align_bucket(started_at, bucket_minutes)]["jobs"] += 1
+            if completed_at is None or completed_at < start:
+                continue
+            bucket = counters[align_bucket(completed_at, bucket_minutes)]
+            count_outcome(bucket, status, reason)
+            if started_at is not None and completed_at >= started_at:
+                bucket["duration_count"] += 1
+                bucket["duration_sum_seconds"] += (
+                    completed_at - started_at
+                ).total_seconds()
+        return throughput_points(
+            counters,
+            self._bucket_sketches(window_start, bucket_minutes, slot_id),
+            window_start,
+            bucket_minutes,
         )
 
-    @staticmethod
-    def _count_provider_errors(
-        session: Session, slot_id: str, window_start: datetime
-    ) -> int:
-        return (
-            session.query(func.count(JobHistoryModel.job_id))
-            .filter(
-                JobHistoryModel.slot_id == slot_id,
-                JobHistoryModel.failure_reason == FailureReason.PROVIDER_ERROR.value,
-                JobHistoryModel.completed_at >= window_start,
+    def _bucket_sketches(
+        self, window_start: datetime, bucket_minutes: int, slot_id: str | None
+    ) -> dict[datetime, DurationSketch]:
+        start = align_bucket(window_start, bucket_minutes)
+        sketches: dict[datetime, DurationSketch] = defaultdict(DurationSketch)
+        for item in self.slot_durations(start):
+            if slot_id is not None and item["slot_id"] != slot_id:
+                continue
+            sketches[align_bucket(item["completed_at"], bucket_minutes)].add(
+                item["seconds"]
             )
-            .scalar()
-            or 0
-        )
+        return sketches
 
-    @staticmethod
-    def _count_success(session: Session, slot_id: str, window_start: datetime) -> int:
-        return (
-            session.query(func.count(JobHistoryModel.job_id))
-            .filter(
-                JobHistoryModel.slot_id == slot_id,
+    def _slot_metrics_with(self, counters: Subquery) -> list[dict[str, Any]]:
+        """Join per-slot window counters with the last success/error of each slot.
+
+        ``counters`` must expose ``slot_id``, ``jobs``, ``timeouts``,
+        ``provider_errors`` and ``success`` columns.
+        """
+        # top-1 на слот через коррелированный подзапрос: индексный seek вместо
+        # сортировки всей истории оконной функцией
+        last_success_at = (
+            select(func.max(JobHistoryModel.completed_at))
+            .where(
+                JobHistoryModel.slot_id == SlotModel.id,
                 JobHistoryModel.status == JobStatus.DONE.value,
-                JobHistoryModel.completed_at >= window_start,
             )
-            .scalar()
-            or 0
+            .scalar_subquery()
         )
+        last_error_reason = (
+            select(JobHistoryModel.failure_reason)
+            .where(
+                JobHistoryModel.slot_id == SlotModel.id,
+                JobHistoryModel.failure_reason.isnot(None),
+            )
+            .order_by(
+                nullslast(JobHistoryModel.completed_at.desc()),
+                JobHistoryModel.started_at.desc(),
+            )
+            .limit(1)
+            .scalar_subquery()
+        )
+        query = (
+            select(
+                SlotModel.id,
+                SlotModel.display_name,
+                SlotModel.is_active,
+                counters.c.jobs,
+                counters.c.timeouts,
+                counters.c.provider_errors,
+                counters.c.success,
+                last_success_at.label("last_success_at"),
+                last_error_reason.label("last_error_reason"),
+            )
+            .outerjoin(counters, counters.c.slot_id == SlotModel.id)
+            .order_by(SlotModel.id)
+        )
+        with self._session_factory() as session:
+            rows = session.execute(query).all()
+
+        metrics: list[dict[str, Any]] = []
+        for row in rows:
+            timeouts_last_window = row.timeouts or 0
+            provider_errors_last_window = row.provider_errors or 0
+            metrics.append(
+                {
+                    "slot_id": row.id,
+                    "display_name": row.display_name or row.id,
+                    "is_active": row.is_active,
+                    "jobs_last_window": row.jobs or 0,
+                    "timeouts_last_window": timeouts_last_window,
+                    "provider_errors_last_window": provider_errors_last_window,
+                    "failures_last_window": (
+                        timeouts_last_window + provider_errors_last_window
+                    ),
+                    "success_last_window": row.success or 0,
+                    "last_success_at": row.last_success_at,
+                    "last_error_reason": row.last_error_reason,
+                }
+            )
+        return metrics
+
+    @staticmethod
+    def _in_window(window_start: datetime) -> ColumnElement[bool]:
+        # completed_at >= started_at, но pending-задачи без completed_at
+        # учитываются только по started_at
+        return or_(
+            JobHistoryModel.started_at >= window_start,
+            JobHistoryModel.completed_at >= window_start,
+        )
+
+    @staticmethod
+    def _window_counters(
+        window_start: datetime, columns: ReadOnlyColumnCollection[str, Any]
+    ) -> list[Label[Any]]:
+        """Conditional SUMs shared by system and per-slot window metrics."""
+
+        def _count_if(*conditions: ColumnElement[bool]) -> Any:
+            return func.sum(case((and_(*conditions), 1), else_=0))
+
+        completed_in_window = columns.completed_at >= window_start
+        return [
+            _count_if(columns.started_at >= window_start).label("jobs"),
+            _count_if(
+                columns.status == JobStatus.TIMEOUT.value, completed_in_window
+            ).label("timeouts"),
+            _count_if(
+                columns.failure_reason == FailureReason.PROVIDER_ERROR.value,
+                completed_in_window,
+            ).label("provider_errors"),
+            _count_if(
+                columns.status == JobStatus.DONE.value, completed_in_window
+            ).label("success"),
+        ]
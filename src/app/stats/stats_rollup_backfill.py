@@ -0,0 +1,72 @@
+"""Background backfill of the rollup tables from existing job history."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from ..db.db_executor import run_db, run_db_write
+from .stats_rollup_repository import StatsRollupRepository
+
+
+@dataclass(slots=True)
+class RollupBackfill:
+    """Roll up history that predates the rollup tables, one ``chunk`` per write.
+
+    A full :meth:`StatsRollupRepository.rebuild` is one transaction of tens of
+    seconds on a large history; on the single SQLite writer it would hold up
+    every ingest write queued behind it. Here each chunk is its own
+    ``run_db_write`` call, so writes issued meanwhile run between chunks.
+    Chunks go newest first: recent windows are correct soonest, and a
+    backfill cut short by a restart resumes from
+    :meth:`StatsRollupRepository.pending_backfill`. ``on_done`` (seeding
+    ``/metrics`` counters from the rollups) runs afterwards, backfill or not.
+    """
+
+    repo: StatsRollupRepository
+    on_done: Callable[[], None] | None = None
+    chunk: timedelta = timedelta(hours=1)
+    log: logging.Logger = field(default_factory=lambda: logging.getLogger(__name__))
+    _task: asyncio.Task[int] | None = field(default=None, init=False)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="stats-rollup-backfill")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def run(self) -> int:
+        """Backfill pending hours and return rows written."""
+        pending = await run_db(self.repo.pending_backfill)
+        rows = 0
+        if pending is not None:
+            since, until = pending
+            self.log.info(
+                "stats.rollup.backfill_started",
+                extra={"since": since.isoformat(), "until": until.isoformat()},
+            )
+            while until > since:
+                lower = max(until - self.chunk, since)
+                rows += await run_db_write(self.repo.rebuild, lower, until)
+                until = lower
+            self.log.info("stats.rollup.backfill_done", extra={"rows": rows})
+        if self.on_done is not None:
+            await run_db(self.on_done)
+        return rows
+
+    async def _run(self) -> int:
+        try:
+            return await self.run()
+        except Exception:
+            self.log.exception("stats.rollup.backfill_failed")
+            return 0
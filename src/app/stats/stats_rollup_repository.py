@@ -0,0 +1,818 @@
+"""Statistics backed by the pre-aggregated job_stats_rollup table."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import DateTime, and_, case, delete, func, or_, select, type_coerce
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement, Label
+
+from ..db.db_models import (
+    DURATION_BUCKETS_SECONDS,
+    JobDurationSketchModel,
+    JobHistoryModel,
+    JobStatsRollupModel,
+    SlotModel,
+)
+from ..ingest.ingest_models import FailureReason, JobOutcome, JobStatus
+from .stats_repository import (
+    StatsRepository,
+    align_bucket,
+    count_outcome,
+    new_counters,
+    series_points,
+    throughput_points,
+)
+from .stats_sketch import DurationSketch, bin_index
+
+logger = logging.getLogger(__name__)
+
+MINUTE = "minute"
+HOUR = "hour"
+TOTAL = "total"
+TOTAL_BUCKET = datetime(1970, 1, 1)
+# минутные корзины читаются только на краях окна (до MAX_WINDOW_MINUTES назад)
+MINUTE_RETENTION = timedelta(days=3, hours=1)
+# старт задачи хранится отдельной строкой со статусом pending
+STARTED_STATUS = JobStatus.PENDING.value
+
+KEY_COLUMNS = (
+    "resolution",
+    "bucket_start",
+    "slot_id",
+    "provider",
+    "status",
+    "failure_reason",
+)
+SKETCH_KEY_COLUMNS = ("resolution", "bucket_start", "slot_id", "provider", "bin")
+HISTOGRAM_COLUMNS = tuple(f"duration_le_{bucket}" for bucket in DURATION_BUCKETS_SECONDS)
+COUNTER_COLUMNS = (
+    "started",
+    "completed",
+    "duration_count",
+    "duration_sum_seconds",
+    *HISTOGRAM_COLUMNS,
+)
+
+RollupKey = tuple[Any, ...]
+# (resolution, bucket_start, slot_id, provider, bin)
+SketchKey = tuple[str, datetime, str, str, int]
+
+
+def bucket_start(resolution: str, moment: datetime) -> datetime:
+    """Return the start of the ``resolution`` bucket containing ``moment``."""
+    if resolution == MINUTE:
+        return moment.replace(second=0, microsecond=0)
+    if resolution == HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return TOTAL_BUCKET
+
+
+def _series_resolution(bucket_minutes: int) -> str:
+    """Whole-hour series buckets are folded from hour rows, others from minutes."""
+    return HOUR if bucket_minutes % 60 == 0 else MINUTE
+
+
+def _ceil_hour(moment: datetime) -> datetime:
+    floor = bucket_start(HOUR, moment)
+    return floor if floor == moment else floor + timedelta(hours=1)
+
+
+@dataclass(slots=True)
+class RollupBatch:
+    """Rollup increments merged per bucket key before a single upsert."""
+
+    rows: dict[RollupKey, dict[str, float]] = field(default_factory=dict)
+    sketches: dict[SketchKey, int] = field(default_factory=dict)
+
+    def add_start(self, *, slot_id: str, provider: str, started_at: datetime) -> None:
+        for resolution in (MINUTE, HOUR, TOTAL):
+            self.merge(
+                (
+                    resolution,
+                    bucket_start(resolution, started_at),
+                    slot_id,
+                    provider,
+                    STARTED_STATUS,
+                    "",
+                ),
+                {"started": 1},
+            )
+
+    def add_completion(
+        self,
+        *,
+        slot_id: str,
+        provider: str,
+        status: str,
+        failure_reason: str | None,
+        completed_at: datetime,
+        duration_seconds: float | None,
+    ) -> None:
+        counters: dict[str, float] = {"completed": 1}
+        if duration_seconds is not None:
+            counters["duration_count"] = 1
+            counters["duration_sum_seconds"] = duration_seconds
+            for bucket, column in zip(DURATION_BUCKETS_SECONDS, HISTOGRAM_COLUMNS):
+                if duration_seconds <= bucket:
+                    counters[column] = 1
+        for resolution in (MINUTE, HOUR, TOTAL):
+            self.merge(
+                (
+                    resolution,
+                    bucket_start(resolution, completed_at),
+                    slot_id,
+                    provider,
+                    status,
+                    failure_reason or "",
+                ),
+                counters,
+            )
+            if duration_seconds is not None:
+                self.merge_sketch(
+                    (
+                        resolution,
+                        bucket_start(resolution, completed_at),
+                        slot_id,
+                        provider,
+                        bin_index(duration_seconds),
+                    ),
+                    1,
+                )
+
+    def merge(self, key: RollupKey, counters: dict[str, Any], sign: int = 1) -> None:
+        row = self.rows.setdefault(key, dict.fromkeys(COUNTER_COLUMNS, 0))
+        for name, value in counters.items():
+            row[name] += sign * (value or 0)
+
+    def merge_sketch(self, key: SketchKey, count: int, sign: int = 1) -> None:
+        self.sketches[key] = self.sketches.get(key, 0) + sign * count
+
+    def to_rows(self) -> list[dict[str, Any]]:
+        return [
+            {**dict(zip(KEY_COLUMNS, key)), **counters}
+            for key, counters in self.rows.items()
+            if any(counters.values())
+        ]
+
+    def sketch_rows(self) -> list[dict[str, Any]]:
+        return [
+            {**dict(zip(SKETCH_KEY_COLUMNS, key)), "count": count}
+            for key, count in self.sketches.items()
+            if count
+        ]
+
+
+class StatsRollupRepository(StatsRepository):
+    """Statistics read from per-minute/per-hour rollups instead of raw job_history.
+
+    Window and all-time counters touch a bounded number of buckets, so their
+    cost does not grow with history size. Last success/error per slot and the
+    recent failures list still come from indexed job_history lookups. Rollups
+    count finished jobs only: ingest adds a job via :meth:`record_outcome`
+    once it completes, and :meth:`rebuild` recomputes buckets the same way.
+    Latency sketches (``job_duration_sketch``) share the bucket keys and are
+    maintained alongside the counters.
+    """
+
+    def record_outcome(self, outcome: JobOutcome) -> None:
+        """Ingest completion hook: add the job start and outcome to the rollups.
+
+        The provider key is the slot's, as in :meth:`rebuild` (job_history
+        does not keep it), not ``outcome.provider``, which a test-run override
+        may change.
+        """
+        if outcome.started_at is None and outcome.completed_at is None:
+            return
+        with self._session_factory() as session:
+            provider = session.scalar(
+                select(SlotModel.provider).where(SlotModel.id == outcome.slot_id)
+            )
+            if provider is None:
+                return  # слот удалён — rebuild такие задачи тоже не считает
+            batch = RollupBatch()
+            if outcome.started_at is not None:
+                batch.add_start(
+                    slot_id=outcome.slot_id,
+                    provider=provider,
+                    started_at=outcome.started_at,
+                )
+            if outcome.completed_at is not None:
+                batch.add_completion(
+                    slot_id=outcome.slot_id,
+                    provider=provider,
+                    status=outcome.status,
+                    failure_reason=outcome.failure_reason,
+                    completed_at=outcome.completed_at,
+                    duration_seconds=outcome.duration_seconds,
+                )
+            self._upsert(session, batch.to_rows())
+            self._upsert_sketches(session, batch.sketch_rows())
+            session.commit()
+
+    def rebuild(
+        self, since: datetime | None = None, until: datetime | None = None
+    ) -> int:
+        """Recompute rollup buckets from job_history and return rows written.
+
+        The ``[since, until)`` range is widened to whole hours and the totals are
+        corrected by the difference between old and new hour buckets. Without
+        ``since`` every bucket, including the all-time totals, is rebuilt and
+        ``until`` is ignored. Minute buckets are only rebuilt within retention.
+        """
+        now = datetime.utcnow()
+        range_start = bucket_start(HOUR, since) if since is not None else None
+        range_end = _ceil_hour(until or now) if range_start is not None else None
+        minute_since = bucket_start(MINUTE, now - MINUTE_RETENTION)
+        rollup = JobStatsRollupModel
+
+        sketch = JobDurationSketchModel
+
+        stale = delete(rollup)
+        stale_sketches = delete(sketch)
+        if range_start is not None:
+            stale = stale.where(
+                rollup.resolution.in_([MINUTE, HOUR]),
+                rollup.bucket_start >= range_start,
+                rollup.bucket_start < range_end,
+            )
+            stale_sketches = stale_sketches.where(
+                sketch.resolution.in_([MINUTE, HOUR]),
+                sketch.bucket_start >= range_start,
+                sketch.bucket_start < range_end,
+            )
+
+        with self._session_factory() as session:
+            dialect = session.get_bind().dialect.name
+            batch = RollupBatch()
+            for resolution, lower in (
+                (MINUTE, max(range_start or minute_since, minute_since)),
+                (HOUR, range_start),
+            ):
+                for key, counters in self._aggregate_history(
+                    session, dialect, resolution, lower, range_end
+                ):
+                    batch.merge(key, counters)
+            for key, count in self._aggregate_sketches(
+                session,
+                {
+                    MINUTE: max(range_start or minute_since, minute_since),
+                    HOUR: range_start,
+                },
+                range_end,
+            ):
+                batch.merge_sketch(key, count)
+
+            totals = RollupBatch()
+            for (resolution, _, *key), counters in batch.rows.items():
+                if resolution == HOUR:
+                    totals.merge((TOTAL, TOTAL_BUCKET, *key), counters)
+            for (resolution, _, *sketch_key), count in batch.sketches.items():
+                if resolution == HOUR:
+                    totals.merge_sketch((TOTAL, TOTAL_BUCKET, *sketch_key), count)
+            if range_start is not None:
+                # частичный пересчёт: total += новые часовые корзины − заменяемые
+                old_hours = session.execute(
+                    select(rollup).where(
+                        rollup.resolution == HOUR,
+                        rollup.bucket_start >= range_start,
+                        rollup.bucket_start < range_end,
+                    )
+                ).scalars()
+                for old in old_hours:
+                    totals.merge(
+                        (
+                            TOTAL,
+                            TOTAL_BUCKET,
+                            old.slot_id,
+                            old.provider,
+                            old.status,
+                            old.failure_reason,
+                        ),
+                        {name: getattr(old, name) for name in COUNTER_COLUMNS},
+                        sign=-1,
+                    )
+                old_sketches = session.execute(
+                    select(sketch).where(
+                        sketch.resolution == HOUR,
+                        sketch.bucket_start >= range_start,
+                        sketch.bucket_start < range_end,
+                    )
+                ).scalars()
+                for old in old_sketches:
+                    totals.merge_sketch(
+                        (TOTAL, TOTAL_BUCKET, old.slot_id, old.provider, old.bin),
+                        old.count,
+                        sign=-1,
+                    )
+
+            rows = batch.to_rows() + totals.to_rows()
+            sketch_rows = batch.sketch_rows() + totals.sketch_rows()
+            session.execute(stale)
+            session.execute(stale_sketches)
+            if rows:
+                self._upsert(session, rows)
+            self._upsert_sketches(session, sketch_rows)
+            session.commit()
+        logger.info(
+            "stats.rollup.rebuilt",
+            extra={
+                "since": range_start.isoformat() if range_start else None,
+                "until": range_end.isoformat() if range_end else None,
+                "rows": len(rows),
+                "sketch_rows": len(sketch_rows),
+            },
+        )
+        return len(rows) + len(sketch_rows)
+
+    def pending_backfill(self) -> tuple[datetime, datetime] | None:
+        """Whole hours of job history not rolled up yet, as ``[since, until)``.
+
+        History before the first hour bucket predates the rollup tables (first
+        start on an existing database) or an interrupted backfill, which fills
+        hours newest first. The first bucket's own hour is included: the
+        completion hook may have filled it only partly. Without sketches all
+        history up to now is pending. ``None`` when nothing is.
+        """
+        with self._session_factory() as session:
+            first_job = session.scalar(select(func.min(JobHistoryModel.started_at)))
+            first_hour = session.scalar(
+                select(func.min(JobStatsRollupModel.bucket_start)).where(
+                    JobStatsRollupModel.resolution == HOUR
+                )
+            )
+            has_sketches = session.scalar(
+                select(JobDurationSketchModel.slot_id).limit(1)
+            )
+        if first_job is None:
+            return None
+        since = bucket_start(HOUR, first_job)
+        if first_hour is None or has_sketches is None:
+            return since, _ceil_hour(datetime.utcnow())
+        if first_hour <= since:
+            return None
+        return since, first_hour + timedelta(hours=1)
+
+    def prune(self, now: datetime | None = None) -> int:
+        """Drop minute buckets past retention; hour and total buckets are kept."""
+        cutoff = (now or datetime.utcnow()) - MINUTE_RETENTION
+        removed = 0
+        with self._session_factory() as session:
+            for model in (JobStatsRollupModel, JobDurationSketchModel):
+                result = session.execute(
+                    delete(model).where(
+                        model.resolution == MINUTE, model.bucket_start < cutoff
+                    )
+                )
+                removed += result.rowcount or 0
+            session.commit()
+        return removed
+
+    def system_metrics(self, window_start: datetime) -> dict[str, Any]:
+        rollup = JobStatsRollupModel
+        with self._session_factory() as session:
+            total_jobs = session.scalar(
+                select(func.sum(rollup.started)).where(rollup.resolution == TOTAL)
+            )
+            row = session.execute(
+                select(*self._rollup_counters()).where(self._window(window_start))
+            ).one()
+
+        return {
+            "jobs_total": total_jobs or 0,
+            "jobs_last_window": row.jobs or 0,
+            "timeouts_last_window": row.timeouts or 0,
+            "provider_errors_last_window": row.provider_errors or 0,
+        }
+
+    def slot_metrics(self, window_start: datetime) -> Sequence[dict[str, Any]]:
+        """Per-slot window counters from rollups plus last success/error."""
+        rollup = JobStatsRollupModel
+        counters = (
+            select(rollup.slot_id, *self._rollup_counters())
+            .where(self._window(window_start))
+            .group_by(rollup.slot_id)
+            .subquery("counters")
+        )
+        return self._slot_metrics_with(counters)
+
+    def slot_totals(self) -> Sequence[dict[str, Any]]:
+        """Total counters per slot/provider (all time) from the total buckets."""
+        rollup = JobStatsRollupModel
+        totals = (
+            select(rollup.slot_id, *self._rollup_counters())
+            .where(rollup.resolution == TOTAL)
+            .group_by(rollup.slot_id)
+            .subquery("totals")
+        )
+        query = (
+            select(
+                SlotModel.id,
+                SlotModel.provider,
+                totals.c.jobs,
+                totals.c.timeouts,
+                totals.c.provider_errors,
+                totals.c.success,
+            )
+            .outerjoin(totals, totals.c.slot_id == SlotModel.id)
+            .order_by(SlotModel.id)
+        )
+        with self._session_factory() as session:
+            rows = session.execute(query).all()
+        return [
+            {
+                "slot_id": row.id,
+                "provider": row.provider,
+                "jobs_total": row.jobs or 0,
+                "timeouts_total": row.timeouts or 0,
+                "provider_errors_total": row.provider_errors or 0,
+                "success_total": row.success or 0,
+            }
+            for row in rows
+        ]
+
+    def slot_duration_histograms(
+        self, window_start: datetime
+    ) -> Sequence[dict[str, Any]]:
+        """Cumulative duration histogram per slot/provider from rollup buckets."""
+        return self._slot_histograms(self._window(window_start))
+
+    def slot_total_histograms(self) -> Sequence[dict[str, Any]]:
+        """All-time duration histogram per slot/provider (seeds /metrics)."""
+        return self._slot_histograms(JobStatsRollupModel.resolution == TOTAL)
+
+    def _slot_histograms(
+        self, condition: ColumnElement[bool]
+    ) -> Sequence[dict[str, Any]]:
+        rollup = JobStatsRollupModel
+        duration_count = func.sum(rollup.duration_count)
+        query = (
+            select(
+                rollup.slot_id,
+                SlotModel.provider,
+                duration_count.label("count"),
+                func.sum(rollup.duration_sum_seconds).label("sum_seconds"),
+                *[
+                    func.sum(getattr(rollup, column)).label(column)
+                    for column in HISTOGRAM_COLUMNS
+                ],
+            )
+            .join(SlotModel, SlotModel.id == rollup.slot_id)
+            .where(condition)
+            .group_by(rollup.slot_id, SlotModel.provider)
+            .having(duration_count > 0)
+            .order_by(rollup.slot_id)
+        )
+        with self._session_factory() as session:
+            rows = session.execute(query).all()
+        return [
+            {
+                "slot_id": row.slot_id,
+                "provider": row.provider,
+                "buckets": [int(getattr(row, column)) for column in HISTOGRAM_COLUMNS],
+                "count": int(row.count),
+                "sum_seconds": float(row.sum_seconds),
+            }
+            for row in rows
+        ]
+
+    def slot_latency(self, window_start: datetime) -> dict[str, dict[str, Any]]:
+        """p50/p95/p99 per slot merged from the sketch buckets of the window."""
+        sketch = JobDurationSketchModel
+        query = (
+            select(sketch.slot_id, sketch.bin, func.sum(sketch.count))
+            .where(self._window(window_start, sketch))
+            .group_by(sketch.slot_id, sketch.bin)
+        )
+        sketches: dict[str, DurationSketch] = {}
+        with self._session_factory() as session:
+            for slot_id, index, count in session.execute(query):
+                sketches.setdefault(slot_id, DurationSketch()).add_bin(index, count)
+        return {slot_id: item.quantiles() for slot_id, item in sketches.items()}
+
+    def latency_series(
+        self,
+        window_start: datetime,
+        bucket_minutes: int,
+        slot_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Latency percentiles per bucket merged from hour or minute sketches.
+
+        Hour sketches serve buckets that are whole hours; shorter buckets are
+        built from minute sketches and are limited by ``MINUTE_RETENTION``.
+        """
+        return series_points(
+            self._bucket_sketches(window_start, bucket_minutes, slot_id),
+            window_start,
+            bucket_minutes,
+        )
+
+    def throughput_series(
+        self,
+        window_start: datetime,
+        bucket_minutes: int,
+        slot_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Per-bucket counters and mean/p95 duration from rollup buckets.
+
+        One GROUP BY over the hour (or minute) counter buckets plus one over the
+        matching sketches; both are folded into ``bucket_minutes`` buckets here.
+        """
+        rollup = JobStatsRollupModel
+        query = (
+            select(
+                rollup.bucket_start,
+                rollup.status,
+                rollup.failure_reason,
+                func.sum(rollup.started),
+                func.sum(rollup.completed),
+                func.sum(rollup.duration_count),
+                func.sum(rollup.duration_sum_seconds),
+            )
+            .where(
+                rollup.resolution == _series_resolution(bucket_minutes),
+                rollup.bucket_start >= align_bucket(window_start, bucket_minutes),
+            )
+            .group_by(rollup.bucket_start, rollup.status, rollup.failure_reason)
+        )
+        if slot_id is not None:
+            query = query.where(rollup.slot_id == slot_id)
+        counters: dict[datetime, dict[str, float]] = {}
+        with self._session_factory() as session:
+            rows = session.execute(query).all()
+        for start, status, reason, started, completed, measured, seconds in rows:
+            bucket = counters.setdefault(
+                align_bucket(start, bucket_minutes), new_counters()
+            )
+            bucket["jobs"] += started
+            count_outcome(bucket, status, reason, completed)
+            bucket["duration_count"] += measured
+            bucket["duration_sum_seconds"] += seconds
+        return throughput_points(
+            counters,
+            self._bucket_sketches(window_start, bucket_minutes, slot_id),
+            window_start,
+            bucket_minutes,
+        )
+
+    def recent_sketches(self, since: datetime) -> Sequence[dict[str, Any]]:
+        """Minute sketch rows since ``since`` (seeds the /metrics summaries)."""
+        sketch = JobDurationSketchModel
+        query = select(
+            sketch.bucket_start, sketch.slot_id, sketch.provider, sketch.bin, sketch.count
+        ).where(sketch.resolution == MINUTE, sketch.bucket_start >= since)
+        with self._session_factory() as session:
+            rows = session.execute(query).all()
+        return [
+            {
+                "bucket_start": row.bucket_start,
+                "slot_id": row.slot_id,
+                "provider": row.provider,
+                "bin": row.bin,
+                "count": row.count,
+            }
+            for row in rows
+        ]
+
+    def _bucket_sketches(
+        self, window_start: datetime, bucket_minutes: int, slot_id: str | None
+    ) -> dict[datetime, DurationSketch]:
+        sketch = JobDurationSketchModel
+        query = (
+            select(sketch.bucket_start, sketch.bin, func.sum(sketch.count))
+            .where(
+                sketch.resolution == _series_resolution(bucket_minutes),
+                sketch.bucket_start >= align_bucket(window_start, bucket_minutes),
+            )
+            .group_by(sketch.bucket_start, sketch.bin)
+        )
+        if slot_id is not None:
+            query = query.where(sketch.slot_id == slot_id)
+        sketches: dict[datetime, DurationSketch] = {}
+        with self._session_factory() as session:
+            for start, index, count in session.execute(query):
+                sketches.setdefault(
+                    align_bucket(start, bucket_minutes), DurationSketch()
+                ).add_bin(index, count)
+        return sketches
+
+    @staticmethod
+    def _aggregate_sketches(
+        session: Session,
+        lowers: dict[str, datetime | None],
+        upper: datetime | None,
+    ) -> Iterable[tuple[SketchKey, int]]:
+        """Bin job durations into sketch buckets per resolution.
+
+        Log bins are not expressible portably in SQL, so completed jobs are
+        streamed and binned here; ``lowers`` gives each resolution's lower bound.
+        """
+        jobs = JobHistoryModel
+        conditions = [jobs.completed_at.isnot(None), jobs.started_at.isnot(None)]
+        if all(lower is not None for lower in lowers.values()):
+            conditions.append(jobs.completed_at >= min(lowers.values()))
+        if upper is not None:
+            conditions.append(jobs.completed_at < upper)
+        query = (
+            select(jobs.slot_id, SlotModel.provider, jobs.started_at, jobs.completed_at)
+            .join(SlotModel, SlotModel.id == jobs.slot_id)
+            .where(*conditions)
+            .execution_options(yield_per=10_000)
+        )
+        counts: dict[SketchKey, int] = {}
+        for slot_id, provider, started_at, completed_at in session.execute(query):
+            duration = (completed_at - started_at).total_seconds()
+            if duration < 0:
+                continue
+            index = bin_index(duration)
+            for resolution, lower in lowers.items():
+                if lower is not None and completed_at < lower:
+                    continue
+                key = (
+                    resolution,
+                    bucket_start(resolution, completed_at),
+                    slot_id,
+                    provider,
+                    index,
+                )
+                counts[key] = counts.get(key, 0) + 1
+        return counts.items()
+
+    @staticmethod
+    def _aggregate_history(
+        session: Session,
+        dialect: str,
+        resolution: str,
+        lower: datetime | None,
+        upper: datetime | None,
+    ) -> Iterable[tuple[RollupKey, dict[str, Any]]]:
+        """GROUP BY job_history into ``resolution`` buckets (finished jobs only)."""
+        jobs = JobHistoryModel
+
+        def _between(column: Any) -> list[ColumnElement[bool]]:
+            conditions = []
+            if lower is not None:
+                conditions.append(column >= lower)
+            if upper is not None:
+                conditions.append(column < upper)
+            return conditions
+
+        started_bucket = _truncate(jobs.started_at, resolution, dialect)
+        starts = (
+            select(started_bucket, jobs.slot_id, SlotModel.provider, func.count())
+            .join(SlotModel, SlotModel.id == jobs.slot_id)
+            .where(jobs.completed_at.isnot(None), *_between(jobs.started_at))
+            .group_by(started_bucket, jobs.slot_id, SlotModel.provider)
+        )
+        for bucket, slot_id, provider, started in session.execute(starts):
+            yield (
+                (resolution, bucket, slot_id, provider, STARTED_STATUS, ""),
+                {"started": started},
+            )
+
+        completed_bucket = _truncate(jobs.completed_at, resolution, dialect)
+        failure_reason = func.coalesce(jobs.failure_reason, "")
+        duration = _duration_seconds(jobs.started_at, jobs.completed_at, dialect)
+        measured = duration >= 0
+
+        def _count_if(condition: ColumnElement[bool]) -> Any:
+            return func.sum(case((condition, 1), else_=0))
+
+        completions = (
+            select(
+                completed_bucket,
+                jobs.slot_id,
+                SlotModel.provider,
+                jobs.status,
+                failure_reason,
+                func.count(),
+                _count_if(measured),
+                func.sum(case((measured, duration), else_=0)),
+                *[
+                    _count_if(and_(measured, duration <= bucket))
+                    for bucket in DURATION_BUCKETS_SECONDS
+                ],
+            )
+            .join(SlotModel, SlotModel.id == jobs.slot_id)
+            .where(jobs.completed_at.isnot(None), *_between(jobs.completed_at))
+            .group_by(
+                completed_bucket,
+                jobs.slot_id,
+                SlotModel.provider,
+                jobs.status,
+                failure_reason,
+            )
+        )
+        for bucket, slot_id, provider, status, reason, *counters in session.execute(
+            completions
+        ):
+            yield (
+                (resolution, bucket, slot_id, provider, status, reason),
+                dict(zip(COUNTER_COLUMNS[1:], counters)),
+            )
+
+    @staticmethod
+    def _window(
+        window_start: datetime,
+        rollup: type[JobStatsRollupModel] | type[JobDurationSketchModel] = (
+            JobStatsRollupModel
+        ),
+    ) -> ColumnElement[bool]:
+        """Select buckets covering ``[window_start, now]`` (minute precision).
+
+        Whole hours inside the window are read from hour buckets, the partial
+        hours at both edges from minute buckets. Works for the counter and the
+        sketch tables, which share the bucket columns.
+        """
+        first_minute = bucket_start(MINUTE, window_start)
+        first_hour = _ceil_hour(window_start)
+        current_hour = bucket_start(HOUR, datetime.utcnow())
+        if first_hour >= current_hour:
+            return and_(rollup.resolution == MINUTE, rollup.bucket_start >= first_minute)
+        return or_(
+            and_(
+                rollup.resolution == MINUTE,
+                rollup.bucket_start >= first_minute,
+                rollup.bucket_start < first_hour,
+            ),
+            and_(
+                rollup.resolution == HOUR,
+                rollup.bucket_start >= first_hour,
+                rollup.bucket_start < current_hour,
+            ),
+            and_(rollup.resolution == MINUTE, rollup.bucket_start >= current_hour),
+        )
+
+    @staticmethod
+    def _rollup_counters() -> list[Label[Any]]:
+        """Rollup equivalents of :meth:`StatsRepository._window_counters`."""
+        rollup = JobStatsRollupModel
+
+        def _completed_if(condition: ColumnElement[bool]) -> Any:
+            return func.sum(case((condition, rollup.completed), else_=0))
+
+        return [
+            func.sum(rollup.started).label("jobs"),
+            _completed_if(rollup.status == JobStatus.TIMEOUT.value).label("timeouts"),
+            _completed_if(
+                rollup.failure_reason == FailureReason.PROVIDER_ERROR.value
+            ).label("provider_errors"),
+            _completed_if(rollup.status == JobStatus.DONE.value).label("success"),
+        ]
+
+    @staticmethod
+    def _upsert(session: Session, rows: list[dict[str, Any]]) -> None:
+        """Add counters to existing buckets (INSERT ... ON CONFLICT DO UPDATE)."""
+        table = JobStatsRollupModel.__table__
+        dialect = session.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(KEY_COLUMNS),
+            set_={
+                name: table.c[name] + statement.excluded[name]
+                for name in COUNTER_COLUMNS
+            },
+        )
+        session.execute(statement, rows)
+
+    @staticmethod
+    def _upsert_sketches(session: Session, rows: list[dict[str, Any]]) -> None:
+        """Add bin counts to existing sketch buckets."""
+        if not rows:
+            return
+        table = JobDurationSketchModel.__table__
+        dialect = session.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(SKETCH_KEY_COLUMNS),
+            set_={"count": table.c.count + statement.excluded.count},
+        )
+        session.execute(statement, rows)
+
+
+def _truncate(column: Any, resolution: str, dialect: str) -> ColumnElement[Any]:
+    """Bucket start of ``column`` computed in SQL (same as :func:`bucket_start`)."""
+    if dialect == "postgresql":
+        return func.date_trunc(resolution, column)
+    pattern = "%Y-%m-%d %H:%M:00" if resolution == MINUTE else "%Y-%m-%d %H:00:00"
+    return type_coerce(func.strftime(pattern, column), DateTime)
+
+
+def _duration_seconds(
+    started_at: Any, completed_at: Any, dialect: str
+) -> ColumnElement[Any]:
+    if dialect == "postgresql":
+        return func.extract("epoch", completed_at - started_at)
+    # julianday хранит дни в double: округляем до миллисекунд, чтобы границы
+    # корзин гистограммы (10 с, 48 с) не «плыли» из-за погрешности
+    return func.round(
+        (func.julianday(completed_at) - func.julianday(started_at)) * 86400.0, 3
+    )
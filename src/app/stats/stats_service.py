@@ -2,17 +2,20 @@
 
 from __future__ import annotations
 
-import os
+from collections.abc import Callable
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from pathlib import Path
 from typing import Any
 
-from ..config import MediaPaths
 from ..ingest.ingest_models import FailureReason
+from ..repositories.storage_ledger import ARCHIVE_SCOPE, OBJECT_SCOPE, StorageLedger
 from .stats_repository import StatsRepository
 
 MAX_WINDOW_MINUTES = 4320
+MAX_BUCKET_MINUTES = 1440
+# результат переезжает между слоями (каталог задачи, общий object store, архив) —
+# объём хранилища считаем по всем трём, иначе архивация «освобождает» место
+RESULT_STORAGE_SCOPES = ("result", OBJECT_SCOPE, ARCHIVE_SCOPE)
 
 
 @dataclass(slots=True)
@@ -20,7 +23,7 @@ class StatsService:
     """Aggregate ingest statistics for admin UI."""
 
     repo: StatsRepository
-    media_paths: MediaPaths
+    ledger: StorageLedger
 
     def overview(self, window_minutes: int = 60) -> dict[str, Any]:
         """Return system + slot metrics for the requested time window."""
@@ -28,9 +31,10 @@ class StatsService:
         window_start = datetime.utcnow() - timedelta(minutes=window_minutes)
         system = self.repo.system_metrics(window_start)
         slots = self.repo.slot_metrics(window_start)
-        system["storage_usage_mb"] = self._calc_storage_usage_mb(
-            self.media_paths.results
+        usage_bytes = sum(
+            self.ledger.usage_bytes(scope) for scope in RESULT_STORAGE_SCOPES
         )
+        system["storage_usage_mb"] = round(usage_bytes / (1024 * 1024), 2)
         return {
             "window_minutes": window_minutes,
             "system": system,
@@ -42,6 +46,7 @@ class StatsService:
         window_minutes = max(1, min(window_minutes, MAX_WINDOW_MINUTES))
         window_start = datetime.utcnow() - timedelta(minutes=window_minutes)
         raw_slots = self.repo.slot_metrics(window_start)
+        latency = self.repo.slot_latency(window_start)
         recent_failures = [
             {
                 "finished_at": item.get("finished_at"),
@@ -57,24 +62,55 @@ class StatsService:
         for slot in raw_slots:
             if not slot.get("is_active"):
                 continue
-            active_slots.append(self._augment_slot_metrics(slot))
+            enriched = self._augment_slot_metrics(slot)
+            quantiles = latency.get(slot["slot_id"], {})
+            for label in ("p50", "p95", "p99"):
+                enriched[f"latency_{label}_seconds"] = quantiles.get(label)
+            active_slots.append(enriched)
         return {
             "window_minutes": window_minutes,
             "slots": active_slots,
             "recent_failures": recent_failures,
         }
 
+    def latency_series(
+        self,
+        window_minutes: int = 60,
+        bucket_minutes: int = 5,
+        slot_id: str | None = None,
+    ) -> dict[str, Any]:
+        """Return p50/p95/p99 per time bucket, for all slots or a single one."""
+        return self._series(
+            self.repo.latency_series, window_minutes, bucket_minutes, slot_id
+        )
+
+    def timeseries(
+        self,
+        window_minutes: int = 60,
+        bucket_minutes: int = 5,
+        slot_id: str | None = None,
+    ) -> dict[str, Any]:
+        """Return jobs, outcomes and mean/p95 duration per time bucket."""
+        return self._series(
+            self.repo.throughput_series, window_minutes, bucket_minutes, slot_id
+        )
+
     @staticmethod
-    def _calc_storage_usage_mb(root: Path) -> float:
-        total_bytes = 0
-        if root.exists():
-            for dirpath, _, filenames in os.walk(root):
-                for filename in filenames:
-                    try:
-                        total_bytes += (Path(dirpath) / filename).stat().st_size
-                    except OSError:
-                        continue
-        return round(total_bytes / (1024 * 1024), 2)
+    def _series(
+        load: Callable[[datetime, int, str | None], list[dict[str, Any]]],
+        window_minutes: int,
+        bucket_minutes: int,
+        slot_id: str | None,
+    ) -> dict[str, Any]:
+        window_minutes = max(1, min(window_minutes, MAX_WINDOW_MINUTES))
+        bucket_minutes = max(1, min(bucket_minutes, MAX_BUCKET_MINUTES))
+        window_start = datetime.utcnow() - timedelta(minutes=window_minutes)
+        return {
+            "window_minutes": window_minutes,
+            "bucket_minutes": bucket_minutes,
+            "slot_id": slot_id,
+            "points": load(window_start, bucket_minutes, slot_id),
+        }
 
     @staticmethod
     def _augment_slot_metrics(slot: dict[str, Any]) -> dict[str, Any]:
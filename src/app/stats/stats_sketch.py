@@ -0,0 +1,83 @@
+"""Mergeable duration sketch for latency percentiles (log-bucketed, DDSketch-like)."""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+
+# относительная погрешность квантиля: 2% от значения
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+# всё быстрее миллисекунды попадает в одну корзину
+MIN_SECONDS = 0.001
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def bin_index(seconds: float) -> int:
+    """Bin holding ``seconds``: values in ``(GAMMA**(i-1), GAMMA**i]`` map to ``i``."""
+    return math.ceil(math.log(max(seconds, MIN_SECONDS)) / _LOG_GAMMA)
+
+
+def bin_value(index: int) -> float:
+    """Representative value of a bin (within ``RELATIVE_ACCURACY`` of its members)."""
+    return 2 * GAMMA**index / (GAMMA + 1)
+
+
+def quantile_label(quantile: float) -> str:
+    """``0.95`` -> ``p95``, ``0.5`` -> ``p50``."""
+    return f"p{quantile * 100:g}"
+
+
+@dataclass(slots=True)
+class DurationSketch:
+    """Sparse bin counts; two sketches merge by adding counts per bin."""
+
+    bins: dict[int, int] = field(default_factory=dict)
+    count: int = 0
+
+    @classmethod
+    def from_bins(cls, bins: Iterable[tuple[int, int]]) -> DurationSketch:
+        sketch = cls()
+        for index, count in bins:
+            sketch.add_bin(index, count)
+        return sketch
+
+    def add(self, seconds: float, count: int = 1) -> None:
+        self.add_bin(bin_index(seconds), count)
+
+    def add_bin(self, index: int, count: int) -> None:
+        if count <= 0:
+            return
+        self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+
+    def merge(self, other: DurationSketch) -> None:
+        for index, count in other.bins.items():
+            self.add_bin(index, count)
+
+    def quantile(self, quantile: float) -> float | None:
+        """Value at ``quantile`` (0..1) or ``None`` for an empty sketch."""
+        if not self.count:
+            return None
+        # nearest-rank: p99 из трёх значений — максимум, а не медиана
+        rank = max(math.ceil(quantile * self.count) - 1, 0)
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return bin_value(index)
+        return bin_value(max(self.bins))
+
+    def quantiles(
+        self, quantiles: Sequence[float] = QUANTILES
+    ) -> dict[str, float | None]:
+        """``{"p50": ..., "p95": ..., "p99": ...}`` rounded to milliseconds."""
+        result: dict[str, float | None] = {}
+        for quantile in quantiles:
+            value = self.quantile(quantile)
+            result[quantile_label(quantile)] = (
+                round(value, 3) if value is not None else None
+            )
+        return result
@@ -13,7 +13,7 @@ class RepoStub:
     def __init__(self, records: dict[str, JobHistoryRecord]):
         self._records = records
 
-    def get_job(self, job_id: str) -> JobHistoryRecord:
+    def get_result(self, job_id: str) -> JobHistoryRecord:
         if job_id not in self._records:
             raise KeyError(job_id)
         return self._records[job_id]
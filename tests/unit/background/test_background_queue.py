@@ -0,0 +1,185 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.app.background.background_queue import BackgroundTaskQueue
+
+
+def test_submit_runs_inline_when_queue_not_started() -> None:
+    queue = BackgroundTaskQueue()
+    calls: list[int] = []
+
+    queued = queue.submit("task", calls.append, 1)
+
+    assert queued is False
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_workers_execute_tasks_off_event_loop() -> None:
+    queue = BackgroundTaskQueue(workers=2)
+    await queue.start()
+    loop_thread = threading.get_ident()
+    threads: list[int] = []
+
+    try:
+        assert queue.submit("task", lambda: threads.append(threading.get_ident()))
+        await queue.join()
+    finally:
+        await queue.stop()
+
+    assert len(threads) == 1
+    assert threads[0] != loop_thread
+
+
+@pytest.mark.asyncio
+async def test_failed_task_is_retried_until_success() -> None:
+    queue = BackgroundTaskQueue(workers=1, max_attempts=3, retry_delay_seconds=0.01)
+    await queue.start()
+    attempts: list[int] = []
+
+    def flaky() -> None:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("db is busy")
+
+    try:
+        queue.submit("flaky", flaky)
+        await queue.join()
+    finally:
+        await queue.stop()
+
+    assert len(attempts) == 3
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_exhausted_task() -> None:
+    queue = BackgroundTaskQueue(workers=1, max_attempts=2, retry_delay_seconds=0.01)
+    await queue.start()
+    done: list[str] = []
+
+    def broken() -> None:
+        raise RuntimeError("boom")
+
+    try:
+        queue.submit("broken", broken)
+        await queue.join()
+        queue.submit("ok", done.append, "ok")
+        await queue.join()
+    finally:
+        await queue.stop()
+
+    assert done == ["ok"]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_hands_overflow_to_executor() -> None:
+    queue = BackgroundTaskQueue(workers=1, max_size=1)
+    await queue.start()
+    loop_thread = threading.get_ident()
+    gate = threading.Event()
+    order: list[str] = []
+    threads: list[int] = []
+
+    def overflow() -> None:
+        threads.append(threading.get_ident())
+        order.append("overflow")
+
+    try:
+        queue.submit("blocker", gate.wait)
+        await asyncio.sleep(0.05)  # worker picks up the blocker
+        assert queue.submit("queued", order.append, "queued") is True
+        assert queue.submit("overflow", overflow) is False
+        await asyncio.sleep(0.05)
+        assert order == ["overflow"]  # не ждёт, пока освободится очередь
+        gate.set()
+        await queue.join()
+    finally:
+        gate.set()
+        await queue.stop()
+
+    assert order == ["overflow", "queued"]
+    assert threads[0] != loop_thread
+
+
+@pytest.mark.asyncio
+async def test_exhausted_task_runs_fallback_once() -> None:
+    queue = BackgroundTaskQueue(workers=1, max_attempts=2, retry_delay_seconds=0.01)
+    await queue.start()
+    attempts: list[int] = []
+    fallbacks: list[str] = []
+
+    def broken() -> None:
+        attempts.append(1)
+        raise RuntimeError("boom")
+
+    try:
+        queue.submit("broken", broken, fallback=lambda: fallbacks.append("failed"))
+        await queue.join()
+    finally:
+        await queue.stop()
+
+    assert len(attempts) == 2
+    assert fallbacks == ["failed"]
+
+
+@pytest.mark.asyncio
+async def test_retry_from_worker_thread_does_not_sleep_in_it() -> None:
+    queue = BackgroundTaskQueue(workers=1, max_attempts=2, retry_delay_seconds=0.2)
+    await queue.start()
+    attempts: list[int] = []
+
+    def flaky() -> None:
+        attempts.append(threading.get_ident())
+        if len(attempts) == 1:
+            raise RuntimeError("db is busy")
+
+    def submit_from_worker() -> tuple[bool, float]:
+        # например, поток DB writer: его нельзя усыплять на время повтора
+        started = time.monotonic()
+        queued = queue.submit("flaky", flaky)
+        return queued, time.monotonic() - started
+
+    try:
+        queued, blocked = await asyncio.to_thread(submit_from_worker)
+        await queue.join()
+    finally:
+        await queue.stop()
+
+    assert queued is False
+    assert blocked < 0.2
+    # повтор выполнен воркером очереди по таймеру loop
+    assert len(attempts) == 2
+
+
+def test_fallback_runs_when_queue_not_started() -> None:
+    queue = BackgroundTaskQueue(max_attempts=2, retry_delay_seconds=0)
+    fallbacks: list[str] = []
+    succeeded: list[int] = []
+
+    def broken() -> None:
+        raise RuntimeError("boom")
+
+    assert queue.submit("broken", broken, fallback=lambda: fallbacks.append("failed")) is False
+    queue.submit("ok", succeeded.append, 1, fallback=lambda: fallbacks.append("ok"))
+
+    assert fallbacks == ["failed"]
+    assert succeeded == [1]
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_pending_tasks() -> None:
+    queue = BackgroundTaskQueue(workers=1)
+    await queue.start()
+    gate = threading.Event()
+    done: list[int] = []
+
+    queue.submit("blocker", gate.wait, 1)
+    await asyncio.sleep(0.05)
+    queue.submit("pending", done.append, 1)
+    gate.set()
+    await queue.stop(drain=True)
+
+    assert done == [1]
@@ -0,0 +1,78 @@
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.db_engine import SqliteProfile, create_db_engine
+from src.app.db.db_init import init_db
+from src.app.db.db_models import JobHistoryModel
+from src.app.repositories.job_unit_of_work import JobUnitOfWork
+
+
+def test_sqlite_profile_applies_pragmas(tmp_path) -> None:
+    engine = create_db_engine(
+        f"sqlite:///{(tmp_path / 'pragmas.db').as_posix()}",
+        sqlite_profile=SqliteProfile(busy_timeout_ms=2500, cache_size_kib=4096),
+    )
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 2500
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -4096
+
+
+def test_memory_sqlite_is_shared_between_threads() -> None:
+    engine = create_db_engine("sqlite:///:memory:")
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    counts: list[int] = []
+
+    def _count() -> None:
+        with engine.connect() as conn:
+            counts.append(conn.execute(text("SELECT COUNT(*) FROM slot")).scalar())
+
+    worker = threading.Thread(target=_count)
+    worker.start()
+    worker.join()
+
+    assert counts == [15]
+
+
+def test_parallel_slot_writers_do_not_hit_lock_errors(tmp_path) -> None:
+    engine = create_db_engine(f"sqlite:///{(tmp_path / 'concurrency.db').as_posix()}")
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    errors: list[Exception] = []
+
+    def _writer(index: int) -> None:
+        slot_id = f"slot-{index + 1:03d}"
+        for job_index in range(10):
+            now = datetime.utcnow()
+            unit_of_work = JobUnitOfWork(session_factory)
+            unit_of_work.create_pending(
+                job_id=f"{slot_id}-{job_index}",
+                slot_id=slot_id,
+                started_at=now,
+                sync_deadline=now + timedelta(seconds=48),
+            )
+            unit_of_work.set_failure(
+                job_id=f"{slot_id}-{job_index}",
+                status="failed",
+                failure_reason="bench",
+                completed_at=now,
+            )
+            try:
+                unit_of_work.flush()
+            except Exception as exc:  # pragma: no cover - failure path
+                errors.append(exc)
+
+    threads = [threading.Thread(target=_writer, args=(index,)) for index in range(15)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with session_factory() as session:
+        assert session.query(JobHistoryModel).count() == 150
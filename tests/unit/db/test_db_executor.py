@@ -0,0 +1,117 @@
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from src.app.db.db_executor import (
+    DbExecutor,
+    call_db_write,
+    configure_db_writer,
+    run_db_write,
+)
+
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="")
+
+
+@pytest.mark.asyncio
+async def test_run_executes_off_loop_thread_and_keeps_context() -> None:
+    executor = DbExecutor(max_workers=2)
+    request_id.set("req-1")
+    loop_thread = threading.get_ident()
+
+    def _call(value: int) -> tuple[int, str, int]:
+        return value * 2, request_id.get(), threading.get_ident()
+
+    try:
+        doubled, seen_request, thread_id = await executor.run(_call, 21)
+    finally:
+        executor.shutdown()
+
+    assert doubled == 42
+    assert seen_request == "req-1"
+    assert thread_id != loop_thread
+
+
+@pytest.mark.asyncio
+async def test_blocking_call_does_not_stall_event_loop() -> None:
+    executor = DbExecutor(max_workers=1)
+    ticks = 0
+
+    async def _ticker() -> None:
+        nonlocal ticks
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    try:
+        await asyncio.gather(executor.run(time.sleep, 0.2), _ticker())
+    finally:
+        executor.shutdown()
+
+    assert ticks == 5
+
+
+@pytest.mark.asyncio
+async def test_run_propagates_exceptions() -> None:
+    executor = DbExecutor(max_workers=1)
+
+    def _fail() -> None:
+        raise KeyError("missing")
+
+    try:
+        with pytest.raises(KeyError):
+            await executor.run(_fail)
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_single_writer_serializes_writes() -> None:
+    writer = configure_db_writer(single_writer=True)
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def _write() -> None:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.01)
+        with lock:
+            active -= 1
+
+    try:
+        assert writer.max_workers == 1
+        await asyncio.gather(*(run_db_write(_write) for _ in range(8)))
+    finally:
+        configure_db_writer(single_writer=False)
+
+    assert peak == 1
+
+
+@pytest.mark.asyncio
+async def test_call_db_write_queues_worker_threads_on_writer() -> None:
+    # без выделенного writer вызов остаётся в потоке фоновой задачи
+    worker, inline = await asyncio.to_thread(
+        lambda: (threading.get_ident(), call_db_write(threading.get_ident))
+    )
+    assert inline == worker
+
+    configure_db_writer(single_writer=True)
+    try:
+        writer_thread = await run_db_write(threading.get_ident)
+        worker, queued = await asyncio.to_thread(
+            lambda: (threading.get_ident(), call_db_write(threading.get_ident))
+        )
+        # из потока самого writer — без очереди к самому себе (иначе deadlock)
+        nested = await asyncio.wait_for(
+            run_db_write(call_db_write, threading.get_ident), timeout=2
+        )
+    finally:
+        configure_db_writer(single_writer=False)
+
+    assert queued == writer_thread != worker
+    assert nested == writer_thread
@@ -0,0 +1,43 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.db_engine import create_db_engine
+from src.app.db.db_init import init_db
+from src.app.db.db_models import Base
+
+# media_object до миграций 20261019_07+ (sha256, last_accessed_at, архив)
+PRE_OBJECT_STORE_MEDIA_OBJECT = """
+CREATE TABLE media_object (
+    id VARCHAR(64) NOT NULL,
+    job_id VARCHAR(64) NOT NULL,
+    slot_id VARCHAR(32) NOT NULL,
+    scope VARCHAR(16) NOT NULL,
+    path VARCHAR(512) NOT NULL,
+    preview_path VARCHAR(512),
+    expires_at DATETIME NOT NULL,
+    cleaned_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(job_id) REFERENCES job_history (job_id),
+    FOREIGN KEY(slot_id) REFERENCES slot (id)
+)
+"""
+
+
+def test_init_db_starts_on_database_awaiting_migrations(tmp_path) -> None:
+    engine = create_db_engine(f"sqlite:///{(tmp_path / 'old.db').as_posix()}")
+    with engine.begin() as conn:
+        conn.execute(text(PRE_OBJECT_STORE_MEDIA_OBJECT))
+        conn.execute(text("CREATE INDEX ix_media_object_job_id ON media_object (job_id)"))
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+
+    # приложение стартует раньше `alembic upgrade head`: новые индексы — дело миграций
+    init_db(engine, session_factory)
+
+    inspector = inspect(engine)
+    assert set(inspector.get_table_names()) == set(Base.metadata.tables)
+    assert "sha256" not in {column["name"] for column in inspector.get_columns("media_object")}
+    assert {index["name"] for index in inspector.get_indexes("media_object")} == {
+        "ix_media_object_job_id"
+    }
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM slot")).scalar() == 15
@@ -0,0 +1,350 @@
+"""Query-plan and latency regression suite for hot job_history/media_object queries.
+
+By default the suite seeds a modest dataset so it stays fast in CI; set
+``QUERY_PLAN_ROWS=1000000`` to run it against a million-row ``job_history``.
+PostgreSQL checks run only when ``TEST_POSTGRES_URL`` points to a scratch DB.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.db_engine import create_db_engine
+from src.app.db.db_init import init_db
+from src.app.db.db_models import Base, JobHistoryModel, MediaObjectModel
+from src.app.repositories.job_history_repository import JobHistoryRepository
+from src.app.repositories.media_object_repository import MediaObjectRepository
+from src.app.stats.stats_repository import StatsRepository
+from src.app.stats.stats_rollup_repository import StatsRollupRepository
+
+ROWS = int(os.getenv("QUERY_PLAN_ROWS", 20_000))
+# бюджеты ниже рассчитаны на 1M строк; множитель — для медленных CI-машин
+BUDGET_SCALE = float(os.getenv("QUERY_PLAN_BUDGET_SCALE", 1.0))
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+WINDOW_START = NOW - timedelta(hours=24)
+STATUSES = ("done", "done", "done", "done", "failed", "timeout", "pending")
+FAILURES = {"failed": "provider_error", "timeout": "provider_timeout"}
+
+
+@dataclass(slots=True)
+class HotQuery:
+    name: str
+    call: Callable[[], Any]
+    budget_ms: float
+    expected_indexes: set[str]
+    # достаточно любого из индексов — выбор зависит от статистики данных
+    any_of: frozenset[str] = frozenset()
+
+
+def _seed(engine: Engine, rows: int) -> None:
+    rng = random.Random(42)
+    batch: list[dict[str, Any]] = []
+    media: list[dict[str, Any]] = []
+    with engine.begin() as conn:
+        for index in range(rows):
+            status = rng.choice(STATUSES)
+            started_at = NOW - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+            completed_at = (
+                None
+                if status == "pending"
+                else started_at + timedelta(seconds=rng.randint(1, 60))
+            )
+            job_id = f"job-{index:08d}"
+            batch.append(
+                {
+                    "job_id": job_id,
+                    "slot_id": f"slot-{rng.randint(1, 15):03d}",
+                    "source": "ingest",
+                    "status": status,
+                    "failure_reason": FAILURES.get(status),
+                    "started_at": started_at,
+                    "completed_at": completed_at,
+                    "result_path": f"/media/results/{job_id}/payload.png"
+                    if status == "done"
+                    else None,
+                    "result_expires_at": (
+                        completed_at + timedelta(hours=168) if completed_at else None
+                    ),
+                }
+            )
+            if status == "done" and index % 10 == 0:
+                media.append(
+                    {
+                        "id": f"media-{index:08d}",
+                        "job_id": job_id,
+                        "slot_id": batch[-1]["slot_id"],
+                        "scope": "result",
+                        "path": batch[-1]["result_path"],
+                        "expires_at": batch[-1]["result_expires_at"],
+                        "created_at": completed_at,
+                        "cleaned_at": (
+                            None if rng.random() < 0.1 else batch[-1]["result_expires_at"]
+                        ),
+                    }
+                )
+            if len(batch) >= 10_000:
+                conn.execute(insert(JobHistoryModel), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(JobHistoryModel), batch)
+        if media:
+            conn.execute(insert(MediaObjectModel), media)
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+        else:
+            conn.execute(text("ANALYZE job_history"))
+            conn.execute(text("ANALYZE media_object"))
+
+
+def _hot_queries(engine: Engine) -> list[HotQuery]:
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    stats = StatsRepository(session_factory)
+    rollup = StatsRollupRepository(session_factory)
+    jobs = JobHistoryRepository(session_factory)
+    media = MediaObjectRepository(session_factory)
+    return [
+        HotQuery(
+            "stats.system_metrics",
+            lambda: stats.system_metrics(WINDOW_START),
+            300,
+            {"ix_job_history_started_at", "ix_job_history_completed_at"},
+        ),
+        HotQuery(
+            "stats.slot_metrics",
+            lambda: stats.slot_metrics(WINDOW_START),
+            300,
+            {
+                "ix_job_history_slot_status_completed",
+                "ix_job_history_slot_failure_completed",
+            },
+        ),
+        HotQuery(
+            "stats.recent_failures",
+            lambda: stats.recent_failures(WINDOW_START),
+            50,
+            set(),
+            frozenset(
+                {"ix_job_history_failure_completed", "ix_job_history_completed_at"}
+            ),
+        ),
+        HotQuery(
+            "stats.slot_durations",
+            lambda: stats.slot_durations(WINDOW_START),
+            250,
+            {"ix_job_history_completed_at"},
+        ),
+        # агрегат за всё время — O(N) по определению
+        HotQuery("stats.slot_totals", stats.slot_totals, 6000, set()),
+        # rollup-чтения не зависят от объёма истории
+        HotQuery(
+            "rollup.system_metrics",
+            lambda: rollup.system_metrics(WINDOW_START),
+            20,
+            set(),
+        ),
+        HotQuery(
+            "rollup.slot_metrics",
+            lambda: rollup.slot_metrics(WINDOW_START),
+            50,
+            {"ix_job_history_slot_failure_completed"},
+        ),
+        HotQuery("rollup.slot_totals", rollup.slot_totals, 20, set()),
+        HotQuery(
+            "rollup.slot_duration_histograms",
+            lambda: rollup.slot_duration_histograms(WINDOW_START),
+            20,
+            set(),
+        ),
+        # ряд за 3 суток по часам: часовые корзины + покрывающий индекс скетчей
+        HotQuery(
+            "rollup.throughput_series",
+            lambda: rollup.throughput_series(NOW - timedelta(days=3), 60),
+            100,
+            {"ix_job_duration_sketch_series"},
+        ),
+        HotQuery(
+            "rollup.throughput_series.slot",
+            lambda: rollup.throughput_series(NOW - timedelta(days=3), 60, "slot-003"),
+            100,
+            {"ix_job_duration_sketch_slot_series"},
+        ),
+        HotQuery(
+            "jobs.list_recent_by_slot",
+            lambda: jobs.list_recent_by_slot("slot-001", limit=10),
+            200,
+            set(),
+        ),
+        # публичная галерея: top-N на слот коррелированным подзапросом по индексу
+        HotQuery(
+            "jobs.list_recent_results",
+            lambda: jobs.list_recent_results(limit=10),
+            50,
+            {"ix_job_history_slot_status_completed", "ix_media_object_job_id"},
+        ),
+        HotQuery("jobs.get_job", lambda: jobs.get_job("job-00000001"), 20, set()),
+        HotQuery(
+            "cleanup.list_expired_results",
+            lambda: media.list_expired_results(NOW),
+            300,
+            {"ix_media_object_scope_expires"},
+        ),
+        # батч cleanup по ключу (expires_at, id): стоимость не зависит от хвоста
+        HotQuery(
+            "cleanup.list_expired_batch",
+            lambda: media.list_expired_batch(
+                "result", NOW, limit=500, after=(NOW - timedelta(days=30), "")
+            ),
+            50,
+            {"ix_media_object_scope_expires"},
+        ),
+        # вытеснение при нехватке места: LRU по выдаче или записи, без сортировки хвоста
+        HotQuery(
+            "quota.list_eviction_candidates",
+            lambda: media.list_eviction_candidates(limit=100),
+            50,
+            {"ix_media_object_scope_lru"},
+        ),
+        # холодный слой: остались ли живые члены у архива — range scan по пути
+        HotQuery(
+            "archive.live_archives",
+            lambda: media.live_archives(
+                [f"/media/archive/slot-{i:03d}/2026-10-18.zip" for i in range(1, 11)]
+            ),
+            50,
+            {"ix_media_object_path_live"},
+        ),
+        # сверка с деревом media/: страница живых путей в порядке обхода
+        HotQuery(
+            "orphans.live_paths",
+            lambda: media.live_paths(
+                "path", lower="/media/results/", upper="/media/results0", limit=1000
+            ),
+            50,
+            {"ix_media_object_path_live"},
+        ),
+        HotQuery(
+            "orphans.live_previews",
+            lambda: media.live_paths(
+                "preview_path", lower="/media/results/", upper="/media/results0", limit=1000
+            ),
+            20,
+            {"ix_media_object_preview_live"},
+        ),
+        HotQuery(
+            "cleanup.list_expired_temp",
+            lambda: media.list_expired_by_scope("provider", NOW),
+            50,
+            {"ix_media_object_scope_expires"},
+        ),
+    ]
+
+
+def _capture_selects(engine: Engine, func: Callable[[], Any]) -> list[tuple[str, Any]]:
+    statements: list[tuple[str, Any]] = []
+
+    def _before(_conn, _cursor, statement, parameters, _context, _executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        func()
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+    return statements
+
+
+def _sqlite_plan(engine: Engine, statement: str, parameters: Any) -> list[str]:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in rows]
+
+
+def _postgres_plan(engine: Engine, statement: str, parameters: Any) -> list[str]:
+    with engine.connect() as conn:
+        # на малых таблицах планировщик PG предпочитает seq scan — проверяем,
+        # что индекс вообще применим
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        return [row[0] for row in rows]
+
+
+def _full_scans(lines: list[str], dialect: str) -> list[str]:
+    tables = ("job_history", "media_object")
+    if dialect == "sqlite":
+        return [line for line in lines if line.strip() in {f"SCAN {t}" for t in tables}]
+    return [
+        line for line in lines if any(f"Seq Scan on {t}" in line for t in tables)
+    ]
+
+
+def _check_queries(engine: Engine, plan: Callable[[Engine, str, Any], list[str]]) -> None:
+    dialect = engine.dialect.name
+    failures: list[str] = []
+    for query in _hot_queries(engine):
+        statements = _capture_selects(engine, query.call)
+        assert statements, f"{query.name}: no SELECT captured"
+        lines: list[str] = []
+        for statement, parameters in statements:
+            lines.extend(plan(engine, statement, parameters))
+        scans = _full_scans(lines, dialect)
+        if scans:
+            failures.append(f"{query.name}: full scan {scans}")
+        used = " ".join(lines)
+        missing = {name for name in query.expected_indexes if name not in used}
+        if missing:
+            failures.append(f"{query.name}: indexes not used {sorted(missing)}")
+        if query.any_of and not any(name in used for name in query.any_of):
+            failures.append(f"{query.name}: none of {sorted(query.any_of)} used")
+
+        started = time.perf_counter()
+        query.call()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        budget_ms = query.budget_ms * BUDGET_SCALE
+        if elapsed_ms > budget_ms:
+            failures.append(f"{query.name}: {elapsed_ms:.0f}ms > {budget_ms:.0f}ms")
+    assert not failures, "\n".join(failures)
+
+
+@pytest.fixture(scope="module")
+def sqlite_engine(tmp_path_factory: pytest.TempPathFactory) -> Iterator[Engine]:
+    db_path = tmp_path_factory.mktemp("query-plans") / "plans.db"
+    engine = create_db_engine(f"sqlite:///{db_path.as_posix()}")
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    _seed(engine, ROWS)
+    StatsRollupRepository(session_factory).rebuild()
+    yield engine
+    engine.dispose()
+
+
+def test_sqlite_hot_queries_use_indexes_within_budget(sqlite_engine: Engine) -> None:
+    _check_queries(sqlite_engine, _sqlite_plan)
+
+
+@pytest.mark.skipif(
+    not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL is not set"
+)
+def test_postgres_hot_queries_use_indexes_within_budget() -> None:
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"], future=True)
+    Base.metadata.drop_all(engine)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    try:
+        _seed(engine, ROWS)
+        StatsRollupRepository(session_factory).rebuild()
+        _check_queries(engine, _postgres_plan)
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
@@ -44,6 +44,11 @@ class StubIngestService:
         self.last_job = job
         return job
 
+    async def prepare_job_async(
+        self, slot_id: str, *, source: str = "ingest"
+    ) -> JobContext:
+        return self.prepare_job(slot_id, source=source)
+
     async def validate_upload(
         self, job: JobContext, upload: Any, expected_hash: str | None
     ) -> UploadValidationResult:
@@ -105,8 +110,9 @@ def test_ingest_slot_disabled_returns_404(tmp_path) -> None:
 def test_ingest_rate_limited_when_slot_busy(tmp_path) -> None:
     service = StubIngestService()
     client = build_client(service)
-    loop = asyncio.get_event_loop()
+    loop = asyncio.new_event_loop()
     loop.run_until_complete(service.slot_lock("slot-001").acquire())
+    loop.close()
 
     try:
         response = client.post(
@@ -32,6 +32,9 @@ class DummyIngestService:
         self.last_job = job
         return job
 
+    async def prepare_job_async(self, slot_id: str) -> DummyJob:
+        return self.prepare_job(slot_id)
+
     async def validate_upload(self, job: DummyJob, upload, expected_hash: str):
         job.upload = upload
         return {"status": "ok"}
@@ -1,23 +1,32 @@
 import asyncio
+import errno
+import threading
 from hashlib import sha256
 from io import BytesIO
 from pathlib import Path
 
 import pytest
 from fastapi import UploadFile
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
+from src.app.background.background_queue import BackgroundTaskQueue
 from src.app.config import IngestLimits, MediaPaths
 from src.app.db.db_init import init_db
-from src.app.db.db_models import JobHistoryModel
+from src.app.db.db_models import JobHistoryModel, MediaObjectModel
 from src.app.ingest.ingest_errors import ProviderTimeoutError
 from src.app.ingest.ingest_service import IngestService
-from src.app.ingest.ingest_models import FailureReason, JobContext, JobStatus
+from src.app.ingest.ingest_models import (
+    FailureReason,
+    JobContext,
+    JobOutcome,
+    JobStatus,
+)
 from src.app.ingest.validation import UploadValidator
 from src.app.media.media_service import ResultStore
 from src.app.media.temp_media_store import TempMediaStore
 from src.app.repositories.job_history_repository import JobHistoryRepository
+from src.app.repositories.job_unit_of_work import JobUnitOfWork
 from src.app.repositories.media_object_repository import MediaObjectRepository
 from src.app.slots.slots_repository import SlotRepository
 from starlette.datastructures import Headers  # добавь рядом с UploadFile
@@ -48,10 +57,16 @@ def build_service(
     tmp_path: Path,
     *,
     sync_response_seconds: int = 48,
+    database_url: str | None = None,
+    use_unit_of_work: bool = False,
     service_cls: type[IngestService] = IngestService,
     **service_kwargs,
 ) -> IngestService:
-    engine = create_engine("sqlite:///:memory:", future=True)
+    # репозитории ходят в БД из пула потоков — in-memory SQLite там не виден
+    database_url = database_url or f"sqlite:///{(tmp_path / 'ingest.db').as_posix()}"
+    engine = create_engine(
+        database_url, future=True, connect_args={"check_same_thread": False}
+    )
     session_factory = sessionmaker(bind=engine, expire_on_commit=False)
     init_db(engine, session_factory)
 
@@ -77,6 +92,8 @@ def build_service(
         media_repo=media_repo,
         temp_ttl_seconds=sync_response_seconds,
     )
+    if use_unit_of_work:
+        service_kwargs["unit_of_work_factory"] = lambda: JobUnitOfWork(session_factory)
     return service_cls(
         slot_repo=slot_repo,
         validator=validator,
@@ -157,6 +174,45 @@ async def test_record_success(tmp_path) -> None:
         assert model.failure_reason is None
 
 
+@pytest.mark.asyncio
+async def test_record_success_reclaims_space_once_on_enospc(
+    tmp_path, monkeypatch
+) -> None:
+    reclaims: list[int] = []
+
+    def reclaim_space() -> int:
+        reclaims.append(1)
+        return 3
+
+    service = build_service(tmp_path, reclaim_space=reclaim_space)
+    job = service.prepare_job("slot-001")
+    data = load_asset("tiny.png")
+    await service.validate_upload(job, make_upload(data), sha256(data).hexdigest())
+    save_payload = ResultStore.save_payload
+    attempts: list[int] = []
+
+    def flaky_save(self, *args, **kwargs):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        return save_payload(self, *args, **kwargs)
+
+    monkeypatch.setattr(ResultStore, "save_payload", flaky_save)
+
+    path = service.record_success(job, data, "image/png")
+
+    assert path.read_bytes() == data
+    assert (len(reclaims), len(attempts)) == (1, 2)
+
+    # места не освободилось — ошибка записи не маскируется
+    service.reclaim_space = lambda: 0
+    attempts.clear()
+    job = service.prepare_job("slot-001")
+    await service.validate_upload(job, make_upload(data), sha256(data).hexdigest())
+    with pytest.raises(OSError):
+        service.record_success(job, data, "image/png")
+
+
 @pytest.mark.asyncio
 async def test_record_failure(tmp_path) -> None:
     service = build_service(tmp_path)
@@ -218,3 +274,171 @@ async def test_process_timeout(tmp_path) -> None:
         assert model is not None
         assert model.status == JobStatus.TIMEOUT.value
         assert model.failure_reason == FailureReason.PROVIDER_TIMEOUT.value
+
+
+@pytest.mark.asyncio
+async def test_process_defers_bookkeeping_to_background_queue(tmp_path) -> None:
+    async def fast_provider(_job: JobContext) -> tuple[bytes, str]:
+        return b"result-bytes", "image/png"
+
+    queue = BackgroundTaskQueue(workers=1)
+    outcomes: list[JobOutcome] = []
+    started: list[JobContext] = []
+    service = build_service(
+        tmp_path,
+        service_cls=StubIngestService,
+        provider_callable=fast_provider,
+        background=queue,
+        completion_hooks=[outcomes.append],
+        start_hooks=[started.append],
+    )
+    job = service.prepare_job("slot-001")
+    assert started == [job]
+    data = load_asset("tiny.png")
+    await service.validate_upload(job, make_upload(data), sha256(data).hexdigest())
+    temp_path = job.temp_payload_path
+
+    await queue.start()
+    try:
+        payload = await service.process(job)
+        assert payload == b"result-bytes"
+        await queue.join()
+    finally:
+        await queue.stop()
+
+    assert temp_path is not None and not temp_path.exists()
+    assert job.result_dir is not None and (job.result_dir / "payload.png").exists()
+    with service.job_repo._session_factory() as session:  # type: ignore[attr-defined]
+        model = session.get(JobHistoryModel, job.job_id)
+        assert model is not None
+        assert model.status == JobStatus.DONE.value
+    assert [outcome.status for outcome in outcomes] == [JobStatus.DONE.value]
+    assert outcomes[0].duration_seconds is not None
+
+
+@pytest.mark.asyncio
+async def test_deferred_success_falls_back_to_failure_when_retries_run_out(
+    tmp_path, monkeypatch
+) -> None:
+    async def fast_provider(_job: JobContext) -> tuple[bytes, str]:
+        return b"result-bytes", "image/png"
+
+    queue = BackgroundTaskQueue(workers=1, max_attempts=2, retry_delay_seconds=0.01)
+    outcomes: list[JobOutcome] = []
+    service = build_service(
+        tmp_path,
+        service_cls=StubIngestService,
+        provider_callable=fast_provider,
+        background=queue,
+        completion_hooks=[outcomes.append],
+        use_unit_of_work=True,
+    )
+    job = service.prepare_job("slot-001")
+    data = load_asset("tiny.png")
+    await service.validate_upload(job, make_upload(data), sha256(data).hexdigest())
+    attempts: list[int] = []
+
+    def broken_save(*_args, **_kwargs):
+        attempts.append(1)
+        raise OSError(errno.EIO, "I/O error")
+
+    monkeypatch.setattr(ResultStore, "save_payload", broken_save)
+
+    await queue.start()
+    try:
+        assert await service.process(job) == b"result-bytes"
+        await queue.join()
+    finally:
+        await queue.stop()
+
+    assert len(attempts) == 2
+    # задача не остаётся pending: исчерпанные попытки записываются как internal_error
+    with service.job_repo._session_factory() as session:  # type: ignore[attr-defined]
+        model = session.get(JobHistoryModel, job.job_id)
+        assert model is not None
+        assert model.status == JobStatus.FAILED.value
+        assert model.failure_reason == FailureReason.INTERNAL_ERROR.value
+        assert (
+            session.query(MediaObjectModel)
+            .filter_by(job_id=job.job_id, scope="result")
+            .count()
+            == 0
+        )
+    assert [outcome.failure_reason for outcome in outcomes] == ["internal_error"]
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_limits_job_to_two_commits(tmp_path) -> None:
+    async def fast_provider(_job: JobContext) -> tuple[bytes, str]:
+        return b"result-bytes", "image/png"
+
+    service = build_service(
+        tmp_path,
+        service_cls=StubIngestService,
+        provider_callable=fast_provider,
+        use_unit_of_work=True,
+    )
+    session_factory = service.job_repo._session_factory  # type: ignore[attr-defined]
+    commits: list[int] = []
+    event.listen(session_factory, "after_commit", lambda _session: commits.append(1))
+
+    job = service.prepare_job("slot-001")
+    data = load_asset("tiny.png")
+    await service.validate_upload(job, make_upload(data), sha256(data).hexdigest())
+    assert commits == []  # старт ещё не зафиксирован
+
+    await service.process(job, defer_bookkeeping=False)
+
+    assert len(commits) == 2
+    with session_factory() as session:
+        model = session.get(JobHistoryModel, job.job_id)
+        assert model is not None
+        assert model.status == JobStatus.DONE.value
+        media = session.query(MediaObjectModel).filter_by(job_id=job.job_id).all()
+        scopes = {row.scope: row for row in media}
+        assert set(scopes) == {"provider", "result"}
+        assert scopes["provider"].cleaned_at is not None
+        assert scopes["result"].cleaned_at is None
+
+
+@pytest.mark.asyncio
+async def test_undeferred_bookkeeping_runs_off_event_loop(tmp_path) -> None:
+    async def fast_provider(_job: JobContext) -> tuple[bytes, str]:
+        return b"result-bytes", "image/png"
+
+    threads: list[threading.Thread] = []
+    service = build_service(
+        tmp_path,
+        service_cls=StubIngestService,
+        provider_callable=fast_provider,
+        use_unit_of_work=True,
+        completion_hooks=[lambda _outcome: threads.append(threading.current_thread())],
+    )
+    job = service.prepare_job("slot-001")
+    data = load_asset("tiny.png")
+    await service.validate_upload(job, make_upload(data), sha256(data).hexdigest())
+
+    await service.process(job, defer_bookkeeping=False)
+
+    # админский тест-ран ждёт запись результата, но не блокирует event loop
+    assert len(threads) == 1
+    assert threads[0] is not threading.current_thread()
+    assert service.job_repo.get_job(job.job_id).status == JobStatus.DONE.value
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_rejected_upload_is_single_commit(tmp_path) -> None:
+    service = build_service(tmp_path, use_unit_of_work=True)
+    session_factory = service.job_repo._session_factory  # type: ignore[attr-defined]
+    commits: list[int] = []
+    event.listen(session_factory, "after_commit", lambda _session: commits.append(1))
+
+    job = service.prepare_job("slot-001")
+    service.record_failure(job, FailureReason.UNSUPPORTED_MEDIA_TYPE)
+
+    assert len(commits) == 1
+    with session_factory() as session:
+        model = session.get(JobHistoryModel, job.job_id)
+        assert model is not None
+        assert model.status == JobStatus.FAILED.value
+        assert model.failure_reason == FailureReason.UNSUPPORTED_MEDIA_TYPE.value
@@ -1,3 +1,4 @@
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -5,15 +6,22 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from src.app.config import MediaPaths
+from src.app.db.db_engine import create_db_engine
+from src.app.db.db_executor import configure_db_writer
 from src.app.db.db_init import init_db
-from src.app.media.media_cleanup import cleanup_expired_results
+from src.app.media.media_cleanup import CleanupLimits, cleanup_expired_results
 from src.app.media.media_service import ResultStore
 from src.app.media.temp_media_store import TempMediaStore
 from src.app.repositories.media_object_repository import MediaObjectRepository
+from src.app.repositories.storage_ledger import StorageLedger
 
 
-def build_repos(tmp_path: Path):
-    engine = create_engine("sqlite:///:memory:", future=True)
+def build_repos(tmp_path: Path, ledger: bool = False, *, threaded: bool = False):
+    if threaded:
+        # строки пишет поток DB writer — нужна БД, видимая из других потоков
+        engine = create_db_engine("sqlite:///:memory:")
+    else:
+        engine = create_engine("sqlite:///:memory:", future=True)
     session_factory = sessionmaker(bind=engine, expire_on_commit=False)
     init_db(engine, session_factory)
     media_repo = MediaObjectRepository(session_factory)
@@ -23,7 +31,9 @@ def build_repos(tmp_path: Path):
         templates=tmp_path / "templates",
         temp=tmp_path / "temp",
     )
-    store = ResultStore(media_paths)
+    store = ResultStore(
+        media_paths, ledger=StorageLedger(session_factory) if ledger else None
+    )
     return media_repo, store, media_paths
 
 
@@ -43,15 +53,64 @@ def test_cleanup_expired_results(tmp_path):
         expires_at=expires_at,
     )
 
-    removed = cleanup_expired_results(media_repo, store)
+    notified: list[int] = []
+    evicted: list[str] = []
+    removed = cleanup_expired_results(
+        media_repo,
+        store,
+        on_removed=lambda: notified.append(1),
+        on_result_removed=evicted.append,
+    )
 
     assert removed == 1
+    assert notified == [1]
+    assert evicted == [job_id]
+    # повторный проход ничего не удаляет и не дёргает кэш галереи
+    cleanup_expired_results(media_repo, store, on_removed=lambda: notified.append(1))
+    assert notified == [1]
     assert not directory.exists()
     assert all(
         obj.id != media_id for obj in media_repo.list_expired_results(datetime.utcnow())
     )
 
 
+def test_cleanup_batch_writes_go_through_db_writer(tmp_path, monkeypatch):
+    media_repo, store, _ = build_repos(tmp_path, ledger=True, threaded=True)
+    directory = store.ensure_structure("slot-001", "job123")
+    (directory / "payload.bin").write_bytes(b"test")
+    media_repo.register_result(
+        job_id="job123",
+        slot_id="slot-001",
+        path=directory / "payload.bin",
+        preview_path=None,
+        expires_at=datetime.utcnow() - timedelta(hours=1),
+    )
+    threads: dict[str, int] = {}
+    mark_cleaned_many = MediaObjectRepository.mark_cleaned_many
+    record_many = StorageLedger.record_many
+
+    def _mark(self, *args, **kwargs):
+        threads["mark"] = threading.get_ident()
+        return mark_cleaned_many(self, *args, **kwargs)
+
+    def _record(self, *args, **kwargs):
+        threads["ledger"] = threading.get_ident()
+        return record_many(self, *args, **kwargs)
+
+    monkeypatch.setattr(MediaObjectRepository, "mark_cleaned_many", _mark)
+    monkeypatch.setattr(StorageLedger, "record_many", _record)
+    writer = configure_db_writer(single_writer=True)
+    try:
+        writer_thread = writer.call(threading.get_ident)
+        removed = cleanup_expired_results(media_repo, store)
+    finally:
+        configure_db_writer(single_writer=False)
+
+    assert removed == 1
+    # срез выполняется вне writer, но строки и ledger пишет только он
+    assert threads == {"mark": writer_thread, "ledger": writer_thread}
+
+
 def test_cleanup_expired_temp_media(tmp_path):
     media_repo, _, media_paths = build_repos(tmp_path)
     temp_store = TempMediaStore(
@@ -80,3 +139,54 @@ def test_cleanup_expired_temp_media(tmp_path):
         obj.id != media_id
         for obj in media_repo.list_expired_by_scope("provider", datetime.utcnow())
     )
+
+
+def test_cleanup_runs_in_bounded_batches_and_resumes(tmp_path):
+    media_repo, store, _ = build_repos(tmp_path, ledger=True)
+    expires_at = datetime.utcnow() - timedelta(hours=1)
+    for index in range(5):
+        job_id = f"job-{index}"
+        path = store.save_payload("slot-001", job_id, b"12345", "png")
+        media_repo.register_result(
+            job_id=job_id, slot_id="slot-001", path=path,
+            preview_path=None, expires_at=expires_at,
+        )
+    evicted: list[str] = []
+
+    limits = CleanupLimits(batch_size=2, max_batches=2, workers=2)
+    removed = cleanup_expired_results(
+        media_repo, store, on_result_removed=evicted.append, limits=limits
+    )
+
+    # лимит на запуск: 2 батча по 2 строки, остаток — следующему запуску
+    assert removed == 4
+    assert media_repo.count_expired("result", datetime.utcnow()) == 1
+    assert cleanup_expired_results(media_repo, store, limits=limits) == 1
+    assert len(set(evicted)) == 4
+    assert not any((tmp_path / "results" / "slot-001").iterdir())
+    usage = {(row["scope"], row["slot_id"]): row for row in store.ledger.usage()}
+    assert usage[("result", "slot-001")]["bytes"] == 0
+    assert usage[("result", "slot-001")]["files"] == 0
+
+
+def test_cleanup_keeps_rows_whose_delete_failed(tmp_path, monkeypatch):
+    media_repo, store, _ = build_repos(tmp_path)
+    expires_at = datetime.utcnow() - timedelta(hours=1)
+    for job_id in ("job-ok", "job-broken"):
+        path = store.save_payload("slot-001", job_id, b"x", "png")
+        media_repo.register_result(
+            job_id=job_id, slot_id="slot-001", path=path,
+            preview_path=None, expires_at=expires_at,
+        )
+    delete_result_dir = ResultStore.delete_result_dir
+
+    def flaky_delete(self, slot_id, job_id):
+        if job_id == "job-broken":
+            raise PermissionError("read-only")
+        return delete_result_dir(self, slot_id, job_id)
+
+    monkeypatch.setattr(ResultStore, "delete_result_dir", flaky_delete)
+
+    assert cleanup_expired_results(media_repo, store) == 1
+    remaining = media_repo.list_expired_results(datetime.utcnow())
+    assert [media.job_id for media in remaining] == ["job-broken"]
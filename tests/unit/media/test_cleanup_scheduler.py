@@ -0,0 +1,118 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from src.app.media.media_cleanup import CleanupReport
+from src.app.media.media_cleanup_scheduler import CleanupScheduler
+from src.app.media.public_result_service import PublicResultService
+from src.app.repositories.job_history_repository import JobHistoryRecord
+
+
+class FakeCleanup:
+    def __init__(self, reports: list[CleanupReport] | None = None):
+        self.reports = list(reports or [])
+        self.limits = []
+        self.threads: list[int] = []
+        self.ran = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+
+    def run(self, limits=None, reference_time=None) -> CleanupReport:
+        self.limits.append(limits)
+        self.threads.append(threading.get_ident())
+        self.loop.call_soon_threadsafe(self.ran.set)
+        return self.reports.pop(0) if self.reports else CleanupReport()
+
+
+async def wait_runs(cleanup: FakeCleanup, count: int) -> None:
+    async def _wait() -> None:
+        while len(cleanup.limits) < count:
+            cleanup.ran.clear()
+            await cleanup.ran.wait()
+
+    await asyncio.wait_for(_wait(), timeout=2)
+
+
+@pytest.mark.asyncio
+async def test_request_run_wakes_scheduler_off_event_loop() -> None:
+    cleanup = FakeCleanup()
+    # интервал большой: срезы идут только по запросу
+    scheduler = CleanupScheduler(cleanup=cleanup, interval_seconds=3600, slice_seconds=0.5)
+    await scheduler.start()
+    try:
+        scheduler.request_run()
+        await wait_runs(cleanup, 1)
+        # запрос из потока обработчика запроса (sync-роут)
+        await asyncio.to_thread(scheduler.request_run)
+        await wait_runs(cleanup, 2)
+    finally:
+        await scheduler.stop()
+
+    assert threading.get_ident() not in cleanup.threads
+    limits = cleanup.limits[0]
+    assert limits.batch_size == scheduler.batch_size
+    assert limits.deadline is not None
+
+
+@pytest.mark.asyncio
+async def test_backlog_is_drained_in_consecutive_slices() -> None:
+    cleanup = FakeCleanup(
+        [CleanupReport(results_removed=200), CleanupReport(temp_removed=5)]
+    )
+    scheduler = CleanupScheduler(cleanup=cleanup, interval_seconds=3600)
+    await scheduler.start()
+    try:
+        scheduler.request_run()
+        # после непустого среза следующий идёт без ожидания интервала
+        await wait_runs(cleanup, 3)
+    finally:
+        await scheduler.stop()
+
+    assert len(cleanup.limits) == 3
+
+
+@pytest.mark.asyncio
+async def test_disabled_scheduler_ignores_requests() -> None:
+    cleanup = FakeCleanup()
+    scheduler = CleanupScheduler(cleanup=cleanup, interval_seconds=0)
+    await scheduler.start()
+    scheduler.request_run()
+    await asyncio.sleep(0.05)
+    await scheduler.stop()
+
+    assert cleanup.limits == []
+
+
+class DummyJobRepo:
+    def __init__(self, record: JobHistoryRecord):
+        self.record = record
+
+    def get_result(self, job_id: str) -> JobHistoryRecord:
+        return self.record
+
+
+def test_expired_result_still_served_and_triggers_cleanup(tmp_path: Path) -> None:
+    result_file = tmp_path / "payload.png"
+    result_file.write_bytes(b"png")
+    record = JobHistoryRecord(
+        job_id="job-1",
+        slot_id="slot-001",
+        source="ingest",
+        status="done",
+        failure_reason=None,
+        result_path=str(result_file),
+        result_expires_at=datetime.utcnow() - timedelta(minutes=1),
+    )
+    requests: list[int] = []
+    service = PublicResultService(
+        job_repo=DummyJobRepo(record), on_expired=lambda: requests.append(1)
+    )
+
+    response = service.open_result("job-1")
+
+    # по контракту файл отдаётся, пока cleanup его не удалил
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+    assert requests == [1]
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import unquote
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.app.media.media_http import MediaOffload
+from src.app.media.public_media_links import MediaUrlDenylist, MediaUrlSigner
+from src.app.media.public_media_service import PublicMediaService
+from src.app.media.public_result_service import PublicResultService
+from src.app.public.public_media_router import build_public_media_router
+from src.app.public.public_results_router import build_public_results_router
+from src.app.repositories.job_history_repository import JobHistoryRecord
+
+
+class NginxStub:
+    """Minimal stand-in for an nginx ``internal`` location behind the app."""
+
+    def __init__(self, client: TestClient, prefix: str, root: Path) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.root = root
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        upstream = self.client.get(url, **kwargs)
+        target = upstream.headers.get("x-accel-redirect")
+        if target is None:
+            return upstream
+        assert target.startswith(self.prefix)
+        body = (self.root / unquote(target[len(self.prefix) :])).read_bytes()
+        # nginx сохраняет Content-Type/Content-Disposition/Cache-Control апстрима
+        headers = {
+            key: value
+            for key, value in upstream.headers.items()
+            if key in {"content-type", "content-disposition", "cache-control", "etag"}
+        }
+        return httpx.Response(200, content=body, headers=headers)
+
+
+class DummyJobRepo:
+    def __init__(self, record: JobHistoryRecord) -> None:
+        self.record = record
+
+    def get_result(self, job_id: str) -> JobHistoryRecord:
+        if job_id != self.record.job_id:
+            raise KeyError(job_id)
+        return self.record
+
+
+def _app(
+    tmp_path: Path, offload: MediaOffload
+) -> tuple[TestClient, MediaUrlSigner, Path]:
+    result = tmp_path / "results" / "slot-1" / "job 1" / "payload.png"
+    result.parent.mkdir(parents=True)
+    result.write_bytes(b"result-bytes")
+    record = JobHistoryRecord(
+        job_id="job1",
+        slot_id="slot-1",
+        source="ingest",
+        status="done",
+        failure_reason=None,
+        result_path=str(result),
+        result_expires_at=datetime.utcnow() + timedelta(hours=1),
+        result_sha256="ab" * 32,
+    )
+    signer = MediaUrlSigner.from_secret("secret", tmp_path, ttl_seconds=60)
+    app = FastAPI()
+    app.include_router(
+        build_public_results_router(
+            PublicResultService(
+                job_repo=DummyJobRepo(record),  # type: ignore[arg-type]
+                offload=offload,
+            )
+        )
+    )
+    app.include_router(
+        build_public_media_router(
+            PublicMediaService(
+                signer=signer, denylist=MediaUrlDenylist(ttl_seconds=60), offload=offload
+            )
+        )
+    )
+    return TestClient(app), signer, result
+
+
+def test_x_accel_redirect_offloads_bodies_to_proxy(tmp_path: Path) -> None:
+    offload = MediaOffload.from_config("X-Accel-Redirect", tmp_path, "_protected")
+    assert offload is not None
+    client, signer, _ = _app(tmp_path, offload)
+
+    upstream = client.get("/public/results/job1")
+    assert (
+        upstream.headers["x-accel-redirect"]
+        == "/_protected/results/slot-1/job%201/payload.png"
+    )
+    assert upstream.headers["content-type"] == "image/png"
+    assert upstream.headers["etag"] == f'"{"ab" * 32}"'
+    assert upstream.content == b""
+
+    proxy = NginxStub(client, "/_protected/", tmp_path)
+    served = proxy.get("/public/results/job1")
+    assert served.content == b"result-bytes"
+    assert served.headers["content-disposition"].startswith("inline;")
+
+    provider_file = tmp_path / "temp" / "slot-1" / "upload.jpg"
+    provider_file.parent.mkdir(parents=True)
+    provider_file.write_bytes(b"upload-bytes")
+    assert proxy.get("/" + signer.sign(provider_file)).content == b"upload-bytes"
+
+    # авторизация и 304 остаются на стороне приложения
+    assert client.get("/public/results/missing").status_code == 404
+    cached = client.get(
+        "/public/results/job1", headers={"If-None-Match": upstream.headers["etag"]}
+    )
+    assert cached.status_code == 304
+    assert "x-accel-redirect" not in cached.headers
+
+
+def test_x_sendfile_uses_absolute_path(tmp_path: Path) -> None:
+    offload = MediaOffload.from_config("x-sendfile", tmp_path, "/_media/")
+    client, _, result = _app(tmp_path, offload)  # type: ignore[arg-type]
+
+    response = client.get("/public/results/job1")
+
+    assert response.headers["x-sendfile"] == str(result.resolve())
+
+
+def test_offload_config_parsing(tmp_path: Path) -> None:
+    assert MediaOffload.from_config("", tmp_path, "/_media/") is None
+    with pytest.raises(ValueError):
+        MediaOffload.from_config("sendfile", tmp_path, "/_media/")
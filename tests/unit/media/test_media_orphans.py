@@ -0,0 +1,237 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from src.app.config import MediaPaths
+from src.app.db.db_init import init_db
+from src.app.db.db_models import MediaObjectModel
+from src.app.media.media_orphan_scheduler import OrphanScheduler
+from src.app.media.media_orphans import OrphanReconciler, OrphanReport, walk_sorted
+from src.app.repositories.media_object_repository import MediaObjectRepository
+from src.app.repositories.storage_ledger import StorageLedger
+
+
+def write(path: Path, data: bytes = b"x" * 10, *, aged: bool = True) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if aged:
+        age(path)
+    return path
+
+
+def age(path: Path) -> None:
+    past = path.stat().st_mtime - 7200
+    os.utime(path, (past, past))
+
+
+def build(tmp_path: Path, **kwargs):
+    engine = create_engine("sqlite:///:memory:", future=True)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    media_paths = MediaPaths(
+        root=tmp_path,
+        results=tmp_path / "results",
+        templates=tmp_path / "templates",
+        temp=tmp_path / "temp",
+    )
+    reconciler = OrphanReconciler(
+        media_repo=MediaObjectRepository(session_factory),
+        paths=media_paths,
+        ledger=StorageLedger(session_factory),
+        **kwargs,
+    )
+    return session_factory, media_paths, reconciler
+
+
+def add_row(session_factory, path: Path | str, **values) -> str:
+    media_id = uuid.uuid4().hex
+    values.setdefault("scope", "result")
+    with session_factory() as session:
+        session.add(
+            MediaObjectModel(
+                id=media_id,
+                job_id=f"job-{media_id[:8]}",
+                slot_id="slot-001",
+                path=str(path),
+                expires_at=datetime.utcnow() + timedelta(hours=24),
+                **values,
+            )
+        )
+        session.commit()
+    return media_id
+
+
+def cleaned_ids(session_factory) -> set[str]:
+    with session_factory() as session:
+        return set(
+            session.execute(
+                select(MediaObjectModel.id).where(MediaObjectModel.cleaned_at.is_not(None))
+            ).scalars()
+        )
+
+
+def test_walk_sorted_yields_binary_string_order(tmp_path):
+    # имена с символами меньше разделителя: порядок обхода дерева ≠ порядку строк
+    for name in ("a/b", "a-b/x", "a.c", "ab/z", "a/b-c/d", "a/b.d", "a b"):
+        write(tmp_path / name)
+    (tmp_path / "a" / "empty").mkdir()
+
+    entries = list(walk_sorted(tmp_path))
+    files = [entry.path for entry in entries if not entry.is_dir]
+
+    assert files == sorted(files)
+    assert len(files) == 7
+    assert [entry.path for entry in entries if entry.is_dir] == [
+        str(tmp_path / "a" / "empty")
+    ]
+    cursor = str(tmp_path / "a" / "b-c" / "d")
+    resumed = [entry.path for entry in walk_sorted(tmp_path, after=cursor) if not entry.is_dir]
+    assert resumed == [path for path in files if path > cursor]
+
+
+def seed_tree(session_factory, media_paths: MediaPaths) -> dict[str, object]:
+    results = media_paths.results / "slot-001"
+    live = write(results / "job-1" / "payload.png")
+    add_row(session_factory, live)
+    # упавшая задача: файл остался, строки нет
+    orphan = write(results / "job-2" / "payload.png", b"y" * 30)
+    # строка живая, файл удалён (rmtree с ignore_errors, убитый воркер)
+    missing = add_row(session_factory, results / "job-3" / "payload.png")
+    missing_template = add_row(
+        session_factory, media_paths.templates / "slot-001" / "gone.png", scope="template"
+    )
+    # строка очищена, а файл не удалился
+    leftover = write(results / "job-4" / "payload.png", b"z" * 20)
+    add_row(session_factory, leftover, cleaned_at=datetime.utcnow())
+    # только что записанный файл: строка ещё может коммититься
+    young = write(media_paths.temp / "slot-001" / "job-5" / "upload.jpg", aged=False)
+    shared = write(media_paths.root / "objects" / "ab" / "cd" / "abcd.png")
+    add_row(session_factory, shared)
+    add_row(session_factory, shared)
+    archives = media_paths.root / "archive" / "slot-001"
+    packed = write(archives / "2026-10-17.zip", b"p" * 40)
+    for job in ("job-6", "job-7"):
+        add_row(session_factory, packed / job / "payload.png", archive_offset=30, archive_size=10)
+    stale_archive = write(archives / "2026-10-16.zip", b"q" * 50)
+    empty = results / "job-8"
+    empty.mkdir()
+    age(empty)
+    return {
+        "live": live,
+        "orphan": orphan,
+        "missing": missing,
+        "missing_template": missing_template,
+        "leftover": leftover,
+        "young": young,
+        "shared": shared,
+        "packed": packed,
+        "stale_archive": stale_archive,
+        "empty": empty,
+    }
+
+
+def test_report_finds_orphans_in_both_directions(tmp_path):
+    session_factory, media_paths, reconciler = build(tmp_path)
+    tree = seed_tree(session_factory, media_paths)
+    already_cleaned = cleaned_ids(session_factory)
+
+    report = reconciler.run()
+
+    assert report.files_scanned == 7
+    assert (report.orphan_files, report.orphan_bytes) == (3, 30 + 20 + 50)
+    assert report.missing_rows == 2
+    assert report.empty_dirs == 1
+    assert report.cursor is None
+    # отчёт ничего не трогает
+    assert (report.files_removed, report.rows_cleaned, report.dirs_removed) == (0, 0, 0)
+    assert tree["orphan"].exists() and tree["empty"].exists()
+    assert cleaned_ids(session_factory) == already_cleaned
+
+
+def test_fix_removes_orphans_and_cleans_rows(tmp_path):
+    session_factory, media_paths, reconciler = build(tmp_path)
+    tree = seed_tree(session_factory, media_paths)
+    already_cleaned = cleaned_ids(session_factory)
+    removed: list[int] = []
+    reconciler.on_removed = lambda: removed.append(1)
+
+    report = reconciler.run(fix=True)
+
+    assert (report.files_removed, report.bytes_removed) == (3, 100)
+    assert report.rows_cleaned == 1
+    assert report.dirs_removed == 1
+    assert removed == [1]
+    for name in ("orphan", "leftover", "stale_archive", "empty"):
+        assert not tree[name].exists(), name
+    for name in ("live", "young", "shared", "packed"):
+        assert tree[name].exists(), name
+    # строку шаблона слот ещё использует: о ней только сообщается
+    assert cleaned_ids(session_factory) - already_cleaned == {tree["missing"]}
+    usage = {
+        (item["scope"], item["slot_id"]): item["bytes"]
+        for item in reconciler.ledger.usage()
+    }
+    assert usage == {("result", "slot-001"): -50, ("archive", "slot-001"): -50}
+
+    again = reconciler.run(fix=True)
+    # опустевшие каталоги задач моложе grace-периода: их уберёт один из следующих проходов
+    assert (again.orphan_files, again.missing_rows) == (0, 1)
+
+
+def test_bounded_runs_resume_from_cursor(tmp_path):
+    session_factory, media_paths, reconciler = build(tmp_path, batch_size=1)
+    seed_tree(session_factory, media_paths)
+    full = reconciler.run()
+
+    total = OrphanReport()
+    runs = 0
+    while True:
+        # дедлайн уже прошёл: каждый запуск обрабатывает одну пачку
+        total.add(reconciler.run(start_after=total.cursor, deadline=0))
+        runs += 1
+        if total.cursor is None:
+            break
+
+    assert runs > 5
+    assert (total.files_scanned, total.rows_scanned) == (
+        full.files_scanned,
+        full.rows_scanned,
+    )
+    assert (total.orphan_files, total.missing_rows, total.empty_dirs) == (
+        full.orphan_files,
+        full.missing_rows,
+        full.empty_dirs,
+    )
+
+
+class FakeReconciler:
+    def __init__(self, slices: list[OrphanReport]):
+        self.slices = slices
+        self.cursors: list[str | None] = []
+
+    def run(self, *, fix, start_after, deadline):
+        self.cursors.append(start_after)
+        return self.slices.pop(0)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_pass_resumes_slices_and_keeps_totals() -> None:
+    reconciler = FakeReconciler(
+        [
+            OrphanReport(files_scanned=10, orphan_files=1, cursor="/media/results/a"),
+            OrphanReport(files_scanned=5, missing_rows=2),
+        ]
+    )
+    scheduler = OrphanScheduler(reconciler=reconciler, duty_cycle=1.0)
+
+    report = await scheduler.run_pass()
+
+    assert reconciler.cursors == [None, "/media/results/a"]
+    assert (report.files_scanned, report.orphan_files, report.missing_rows) == (15, 1, 2)
+    assert report.cursor is None
+    assert scheduler.last_pass is report
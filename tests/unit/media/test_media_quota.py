@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app.config import MediaPaths
+from src.app.db.db_init import init_db
+from src.app.media.media_cleanup import MediaCleanup
+from src.app.media.media_quota import QuotaManager
+from src.app.media.media_service import ResultStore
+from src.app.media.public_result_service import PublicResultService
+from src.app.media.temp_media_store import TempMediaStore
+from src.app.repositories.job_history_repository import JobHistoryRecord
+from src.app.repositories.media_object_repository import MediaObjectRepository
+
+PAYLOAD = b"x" * 100
+CAPACITY = 500
+
+
+def build_quota(tmp_path: Path, jobs: int, **kwargs):
+    engine = create_engine("sqlite:///:memory:", future=True)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    media_repo = MediaObjectRepository(session_factory)
+    media_paths = MediaPaths(
+        root=tmp_path,
+        results=tmp_path / "results",
+        templates=tmp_path / "templates",
+        temp=tmp_path / "temp",
+    )
+    store = ResultStore(media_paths)
+    expires_at = datetime.utcnow() + timedelta(hours=24)
+    for index in range(jobs):
+        job_id = f"job-{index}"
+        path = store.save_payload("slot-001", job_id, PAYLOAD, "png")
+        media_repo.register_result(
+            job_id=job_id, slot_id="slot-001", path=path,
+            preview_path=None, expires_at=expires_at + timedelta(minutes=index),
+        )
+    evicted: list[str] = []
+    cleanup = MediaCleanup(
+        media_repo=media_repo,
+        result_store=store,
+        temp_store=TempMediaStore(
+            paths=media_paths, media_repo=media_repo, temp_ttl_seconds=48
+        ),
+        on_result_removed=evicted.append,
+    )
+
+    def disk_usage(_root: Path) -> tuple[int, int]:
+        # том целиком занят результатами: 100 байт на задачу
+        return len(list(media_paths.results.rglob("payload.*"))) * len(PAYLOAD), CAPACITY
+
+    kwargs.setdefault("disk_usage", disk_usage)
+    quota = QuotaManager(
+        cleanup=cleanup, media_repo=media_repo, media_root=tmp_path, **kwargs
+    )
+    return quota, media_repo, evicted
+
+
+def test_reclaim_evicts_least_recently_served_down_to_low_watermark(tmp_path):
+    quota, media_repo, evicted = build_quota(
+        tmp_path, jobs=5, high_watermark=0.9, low_watermark=0.3, batch_size=1
+    )
+    # job-0 скачивали два часа назад, job-1 — только что (ещё в буфере)
+    media_repo.touch_results({"job-0": datetime.utcnow() - timedelta(hours=2)})
+    quota.access_log.touch("job-1")
+
+    assert quota.check() == 4
+
+    # давно скачанный раньше свежих нескачанных (по времени записи), затем они
+    assert evicted == ["job-0", "job-2", "job-3", "job-4"]
+    assert quota.evicted_total == 4
+    assert len(quota.access_log) == 0
+    assert quota.usage_ratio() <= 0.3
+    live = media_repo.list_eviction_candidates(limit=10)
+    assert [media.job_id for media in live] == ["job-1"]
+    assert live[0].last_accessed_at is not None
+
+
+def test_fresh_unserved_result_outlives_one_served_long_ago(tmp_path):
+    quota, media_repo, evicted = build_quota(
+        tmp_path, jobs=1, high_watermark=0.3, low_watermark=0.2, batch_size=1
+    )
+    media_repo.touch_results({"job-0": datetime.utcnow() - timedelta(days=3)})
+    path = quota.cleanup.result_store.save_payload("slot-001", "job-new", PAYLOAD, "png")
+    media_repo.register_result(
+        job_id="job-new", slot_id="slot-001", path=path,
+        preview_path=None, expires_at=datetime.utcnow() + timedelta(hours=1),
+    )
+
+    assert quota.reclaim() == 1
+
+    # только что записанный результат ещё не успели скачать — он не «давний»
+    assert evicted == ["job-0"]
+
+
+def test_check_below_high_watermark_only_flushes_access_log(tmp_path):
+    quota, media_repo, evicted = build_quota(tmp_path, jobs=4)
+    quota.access_log.touch("job-3")
+
+    assert quota.check() == 0
+
+    assert evicted == []
+    accessed = {
+        media.job_id: media.last_accessed_at
+        for media in media_repo.list_eviction_candidates(limit=10)
+    }
+    assert accessed["job-3"] is not None
+    assert accessed["job-0"] is None
+
+
+def test_reclaim_stops_when_eviction_frees_nothing(tmp_path):
+    # использование тома не падает (например, объекты в grace-периоде)
+    quota, _, evicted = build_quota(
+        tmp_path, jobs=5, batch_size=2, disk_usage=lambda _root: (CAPACITY, CAPACITY)
+    )
+
+    assert quota.reclaim() == 2
+    assert evicted == ["job-0", "job-1"]
+
+
+class DummyJobRepo:
+    def __init__(self, record: JobHistoryRecord):
+        self.record = record
+
+    def get_result(self, job_id: str) -> JobHistoryRecord:
+        return self.record
+
+
+def test_public_result_reports_served_job(tmp_path):
+    result_file = tmp_path / "payload.png"
+    result_file.write_bytes(b"png")
+    record = JobHistoryRecord(
+        job_id="job-1",
+        slot_id="slot-001",
+        source="ingest",
+        status="done",
+        failure_reason=None,
+        result_path=str(result_file),
+        result_expires_at=datetime.utcnow() + timedelta(hours=1),
+    )
+    served: list[str] = []
+    service = PublicResultService(job_repo=DummyJobRepo(record), on_served=served.append)
+
+    assert service.open_result("job-1").status_code == 200
+    # вытесненный результат (файла нет) обращением не считается
+    result_file.unlink()
+    assert service.open_result("job-1").status_code == 410
+
+    assert served == ["job-1"]
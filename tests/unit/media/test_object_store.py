@@ -0,0 +1,169 @@
+import os
+from datetime import datetime, timedelta
+from hashlib import sha256
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app.config import MediaPaths
+from src.app.db.db_init import init_db
+from src.app.media.media_cleanup import MediaCleanup, cleanup_expired_results
+from src.app.media.media_cleanup_scheduler import CleanupScheduler
+from src.app.media.media_layout_migration import migrate_to_object_store
+from src.app.media.media_service import ResultStore
+from src.app.media.object_store import ObjectStore
+from src.app.media.temp_media_store import TempMediaStore
+from src.app.repositories.job_history_repository import JobHistoryRepository
+from src.app.repositories.media_object_repository import MediaObjectRepository
+
+
+def build_store(tmp_path: Path):
+    engine = create_engine("sqlite:///:memory:", future=True)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    media_repo = MediaObjectRepository(session_factory)
+    media_paths = MediaPaths(
+        root=tmp_path,
+        results=tmp_path / "results",
+        templates=tmp_path / "templates",
+        temp=tmp_path / "temp",
+    )
+    object_store = ObjectStore.for_paths(media_paths, media_repo)
+    return session_factory, media_repo, media_paths, object_store
+
+
+def age(path: Path, seconds: int = 7200) -> None:
+    past = path.stat().st_mtime - seconds
+    os.utime(path, (past, past))
+
+
+def test_put_bytes_shards_and_deduplicates(tmp_path):
+    _, _, _, object_store = build_store(tmp_path)
+    digest = sha256(b"same-bytes").hexdigest()
+
+    first = object_store.put_bytes(b"same-bytes", ".png")
+    second = object_store.put_bytes(b"same-bytes", "png")
+
+    assert first.created and not second.created
+    assert first.path == second.path
+    assert first.path == tmp_path / "objects" / digest[:2] / digest[2:4] / f"{digest}.png"
+    assert first.path.read_bytes() == b"same-bytes"
+    # временных файлов после публикации не остаётся
+    assert [p.name for p in first.path.parent.iterdir()] == [first.path.name]
+
+
+def test_release_waits_for_last_reference_and_grace(tmp_path):
+    _, media_repo, _, object_store = build_store(tmp_path)
+    stored = object_store.put_bytes(b"shared", ".jpg")
+    expired = datetime.utcnow() - timedelta(hours=1)
+    first = media_repo.register_result(
+        job_id="job-1", slot_id="slot-001", path=stored.path,
+        preview_path=None, expires_at=expired, sha256=stored.sha256,
+    )
+    second = media_repo.register_result(
+        job_id="job-2", slot_id="slot-002", path=stored.path,
+        preview_path=None, expires_at=expired, sha256=stored.sha256,
+    )
+
+    media_repo.mark_cleaned(first, datetime.utcnow())
+    assert object_store.release(stored.path, stored.sha256) is False
+
+    media_repo.mark_cleaned(second, datetime.utcnow())
+    # объект только что записан или переиспользован — ждём grace-период
+    assert object_store.release(stored.path, stored.sha256) is False
+    age(stored.path)
+    assert object_store.release(stored.path, stored.sha256) is True
+    assert not stored.path.exists()
+    assert not (tmp_path / "objects" / stored.sha256[:2]).exists()
+
+
+def test_cleanup_releases_content_addressed_results(tmp_path):
+    _, media_repo, media_paths, object_store = build_store(tmp_path)
+    store = ResultStore(media_paths, object_store=object_store, content_addressed=True)
+    path = store.save_payload("slot-001", "job-1", b"result", "png")
+    assert object_store.contains(path)
+    assert not store.result_dir("slot-001", "job-1").exists()
+    media_repo.register_result(
+        job_id="job-1", slot_id="slot-001", path=path, preview_path=None,
+        expires_at=datetime.utcnow() - timedelta(minutes=1),
+        sha256=sha256(b"result").hexdigest(),
+    )
+    age(path)
+
+    assert cleanup_expired_results(media_repo, store) == 1
+    assert not path.exists()
+
+
+def test_cleanup_slices_skip_object_held_by_grace_period(tmp_path):
+    _, media_repo, media_paths, object_store = build_store(tmp_path)
+    store = ResultStore(media_paths, object_store=object_store, content_addressed=True)
+    path = store.save_payload("slot-001", "job-1", b"result", "png")
+    media_id = media_repo.register_result(
+        job_id="job-1", slot_id="slot-001", path=path, preview_path=None,
+        expires_at=datetime.utcnow() - timedelta(minutes=1),
+        sha256=sha256(b"result").hexdigest(),
+    )
+    invalidations: list[int] = []
+    scheduler = CleanupScheduler(
+        cleanup=MediaCleanup(
+            media_repo=media_repo,
+            result_store=store,
+            temp_store=TempMediaStore(
+                paths=media_paths, media_repo=media_repo, temp_ttl_seconds=60
+            ),
+            on_removed=lambda: invalidations.append(1),
+        )
+    )
+
+    # объект свежий: строка не очищается и не считается удалённой — backlog нет
+    assert scheduler.run_slice().removed == 0
+    assert scheduler.run_slice().removed == 0
+    assert invalidations == []
+    assert path.exists()
+    assert media_repo.get_media(media_id).cleaned_at is None
+    assert scheduler.cleanup.evict_results() == []
+
+    age(path)
+    assert scheduler.run_slice().removed == 1
+    assert not path.exists()
+    assert invalidations == [1]
+
+
+def test_migration_moves_files_and_repoints_rows(tmp_path):
+    session_factory, media_repo, media_paths, object_store = build_store(tmp_path)
+    job_repo = JobHistoryRepository(session_factory)
+    legacy = ResultStore(media_paths)
+    expires_at = datetime.utcnow() + timedelta(hours=24)
+    sources = []
+    for job_id in ("job-1", "job-2"):
+        job_repo.create_pending(
+            job_id=job_id, slot_id="slot-001",
+            started_at=datetime.utcnow(), sync_deadline=datetime.utcnow(),
+        )
+        path = legacy.save_payload("slot-001", job_id, b"identical", "png")
+        media_repo.register_result(
+            job_id=job_id, slot_id="slot-001", path=path,
+            preview_path=None, expires_at=expires_at,
+        )
+        job_repo.set_result(
+            job_id=job_id, status="done", result_path=str(path),
+            result_expires_at=expires_at,
+        )
+        sources.append(path)
+
+    summary = migrate_to_object_store(session_factory, object_store, batch_size=1)
+
+    assert (summary.moved, summary.deduplicated, summary.missing) == (2, 1, 0)
+    assert summary.bytes_freed == len(b"identical")
+    target = object_store.object_path(sha256(b"identical").hexdigest(), ".png")
+    assert target.read_bytes() == b"identical"
+    assert not any(path.exists() for path in sources)
+    assert not (media_paths.results / "slot-001" / "job-1").exists()
+    for job_id in ("job-1", "job-2"):
+        record = job_repo.get_result(job_id)
+        assert record is not None and record.result_path == str(target)
+        assert record.result_sha256 == sha256(b"identical").hexdigest()
+    # повторный запуск ничего не трогает
+    again = migrate_to_object_store(session_factory, object_store)
+    assert again.moved == 0
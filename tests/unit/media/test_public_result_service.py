@@ -9,7 +9,7 @@ class DummyJobRepo:
     def __init__(self, record_map: dict[str, JobHistoryRecord]):
         self._records = record_map
 
-    def get_job(self, job_id: str) -> JobHistoryRecord:
+    def get_result(self, job_id: str) -> JobHistoryRecord:
         try:
             return self._records[job_id]
         except KeyError:
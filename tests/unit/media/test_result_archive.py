@@ -0,0 +1,156 @@
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app.config import MediaPaths
+from src.app.db.db_init import init_db
+from src.app.media.media_cleanup import cleanup_expired_results
+from src.app.media.media_service import ResultStore
+from src.app.media.public_result_service import PublicResultService
+from src.app.media.result_archive import ResultArchive, archive_aged_results
+from src.app.public.public_results_router import build_public_results_router
+from src.app.repositories.job_history_repository import JobHistoryRepository
+from src.app.repositories.media_object_repository import MediaObjectRepository
+
+# запуск архивации «через двое суток»: все результаты старше порога в 24 часа
+LATER = datetime.utcnow() + timedelta(days=2)
+
+
+def build_archive(tmp_path: Path, jobs: int):
+    # файловая БД: open_result_async читает её из потока пула
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'app.db'}",
+        future=True,
+        connect_args={"check_same_thread": False},
+    )
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    media_repo = MediaObjectRepository(session_factory)
+    job_repo = JobHistoryRepository(session_factory)
+    media_paths = MediaPaths(
+        root=tmp_path / "media",
+        results=tmp_path / "media" / "results",
+        templates=tmp_path / "media" / "templates",
+        temp=tmp_path / "media" / "temp",
+    )
+    archive = ResultArchive.for_paths(media_paths, media_repo)
+    store = ResultStore(media_paths, archive=archive)
+    expires_at = datetime.utcnow() + timedelta(days=3)
+    payloads = {}
+    for index in range(jobs):
+        job_id = f"job-{index}"
+        payload = f"payload-{index}".encode() * 50
+        job_repo.create_pending(
+            job_id=job_id, slot_id="slot-001",
+            started_at=datetime.utcnow(), sync_deadline=datetime.utcnow(),
+        )
+        path = store.save_payload("slot-001", job_id, payload, "png")
+        media_repo.register_result(
+            job_id=job_id, slot_id="slot-001", path=path,
+            preview_path=None, expires_at=expires_at,
+        )
+        job_repo.set_result(
+            job_id=job_id, status="done", result_path=str(path),
+            result_expires_at=expires_at,
+        )
+        payloads[job_id] = payload
+    return session_factory, media_repo, job_repo, media_paths, archive, store, payloads
+
+
+def test_archive_packs_day_parts_and_repoints_rows(tmp_path):
+    session_factory, _, job_repo, media_paths, archive, _, payloads = build_archive(
+        tmp_path, jobs=3
+    )
+
+    summary = archive_aged_results(
+        session_factory, archive, media_paths.results,
+        older_than=timedelta(hours=24), batch_size=2, reference_time=LATER,
+    )
+
+    assert (summary.archived, summary.archives, summary.missing) == (3, 2, 0)
+    day = datetime.utcnow().date().isoformat()
+    parts = sorted(p.name for p in (archive.root / "slot-001").iterdir())
+    assert parts == [f"{day}.1.zip", f"{day}.zip"]
+    # каталоги задач удалены: вместо трёх файлов — два архива
+    assert list((media_paths.results / "slot-001").iterdir()) == []
+    for job_id, payload in payloads.items():
+        record = job_repo.get_result(job_id)
+        member = Path(record.result_path)
+        assert member.parent.parent.suffix == ".zip"
+        assert record.result_size == len(payload)
+        with member.parent.parent.open("rb") as handle:
+            handle.seek(record.result_archive_offset)
+            assert handle.read(record.result_size) == payload
+    # обычный zip: стандартные инструменты читают архив целиком
+    with zipfile.ZipFile(archive.root / "slot-001" / f"{day}.zip") as bundle:
+        assert bundle.testzip() is None
+        assert bundle.read("job-0/payload.png") == payloads["job-0"]
+
+    again = archive_aged_results(
+        session_factory, archive, media_paths.results,
+        older_than=timedelta(hours=24), reference_time=LATER,
+    )
+    assert again.archived == 0
+
+
+def test_public_results_serve_archived_member_with_range(tmp_path):
+    session_factory, _, job_repo, media_paths, archive, _, payloads = build_archive(
+        tmp_path, jobs=2
+    )
+    archive_aged_results(
+        session_factory, archive, media_paths.results,
+        older_than=timedelta(hours=24), reference_time=LATER,
+    )
+    app = FastAPI()
+    app.include_router(build_public_results_router(PublicResultService(job_repo=job_repo)))
+    client = TestClient(app)
+
+    response = client.get("/public/results/job-1")
+    assert response.status_code == 200
+    assert response.content == payloads["job-1"]
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["content-disposition"] == 'inline; filename="payload.png"'
+
+    partial = client.get("/public/results/job-1", headers={"Range": "bytes=2-5"})
+    assert partial.status_code == 206
+    assert partial.content == payloads["job-1"][2:6]
+    assert partial.headers["content-range"] == f"bytes 2-5/{len(payloads['job-1'])}"
+
+    unsatisfiable = client.get("/public/results/job-1", headers={"Range": "bytes=9999-"})
+    assert unsatisfiable.status_code == 416
+
+    etag = response.headers["etag"]
+    assert client.get(
+        "/public/results/job-1", headers={"If-None-Match": etag}
+    ).status_code == 304
+    head = client.head("/public/results/job-1")
+    assert head.status_code == 200
+    assert head.content == b""
+    assert head.headers["content-length"] == str(len(payloads["job-1"]))
+
+
+def test_cleaning_last_member_removes_archive(tmp_path):
+    session_factory, media_repo, _, media_paths, archive, store, _ = build_archive(
+        tmp_path, jobs=2
+    )
+    archive_aged_results(
+        session_factory, archive, media_paths.results,
+        older_than=timedelta(hours=24), reference_time=LATER,
+    )
+    (bundle,) = (archive.root / "slot-001").iterdir()
+
+    # первый проход: одна строка ещё жива — архив остаётся
+    first = media_repo.list_eviction_candidates(limit=1)[0]
+    media_repo.mark_cleaned(first.id, datetime.utcnow())
+    store.release_results([(first.path, None)])
+    assert bundle.exists()
+
+    assert cleanup_expired_results(
+        media_repo, store, reference_time=datetime.utcnow() + timedelta(days=4)
+    ) == 1
+    assert not bundle.exists()
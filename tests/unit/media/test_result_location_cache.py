@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi import status
+
+from src.app.ingest.ingest_models import JobOutcome
+from src.app.media.public_result_service import PublicResultService
+from src.app.media.result_location_cache import (
+    ResultLocation,
+    ResultLocationCache,
+    ResultMiss,
+)
+from src.app.repositories.job_history_repository import JobHistoryRecord
+
+
+class CountingRepo:
+    def __init__(self, records: dict[str, JobHistoryRecord] | None = None) -> None:
+        self.records = records or {}
+        self.calls: list[str] = []
+
+    def get_result(self, job_id: str) -> JobHistoryRecord:
+        self.calls.append(job_id)
+        return self.records[job_id]
+
+
+def _outcome(job_id: str, path: Path, *, status_value: str = "done") -> JobOutcome:
+    return JobOutcome(
+        job_id=job_id,
+        slot_id="slot-001",
+        provider="gemini",
+        status=status_value,
+        result_path=path,
+        result_expires_at=datetime.utcnow() + timedelta(hours=1),
+        content_type="image/png",
+        size_bytes=4,
+        sha256="aa" * 32,
+    )
+
+
+def test_completed_job_is_served_without_database(tmp_path: Path) -> None:
+    payload = tmp_path / "payload.png"
+    payload.write_bytes(b"data")
+    record = JobHistoryRecord(
+        job_id="job-1",
+        slot_id="slot-001",
+        source="ingest",
+        status="done",
+        failure_reason=None,
+        result_path=str(payload),
+        result_expires_at=datetime.utcnow() + timedelta(hours=1),
+    )
+    repo = CountingRepo({"job-1": record})
+    service = PublicResultService(job_repo=repo)  # type: ignore[arg-type]
+
+    service.cache.record_outcome(_outcome("job-1", payload))
+    response = service.open_result("job-1")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.media_type == "image/png"
+    assert response.headers["etag"] == f'"{"aa" * 32}"'
+    assert repo.calls == []
+
+    # файл удалён cron-ом в другом процессе: БД перечитывается один раз
+    # (файл мог переехать), дальше 410 отдаётся из кэша
+    payload.unlink()
+    assert service.open_result("job-1").status_code == status.HTTP_410_GONE
+    assert service.open_result("job-1").status_code == status.HTTP_410_GONE
+    assert repo.calls == ["job-1"]
+
+    # переезд в хранилище объектов: устаревший путь из кэша заменяется путём из БД
+    moved = tmp_path / "objects" / "payload.png"
+    moved.parent.mkdir()
+    moved.write_bytes(b"data")
+    service.cache.record_outcome(_outcome("job-1", payload))
+    record.result_path = str(moved)
+    assert service.open_result("job-1").status_code == status.HTTP_200_OK
+    assert service.cache.get("job-1").path == moved  # type: ignore[union-attr]
+
+
+def test_misses_are_cached_briefly_and_do_not_hide_new_results(tmp_path: Path) -> None:
+    repo = CountingRepo()
+    cache = ResultLocationCache(negative_ttl_seconds=60)
+    service = PublicResultService(job_repo=repo, cache=cache)  # type: ignore[arg-type]
+
+    assert service.open_result("job-2").status_code == status.HTTP_404_NOT_FOUND
+    assert service.open_result("job-2").status_code == status.HTTP_404_NOT_FOUND
+    assert repo.calls == ["job-2"]
+
+    payload = tmp_path / "payload.png"
+    payload.write_bytes(b"data")
+    cache.record_outcome(_outcome("job-2", payload))
+    assert service.open_result("job-2").status_code == status.HTTP_200_OK
+
+    # поздний промах из БД не затирает запись хука
+    cache.add("job-2", ResultMiss(status.HTTP_404_NOT_FOUND, "result_not_found"))
+    assert isinstance(cache.get("job-2"), ResultLocation)
+
+    expired = ResultLocationCache(negative_ttl_seconds=0)
+    expired.put("job-3", ResultMiss(status.HTTP_404_NOT_FOUND, "result_not_found"))
+    assert expired.get("job-3") is None
+
+
+def test_cache_is_bounded_lru_and_forgets_failed_jobs(tmp_path: Path) -> None:
+    cache = ResultLocationCache(max_entries=2)
+    for job_id in ("a", "b"):
+        cache.record_outcome(_outcome(job_id, tmp_path / f"{job_id}.png"))
+    assert cache.get("a") is not None  # "a" стал самым свежим
+    cache.record_outcome(_outcome("c", tmp_path / "c.png"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    cache.record_outcome(_outcome("c", tmp_path / "c.png", status_value="failed"))
+    assert cache.get("c") is None
+    assert len(cache) == 1
@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from hashlib import sha256
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.app.auth.auth_dependencies import require_admin_user
+from src.app.config import MediaPaths
+from src.app.db.db_engine import create_db_engine
+from src.app.db.db_init import init_db
+from src.app.db.db_models import SlotTemplateMediaModel
+from src.app.media.object_store import ObjectStore
+from src.app.media.public_media_links import MediaUrlDenylist, MediaUrlSigner
+from src.app.media.public_media_service import PublicMediaService
+from src.app.media.template_media_api import router
+from src.app.public.public_media_router import build_public_media_router
+from src.app.repositories.job_history_repository import JobHistoryRepository
+from src.app.repositories.media_object_repository import MediaObjectRepository
+from src.app.repositories.storage_ledger import StorageLedger
+
+
+@dataclass
+class TemplateApp:
+    client: TestClient
+    signer: MediaUrlSigner
+    media_repo: MediaObjectRepository
+    job_repo: JobHistoryRepository
+    ledger: StorageLedger
+    session_factory: sessionmaker[Session]
+
+    def add_template(self, job_id: str, path: Path, content: bytes) -> str:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        now = datetime.utcnow()
+        self.job_repo.create_template_upload(
+            job_id=job_id, slot_id="slot-001", path=str(path), completed_at=now
+        )
+        return self.media_repo.register_template(
+            job_id=job_id,
+            slot_id="slot-001",
+            path=path,
+            expires_at=now + timedelta(days=3650),
+            sha256=sha256(content).hexdigest(),
+        )
+
+
+def build_app(tmp_path: Path) -> TemplateApp:
+    engine = create_db_engine("sqlite:///:memory:")
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    paths = MediaPaths(
+        root=tmp_path,
+        results=tmp_path / "results",
+        templates=tmp_path / "templates",
+        temp=tmp_path / "temp",
+    )
+    media_repo = MediaObjectRepository(session_factory)
+    ledger = StorageLedger(session_factory)
+    signer = MediaUrlSigner.from_secret("secret", tmp_path, ttl_seconds=60)
+    public_media_service = PublicMediaService(
+        signer=signer, denylist=MediaUrlDenylist(ttl_seconds=60)
+    )
+
+    app = FastAPI()
+    app.include_router(router)
+    app.include_router(build_public_media_router(public_media_service))
+    app.state.media_repo = media_repo
+    app.state.storage_ledger = ledger
+    app.state.object_store = ObjectStore.for_paths(paths, media_repo, ledger)
+    app.state.public_media_service = public_media_service
+    app.dependency_overrides[require_admin_user] = lambda: {
+        "sub": "serg",
+        "scope": "admin",
+    }
+    return TemplateApp(
+        client=TestClient(app),
+        signer=signer,
+        media_repo=media_repo,
+        job_repo=JobHistoryRepository(session_factory),
+        ledger=ledger,
+        session_factory=session_factory,
+    )
+
+
+def test_deleted_template_link_is_revoked(tmp_path: Path) -> None:
+    env = build_app(tmp_path)
+    client = env.client
+    path = tmp_path / "templates" / "slot-001" / "style.png"
+    media_id = env.add_template("template-1", path, b"style")
+    env.ledger.record("template", "slot-001", 5, 1)
+    link = "/" + env.signer.sign(path)
+    assert client.get(link).status_code == 200
+
+    assert client.delete(f"/api/template-media/{media_id}").status_code == 204
+    assert not path.exists()
+    assert env.ledger.usage_bytes("template") == 0
+    assert client.get(link).status_code == 410
+    assert client.delete(f"/api/template-media/{media_id}").status_code == 404
+
+
+def test_shared_object_link_is_revoked_with_last_reference(tmp_path: Path) -> None:
+    env = build_app(tmp_path)
+    client = env.client
+    digest = sha256(b"shared").hexdigest()
+    path = tmp_path / "objects" / digest[:2] / digest[2:4] / f"{digest}.png"
+    first = env.add_template("template-1", path, b"shared")
+    second = env.add_template("template-2", path, b"shared")
+    link = "/" + env.signer.sign(path)
+
+    # другой шаблон всё ещё ссылается на объект — его ссылки продолжают работать
+    assert client.delete(f"/api/template-media/{first}").status_code == 204
+    assert client.get(link).status_code == 200
+
+    # объект моложе grace-периода остаётся на диске, но ссылки на него отозваны
+    assert client.delete(f"/api/template-media/{second}").status_code == 204
+    assert path.exists()
+    assert client.get(link).status_code == 410
+
+
+def test_delete_keeps_template_bound_to_slot(tmp_path: Path) -> None:
+    env = build_app(tmp_path)
+    path = tmp_path / "templates" / "slot-001" / "style.png"
+    media_id = env.add_template("template-1", path, b"style")
+    with env.session_factory() as session:
+        session.add(
+            SlotTemplateMediaModel(
+                slot_id="slot-001", media_kind="style", media_object_id=media_id
+            )
+        )
+        session.commit()
+
+    response = env.client.delete(f"/api/template-media/{media_id}")
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["failure_reason"] == "template_in_use"
+    assert path.exists()
+    assert env.client.get("/" + env.signer.sign(path)).status_code == 200
+
+
+def test_delete_rejects_non_template_media(tmp_path: Path) -> None:
+    env = build_app(tmp_path)
+    env.job_repo.create_template_upload(
+        job_id="job-1",
+        slot_id="slot-001",
+        path=str(tmp_path / "results" / "payload.png"),
+        completed_at=datetime.utcnow(),
+    )
+    media_id = env.media_repo.register_result(
+        job_id="job-1",
+        slot_id="slot-001",
+        path=tmp_path / "results" / "payload.png",
+        preview_path=None,
+        expires_at=datetime.utcnow() + timedelta(days=1),
+    )
+
+    assert env.client.delete(f"/api/template-media/{media_id}").status_code == 404
+    assert env.client.delete("/api/template-media/unknown").status_code == 404
@@ -11,6 +11,7 @@ from sqlalchemy.orm import sessionmaker
 from src.app.db.db_models import Base, MediaObjectModel, SlotTemplateMediaModel
 from src.app.ingest.ingest_errors import ProviderExecutionError
 from src.app.ingest.ingest_models import JobContext, UploadValidationResult
+from src.app.media.public_media_links import MediaUrlSigner
 from src.app.media.temp_media_store import TempMediaHandle
 from src.app.providers.providers_turbotext import TurbotextDriver
 from src.app.repositories.media_object_repository import MediaObjectRepository
@@ -84,6 +85,11 @@ def media_repo(session_factory) -> MediaObjectRepository:
     return MediaObjectRepository(session_factory)
 
 
+@pytest.fixture
+def url_signer(tmp_path: Path) -> MediaUrlSigner:
+    return MediaUrlSigner.from_secret("secret", tmp_path, ttl_seconds=48)
+
+
 def store_template_media(
     repo: MediaObjectRepository,
     *,
@@ -162,6 +168,7 @@ async def test_turbotext_success(
     monkeypatch,
     job_context: JobContext,
     media_repo: MediaObjectRepository,
+    url_signer: MediaUrlSigner,
     tmp_path: Path,
 ):
     store_template_media(
@@ -189,7 +196,7 @@ async def test_turbotext_success(
     ]
     configure_httpx(monkeypatch, post_responses, get_responses)
 
-    driver = TurbotextDriver(media_repo=media_repo)
+    driver = TurbotextDriver(media_repo=media_repo, url_signer=url_signer)
     driver.poll_interval_seconds = 0
     result = await driver.process(job_context)
 
@@ -199,7 +206,7 @@ async def test_turbotext_success(
 
 @pytest.mark.asyncio
 async def test_turbotext_polling_reconnect(
-    monkeypatch, job_context, media_repo, tmp_path
+    monkeypatch, job_context, media_repo, url_signer, tmp_path
 ):
     store_template_media(
         media_repo,
@@ -225,14 +232,16 @@ async def test_turbotext_polling_reconnect(
     ]
     configure_httpx(monkeypatch, post_responses, get_responses)
 
-    driver = TurbotextDriver(media_repo=media_repo)
+    driver = TurbotextDriver(media_repo=media_repo, url_signer=url_signer)
     driver.poll_interval_seconds = 0
     result = await driver.process(job_context)
     assert result.payload == b"result"
 
 
 @pytest.mark.asyncio
-async def test_turbotext_timeout(monkeypatch, job_context, media_repo, tmp_path):
+async def test_turbotext_timeout(
+    monkeypatch, job_context, media_repo, url_signer, tmp_path
+):
     store_template_media(
         media_repo,
         slot_id=job_context.slot_id,
@@ -248,16 +257,18 @@ async def test_turbotext_timeout(monkeypatch, job_context, media_repo, tmp_path)
     get_responses: list[DummyHTTPResponse] = []
     configure_httpx(monkeypatch, post_responses, get_responses)
 
-    driver = TurbotextDriver(media_repo=media_repo)
+    driver = TurbotextDriver(media_repo=media_repo, url_signer=url_signer)
     driver.poll_interval_seconds = 0
     with pytest.raises(ProviderExecutionError):
         await driver.process(job_context)
 
 
 @pytest.mark.asyncio
-async def test_turbotext_missing_base_url(monkeypatch, job_context, media_repo):
+async def test_turbotext_missing_base_url(
+    monkeypatch, job_context, media_repo, url_signer
+):
     monkeypatch.delenv("PUBLIC_MEDIA_BASE_URL", raising=False)
-    driver = TurbotextDriver(media_repo=media_repo)
+    driver = TurbotextDriver(media_repo=media_repo, url_signer=url_signer)
     driver.poll_interval_seconds = 0
     with pytest.raises(ProviderExecutionError):
         await driver.process(job_context)
@@ -265,7 +276,7 @@ async def test_turbotext_missing_base_url(monkeypatch, job_context, media_repo):
 
 @pytest.mark.asyncio
 async def test_turbotext_create_queue_failure(
-    monkeypatch, job_context, media_repo, tmp_path
+    monkeypatch, job_context, media_repo, url_signer, tmp_path
 ):
     store_template_media(
         media_repo,
@@ -279,7 +290,7 @@ async def test_turbotext_create_queue_failure(
     get_responses: list[DummyHTTPResponse] = []
     configure_httpx(monkeypatch, post_responses, get_responses)
 
-    driver = TurbotextDriver(media_repo=media_repo)
+    driver = TurbotextDriver(media_repo=media_repo, url_signer=url_signer)
     driver.poll_interval_seconds = 0
     with pytest.raises(ProviderExecutionError):
         await driver.process(job_context)
@@ -287,14 +298,14 @@ async def test_turbotext_create_queue_failure(
 
 @pytest.mark.asyncio
 async def test_turbotext_missing_template(
-    monkeypatch, job_context, media_repo, tmp_path
+    monkeypatch, job_context, media_repo, url_signer, tmp_path
 ):
     # No template stored, and entry is required (no optional flag)
     post_responses = [DummyHTTPResponse(200, {"success": True, "queueid": "123"})]
     get_responses: list[DummyHTTPResponse] = []
     configure_httpx(monkeypatch, post_responses, get_responses)
 
-    driver = TurbotextDriver(media_repo=media_repo)
+    driver = TurbotextDriver(media_repo=media_repo, url_signer=url_signer)
     driver.poll_interval_seconds = 0
     with pytest.raises(ProviderExecutionError):
         await driver.process(job_context)
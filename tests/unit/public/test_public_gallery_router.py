@@ -1,62 +1,190 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime, timedelta
 from pathlib import Path
 
-from src.app.public.public_gallery_router import _build_latest, _build_recent
-from src.app.repositories.job_history_repository import JobHistoryRecord
-
-
-class DummyJobRepo:
-    def __init__(self, records_by_slot: dict[str, list[JobHistoryRecord]]):
-        self._records_by_slot = records_by_slot
-
-    def list_recent_by_slot(self, slot_id: str, limit: int = 10) -> list[JobHistoryRecord]:
-        return list(self._records_by_slot.get(slot_id, []))[:limit]
-
-
-def _record(job_id: str, path: Path, *, expires_delta_hours: int = -24) -> JobHistoryRecord:
-    now = datetime.utcnow()
-    return JobHistoryRecord(
-        job_id=job_id,
-        slot_id="slot-001",
-        source="ingest",
-        status="done",
-        failure_reason=None,
-        result_path=str(path),
-        result_expires_at=now + timedelta(hours=expires_delta_hours),
-        completed_at=now,
-        started_at=now,
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.db_init import init_db
+from src.app.db.db_models import JobHistoryModel, MediaObjectModel
+from src.app.ingest.ingest_models import JobOutcome
+from src.app.public.public_gallery_router import (
+    _render_gallery_payload,
+    build_public_gallery_router,
+)
+from src.app.public.public_gallery_stream import GalleryStream
+from src.app.public.public_gallery_service import (
+    GalleryCache,
+    GalleryEntry,
+    GalleryRateLimiter,
+    GalleryShareState,
+)
+from src.app.repositories.job_history_repository import JobHistoryRepository
+from src.app.slots.slots_repository import SlotRepository
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+class DummySettings:
+    def snapshot(self) -> dict[str, int]:
+        return {"sync_response_seconds": 48, "result_ttl_hours": 168}
+
+
+def _build(
+    tmp_path: Path,
+) -> tuple[SlotRepository, JobHistoryRepository, sessionmaker, list[str]]:
+    # роутер ходит в БД из пула потоков — in-memory SQLite там не виден
+    engine = create_engine(
+        f"sqlite:///{(tmp_path / 'gallery.db').as_posix()}",
+        future=True,
+        connect_args={"check_same_thread": False},
+    )
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    statements: list[str] = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda _conn, _cursor, statement, *_args: statements.append(statement),
+    )
+    return (
+        SlotRepository(session_factory),
+        JobHistoryRepository(session_factory),
+        session_factory,
+        statements,
     )
 
 
-def test_build_recent_skips_missing_files_and_keeps_existing_even_if_expired(
-    tmp_path: Path,
+def _add_job(
+    session_factory: sessionmaker,
+    job_id: str,
+    *,
+    slot_id: str = "slot-001",
+    minutes_ago: int = 0,
+    status: str = "done",
+    cleaned: bool = False,
+    expires_delta_hours: int = 24,
 ) -> None:
-    existing = tmp_path / "results" / "slot-001" / "job-ok" / "payload.png"
-    existing.parent.mkdir(parents=True, exist_ok=True)
-    existing.write_bytes(b"ok")
-    missing = tmp_path / "results" / "slot-001" / "job-missing" / "payload.png"
-
-    repo = DummyJobRepo(
-        {
-            "slot-001": [
-                _record("job-ok", existing, expires_delta_hours=-48),
-                _record("job-missing", missing, expires_delta_hours=48),
-            ]
-        }
+    completed_at = NOW - timedelta(minutes=minutes_ago)
+    expires_at = completed_at + timedelta(hours=expires_delta_hours)
+    # файлов на диске нет: галерея не должна их проверять
+    path = f"/missing/{slot_id}/{job_id}/payload.png" if status == "done" else None
+    with session_factory() as session:
+        session.add(
+            JobHistoryModel(
+                job_id=job_id,
+                slot_id=slot_id,
+                source="ingest",
+                status=status,
+                started_at=completed_at - timedelta(seconds=5),
+                completed_at=completed_at,
+                result_path=path,
+                result_expires_at=expires_at if path else None,
+            )
+        )
+        session.flush()
+        if path:
+            session.add(
+                MediaObjectModel(
+                    id=f"media-{job_id}",
+                    job_id=job_id,
+                    slot_id=slot_id,
+                    scope="result",
+                    path=path,
+                    expires_at=expires_at,
+                    cleaned_at=NOW if cleaned else None,
+                )
+            )
+        session.commit()
+
+
+def test_gallery_uses_cleaned_at_and_one_job_query(tmp_path: Path) -> None:
+    slot_repo, job_repo, session_factory, statements = _build(tmp_path)
+    _add_job(session_factory, "failed-newest", status="failed")
+    _add_job(session_factory, "expired-kept", minutes_ago=1, expires_delta_hours=-48)
+    _add_job(session_factory, "cleaned", minutes_ago=2, cleaned=True)
+    _add_job(session_factory, "older", minutes_ago=3)
+    for index in range(12):
+        _add_job(session_factory, f"s2-{index:02d}", slot_id="slot-002", minutes_ago=index)
+    statements.clear()
+
+    entry = _render_gallery_payload(slot_repo, job_repo, DummySettings())  # type: ignore[arg-type]
+
+    payload = json.loads(entry.body)
+    slots = {item["slot_id"]: item for item in payload["slots"]}
+    assert [item["job_id"] for item in slots["slot-001"]["recent_results"]] == [
+        "expired-kept",
+        "older",
+    ]
+    assert slots["slot-001"]["latest_result"]["job_id"] == "expired-kept"
+    assert slots["slot-001"]["latest_result"]["mime"] == "image/png"
+    assert len(slots["slot-002"]["recent_results"]) == 10
+    assert slots["slot-003"]["latest_result"] is None
+    # слоты + одна выборка результатов, независимо от числа слотов
+    assert len([s for s in statements if "FROM job_history" in s]) == 1
+
+
+def test_gallery_etag_answers_304_until_a_job_completes(tmp_path: Path) -> None:
+    slot_repo, job_repo, session_factory, statements = _build(tmp_path)
+    _add_job(session_factory, "first", minutes_ago=5)
+    share_state = GalleryShareState()
+    share_state.enable()
+    cache = GalleryCache()
+    app = FastAPI()
+    app.include_router(
+        build_public_gallery_router(
+            share_state=share_state,
+            rate_limiter=GalleryRateLimiter(limit_per_minute=100),
+            cache=cache,
+            stream=GalleryStream(share_state),
+            slot_repo=slot_repo,
+            job_repo=job_repo,
+            settings_service=DummySettings(),  # type: ignore[arg-type]
+            gallery_page_path=str(tmp_path / "gallery.html"),
+        )
     )
+    client = TestClient(app)
+
+    first = client.get("/pub/gallery")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "no-cache"
+    statements.clear()
+
+    cached = client.get("/pub/gallery", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert statements == []
+
+    # пересборка по TTL без изменений оставляет тот же ETag
+    cache.invalidate()
+    revalidated = client.get("/pub/gallery", headers={"If-None-Match": f"W/{etag}"})
+    assert revalidated.status_code == 304
+
+    _add_job(session_factory, "second")
+    cache.record_outcome(
+        JobOutcome(
+            job_id="second",
+            slot_id="slot-001",
+            provider="gemini",
+            status="done",
+            failure_reason=None,
+        )
+    )
+    fresh = client.get("/pub/gallery", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert fresh.json()["slots"][0]["latest_result"]["job_id"] == "second"
 
-    results = _build_recent(repo, "slot-001", limit=10)
-
-    assert len(results) == 1
-    assert results[0]["job_id"] == "job-ok"
-
-
-def test_build_latest_returns_none_for_missing_file(tmp_path: Path) -> None:
-    missing = tmp_path / "results" / "slot-001" / "job-missing" / "payload.png"
-    repo = DummyJobRepo({"slot-001": [_record("job-missing", missing)]})
 
-    latest = _build_latest(repo, "slot-001")
+def test_cache_drops_entry_built_before_invalidation() -> None:
+    cache = GalleryCache()
+    generation = cache.generation
+    cache.invalidate()  # задача завершилась, пока шла пересборка
+    cache.set(GalleryEntry(body=b"{}", etag='"stale"'), generation)
 
-    assert latest is None
+    assert cache.get() is None
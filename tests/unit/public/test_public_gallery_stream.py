@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from src.app.ingest.ingest_models import JobOutcome
+from src.app.public.public_gallery_service import GalleryShareState
+from src.app.public.public_gallery_stream import (
+    CLOSED_EVENT,
+    READY_EVENT,
+    RESYNC_EVENT,
+    GalleryStream,
+)
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+def _outcome(job_id: str, status: str = "done") -> JobOutcome:
+    return JobOutcome(
+        job_id=job_id,
+        slot_id="slot-003",
+        provider="gemini",
+        status=status,
+        failure_reason=None,
+        started_at=NOW,
+        completed_at=NOW + timedelta(seconds=7),
+        result_expires_at=NOW + timedelta(hours=72),
+        content_type="image/png" if status == "done" else None,
+    )
+
+
+def _shared() -> GalleryShareState:
+    state = GalleryShareState()
+    state.enable()
+    return state
+
+
+@pytest.mark.asyncio
+async def test_new_result_is_serialised_once_for_all_viewers() -> None:
+    gallery = GalleryStream(_shared())
+    await gallery.start()
+    streams = [gallery.stream(gallery.subscribe()) for _ in range(3)]
+    for stream in streams:
+        assert await anext(stream) == READY_EVENT
+
+    # хук завершения приходит из потока фоновой очереди
+    await asyncio.to_thread(gallery.record_outcome, _outcome("failed", "failed"))
+    await asyncio.to_thread(gallery.record_outcome, _outcome("job-1"))
+
+    frames = [await anext(stream) for stream in streams]
+    assert frames[0] is frames[1] is frames[2]
+    event, data = frames[0].decode().strip().split("\n")
+    assert event == "event: result"
+    payload = json.loads(data.removeprefix("data: "))
+    assert payload["slot_id"] == "slot-003"
+    assert payload["result"]["job_id"] == "job-1"
+    assert payload["result"]["public_url"] == "/public/results/job-1"
+    assert payload["result"]["mime"] == "image/png"
+
+    await gallery.stop()
+    for stream in streams:
+        with pytest.raises(StopAsyncIteration):
+            await anext(stream)
+    assert gallery.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_subscriber_limit_backpressure_and_share_expiry() -> None:
+    share_state = _shared()
+    gallery = GalleryStream(
+        share_state, max_subscribers=1, queue_size=2, heartbeat_seconds=0.05
+    )
+    await gallery.start()
+    stream = gallery.stream(gallery.subscribe())
+    with pytest.raises(HTTPException) as exc_info:
+        gallery.subscribe()
+    assert exc_info.value.status_code == 503
+    await anext(stream)
+
+    for index in range(5):
+        gallery.record_outcome(_outcome(f"job-{index}"))
+    await asyncio.sleep(0)
+    assert await anext(stream) == RESYNC_EVENT
+
+    share_state.share_until = None
+    assert await anext(stream) == CLOSED_EVENT
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+    assert gallery.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_one_client_cannot_take_every_stream() -> None:
+    gallery = GalleryStream(_shared(), max_subscribers=4, max_per_client=2)
+    await gallery.start()
+    greedy = [gallery.stream(gallery.subscribe("10.0.0.1")) for _ in range(2)]
+    for stream in greedy:
+        await anext(stream)
+
+    with pytest.raises(HTTPException) as exc_info:
+        gallery.subscribe("10.0.0.1")
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.detail["reason"] == "too_many_viewers_from_client"
+    # остальные адреса получают оставшиеся места
+    others = [gallery.stream(gallery.subscribe(f"10.0.0.{n}")) for n in (2, 3)]
+    for stream in others:
+        await anext(stream)
+    assert gallery.subscribers == 4
+
+    # закрытый поток освобождает место своего адреса
+    await greedy[0].aclose()
+    await others[0].aclose()
+    gallery.stream(gallery.subscribe("10.0.0.1"))
+    assert gallery.subscribers == 3
@@ -1,104 +1,94 @@
-﻿from __future__ import annotations
+from __future__ import annotations
 
-from datetime import datetime, timedelta
+import time
 from pathlib import Path
 
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
-from src.app.db.db_models import Base, JobHistoryModel, MediaObjectModel, SlotModel
+from src.app.media.public_media_links import (
+    MediaUrlDenylist,
+    MediaUrlSigner,
+    build_public_media_url,
+)
 from src.app.media.public_media_service import PublicMediaService
 from src.app.public.public_media_router import build_public_media_router
-from src.app.repositories.media_object_repository import MediaObjectRepository
 
 
 @pytest.fixture()
-def session_factory(tmp_path) -> sessionmaker:
-    engine = create_engine(
-        f"sqlite:///{(tmp_path / 'public-test.db').as_posix()}",
-        future=True,
-        connect_args={"check_same_thread": False},
-    )
-    Session = sessionmaker(bind=engine, expire_on_commit=False)
-    Base.metadata.create_all(engine)
-    return Session
+def signer(tmp_path: Path) -> MediaUrlSigner:
+    return MediaUrlSigner.from_secret("secret", tmp_path, ttl_seconds=60)
+
+
+@pytest.fixture()
+def service(signer: MediaUrlSigner) -> PublicMediaService:
+    return PublicMediaService(signer=signer, denylist=MediaUrlDenylist(ttl_seconds=60))
 
 
 @pytest.fixture()
-def client(tmp_path: Path, session_factory) -> TestClient:
-    repo = MediaObjectRepository(session_factory)
-    service = PublicMediaService(media_repo=repo)
+def client(service: PublicMediaService) -> TestClient:
     app = FastAPI()
     app.include_router(build_public_media_router(service))
     return TestClient(app)
 
 
-def add_media(
-    session_factory, media_id: str, path: Path, *, expires_in_seconds: int = 60
-) -> None:
+def add_media(path: Path) -> Path:
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_bytes(b"data")
-    with session_factory() as session:
-        if not session.query(SlotModel).filter(SlotModel.id == "slot").count():
-            session.add(
-                SlotModel(
-                    id="slot",
-                    display_name="Slot",
-                    provider="turbotext",
-                    operation="image_edit",
-                    settings_json="{}",
-                    size_limit_mb=15,
-                    is_active=True,
-                )
-            )
-        session.add(
-            JobHistoryModel(
-                job_id=f"job-{media_id}",
-                slot_id="slot",
-                status="pending",
-            )
-        )
-        session.add(
-            MediaObjectModel(
-                id=media_id,
-                job_id=f"job-{media_id}",
-                slot_id="slot",
-                scope="provider",
-                path=str(path),
-                preview_path=None,
-                expires_at=datetime.utcnow() + timedelta(seconds=expires_in_seconds),
-                cleaned_at=None,
-            )
-        )
-        session.commit()
-
-
-def test_public_media_serves_file(
-    client: TestClient, tmp_path: Path, session_factory
+    return path
+
+
+def test_public_media_serves_signed_link(
+    client: TestClient, signer: MediaUrlSigner, tmp_path: Path
 ) -> None:
-    add_media(session_factory, "media-1", tmp_path / "provider" / "file.png")
-    response = client.get("/public/provider-media/media-1")
+    path = add_media(tmp_path / "temp" / "slot" / "job" / "file.png")
+    url = build_public_media_url("https://photochanger.local", signer, path)
+    assert url.startswith("https://photochanger.local/public/provider-media/")
+    assert url.endswith("/temp/slot/job/file.png")
+
+    response = client.get("/" + signer.sign(path))
     assert response.status_code == 200
     assert response.content == b"data"
     assert response.headers["content-type"].startswith("image/")
+    assert response.headers["cache-control"].endswith("immutable")
 
+    cached = client.get(
+        "/" + signer.sign(path), headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert cached.status_code == 304
+    assert client.head("/" + signer.sign(path)).status_code == 200
+
+
+def test_public_media_rejects_tampered_links(
+    client: TestClient, signer: MediaUrlSigner, tmp_path: Path
+) -> None:
+    add_media(tmp_path / "temp" / "a.png")
+    add_media(tmp_path / "temp" / "b.png")
+    link = signer.sign(tmp_path / "temp" / "a.png")
+    prefix, _, _ = link.rpartition("/")
 
-def test_public_media_404(client: TestClient) -> None:
-    response = client.get("/public/provider-media/missing")
-    assert response.status_code == 404
+    assert client.get("/" + prefix + "/b.png").status_code == 404
+    expires, signature = link.split("/")[2:4]
+    later = str(int(expires) + 3600)
+    assert client.get("/" + link.replace(expires, later, 1)).status_code == 404
+    assert signer.resolve("../secret.txt") is None
 
 
-def test_public_media_expired(
-    client: TestClient, tmp_path: Path, session_factory
+def test_public_media_expired_and_revoked(
+    client: TestClient,
+    service: PublicMediaService,
+    signer: MediaUrlSigner,
+    tmp_path: Path,
 ) -> None:
-    add_media(
-        session_factory,
-        "media-expired",
-        tmp_path / "provider" / "old.png",
-        expires_in_seconds=-1,
-    )
-    response = client.get("/public/provider-media/media-expired")
-    assert response.status_code == 410
+    path = add_media(tmp_path / "templates" / "slot" / "style.png")
+    expired = signer.sign(path, now=time.time() - 120)
+    assert client.get("/" + expired).status_code == 410
+
+    link = signer.sign(path)
+    service.revoke(path)
+    assert client.get("/" + link).status_code == 410
+
+    missing = signer.sign(add_media(tmp_path / "temp" / "gone.png"))
+    (tmp_path / "temp" / "gone.png").unlink()
+    assert client.get("/" + missing).status_code == 410
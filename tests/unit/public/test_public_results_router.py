@@ -13,7 +13,7 @@ class DummyJobRepo:
     def __init__(self, records: dict[str, JobHistoryRecord]):
         self._records = records
 
-    def get_job(self, job_id: str) -> JobHistoryRecord:
+    def get_result(self, job_id: str) -> JobHistoryRecord:
         try:
             return self._records[job_id]
         except KeyError:
@@ -78,3 +78,59 @@ def test_public_results_router_not_found(tmp_path: Path) -> None:
 
     assert response.status_code == 404
     assert response.json() == {"status": "error", "failure_reason": "result_not_found"}
+
+
+def test_public_results_router_caching_range_and_head(tmp_path: Path) -> None:
+    result_file = tmp_path / "res" / "slot" / "job123" / "payload.png"
+    result_file.parent.mkdir(parents=True, exist_ok=True)
+    result_file.write_bytes(b"0123456789")
+    record = JobHistoryRecord(
+        job_id="job123",
+        slot_id="slot",
+        source="ingest",
+        status="done",
+        failure_reason=None,
+        result_path=str(result_file),
+        result_expires_at=datetime.utcnow() + timedelta(hours=2),
+        result_sha256="ab" * 32,
+    )
+    repo = DummyJobRepo({"job123": record})
+    calls: list[str] = []
+    get_result = repo.get_result
+    repo.get_result = lambda job_id: calls.append(job_id) or get_result(job_id)  # type: ignore[method-assign]
+    client = create_app(PublicResultService(job_repo=repo))
+
+    response = client.get("/public/results/job123")
+    etag = response.headers["etag"]
+    assert etag == f'"{"ab" * 32}"'
+    cache_control = response.headers["cache-control"]
+    assert cache_control.startswith("public, max-age=") and cache_control.endswith(", immutable")
+    assert 7100 < int(cache_control.split("max-age=")[1].split(",")[0]) <= 7200
+
+    cached = client.get("/public/results/job123", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+    partial = client.get("/public/results/job123", headers={"Range": "bytes=4-"})
+    assert partial.status_code == 206
+    assert partial.content == b"456789"
+    assert partial.headers["content-range"] == "bytes 4-9/10"
+    resumed = client.get(
+        "/public/results/job123", headers={"Range": "bytes=4-", "If-Range": etag}
+    )
+    assert resumed.status_code == 206
+    # файл сменился с момента первой части — отдаём целиком
+    stale = client.get(
+        "/public/results/job123", headers={"Range": "bytes=4-", "If-Range": '"old"'}
+    )
+    assert stale.status_code == 200
+    assert stale.content == b"0123456789"
+
+    head = client.head("/public/results/job123")
+    assert head.status_code == 200
+    assert head.content == b""
+    assert head.headers["content-length"] == "10"
+    assert head.headers["etag"] == etag
+    # БД читается один раз, дальше место файла берётся из ResultLocationCache
+    assert calls == ["job123"]
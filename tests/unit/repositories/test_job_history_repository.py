@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from pathlib import Path
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -6,6 +7,7 @@ from sqlalchemy.orm import sessionmaker
 from src.app.db.db_init import init_db
 from src.app.db.db_models import JobHistoryModel
 from src.app.repositories.job_history_repository import JobHistoryRepository
+from src.app.repositories.media_object_repository import MediaObjectRepository
 
 
 def test_create_pending_records_job() -> None:
@@ -29,3 +31,30 @@ def test_create_pending_records_job() -> None:
         assert row.status == "pending"
         assert row.slot_id == "slot-001"
         assert row.source == "ui_test"
+
+
+def test_get_result_returns_job_with_result_sha256() -> None:
+    engine = create_engine("sqlite:///:memory:", future=True)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    repo = JobHistoryRepository(session_factory)
+    media_repo = MediaObjectRepository(session_factory)
+    now = datetime.utcnow()
+    repo.create_pending(
+        job_id="job-sha",
+        slot_id="slot-001",
+        started_at=now,
+        sync_deadline=now + timedelta(seconds=48),
+        source="ingest",
+    )
+    assert repo.get_result("job-sha").result_sha256 is None
+
+    media_repo.register_result(
+        job_id="job-sha",
+        slot_id="slot-001",
+        path=Path("/tmp/payload.png"),
+        preview_path=None,
+        expires_at=now + timedelta(hours=1),
+        sha256="ef" * 32,
+    )
+    assert repo.get_result("job-sha").result_sha256 == "ef" * 32
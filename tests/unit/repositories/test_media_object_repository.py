@@ -1,9 +1,10 @@
 from datetime import datetime, timedelta
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete
 from sqlalchemy.orm import sessionmaker
 
 from src.app.db.db_init import init_db
+from src.app.db.db_models import SlotTemplateMediaModel
 from src.app.repositories.media_object_repository import MediaObjectRepository
 
 
@@ -49,3 +50,69 @@ def test_register_temp_and_list_by_scope(tmp_path) -> None:
     expired = repo.list_expired_by_scope("provider", datetime.utcnow())
     assert any(m.id == media_id for m in expired)
     assert all(m.scope == "provider" for m in expired)
+
+
+def test_list_expired_batch_pages_by_key_and_bulk_marks_cleaned(tmp_path) -> None:
+    engine = create_engine("sqlite:///:memory:", future=True)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+
+    repo = MediaObjectRepository(session_factory)
+    now = datetime.utcnow()
+    same_expiry = now - timedelta(hours=2)
+    ids = [
+        repo.register_result(
+            job_id=f"job-{index}",
+            slot_id="slot-001",
+            path=tmp_path / f"{index}.bin",
+            preview_path=None,
+            expires_at=same_expiry if index < 3 else now - timedelta(hours=1),
+        )
+        for index in range(5)
+    ]
+
+    first = repo.list_expired_batch("result", now, limit=2)
+    cursor = (first[-1].expires_at, first[-1].id)
+    second = repo.list_expired_batch("result", now, limit=2, after=cursor)
+    cursor = (second[-1].expires_at, second[-1].id)
+    third = repo.list_expired_batch("result", now, limit=2, after=cursor)
+
+    # одинаковый expires_at не теряет и не повторяет строки между батчами
+    seen = [media.id for media in first + second + third]
+    assert sorted(seen) == sorted(ids)
+    assert len(third) == 1
+
+    assert repo.mark_cleaned_many([media.id for media in first], now) == 2
+    assert repo.mark_cleaned_many([media.id for media in first], now) == 0
+    assert repo.count_expired("result", now) == 3
+
+
+def test_clean_unbound_template_checks_binding_in_same_update(tmp_path) -> None:
+    engine = create_engine("sqlite:///:memory:", future=True)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    repo = MediaObjectRepository(session_factory)
+    media_id = repo.register_template(
+        job_id="template-1",
+        slot_id="slot-001",
+        path=tmp_path / "style.png",
+        expires_at=datetime.utcnow() + timedelta(days=3650),
+    )
+    with session_factory() as session:
+        session.add(
+            SlotTemplateMediaModel(
+                slot_id="slot-001", media_kind="style", media_object_id=media_id
+            )
+        )
+        session.commit()
+
+    # слот привязал шаблон — строка остаётся живой
+    assert repo.clean_unbound_template(media_id, datetime.utcnow()) is False
+    assert repo.get_media(media_id).id == media_id
+
+    with session_factory() as session:
+        session.execute(delete(SlotTemplateMediaModel))
+        session.commit()
+    assert repo.clean_unbound_template(media_id, datetime.utcnow()) is True
+    # повторная очистка ничего не меняет
+    assert repo.clean_unbound_template(media_id, datetime.utcnow()) is False
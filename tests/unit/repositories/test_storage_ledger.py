@@ -0,0 +1,139 @@
+import errno
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.app.config import MediaPaths
+from src.app.db.db_init import init_db
+from src.app.db.db_models import JobHistoryModel
+from src.app.media.media_service import ResultStore
+from src.app.media.temp_media_store import TempMediaStore
+from src.app.repositories.job_unit_of_work import JobUnitOfWork
+from src.app.repositories.media_object_repository import MediaObjectRepository
+from src.app.repositories.storage_ledger import StorageLedger
+
+
+def _build(tmp_path: Path) -> tuple[StorageLedger, MediaPaths, sessionmaker]:
+    engine = create_engine("sqlite:///:memory:", future=True)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    paths = MediaPaths(
+        root=tmp_path,
+        results=tmp_path / "results",
+        templates=tmp_path / "templates",
+        temp=tmp_path / "temp",
+    )
+    return StorageLedger(session_factory), paths, session_factory
+
+
+def _usage(ledger: StorageLedger) -> dict[tuple[str, str], tuple[int, int]]:
+    return {
+        (item["scope"], item["slot_id"]): (item["bytes"], item["files"])
+        for item in ledger.usage()
+        if item["bytes"] or item["files"]
+    }
+
+
+def test_write_and_delete_paths_match_disk_scan(tmp_path: Path) -> None:
+    ledger, paths, session_factory = _build(tmp_path)
+    media_repo = MediaObjectRepository(session_factory)
+    results = ResultStore(paths, ledger=ledger)
+    temp_store = TempMediaStore(
+        paths=paths, media_repo=media_repo, temp_ttl_seconds=10, ledger=ledger
+    )
+
+    results.save_payload("slot-001", "job-1", b"x" * 300, "png")
+    results.save_payload("slot-001", "job-1", b"x" * 200, "png")  # перезапись
+    results.save_payload("slot-002", "job-2", b"y" * 50, "jpg")
+    unit_of_work = JobUnitOfWork(session_factory)
+    results.save_payload("slot-002", "job-3", b"z" * 70, "jpg", unit_of_work=unit_of_work)
+    assert ledger.usage_bytes("result") == 250  # дельта ждёт flush
+    unit_of_work.flush()
+    results.remove_result_dir("slot-002", "job-2")
+
+    with session_factory() as session:
+        session.add(
+            JobHistoryModel(
+                job_id="job-4",
+                slot_id="slot-003",
+                source="ingest",
+                status="pending",
+                started_at=datetime.utcnow(),
+            )
+        )
+        session.commit()
+    temp_dir = temp_store.ensure_structure("slot-003", "job-4")
+    (temp_dir / "upload.bin").write_bytes(b"t" * 40)
+    ledger.record("provider", "slot-003", 40, 1)
+    media_repo.register_temp(
+        job_id="job-4",
+        slot_id="slot-003",
+        path=temp_dir / "upload.bin",
+        expires_at=datetime.utcnow() - timedelta(seconds=1),
+    )
+    assert temp_store.cleanup_expired() == 1
+
+    assert _usage(ledger) == {
+        ("result", "slot-001"): (200, 1),
+        ("result", "slot-002"): (70, 1),
+    }
+    summary = ledger.reconcile(paths)
+    assert (summary.drift_bytes, summary.drift_files) == (0, 0)
+
+
+def test_retried_result_write_is_counted_once(tmp_path: Path, monkeypatch) -> None:
+    ledger, paths, session_factory = _build(tmp_path)
+    results = ResultStore(paths, ledger=ledger)
+    flushes: list[int] = []
+
+    def flaky_factory() -> Session:
+        flushes.append(1)
+        if len(flushes) == 1:
+            raise OperationalError("COMMIT", {}, Exception("database is locked"))
+        return session_factory()
+
+    unit_of_work = JobUnitOfWork(flaky_factory)
+    write_bytes = Path.write_bytes
+
+    def disk_full(self: Path, data: bytes) -> int:
+        write_bytes(self, data[:100])
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    # попытки record_success: запись обрывается на середине, затем не проходит flush
+    monkeypatch.setattr(Path, "write_bytes", disk_full)
+    with pytest.raises(OSError):
+        results.save_payload("slot-001", "job-1", b"x" * 300, "png", unit_of_work=unit_of_work)
+    monkeypatch.undo()
+    results.save_payload("slot-001", "job-1", b"x" * 300, "png", unit_of_work=unit_of_work)
+    with pytest.raises(OperationalError):
+        unit_of_work.flush()
+    results.save_payload("slot-001", "job-1", b"x" * 300, "png", unit_of_work=unit_of_work)
+    unit_of_work.flush()
+
+    assert _usage(ledger) == {("result", "slot-001"): (300, 1)}
+    summary = ledger.reconcile(paths)
+    assert (summary.drift_bytes, summary.drift_files) == (0, 0)
+
+
+def test_reconcile_corrects_drift(tmp_path: Path) -> None:
+    ledger, paths, _ = _build(tmp_path)
+    (paths.templates / "slot-001").mkdir(parents=True)
+    (paths.templates / "slot-001" / "a.png").write_bytes(b"a" * 500)
+    (paths.results / "slot-004" / "job-9").mkdir(parents=True)
+    (paths.results / "slot-004" / "job-9" / "payload.png").write_bytes(b"r" * 64)
+    ledger.record("result", "slot-005", 1000, 3)  # удалено вне приложения
+
+    summary = ledger.reconcile(paths)
+
+    assert summary.bytes == 564
+    assert summary.files == 2
+    assert summary.drift_bytes == 564 - 1000
+    assert _usage(ledger) == {
+        ("result", "slot-004"): (64, 1),
+        ("template", "slot-001"): (500, 1),
+    }
+    assert ledger.usage_bytes() == 564
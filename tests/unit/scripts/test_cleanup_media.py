@@ -1,8 +1,13 @@
 from datetime import datetime
 import importlib.util
+import runpy
 import sys
 from pathlib import Path
 
+import pytest
+
+from src.app.media.media_cleanup import CleanupReport
+
 
 PROJECT_ROOT = Path(__file__).resolve().parents[3]
 MODULE_PATH = PROJECT_ROOT / "scripts" / "cleanup_media.py"
@@ -20,39 +25,51 @@ class DummyConfig:
         self.temp_ttl_seconds = 123
 
 
+def load_dummy_config(*, init_schema=True):
+    # cron-скрипт не создаёт схему: её создаёт приложение
+    assert init_schema is False
+    return DummyConfig()
+
+
 class DummyRepo:
     def __init__(self, session_factory):
         assert session_factory is not None
 
-    def list_expired_results(self, reference_time):
+    def count_expired(self, scope, reference_time):
         assert isinstance(reference_time, datetime)
-        return ["expired-result-1", "expired-result-2"]
-
-    def list_expired_by_scope(self, scope, reference_time):
-        assert scope == "provider"
-        assert isinstance(reference_time, datetime)
-        return ["expired-temp"]
+        return {"result": 2, "provider": 1}[scope]
 
 
 class DummyResultStore:
-    def __init__(self, media_paths):
+    def __init__(self, media_paths, ledger=None, object_store=None, archive=None):
         self.media_paths = media_paths
+        self.ledger = ledger
+        self.object_store = object_store
+        self.archive = archive
+
+
+class DummyObjectStore:
+    @classmethod
+    def for_paths(cls, paths, media_repo, ledger=None):
+        return cls()
+
+
+class DummyResultArchive:
+    @classmethod
+    def for_paths(cls, paths, media_repo, ledger=None):
+        return cls()
 
 
 class DummyTempStore:
-    def __init__(self, paths, media_repo, temp_ttl_seconds):
+    def __init__(self, paths, media_repo, temp_ttl_seconds, ledger=None):
         self.paths = paths
         self.media_repo = media_repo
         self.temp_ttl_seconds = temp_ttl_seconds
-        self.cleaned_at = None
-
-    def cleanup_expired(self, reference_time):
-        self.cleaned_at = reference_time
-        return 3
+        self.ledger = ledger
 
 
 def test_perform_cleanup_dry_run(monkeypatch):
-    monkeypatch.setattr(cleanup_media, "load_config", lambda: DummyConfig())
+    monkeypatch.setattr(cleanup_media, "load_config", load_dummy_config)
     monkeypatch.setattr(cleanup_media, "MediaObjectRepository", DummyRepo)
 
     summary = cleanup_media.perform_cleanup(
@@ -67,29 +84,62 @@ def test_perform_cleanup_dry_run(monkeypatch):
 def test_perform_cleanup_executes_cleanup(monkeypatch):
     reference_time = datetime.utcnow()
 
-    monkeypatch.setattr(cleanup_media, "load_config", lambda: DummyConfig())
+    monkeypatch.setattr(cleanup_media, "load_config", load_dummy_config)
     monkeypatch.setattr(cleanup_media, "MediaObjectRepository", DummyRepo)
     monkeypatch.setattr(cleanup_media, "ResultStore", DummyResultStore)
+    monkeypatch.setattr(cleanup_media, "ObjectStore", DummyObjectStore)
+    monkeypatch.setattr(cleanup_media, "ResultArchive", DummyResultArchive)
     monkeypatch.setattr(cleanup_media, "TempMediaStore", DummyTempStore)
 
     called = {}
 
-    def fake_cleanup_expired(media_repo, result_store, ref_time):
-        called["repo"] = media_repo
-        called["store"] = result_store
-        called["time"] = ref_time
-        return 5
+    class DummyCleanup:
+        def __init__(self, media_repo, result_store, temp_store):
+            called["repo"] = media_repo
+            called["store"] = result_store
+            called["temp_store"] = temp_store
 
-    monkeypatch.setattr(cleanup_media, "cleanup_expired_results", fake_cleanup_expired)
+        def run(self, limits, ref_time):
+            called["time"] = ref_time
+            called["limits"] = limits
+            return CleanupReport(results_removed=5, temp_removed=3)
 
+    monkeypatch.setattr(cleanup_media, "MediaCleanup", DummyCleanup)
+
+    limits = cleanup_media.CleanupLimits(batch_size=50, max_batches=2)
     summary = cleanup_media.perform_cleanup(
-        dry_run=False, reference_time=reference_time
+        dry_run=False, reference_time=reference_time, limits=limits
     )
 
     assert summary.dry_run is False
     assert summary.results_removed == 5
     assert summary.temp_removed == 3
     assert called["time"] == reference_time
+    assert called["limits"] is limits
+    assert isinstance(called["store"], DummyResultStore)
+    assert isinstance(called["temp_store"], DummyTempStore)
+
+
+def test_main_passes_run_limits(monkeypatch, capsys):
+    captured = {}
+
+    def fake_perform_cleanup(*, dry_run, limits):
+        captured["limits"] = limits
+        return cleanup_media.CleanupSummary(
+            results_removed=1, temp_removed=0, dry_run=dry_run
+        )
+
+    monkeypatch.setattr(cleanup_media, "perform_cleanup", fake_perform_cleanup)
+
+    exit_code = cleanup_media.main(
+        ["--batch-size", "1000", "--max-batches", "3", "--workers", "8"]
+    )
+
+    assert exit_code == 0
+    limits = captured["limits"]
+    assert (limits.batch_size, limits.max_batches, limits.workers) == (1000, 3, 8)
+    assert limits.deadline is not None
+    assert "results_removed=1" in capsys.readouterr().out
 
 
 def test_main_handles_errors(monkeypatch, capsys):
@@ -105,3 +155,20 @@ def test_main_handles_errors(monkeypatch, capsys):
     assert exit_code == 2
     assert "cleanup failed" in captured.err
     assert "boom" in captured.err
+
+
+def test_entrypoint_reads_command_line(monkeypatch, capsys):
+    # cron вызывает файл напрямую: флаги должны доходить до main
+    monkeypatch.setattr("src.app.config.load_config", load_dummy_config)
+    monkeypatch.setattr(
+        "src.app.repositories.media_object_repository.MediaObjectRepository", DummyRepo
+    )
+    monkeypatch.setattr(
+        sys, "argv", [str(MODULE_PATH), "--dry-run", "--batch-size", "500", "--workers", "2"]
+    )
+
+    with pytest.raises(SystemExit) as exc_info:
+        runpy.run_path(str(MODULE_PATH), run_name="__main__")
+
+    assert exc_info.value.code == 0
+    assert "cleanup dry-run, results_expired=2, temp_expired=1" in capsys.readouterr().out
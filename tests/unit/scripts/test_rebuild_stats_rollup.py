@@ -0,0 +1,81 @@
+import importlib.util
+import runpy
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+MODULE_PATH = PROJECT_ROOT / "scripts" / "rebuild_stats_rollup.py"
+SPEC = importlib.util.spec_from_file_location("rebuild_stats_rollup_module", MODULE_PATH)
+rebuild_stats_rollup = importlib.util.module_from_spec(SPEC)
+assert SPEC and SPEC.loader
+sys.modules["rebuild_stats_rollup_module"] = rebuild_stats_rollup
+SPEC.loader.exec_module(rebuild_stats_rollup)
+
+
+class DummyConfig:
+    def __init__(self):
+        self.session_factory = object()
+
+
+class DummyRollupRepo:
+    calls: list[tuple] = []
+
+    def __init__(self, session_factory):
+        assert session_factory is not None
+
+    def rebuild(self, since=None, until=None):
+        self.calls.append(("rebuild", since, until))
+        return 42
+
+    def prune(self, now):
+        self.calls.append(("prune", now))
+        return 7
+
+
+def test_perform_rebuild_partial_range(monkeypatch):
+    DummyRollupRepo.calls = []
+    monkeypatch.setattr(rebuild_stats_rollup, "load_config", lambda: DummyConfig())
+    monkeypatch.setattr(rebuild_stats_rollup, "StatsRollupRepository", DummyRollupRepo)
+    now = datetime(2026, 10, 19, 12, 0)
+
+    summary = rebuild_stats_rollup.perform_rebuild(since_hours=6, reference_time=now)
+
+    assert summary.rows_written == 42
+    assert summary.minute_buckets_pruned == 7
+    assert DummyRollupRepo.calls == [
+        ("rebuild", now - timedelta(hours=6), now),
+        ("prune", now),
+    ]
+
+
+def test_main_full_rebuild_reports_summary(monkeypatch, capsys):
+    DummyRollupRepo.calls = []
+    monkeypatch.setattr(rebuild_stats_rollup, "load_config", lambda: DummyConfig())
+    monkeypatch.setattr(rebuild_stats_rollup, "StatsRollupRepository", DummyRollupRepo)
+
+    exit_code = rebuild_stats_rollup.main([])
+
+    assert exit_code == 0
+    assert DummyRollupRepo.calls[0][1] is None
+    assert "scope=full, rows=42, pruned=7" in capsys.readouterr().out
+
+
+def test_entrypoint_reads_since_hours(monkeypatch, capsys):
+    DummyRollupRepo.calls = []
+    monkeypatch.setattr("src.app.config.load_config", lambda: DummyConfig())
+    monkeypatch.setattr(
+        "src.app.stats.stats_rollup_repository.StatsRollupRepository", DummyRollupRepo
+    )
+    monkeypatch.setattr(sys, "argv", [str(MODULE_PATH), "--since-hours", "6"])
+
+    with pytest.raises(SystemExit) as exc_info:
+        runpy.run_path(str(MODULE_PATH), run_name="__main__")
+
+    assert exc_info.value.code == 0
+    # без флага был бы полный пересчёт с удалением всех бакетов
+    _, since, until = DummyRollupRepo.calls[0]
+    assert until - since == timedelta(hours=6)
+    assert "scope=full" not in capsys.readouterr().out
@@ -3,6 +3,7 @@ from fastapi.testclient import TestClient
 
 from src.app.stats.metrics_api import router as metrics_router
 from src.app.stats.metrics_exporter import (
+    DurationHistogram,
     DurationSample,
     MetricsSnapshot,
     SlotTotals,
@@ -30,6 +31,8 @@ def test_format_prometheus_renders_counters_and_histogram() -> None:
         media_capacity_bytes=2048,
         window_minutes=5,
         sync_response_seconds=48,
+        orphan_files=3,
+        orphan_bytes=4096,
     )
 
     text = format_prometheus(snapshot)
@@ -48,6 +51,60 @@ def test_format_prometheus_renders_counters_and_histogram() -> None:
     )
     assert "media_storage_bytes 1024" in text
     assert "media_disk_capacity_bytes 2048" in text
+    assert "media_quota_evictions_total 0" in text
+    assert "media_orphan_files 3" in text
+    assert "media_orphan_bytes 4096" in text
+    assert "media_orphan_rows 0" in text
+
+
+def test_format_prometheus_renders_prebucketed_histograms() -> None:
+    snapshot = MetricsSnapshot(
+        totals=[
+            SlotTotals(
+                slot_id=slot_id,
+                provider="gemini",
+                jobs_total=3,
+                timeouts_total=0,
+                provider_errors_total=0,
+                success_total=3,
+            )
+            for slot_id in ("slot-001", "slot-002")
+        ],
+        durations=[],
+        media_usage_bytes=0,
+        media_capacity_bytes=0,
+        window_minutes=5,
+        sync_response_seconds=48,
+        histograms=[
+            DurationHistogram(
+                slot_id="slot-001",
+                provider="gemini",
+                bucket_counts=[0, 1, 2, 2, 2, 2, 2, 2],
+                count=3,
+                sum_seconds=75.5,
+            )
+        ],
+    )
+
+    text = format_prometheus(snapshot)
+
+    assert (
+        'ingest_duration_seconds_bucket{slot_id="slot-001",provider="gemini",le="10"} 2'
+        in text
+    )
+    assert (
+        'ingest_duration_seconds_bucket{slot_id="slot-001",provider="gemini",le="+Inf"} 3'
+        in text
+    )
+    assert (
+        'ingest_duration_seconds_sum{slot_id="slot-001",provider="gemini"} 75.500000'
+        in text
+    )
+    # слот без данных всё равно получает нулевую серию
+    assert (
+        'ingest_duration_seconds_count{slot_id="slot-002",provider="gemini"} 0'
+        in text
+    )
 
 
 def test_metrics_router_uses_exporter_from_state() -> None:
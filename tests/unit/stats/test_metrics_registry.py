@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.db_init import init_db
+from src.app.ingest.ingest_models import JobOutcome
+from src.app.repositories.storage_ledger import StorageLedger
+from src.app.stats.metrics_exporter import MetricsExporter
+from src.app.stats.metrics_registry import MetricsRegistry
+from src.app.stats.stats_rollup_repository import StatsRollupRepository
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+def _outcome(
+    job_id: str,
+    status: str,
+    duration: int,
+    failure_reason: str | None = None,
+    slot_id: str = "slot-001",
+) -> JobOutcome:
+    return JobOutcome(
+        job_id=job_id,
+        slot_id=slot_id,
+        provider="gemini",
+        status=status,
+        failure_reason=failure_reason,
+        started_at=NOW,
+        completed_at=NOW + timedelta(seconds=duration),
+    )
+
+
+def _build(
+    tmp_path: Path,
+) -> tuple[StatsRollupRepository, MetricsRegistry, MetricsExporter, list[str]]:
+    engine = create_engine("sqlite:///:memory:", future=True)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    statements: list[str] = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda _conn, _cursor, statement, *_args: statements.append(statement),
+    )
+    ledger = StorageLedger(session_factory)
+    ledger.record("result", "slot-001", 100, 1)
+    repo = StatsRollupRepository(session_factory)
+    registry = MetricsRegistry()
+    exporter = MetricsExporter(
+        stats_repo=repo,
+        registry=registry,
+        ledger=ledger,
+        media_root=tmp_path,
+        sync_response_seconds=48,
+    )
+    return repo, registry, exporter, statements
+
+
+def test_registry_seeds_from_rollups_and_counts_new_outcomes(tmp_path: Path) -> None:
+    repo, registry, exporter, _ = _build(tmp_path)
+    repo.record_outcome(_outcome("a1", "done", 3))
+    repo.record_outcome(_outcome("a2", "failed", 15, "provider_error"))
+    exporter.seed()
+
+    registry.record_outcome(_outcome("a3", "timeout", 50, "provider_timeout"))
+    text = exporter.collect()
+
+    labels = '{slot_id="slot-001",provider="gemini"}'
+    assert f"ingest_requests_total{labels} 3" in text
+    assert f"ingest_success_total{labels} 1" in text
+    assert f"ingest_timeout_total{labels} 1" in text
+    assert f"ingest_provider_error_total{labels} 1" in text
+    assert (
+        'ingest_duration_seconds_bucket{slot_id="slot-001",provider="gemini",le="20"} 2'
+        in text
+    )
+    assert f"ingest_duration_seconds_count{labels} 3" in text
+    assert f"ingest_duration_seconds_sum{labels} 68.000000" in text
+    # слоты без задач тоже получают нулевые серии из seed
+    assert 'ingest_requests_total{slot_id="slot-015",provider="gemini"} 0' in text
+    assert "media_storage_bytes 100" in text
+
+
+def test_scrape_does_no_database_io(tmp_path: Path) -> None:
+    _, _, exporter, statements = _build(tmp_path)
+    exporter.seed()
+    statements.clear()
+
+    for _ in range(3):
+        exporter.collect()
+
+    assert statements == []
+
+
+def test_latency_summary_covers_recent_minutes_only(tmp_path: Path) -> None:
+    _, registry, exporter, _ = _build(tmp_path)
+    exporter.seed()
+    now = datetime.utcnow()
+    for index, seconds in enumerate((2, 4, 30)):
+        registry.record_outcome(
+            JobOutcome(
+                job_id=f"r{index}",
+                slot_id="slot-002",
+                provider="gemini",
+                status="done",
+                failure_reason=None,
+                started_at=now - timedelta(seconds=seconds),
+                completed_at=now,
+            )
+        )
+
+    text = exporter.collect()
+    labels = 'slot_id="slot-002",provider="gemini"'
+    assert "# TYPE ingest_latency_seconds summary" in text
+    assert f'ingest_latency_seconds{{{labels},quantile="0.5"}} 3.975' in text
+    assert f'ingest_latency_seconds{{{labels},quantile="0.99"}} 30.' in text
+    assert f"ingest_latency_seconds_count{{{labels}}} 3" in text
+    assert (
+        'ingest_latency_seconds{slot_id="slot-001",provider="gemini",quantile="0.95"} NaN'
+        in text
+    )
+
+    _, _, summaries = registry.snapshot(now=now + timedelta(minutes=15))
+    assert all(item.quantiles["p50"] is None for item in summaries)
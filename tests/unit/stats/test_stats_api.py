@@ -11,6 +11,7 @@ class DummyStatsService:
     def __init__(self) -> None:
         self.overview_requests: list[int] = []
         self.slot_requests: list[int] = []
+        self.series_requests: list[tuple[int, int, str | None]] = []
 
     def overview(self, window_minutes: int = 60) -> dict[str, Any]:
         self.overview_requests.append(window_minutes)
@@ -46,6 +47,21 @@ class DummyStatsService:
         }
 
 
+    def timeseries(
+        self,
+        window_minutes: int = 60,
+        bucket_minutes: int = 5,
+        slot_id: str | None = None,
+    ) -> dict[str, Any]:
+        self.series_requests.append((window_minutes, bucket_minutes, slot_id))
+        return {
+            "window_minutes": window_minutes,
+            "bucket_minutes": bucket_minutes,
+            "slot_id": slot_id,
+            "points": [],
+        }
+
+
 class DummyAuthService:
     def validate_token(
         self, token: str, required_scope: str | None = None
@@ -90,6 +106,19 @@ def test_stats_slots_uses_service() -> None:
     assert service.slot_requests == [30]
 
 
+def test_stats_timeseries_passes_query_parameters() -> None:
+    service = DummyStatsService()
+    client = build_client(service)
+
+    response = client.get(
+        "/api/stats/timeseries?window_minutes=4320&bucket_minutes=60&slot_id=slot-002"
+    )
+
+    assert response.status_code == 200
+    assert response.json()["bucket_minutes"] == 60
+    assert service.series_requests == [(4320, 60, "slot-002")]
+
+
 def test_stats_endpoints_require_authentication() -> None:
     service = DummyStatsService()
     client = build_client(service, with_auth=False)
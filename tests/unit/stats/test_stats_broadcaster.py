@@ -0,0 +1,92 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.app.ingest.ingest_models import JobContext, JobOutcome
+from src.app.stats.metrics_registry import MetricsRegistry
+from src.app.stats.stats_broadcaster import StatsBroadcaster
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+def _job(job_id: str, slot_id: str = "slot-001") -> JobContext:
+    job = JobContext(slot_id=slot_id, job_id=job_id, started_at=NOW)
+    job.metadata["provider"] = "gemini"
+    return job
+
+
+def _outcome(job_id: str, status: str = "done", slot_id: str = "slot-001") -> JobOutcome:
+    return JobOutcome(
+        job_id=job_id,
+        slot_id=slot_id,
+        provider="gemini",
+        status=status,
+        failure_reason="provider_timeout" if status == "timeout" else None,
+        started_at=NOW,
+        completed_at=NOW + timedelta(seconds=4),
+    )
+
+
+def _parse(chunk: str) -> tuple[str, dict]:
+    event, data = chunk.strip().split("\n")
+    return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+@pytest.mark.asyncio
+async def test_subscribers_get_snapshot_then_deltas() -> None:
+    registry = MetricsRegistry()
+    registry.record_outcome(_outcome("old"))
+    broadcaster = StatsBroadcaster(registry)
+    await broadcaster.start()
+    broadcaster.record_start(_job("a1"))
+
+    streams = [broadcaster.stream(), broadcaster.stream()]
+    for stream in streams:
+        event, snapshot = _parse(await anext(stream))
+        assert event == "snapshot"
+        assert snapshot["in_flight_total"] == 1
+        slot = next(item for item in snapshot["slots"] if item["slot_id"] == "slot-001")
+        assert (slot["jobs_total"], slot["in_flight"]) == (1, 1)
+
+    # хуки вызываются из потоков фоновой очереди
+    await asyncio.to_thread(broadcaster.record_start, _job("a2", "slot-002"))
+    await asyncio.to_thread(broadcaster.record_outcome, _outcome("a1", "timeout"))
+
+    for stream in streams:
+        _, started = _parse(await anext(stream))
+        _, completed = _parse(await anext(stream))
+        assert (started["type"], started["slot_id"], started["in_flight_total"]) == (
+            "started",
+            "slot-002",
+            2,
+        )
+        assert completed["type"] == "completed"
+        assert completed["status"] == "timeout"
+        assert completed["duration_seconds"] == 4
+        assert (completed["slot_in_flight"], completed["in_flight_total"]) == (0, 1)
+
+    await broadcaster.stop()
+    for stream in streams:
+        with pytest.raises(StopAsyncIteration):
+            await anext(stream)
+    assert broadcaster.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_resynced_and_heartbeat_sent() -> None:
+    broadcaster = StatsBroadcaster(MetricsRegistry(), queue_size=2, heartbeat_seconds=0.05)
+    await broadcaster.start()
+    stream = broadcaster.stream()
+    await anext(stream)
+
+    for index in range(5):
+        broadcaster.record_outcome(_outcome(f"j{index}"))
+    await asyncio.sleep(0)
+
+    event, _ = _parse(await anext(stream))
+    assert event == "snapshot"
+    assert await anext(stream) == ": keepalive\n\n"
+    await stream.aclose()
+    assert broadcaster.subscribers == 0
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.db_init import init_db
+from src.app.db.db_models import JobHistoryModel
+from src.app.stats.stats_repository import StatsRepository
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+WINDOW_START = NOW - timedelta(hours=1)
+
+
+def _job(
+    job_id: str,
+    slot_id: str,
+    status: str,
+    *,
+    started_minutes_ago: int,
+    duration_seconds: int | None = 10,
+    failure_reason: str | None = None,
+) -> JobHistoryModel:
+    started_at = NOW - timedelta(minutes=started_minutes_ago)
+    return JobHistoryModel(
+        job_id=job_id,
+        slot_id=slot_id,
+        source="ingest",
+        status=status,
+        failure_reason=failure_reason,
+        started_at=started_at,
+        completed_at=(
+            started_at + timedelta(seconds=duration_seconds)
+            if duration_seconds is not None
+            else None
+        ),
+    )
+
+
+def build_repo() -> tuple[StatsRepository, sessionmaker]:
+    engine = create_engine("sqlite:///:memory:", future=True)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    with session_factory() as session:
+        session.add_all(
+            [
+                _job("a1", "slot-001", "done", started_minutes_ago=5),
+                _job("a2", "slot-001", "done", started_minutes_ago=30),
+                _job(
+                    "a3",
+                    "slot-001",
+                    "timeout",
+                    started_minutes_ago=10,
+                    failure_reason="provider_timeout",
+                ),
+                _job(
+                    "a4",
+                    "slot-001",
+                    "failed",
+                    started_minutes_ago=20,
+                    failure_reason="provider_error",
+                ),
+                # старая ошибка вне окна: не считается, но и не «последняя»
+                _job(
+                    "a5",
+                    "slot-001",
+                    "failed",
+                    started_minutes_ago=600,
+                    failure_reason="invalid_request",
+                ),
+                _job(
+                    "a6",
+                    "slot-001",
+                    "pending",
+                    started_minutes_ago=1,
+                    duration_seconds=None,
+                ),
+                # задача стартовала до окна, а завершилась уже в нём
+                _job(
+                    "b1",
+                    "slot-002",
+                    "done",
+                    started_minutes_ago=61,
+                    duration_seconds=120,
+                ),
+                _job(
+                    "b2",
+                    "slot-002",
+                    "failed",
+                    started_minutes_ago=300,
+                    failure_reason="provider_error",
+                ),
+            ]
+        )
+        session.commit()
+    return StatsRepository(session_factory), session_factory
+
+
+def test_slot_metrics_matches_per_slot_semantics() -> None:
+    repo, _ = build_repo()
+
+    metrics = {row["slot_id"]: row for row in repo.slot_metrics(WINDOW_START)}
+
+    assert len(metrics) == 15
+    slot1 = metrics["slot-001"]
+    assert slot1["jobs_last_window"] == 5
+    assert slot1["timeouts_last_window"] == 1
+    assert slot1["provider_errors_last_window"] == 1
+    assert slot1["failures_last_window"] == 2
+    assert slot1["success_last_window"] == 2
+    assert slot1["last_success_at"] == NOW - timedelta(minutes=5) + timedelta(seconds=10)
+    assert slot1["last_error_reason"] == "provider_timeout"
+    assert slot1["display_name"] == "Slot 01"
+
+    slot2 = metrics["slot-002"]
+    assert slot2["jobs_last_window"] == 0
+    assert slot2["success_last_window"] == 1
+    assert slot2["failures_last_window"] == 0
+    assert slot2["last_error_reason"] == "provider_error"
+
+    empty = metrics["slot-003"]
+    assert empty["jobs_last_window"] == 0
+    assert empty["success_last_window"] == 0
+    assert empty["last_success_at"] is None
+    assert empty["last_error_reason"] is None
+
+
+def test_slot_metrics_is_a_single_statement() -> None:
+    repo, session_factory = build_repo()
+    engine = session_factory.kw["bind"]
+    statements: list[str] = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda _conn, _cursor, statement, *_args: statements.append(statement),
+    )
+
+    repo.slot_metrics(WINDOW_START)
+
+    assert len(statements) == 1
+
+
+def test_system_metrics_window_counters() -> None:
+    repo, _ = build_repo()
+
+    metrics = repo.system_metrics(WINDOW_START)
+
+    assert metrics == {
+        "jobs_total": 8,
+        "jobs_last_window": 5,
+        "timeouts_last_window": 1,
+        "provider_errors_last_window": 1,
+    }
@@ -0,0 +1,285 @@
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.db_engine import create_db_engine
+from src.app.db.db_init import init_db
+from src.app.db.db_models import (
+    JobDurationSketchModel,
+    JobHistoryModel,
+    JobStatsRollupModel,
+)
+from src.app.ingest.ingest_models import JobOutcome
+from src.app.stats.stats_repository import StatsRepository
+from src.app.stats.stats_rollup_backfill import RollupBackfill
+from src.app.stats.stats_rollup_repository import (
+    MINUTE,
+    MINUTE_RETENTION,
+    StatsRollupRepository,
+)
+
+# окно считается от текущего времени — опорная точка выровнена по минуте
+NOW = datetime.utcnow().replace(second=0, microsecond=0)
+WINDOW_START = NOW - timedelta(minutes=150)
+
+JOBS = [
+    # (job_id, slot_id, status, failure_reason, started_minutes_ago, duration_s)
+    ("a1", "slot-001", "done", None, 5, 3),
+    ("a2", "slot-001", "done", None, 70, 12),
+    ("a3", "slot-001", "timeout", "provider_timeout", 100, 48),
+    ("a4", "slot-001", "failed", "provider_error", 149, 2),
+    ("a5", "slot-001", "failed", "invalid_request", 600, 1),
+    ("b1", "slot-002", "done", None, 151, 180),
+    ("b2", "slot-002", "failed", "provider_error", 3000, 7),
+    ("c1", "slot-003", "done", None, 20, 65),
+]
+
+
+def _build() -> tuple[StatsRollupRepository, StatsRepository, sessionmaker]:
+    engine = create_engine("sqlite:///:memory:", future=True)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    return (
+        StatsRollupRepository(session_factory),
+        StatsRepository(session_factory),
+        session_factory,
+    )
+
+
+def _outcomes() -> list[JobOutcome]:
+    outcomes = []
+    for job_id, slot_id, status, reason, minutes_ago, duration in JOBS:
+        started_at = NOW - timedelta(minutes=minutes_ago, seconds=-10)
+        outcomes.append(
+            JobOutcome(
+                job_id=job_id,
+                slot_id=slot_id,
+                provider="gemini",
+                status=status,
+                failure_reason=reason,
+                started_at=started_at,
+                completed_at=started_at + timedelta(seconds=duration),
+            )
+        )
+    return outcomes
+
+
+def _seed_history(session_factory: sessionmaker) -> None:
+    with session_factory() as session:
+        for outcome in _outcomes():
+            session.add(
+                JobHistoryModel(
+                    job_id=outcome.job_id,
+                    slot_id=outcome.slot_id,
+                    source="ingest",
+                    status=outcome.status,
+                    failure_reason=outcome.failure_reason,
+                    started_at=outcome.started_at,
+                    completed_at=outcome.completed_at,
+                )
+            )
+        session.commit()
+
+
+def _rollup_rows(session_factory: sessionmaker) -> dict[tuple, tuple]:
+    with session_factory() as session:
+        rows = session.execute(select(JobStatsRollupModel)).scalars().all()
+    return {
+        (
+            row.resolution,
+            row.bucket_start,
+            row.slot_id,
+            row.provider,
+            row.status,
+            row.failure_reason,
+        ): (row.started, row.completed, row.duration_count, row.duration_le_10)
+        for row in rows
+    }
+
+
+def _sketch_rows(session_factory: sessionmaker) -> dict[tuple, int]:
+    with session_factory() as session:
+        rows = session.execute(select(JobDurationSketchModel)).scalars().all()
+    return {
+        (row.resolution, row.bucket_start, row.slot_id, row.provider, row.bin): row.count
+        for row in rows
+    }
+
+
+def test_rollup_metrics_match_raw_history() -> None:
+    rollup, raw, session_factory = _build()
+    _seed_history(session_factory)
+    for outcome in _outcomes():
+        rollup.record_outcome(outcome)
+
+    assert rollup.system_metrics(WINDOW_START) == raw.system_metrics(WINDOW_START)
+    assert rollup.slot_metrics(WINDOW_START) == raw.slot_metrics(WINDOW_START)
+    assert rollup.slot_totals() == raw.slot_totals()
+    assert rollup.slot_duration_histograms(
+        WINDOW_START
+    ) == raw.slot_duration_histograms(WINDOW_START)
+    assert rollup.slot_latency(WINDOW_START) == raw.slot_latency(WINDOW_START)
+    for bucket_minutes in (15, 60):
+        assert rollup.latency_series(
+            WINDOW_START, bucket_minutes
+        ) == raw.latency_series(WINDOW_START, bucket_minutes)
+    assert rollup.latency_series(
+        WINDOW_START, 60, slot_id="slot-001"
+    ) == raw.latency_series(WINDOW_START, 60, slot_id="slot-001")
+    for bucket_minutes, slot_id in ((1, None), (15, "slot-001"), (60, None), (1440, None)):
+        assert rollup.throughput_series(
+            WINDOW_START, bucket_minutes, slot_id
+        ) == raw.throughput_series(WINDOW_START, bucket_minutes, slot_id)
+
+
+def test_rebuild_reproduces_incremental_rollups() -> None:
+    rollup, _, session_factory = _build()
+    _seed_history(session_factory)
+    for outcome in _outcomes():
+        rollup.record_outcome(outcome)
+    incremental = _rollup_rows(session_factory)
+    sketches = _sketch_rows(session_factory)
+
+    rollup.rebuild()
+    assert _rollup_rows(session_factory) == incremental
+    assert _sketch_rows(session_factory) == sketches
+
+
+def test_overridden_provider_is_keyed_like_rebuild() -> None:
+    rollup, _, session_factory = _build()
+    _seed_history(session_factory)
+    # админский тест-ран с override провайдера: ключ — провайдер слота, как в rebuild
+    for outcome in _outcomes():
+        rollup.record_outcome(replace(outcome, provider="turbotext"))
+    incremental = _rollup_rows(session_factory)
+    sketches = _sketch_rows(session_factory)
+
+    rollup.rebuild()
+
+    assert {key[3] for key in incremental} == {"gemini"}
+    assert _rollup_rows(session_factory) == incremental
+    assert _sketch_rows(session_factory) == sketches
+
+
+def test_partial_rebuild_repairs_buckets_and_totals() -> None:
+    rollup, _, session_factory = _build()
+    _seed_history(session_factory)
+    rollup.rebuild()
+    expected = _rollup_rows(session_factory)
+
+    with session_factory() as session:
+        session.execute(delete(JobStatsRollupModel))
+        session.commit()
+    outcomes = _outcomes()
+    for outcome in outcomes:
+        if outcome.job_id == "c1":
+            continue  # потерянный хук
+        rollup.record_outcome(outcome)
+    rollup.record_outcome(outcomes[0])  # хук, выполненный дважды
+
+    rollup.rebuild(since=NOW - timedelta(hours=4))
+
+    assert _rollup_rows(session_factory) == expected
+
+
+def test_pending_backfill_resumes_hour_chunks_newest_first() -> None:
+    rollup, _, session_factory = _build()
+    assert rollup.pending_backfill() is None
+
+    _seed_history(session_factory)
+    since, until = rollup.pending_backfill()
+    first_start = min(outcome.started_at for outcome in _outcomes())
+    assert since == first_start.replace(minute=0, second=0, microsecond=0)
+
+    hour = until
+    while hour > since:
+        rollup.rebuild(hour - timedelta(hours=1), hour)
+        hour -= timedelta(hours=1)
+        if hour == until - timedelta(hours=24):
+            # прерванный проход: остаток — до первой уже заполненной корзины
+            resumed = rollup.pending_backfill()
+            assert resumed[0] == since and hour < resumed[1] <= until
+    assert rollup.pending_backfill() is None
+    chunked = (_rollup_rows(session_factory), _sketch_rows(session_factory))
+
+    rollup.rebuild()
+    assert (_rollup_rows(session_factory), _sketch_rows(session_factory)) == chunked
+    assert rollup.system_metrics(WINDOW_START)["jobs_total"] == len(JOBS)
+
+
+def test_prune_drops_only_expired_minute_buckets() -> None:
+    rollup, _, session_factory = _build()
+    _seed_history(session_factory)
+    for outcome in _outcomes():
+        rollup.record_outcome(outcome)
+
+    removed = rollup.prune(now=NOW + MINUTE_RETENTION - timedelta(minutes=1000))
+
+    assert removed == 3  # старт, завершение и скетч b2
+    rows = _rollup_rows(session_factory)
+    assert not any(
+        key[0] == MINUTE and key[1] < NOW - timedelta(minutes=1000) for key in rows
+    )
+    assert rollup.slot_totals()[1]["provider_errors_total"] == 1
+
+
+class RecordingRollup(StatsRollupRepository):
+    def __init__(self, session_factory) -> None:
+        super().__init__(session_factory)
+        self.ranges: list[tuple] = []
+
+    def rebuild(self, since=None, until=None) -> int:
+        self.ranges.append((since, until))
+        return super().rebuild(since, until)
+
+
+def _build_recording() -> tuple[RecordingRollup, sessionmaker]:
+    # backfill пишет из потоков executor'а: нужна общая для потоков база
+    engine = create_db_engine("sqlite:///:memory:")
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    return RecordingRollup(session_factory), session_factory
+
+
+@pytest.mark.asyncio
+async def test_backfill_writes_one_hour_per_call_then_seeds() -> None:
+    rollup, session_factory = _build_recording()
+    _seed_history(session_factory)
+    seeded: list[int] = []
+    backfill = RollupBackfill(
+        repo=rollup, on_done=lambda: seeded.append(len(_rollup_rows(session_factory)))
+    )
+
+    rows = await backfill.run()
+
+    assert rows > 0
+    # ни одной многочасовой транзакции: запись ingest ждёт не дольше часа истории
+    assert all(until - since == timedelta(hours=1) for since, until in rollup.ranges)
+    assert [until for _, until in rollup.ranges] == sorted(
+        (until for _, until in rollup.ranges), reverse=True
+    )
+    first_start = min(outcome.started_at for outcome in _outcomes())
+    assert rollup.ranges[-1][0] <= first_start < rollup.ranges[-1][1]
+    assert seeded == [len(_rollup_rows(session_factory))]
+    assert rollup.system_metrics(first_start)["jobs_total"] == len(JOBS)
+
+    rollup.ranges.clear()
+    assert await backfill.run() == 0
+    assert rollup.ranges == []
+    assert len(seeded) == 2
+
+
+@pytest.mark.asyncio
+async def test_backfill_without_history_only_seeds() -> None:
+    rollup, session_factory = _build_recording()
+    seeded: list[bool] = []
+
+    assert await RollupBackfill(repo=rollup, on_done=lambda: seeded.append(True)).run() == 0
+
+    assert rollup.ranges == []
+    assert seeded == [True]
+    with session_factory() as session:
+        assert session.query(JobHistoryModel).count() == 0
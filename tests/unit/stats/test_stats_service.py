@@ -1,9 +1,17 @@
 from datetime import datetime, timedelta
 from pathlib import Path
-from types import SimpleNamespace
 
 import pytest
-
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app.config import MediaPaths
+from src.app.db.db_init import init_db
+from src.app.media.media_service import ResultStore
+from src.app.media.result_archive import ResultArchive, archive_aged_results
+from src.app.repositories.job_history_repository import JobHistoryRepository
+from src.app.repositories.media_object_repository import MediaObjectRepository
+from src.app.repositories.storage_ledger import StorageLedger
 from src.app.stats.stats_service import StatsService
 
 
@@ -47,15 +55,35 @@ class DummyRepo:
         self.window = window_start
         return self._recent_failures
 
+    def slot_latency(self, window_start: datetime) -> dict:
+        return {"slot-001": {"p50": 1.0, "p95": 4.0, "p99": 9.0}}
+
+    def latency_series(self, window_start: datetime, bucket_minutes: int, slot_id=None):
+        self.window = window_start
+        self.series_request = (bucket_minutes, slot_id)
+        return []
+
+    def throughput_series(self, window_start: datetime, bucket_minutes: int, slot_id=None):
+        self.window = window_start
+        self.series_request = (bucket_minutes, slot_id)
+        return [{"bucket_start": window_start, "jobs": 3}]
+
+
+class DummyLedger:
+    def __init__(self, usage: dict[str, int] | None = None) -> None:
+        self._usage = usage or {}
+        self.scopes: list[str | None] = []
 
-def test_overview_uses_repository_and_calculates_storage(tmp_path: Path) -> None:
+    def usage_bytes(self, scope: str | None = None) -> int:
+        self.scopes.append(scope)
+        return self._usage.get(scope, 0)
+
+
+def test_overview_uses_repository_and_ledger_storage() -> None:
     repo = DummyRepo()
-    results_dir = tmp_path / "results"
-    results_dir.mkdir()
-    sample = results_dir / "file.bin"
-    sample.write_bytes(b"x" * 1024 * 1024)  # 1 MB
+    ledger = DummyLedger({"result": 512 * 1024, "archive": 512 * 1024})  # 1 MB
 
-    service = StatsService(repo=repo, media_paths=SimpleNamespace(results=results_dir))
+    service = StatsService(repo=repo, ledger=ledger)
     snapshot = service.overview(window_minutes=30)
 
     assert snapshot["window_minutes"] == 30
@@ -65,6 +93,58 @@ def test_overview_uses_repository_and_calculates_storage(tmp_path: Path) -> None
     assert snapshot["slots"][0]["success_last_window"] == 2
     assert repo.window is not None
     assert repo.window > datetime.utcnow() - timedelta(minutes=31)
+    assert ledger.scopes == ["result", "object", "archive"]
+
+
+def test_storage_usage_is_unchanged_by_archiving(tmp_path: Path) -> None:
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'app.db'}",
+        future=True,
+        connect_args={"check_same_thread": False},
+    )
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    init_db(engine, session_factory)
+    media_repo = MediaObjectRepository(session_factory)
+    job_repo = JobHistoryRepository(session_factory)
+    ledger = StorageLedger(session_factory)
+    media_paths = MediaPaths(
+        root=tmp_path / "media",
+        results=tmp_path / "media" / "results",
+        templates=tmp_path / "media" / "templates",
+        temp=tmp_path / "media" / "temp",
+    )
+    archive = ResultArchive.for_paths(media_paths, media_repo, ledger)
+    store = ResultStore(media_paths, ledger=ledger, archive=archive)
+    expires_at = datetime.utcnow() + timedelta(days=3)
+    for job_id in ("job-0", "job-1"):
+        job_repo.create_pending(
+            job_id=job_id, slot_id="slot-001",
+            started_at=datetime.utcnow(), sync_deadline=datetime.utcnow(),
+        )
+        path = store.save_payload("slot-001", job_id, b"x" * 512 * 1024, "png")
+        media_repo.register_result(
+            job_id=job_id, slot_id="slot-001", path=path,
+            preview_path=None, expires_at=expires_at,
+        )
+        job_repo.set_result(
+            job_id=job_id, status="done", result_path=str(path),
+            result_expires_at=expires_at,
+        )
+    service = StatsService(repo=DummyRepo(), ledger=ledger)
+    before = service.overview()["system"]["storage_usage_mb"]
+
+    summary = archive_aged_results(
+        session_factory, archive, media_paths.results,
+        older_than=timedelta(hours=24),
+        ledger=ledger,
+        reference_time=datetime.utcnow() + timedelta(days=2),
+    )
+
+    assert summary.archived == 2
+    assert ledger.usage_bytes("result") == 0
+    # байты переехали в архив, а не исчезли из статистики
+    assert before == 1.0
+    assert service.overview()["system"]["storage_usage_mb"] == before
 
 
 def test_slot_stats_filters_inactive_and_adds_rates() -> None:
@@ -98,9 +178,7 @@ def test_slot_stats_filters_inactive_and_adds_rates() -> None:
         ]
     )
 
-    service = StatsService(
-        repo=repo, media_paths=SimpleNamespace(results=Path("/tmp/none"))
-    )
+    service = StatsService(repo=repo, ledger=DummyLedger())
     stats = service.slot_stats(window_minutes=15)
 
     assert stats["window_minutes"] == 15
@@ -109,6 +187,7 @@ def test_slot_stats_filters_inactive_and_adds_rates() -> None:
     assert slot["slot_id"] == "slot-001"
     assert slot["success_rate"] == pytest.approx(0.75)
     assert slot["timeout_rate"] == pytest.approx(0.25)
+    assert slot["latency_p95_seconds"] == 4.0
 
 
 def test_slot_stats_includes_recent_failures() -> None:
@@ -127,11 +206,32 @@ def test_slot_stats_includes_recent_failures() -> None:
             },
         ]
     )
-    service = StatsService(
-        repo=repo, media_paths=SimpleNamespace(results=Path("/tmp/none"))
-    )
+    service = StatsService(repo=repo, ledger=DummyLedger())
     stats = service.slot_stats(window_minutes=10)
 
     assert stats["recent_failures"]
     assert stats["recent_failures"][0]["http_status"] == 502
     assert stats["recent_failures"][1]["http_status"] == 504
+
+
+def test_latency_series_clamps_bucket() -> None:
+    repo = DummyRepo()
+    service = StatsService(repo=repo, ledger=DummyLedger())
+
+    series = service.latency_series(window_minutes=120, bucket_minutes=5000, slot_id="slot-002")
+
+    assert series["bucket_minutes"] == 1440
+    assert repo.series_request == (1440, "slot-002")
+    assert repo.window > datetime.utcnow() - timedelta(minutes=121)
+
+
+def test_timeseries_uses_throughput_series() -> None:
+    repo = DummyRepo()
+    service = StatsService(repo=repo, ledger=DummyLedger())
+
+    series = service.timeseries(window_minutes=10_000, bucket_minutes=0)
+
+    assert series["window_minutes"] == 4320
+    assert series["bucket_minutes"] == 1
+    assert series["points"][0]["jobs"] == 3
+    assert repo.series_request == (1, None)
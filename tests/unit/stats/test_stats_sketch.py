@@ -0,0 +1,37 @@
+import math
+import random
+
+from src.app.stats.stats_sketch import RELATIVE_ACCURACY, DurationSketch
+
+
+def _exact(samples: list[float], quantile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(quantile * len(ordered)) - 1, 0)]
+
+
+def test_quantiles_within_relative_accuracy() -> None:
+    rng = random.Random(35)
+    samples = [rng.lognormvariate(2.0, 1.0) for _ in range(5000)]
+    sketch = DurationSketch()
+    for seconds in samples:
+        sketch.add(seconds)
+
+    for quantile in (0.5, 0.95, 0.99):
+        exact = _exact(samples, quantile)
+        assert abs(sketch.quantile(quantile) - exact) <= exact * RELATIVE_ACCURACY
+
+
+def test_merged_sketches_equal_single_sketch() -> None:
+    samples = [0.0, 0.4, 3.0, 12.0, 48.0, 180.0, 7.5, 7.5]
+    whole = DurationSketch()
+    parts = [DurationSketch(), DurationSketch()]
+    for index, seconds in enumerate(samples):
+        whole.add(seconds)
+        parts[index % 2].add(seconds)
+
+    merged = DurationSketch.from_bins(parts[0].bins.items())
+    merged.merge(parts[1])
+
+    assert merged == whole
+    assert merged.quantiles() == whole.quantiles()
+    assert DurationSketch().quantiles() == {"p50": None, "p95": None, "p99": None}